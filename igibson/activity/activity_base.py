@@ -17,7 +17,6 @@ from igibson.robots.fetch_gripper_robot import FetchGripper
 from igibson.scenes.igibson_indoor_scene import InteractiveIndoorScene
 from igibson.simulator import Simulator
 from igibson.utils.assets_utils import get_ig_avg_category_specs, get_ig_category_path, get_ig_model_path
-from igibson.utils.checkpoint_utils import load_internal_states, save_internal_states
 from igibson.utils.constants import (
     AGENT_POSE_DIM,
     FLOOR_SYNSET,
@@ -25,6 +24,7 @@ from igibson.utils.constants import (
     NON_SAMPLEABLE_OBJECTS,
     TASK_RELEVANT_OBJS_OBS_DIM,
 )
+from igibson.utils.state_dump_utils import load_internal_states_binary, save_internal_states_binary
 
 KINEMATICS_STATES = frozenset({"inside", "ontop", "under", "onfloor"})
 
@@ -94,12 +94,12 @@ class iGBEHAVIORActivityInstance(BEHAVIORActivityInstance):
 
     def save_scene(self):
         snapshot_id = p.saveState()
-        self.state_history[snapshot_id] = save_internal_states(self.simulator)
+        self.state_history[snapshot_id] = save_internal_states_binary(self.simulator)
         return snapshot_id
 
     def reset_scene(self, snapshot_id):
         p.restoreState(snapshot_id)
-        load_internal_states(self.simulator, self.state_history[snapshot_id])
+        load_internal_states_binary(self.simulator, self.state_history[snapshot_id])
 
     def check_scene(self):
         feedback = {"init_success": "yes", "goal_success": "untested", "init_feedback": "", "goal_feedback": ""}
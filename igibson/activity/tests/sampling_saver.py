@@ -33,7 +33,7 @@ def remove_newly_added_objects(igbhvr_act_inst, state_id):
     for sim_obj in igbhvr_act_inst.newly_added_objects:
         igbhvr_act_inst.scene.remove_object(sim_obj)
         for id in sim_obj.body_ids:
-            p.removeBody(id)
+            igbhvr_act_inst.simulator.remove_body(id)
     p.restoreState(state_id)
 
 
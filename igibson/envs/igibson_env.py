@@ -5,7 +5,6 @@ from collections import OrderedDict
 
 import gym
 import numpy as np
-import pybullet as p
 from transforms3d.euler import euler2quat
 
 from igibson.envs.env_base import BaseEnv
@@ -253,7 +252,7 @@ class iGibsonEnv(BaseEnv):
         :return: collision_links: collisions from last physics timestep
         """
         self.simulator_step()
-        collision_links = list(p.getContactPoints(bodyA=self.robots[0].robot_ids[0]))
+        collision_links = list(self.simulator.contact_cache.get_contacts(self.robots[0].robot_ids[0]))
         return self.filter_collision_links(collision_links)
 
     def filter_collision_links(self, collision_links):
@@ -326,7 +325,7 @@ class iGibsonEnv(BaseEnv):
         :return: whether the given body_id has no collision
         """
         self.simulator_step()
-        collisions = list(p.getContactPoints(bodyA=body_id))
+        collisions = self.simulator.contact_cache.get_contacts(body_id)
 
         if logging.root.level <= logging.DEBUG:  # Only going into this if it is for logging --> efficiency
             for item in collisions:
@@ -403,7 +402,7 @@ class iGibsonEnv(BaseEnv):
         max_simulator_step = int(1.0 / self.action_timestep)
         for _ in range(max_simulator_step):
             self.simulator_step()
-            if len(p.getContactPoints(bodyA=body_id)) > 0:
+            if self.simulator.contact_cache.in_contact(body_id):
                 land_success = True
                 break
 
@@ -4,17 +4,86 @@ BEHAVIOR demo batch analysis script
 
 import json
 import logging
+import multiprocessing
 import os
+import socket
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 import bddl
 import pandas as pd
 
-from igibson.examples.behavior.behavior_demo_replay import replay_demo
+from igibson.examples.behavior.behavior_demo_batch_journal import (
+    _write_journal_record,
+    get_manifest_shard,
+    get_pending_demos,
+    read_batch_journal,
+    summarize_batch_journal,
+)
+from igibson.examples.behavior.behavior_demo_replay import (
+    get_demo_activity_key,
+    load_demo_activity,
+    replay_demo,
+    reset_demo_activity,
+)
+
+# Activity instance kept loaded by each worker process of behavior_demo_parallel_batch, so that demos with the
+# same activity key are replayed without reloading the scene.
+_worker_activity = {"key": None, "igbhvr_act_inst": None}
+
+
+def replay_demo_to_json(
+    demo_root, demo, out_dir, get_callbacks_callback, save_frames=False, kinematic=False, igbhvr_act_inst=None
+):
+    """
+    Replay a single demo of a batch with the callbacks provided by get_callbacks_callback and save the gathered
+    information as JSON in out_dir. See behavior_demo_batch for the arguments.
+
+    @param igbhvr_act_inst: Optional loaded activity instance to replay in, see replay_demo.
+    @return the demo information that was saved.
+    """
+    demo_name = os.path.splitext(demo)[0]
+    demo_path = os.path.join(demo_root, demo)
+    replay_path = os.path.join(out_dir, demo_name + "_replay.hdf5")
+    log_path = os.path.join(out_dir, demo_name + ".json")
+
+    curr_frame_save_path = None
+    if save_frames:
+        curr_frame_save_path = os.path.join(out_dir, demo_name + ".mp4")
+
+    try:
+        start_callbacks, step_callbacks, end_callbacks, data_callbacks = get_callbacks_callback()
+        demo_information = replay_demo(
+            in_log_path=demo_path,
+            out_log_path=replay_path,
+            frame_save_path=curr_frame_save_path,
+            start_callbacks=start_callbacks,
+            step_callbacks=step_callbacks,
+            end_callbacks=end_callbacks,
+            mode="headless",
+            verbose=False,
+            kinematic=kinematic,
+            igbhvr_act_inst=igbhvr_act_inst,
+        )
+        demo_information["failed"] = False
+        demo_information["filename"] = Path(demo).name
+
+        for callback in data_callbacks:
+            demo_information.update(callback())
+
+    except Exception as e:
+        print("Demo failed withe error: ", e)
+        demo_information = {"demo_id": Path(demo).name, "failed": True, "failure_reason": str(e)}
+
+    with open(log_path, "w") as file:
+        json.dump(demo_information, file)
+
+    return demo_information
 
 
 def behavior_demo_batch(
-    demo_root, log_manifest, out_dir, get_callbacks_callback, skip_existing=True, save_frames=False
+    demo_root, log_manifest, out_dir, get_callbacks_callback, skip_existing=True, save_frames=False, kinematic=False
 ):
     """
     Execute replay analysis functions (provided through callbacks) on a batch of BEHAVIOR demos.
@@ -30,6 +99,7 @@ def behavior_demo_batch(
         be saved in the end.
     @param skip_existing: Whether demos with existing output logs should be skipped.
     @param save_frames: Whether the demo's frames should be saved alongside statistics.
+    @param kinematic: Whether demos should be replayed kinematically from the logged poses, without simulating physics.
     """
     logger = logging.getLogger()
     logger.disabled = True
@@ -43,8 +113,6 @@ def behavior_demo_batch(
             continue
 
         demo_name = os.path.splitext(demo)[0]
-        demo_path = os.path.join(demo_root, demo)
-        replay_path = os.path.join(out_dir, demo_name + "_replay.hdf5")
         log_path = os.path.join(out_dir, demo_name + ".json")
 
         if skip_existing and os.path.exists(log_path):
@@ -53,31 +121,180 @@ def behavior_demo_batch(
 
         print("Replaying demo: {}, {} out of {}".format(demo, idx, len(demo_list["demos"])))
 
-        curr_frame_save_path = None
-        if save_frames:
-            curr_frame_save_path = os.path.join(out_dir, demo_name + ".mp4")
-
-        try:
-            start_callbacks, step_callbacks, end_callbacks, data_callbacks = get_callbacks_callback()
-            demo_information = replay_demo(
-                in_log_path=demo_path,
-                out_log_path=replay_path,
-                frame_save_path=curr_frame_save_path,
-                start_callbacks=start_callbacks,
-                step_callbacks=step_callbacks,
-                end_callbacks=end_callbacks,
-                mode="headless",
-                verbose=False,
-            )
-            demo_information["failed"] = False
-            demo_information["filename"] = Path(demo).name
+        replay_demo_to_json(
+            demo_root, demo, out_dir, get_callbacks_callback, save_frames=save_frames, kinematic=kinematic
+        )
+
+
+def _init_batch_worker():
+    logger = logging.getLogger()
+    logger.disabled = True
+    bddl.set_backend("iGibson")
+
+
+def _get_worker_activity(demo_path, key):
+    """Returns the worker's loaded activity instance for key, reset for a new replay or loaded if needed."""
+    if _worker_activity["key"] == key:
+        reset_demo_activity(_worker_activity["igbhvr_act_inst"])
+    else:
+        _release_worker_activity()
+        _worker_activity["igbhvr_act_inst"] = load_demo_activity(demo_path)
+        _worker_activity["key"] = key
+    return _worker_activity["igbhvr_act_inst"]
+
+
+def _release_worker_activity():
+    if _worker_activity["igbhvr_act_inst"] is not None:
+        _worker_activity["igbhvr_act_inst"].simulator.disconnect()
+    _worker_activity["key"] = None
+    _worker_activity["igbhvr_act_inst"] = None
+
 
-            for callback in data_callbacks:
-                demo_information.update(callback())
+def _replay_demo_group(args):
+    """Worker function replaying a group of demos that share an activity key."""
+    demo_root, demos, key, out_dir, get_callbacks_callback, save_frames, kinematic, reuse_simulator = args
+    worker = "{}_{}".format(socket.gethostname(), os.getpid())
+
+    for demo in demos:
+        _write_journal_record(out_dir, {"demo": demo, "status": "started", "worker": worker})
+
+        load_start = time.time()
+        igbhvr_act_inst = None
+        if reuse_simulator:
+            try:
+                igbhvr_act_inst = _get_worker_activity(os.path.join(demo_root, demo), key)
+            except Exception as e:
+                print("Loading demo failed with error: ", e)
+                _release_worker_activity()
+                _write_journal_record(
+                    out_dir,
+                    {
+                        "demo": demo,
+                        "status": "failed",
+                        "failure_reason": str(e),
+                        "load_duration": time.time() - load_start,
+                        "replay_duration": 0,
+                        "total_frame_num": 0,
+                        "worker": worker,
+                    },
+                )
+                continue
+        load_duration = time.time() - load_start
+
+        replay_start = time.time()
+        demo_information = replay_demo_to_json(
+            demo_root,
+            demo,
+            out_dir,
+            get_callbacks_callback,
+            save_frames=save_frames,
+            kinematic=kinematic,
+            igbhvr_act_inst=igbhvr_act_inst,
+        )
+        replay_duration = time.time() - replay_start
+
+        # A replay that raised may have left the simulator in an arbitrary state, so it is not reused
+        if demo_information["failed"]:
+            _release_worker_activity()
+
+        _write_journal_record(
+            out_dir,
+            {
+                "demo": demo,
+                "status": "failed" if demo_information["failed"] else "done",
+                "load_duration": load_duration,
+                "replay_duration": replay_duration,
+                "total_frame_num": int(demo_information.get("total_frame_num", 0)),
+                "worker": worker,
+            },
+        )
+
+    return len(demos)
+
+
+def behavior_demo_parallel_batch(
+    demo_root,
+    log_manifest,
+    out_dir,
+    get_callbacks_callback,
+    num_workers=1,
+    num_shards=1,
+    shard_index=0,
+    demos_per_task=None,
+    reuse_simulator=True,
+    retry_failed=False,
+    save_frames=False,
+    kinematic=False,
+):
+    """
+    Execute replay analysis functions (provided through callbacks) on a batch of BEHAVIOR demos with a pool of
+    worker processes. Demos are grouped by activity key, and each worker keeps its simulator loaded across demos
+    of the same group. Progress is recorded in journal files in out_dir, so an interrupted batch resumes with
+    exactly the demos that did not finish, and per-demo timings are aggregated into batch_summary_<shard_index>.json.
+
+    @param demo_root: Directory containing the demo files listed in the manifests.
+    @param log_manifest: The manifest file containing list of BEHAVIOR demos to batch over.
+    @param out_dir: Directory to store results in.
+    @param get_callbacks_callback: See behavior_demo_batch. This is sent to the worker processes, so it needs to
+        be picklable, e.g. a module-level function.
+    @param num_workers: Number of worker processes.
+    @param num_shards: Number of shards the manifest is split into, e.g. one per machine.
+    @param shard_index: Index of the shard of the manifest to process.
+    @param demos_per_task: Maximum number of demos sent to a worker at once. Defaults to whole activity groups.
+    @param reuse_simulator: Whether workers should reuse a loaded simulator for demos with the same activity key.
+    @param retry_failed: Whether demos that failed in a previous run should be replayed again.
+    @param save_frames: Whether the demo's frames should be saved alongside statistics.
+    @param kinematic: Whether demos should be replayed kinematically from the logged poses, without simulating physics.
+    @return the batch summary, see summarize_batch_journal.
+    """
+    logger = logging.getLogger()
+    logger.disabled = True
+
+    demo_list = pd.read_csv(log_manifest)
+    demos = [demo for demo in demo_list["demos"] if "replay" not in demo]
+    demos = get_manifest_shard(demos, num_shards=num_shards, shard_index=shard_index)
+
+    pending = get_pending_demos(demos, read_batch_journal(out_dir), retry_failed=retry_failed)
+    print("Replaying {} out of {} demos in shard {}".format(len(pending), len(demos), shard_index))
+
+    groups = OrderedDict()
+    for demo in pending:
+        key = get_demo_activity_key(os.path.join(demo_root, demo))
+        groups.setdefault(key, []).append(demo)
+
+    tasks = []
+    for key, group in groups.items():
+        chunk_size = demos_per_task or len(group)
+        for start in range(0, len(group), chunk_size):
+            tasks.append(
+                (
+                    demo_root,
+                    group[start : start + chunk_size],
+                    key,
+                    out_dir,
+                    get_callbacks_callback,
+                    save_frames,
+                    kinematic,
+                    reuse_simulator,
+                )
+            )
 
-        except Exception as e:
-            print("Demo failed withe error: ", e)
-            demo_information = {"demo_id": Path(demo).name, "failed": True, "failure_reason": str(e)}
+    # Simulators hold OpenGL contexts and pybullet connections, which cannot be shared with forked processes
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(num_workers, initializer=_init_batch_worker)
+    try:
+        num_done = 0
+        for num_replayed in pool.imap_unordered(_replay_demo_group, tasks):
+            num_done += num_replayed
+            print("Replayed {} out of {} demos".format(num_done, len(pending)))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
 
-        with open(log_path, "w") as file:
-            json.dump(demo_information, file)
+    summary = summarize_batch_journal(out_dir, demos)
+    with open(os.path.join(out_dir, "batch_summary_{}.json".format(shard_index)), "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
@@ -0,0 +1,100 @@
+"""
+Journal and sharding helpers of behavior_demo_parallel_batch. They only read and write files, so they can be used
+to inspect or resume a batch without bddl or a simulator.
+"""
+
+import glob
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+
+
+def get_manifest_shard(demos, num_shards=1, shard_index=0):
+    """
+    Get the demos of a manifest that belong to one shard, so that a manifest can be split across machines.
+
+    @param demos: List of demos in the manifest.
+    @param num_shards: Total number of shards.
+    @param shard_index: Index of the shard to return, in [0, num_shards).
+    @return the list of demos in the shard.
+    """
+    if not 0 <= shard_index < num_shards:
+        raise ValueError("Shard index {} is out of range for {} shards".format(shard_index, num_shards))
+    return list(demos)[shard_index::num_shards]
+
+
+def read_batch_journal(out_dir):
+    """
+    Read the journals written by behavior_demo_parallel_batch in out_dir.
+
+    @param out_dir: Directory the batch results are stored in.
+    @return an OrderedDict mapping each demo to its latest journal record.
+    """
+    records = []
+    for journal_path in glob.glob(os.path.join(out_dir, "journal_*.jsonl")):
+        with open(journal_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                # A worker that was killed mid-write can leave a truncated last line
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+
+    latest = OrderedDict()
+    for record in sorted(records, key=lambda record: record["time"]):
+        latest[record["demo"]] = record
+    return latest
+
+
+def get_pending_demos(demos, journal, retry_failed=False):
+    """
+    Get the demos of a batch that still need to be replayed, so that an interrupted batch resumes where it stopped.
+
+    @param demos: List of demos in the batch.
+    @param journal: Latest journal record of each demo, see read_batch_journal.
+    @param retry_failed: Whether demos that failed in a previous run should be replayed again.
+    @return the list of demos that did not finish, in batch order.
+    """
+    finished_status = ["done"] if retry_failed else ["done", "failed"]
+    return [demo for demo in demos if demo not in journal or journal[demo]["status"] not in finished_status]
+
+
+def _write_journal_record(out_dir, record):
+    record["time"] = time.time()
+    journal_path = os.path.join(out_dir, "journal_{}_{}.jsonl".format(socket.gethostname(), os.getpid()))
+    with open(journal_path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def summarize_batch_journal(out_dir, demos=None):
+    """
+    Aggregate the per-demo timings recorded in the journals of out_dir.
+
+    @param out_dir: Directory the batch results are stored in.
+    @param demos: Optional list of demos to restrict the summary to.
+    @return a dictionary of aggregate statistics and per-demo records.
+    """
+    records = read_batch_journal(out_dir)
+    if demos is not None:
+        demos = set(demos)
+        records = OrderedDict((demo, record) for demo, record in records.items() if demo in demos)
+    finished = [record for record in records.values() if record["status"] in ["done", "failed"]]
+
+    total_replay_duration = sum(record["replay_duration"] for record in finished)
+    total_load_duration = sum(record["load_duration"] for record in finished)
+    total_frame_num = sum(record["total_frame_num"] for record in finished)
+    return {
+        "num_demos": len(finished),
+        "num_failed": sum(record["status"] == "failed" for record in finished),
+        "num_unfinished": len(records) - len(finished),
+        "total_replay_duration": total_replay_duration,
+        "total_load_duration": total_load_duration,
+        "mean_replay_duration": total_replay_duration / len(finished) if finished else 0,
+        "replay_fps": total_frame_num / total_replay_duration if total_replay_duration > 0 else 0,
+        "demos": records,
+    }
@@ -1,6 +1,6 @@
 import argparse
 
-from igibson.examples.behavior.behavior_demo_batch import behavior_demo_batch
+from igibson.examples.behavior.behavior_demo_batch import behavior_demo_batch, behavior_demo_parallel_batch
 from igibson.metrics.agent import AgentMetric
 from igibson.metrics.disarrangement import KinematicDisarrangement, LogicalDisarrangement
 from igibson.metrics.gaze import GazeMetric
@@ -12,23 +12,53 @@ def parse_args():
     parser.add_argument("demo_root", type=str, help="Directory containing demos listed in the manifest.")
     parser.add_argument("log_manifest", type=str, help="Plain text file consisting of list of demos to replay.")
     parser.add_argument("out_dir", type=str, help="Directory to store results in.")
+    parser.add_argument(
+        "--kinematic",
+        action="store_true",
+        help="Whether to compute metrics from logged poses without simulating physics.",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=0,
+        help="Number of worker processes. If 0, demos are replayed serially in this process.",
+    )
+    parser.add_argument(
+        "--num_shards", type=int, default=1, help="Number of shards the manifest is split into (with --num_workers)."
+    )
+    parser.add_argument("--shard_index", type=int, default=0, help="Index of the manifest shard to process.")
     return parser.parse_args()
 
 
+def get_metrics_callbacks():
+    metrics = [KinematicDisarrangement(), LogicalDisarrangement(), AgentMetric(), GazeMetric(), TaskMetric()]
+
+    return (
+        [metric.start_callback for metric in metrics],
+        [metric.step_callback for metric in metrics],
+        [metric.end_callback for metric in metrics],
+        [metric.gather_results for metric in metrics],
+    )
+
+
 def main():
     args = parse_args()
 
-    def get_metrics_callbacks():
-        metrics = [KinematicDisarrangement(), LogicalDisarrangement(), AgentMetric(), GazeMetric(), TaskMetric()]
-
-        return (
-            [metric.start_callback for metric in metrics],
-            [metric.step_callback for metric in metrics],
-            [metric.end_callback for metric in metrics],
-            [metric.gather_results for metric in metrics],
+    if args.num_workers > 0:
+        behavior_demo_parallel_batch(
+            args.demo_root,
+            args.log_manifest,
+            args.out_dir,
+            get_metrics_callbacks,
+            num_workers=args.num_workers,
+            num_shards=args.num_shards,
+            shard_index=args.shard_index,
+            kinematic=args.kinematic,
+        )
+    else:
+        behavior_demo_batch(
+            args.demo_root, args.log_manifest, args.out_dir, get_metrics_callbacks, kinematic=args.kinematic
         )
-
-    behavior_demo_batch(args.demo_root, args.log_manifest, args.out_dir, get_metrics_callbacks)
 
 
 if __name__ == "__main__":
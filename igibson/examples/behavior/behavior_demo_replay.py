@@ -10,11 +10,13 @@ import pprint
 import bddl
 import h5py
 import numpy as np
+import pybullet as p
 
 import igibson
 from igibson.activity.activity_base import iGBEHAVIORActivityInstance
 from igibson.render.mesh_renderer.mesh_renderer_cpu import MeshRendererSettings
 from igibson.render.mesh_renderer.mesh_renderer_vr import VrSettings
+from igibson.robots.behavior_robot import BehaviorRobot
 from igibson.simulator import Simulator
 from igibson.utils.git_utils import project_git_info
 from igibson.utils.ig_logging import IGLogReader, IGLogWriter
@@ -35,6 +37,19 @@ def verify_determinism(in_log_path, out_log_path):
     return bool(is_deterministic)
 
 
+def move_agent_parts_to_targets(vr_agent):
+    """
+    Teleports the agent's body and hands to the poses commanded by the last applied action. In kinematic replay
+    this stands in for the movement constraints, which are only resolved when physics is simulated.
+    """
+    for part_name in ["body", "left_hand", "right_hand"]:
+        part = vr_agent.parts.get(part_name)
+        if part is None or part.movement_cid is None or part.new_pos is None:
+            continue
+        p.resetBasePositionAndOrientation(part.body_id, part.new_pos, part.new_orn)
+    vr_agent.invalidate_state_snapshot()
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Run and collect an ATUS demo")
     parser.add_argument("--vr_log_path", type=str, help="Path (and filename) of vr log to replay")
@@ -52,6 +67,11 @@ def parse_args():
         help="Whether to disable saving log of replayed trajectory, used for validation.",
     )
     parser.add_argument("--profile", action="store_true", help="Whether to print profiling data.")
+    parser.add_argument(
+        "--kinematic",
+        action="store_true",
+        help="Whether to replay by setting logged poses directly instead of simulating physics.",
+    )
     parser.add_argument(
         "--mode",
         type=str,
@@ -61,6 +81,107 @@ def parse_args():
     return parser.parse_args()
 
 
+def get_demo_activity_key(in_log_path):
+    """
+    Get a key identifying the simulator setup needed to replay a BEHAVIOR demo. Demos with the same key can be
+    replayed in the same loaded activity, see reset_demo_activity.
+
+    @param in_log_path: the path of the BEHAVIOR demo log.
+    @return a tuple of the demo's activity, activity definition, scene, timesteps and VR settings.
+    """
+    return tuple(
+        IGLogReader.read_metadata_attr(in_log_path, attr)
+        for attr in [
+            "/metadata/atus_activity",
+            "/metadata/activity_definition",
+            "/metadata/scene_id",
+            "/metadata/physics_timestep",
+            "/metadata/render_timestep",
+            "/metadata/vr_settings",
+        ]
+    )
+
+
+def load_demo_activity(in_log_path, mode="headless", frame_save_path=None):
+    """
+    Create a simulator and load the activity instance that a BEHAVIOR demo was collected in.
+
+    @param in_log_path: the path of the BEHAVIOR demo log.
+    @param mode: which rendering mode ("headless", "simple", "vr").
+    @param frame_save_path: the path to save frame images to. None to disable frame image saving.
+    @return the loaded iGBEHAVIORActivityInstance.
+    """
+    # HDR files for PBR rendering
+    hdr_texture = os.path.join(igibson.ig_dataset_path, "scenes", "background", "probe_02.hdr")
+    hdr_texture2 = os.path.join(igibson.ig_dataset_path, "scenes", "background", "probe_03.hdr")
+    light_modulation_map_filename = os.path.join(
+        igibson.ig_dataset_path, "scenes", "Rs_int", "layout", "floor_lighttype_0.png"
+    )
+    background_texture = os.path.join(igibson.ig_dataset_path, "scenes", "background", "urban_street_01.jpg")
+
+    # VR rendering settings
+    vr_rendering_settings = MeshRendererSettings(
+        optimized=True,
+        fullscreen=False,
+        env_texture_filename=hdr_texture,
+        env_texture_filename2=hdr_texture2,
+        env_texture_filename3=background_texture,
+        light_modulation_map_filename=light_modulation_map_filename,
+        enable_shadow=True,
+        enable_pbr=True,
+        msaa=False,
+        light_dimming_factor=1.0,
+    )
+
+    task = IGLogReader.read_metadata_attr(in_log_path, "/metadata/atus_activity")
+    task_id = IGLogReader.read_metadata_attr(in_log_path, "/metadata/activity_definition")
+    scene = IGLogReader.read_metadata_attr(in_log_path, "/metadata/scene_id")
+    physics_timestep = IGLogReader.read_metadata_attr(in_log_path, "/metadata/physics_timestep")
+    render_timestep = IGLogReader.read_metadata_attr(in_log_path, "/metadata/render_timestep")
+
+    # Initialize settings to save action replay frames
+    vr_settings = VrSettings(config_str=IGLogReader.read_metadata_attr(in_log_path, "/metadata/vr_settings"))
+    vr_settings.set_frame_save_path(frame_save_path)
+
+    # VR system settings
+    s = Simulator(
+        mode=mode,
+        physics_timestep=physics_timestep,
+        render_timestep=render_timestep,
+        rendering_settings=vr_rendering_settings,
+        vr_settings=vr_settings,
+        image_width=1280,
+        image_height=720,
+    )
+
+    igbhvr_act_inst = iGBEHAVIORActivityInstance(task, task_id)
+    igbhvr_act_inst.initialize_simulator(
+        simulator=s,
+        scene_id=scene,
+        scene_kwargs={
+            "urdf_file": "{}_task_{}_{}_0_fixed_furniture".format(scene, task, task_id),
+        },
+        load_clutter=True,
+        online_sampling=False,
+    )
+    return igbhvr_act_inst
+
+
+def reset_demo_activity(igbhvr_act_inst):
+    """
+    Reset a loaded activity instance to the state it was in right after loading, so that another demo with the same
+    activity key can be replayed in it without reloading the scene.
+
+    @param igbhvr_act_inst: the iGBEHAVIORActivityInstance to reset.
+    """
+    igbhvr_act_inst.reset_scene(igbhvr_act_inst.initial_state)
+    for robot in igbhvr_act_inst.simulator.robots:
+        if isinstance(robot, BehaviorRobot):
+            robot.deactivate()
+    igbhvr_act_inst.simulator.frame_count = 0
+    igbhvr_act_inst.simulator.first_sync = True
+
+
 def replay_demo(
     in_log_path,
     out_log_path=None,
@@ -72,6 +193,8 @@ def replay_demo(
     step_callbacks=[],
     end_callbacks=[],
     profile=False,
+    kinematic=False,
+    igbhvr_act_inst=None,
 ):
     """
     Replay a BEHAVIOR demo.
@@ -85,6 +208,13 @@ def replay_demo(
     @param mode: which rendering mode ("headless", "simple", "vr"). In simple mode, the demo will be replayed with simple robot view.
     @param disable_save: Whether saving the replay as a BEHAVIOR demo log should be disabled.
     @param profile: Whether the replay should be profiled, with profiler output to stdout.
+    @param kinematic: Whether the replay should be kinematic. In kinematic mode, physics is not simulated: body poses
+        and joint states are set directly from the log every frame, the agent's parts are moved to their commanded
+        poses, and object states and callbacks are updated as usual. Only bodies that were logged are replayed, so
+        demos collected with filter_objects only replay the objects in the activity's scope.
+    @param igbhvr_act_inst: An activity instance loaded with load_demo_activity for a demo with the same activity key,
+        to replay in instead of loading a new simulator. It should be reset with reset_demo_activity if it has been
+        used before, and it is not disconnected at the end of the replay.
     @param start_callback: A callback function that will be called immediately before starting to replay steps. Should
         take a single argument, an iGBEHAVIORActivityInstance.
     @param step_callback: A callback function that will be called immediately following each replayed step. Should
@@ -93,40 +223,12 @@ def replay_demo(
         argument, an iGBEHAVIORActivityInstance.
     @return if disable_save is True, returns None. Otherwise, returns a boolean indicating if replay was deterministic.
     """
-    # HDR files for PBR rendering
-    hdr_texture = os.path.join(igibson.ig_dataset_path, "scenes", "background", "probe_02.hdr")
-    hdr_texture2 = os.path.join(igibson.ig_dataset_path, "scenes", "background", "probe_03.hdr")
-    light_modulation_map_filename = os.path.join(
-        igibson.ig_dataset_path, "scenes", "Rs_int", "layout", "floor_lighttype_0.png"
-    )
-    background_texture = os.path.join(igibson.ig_dataset_path, "scenes", "background", "urban_street_01.jpg")
-
-    # VR rendering settings
-    vr_rendering_settings = MeshRendererSettings(
-        optimized=True,
-        fullscreen=False,
-        env_texture_filename=hdr_texture,
-        env_texture_filename2=hdr_texture2,
-        env_texture_filename3=background_texture,
-        light_modulation_map_filename=light_modulation_map_filename,
-        enable_shadow=True,
-        enable_pbr=True,
-        msaa=False,
-        light_dimming_factor=1.0,
-    )
-
     # Check mode
     assert mode in ["headless", "vr", "simple"]
 
-    # Initialize settings to save action replay frames
-    vr_settings = VrSettings(config_str=IGLogReader.read_metadata_attr(in_log_path, "/metadata/vr_settings"))
-    vr_settings.set_frame_save_path(frame_save_path)
-
     task = IGLogReader.read_metadata_attr(in_log_path, "/metadata/atus_activity")
     task_id = IGLogReader.read_metadata_attr(in_log_path, "/metadata/activity_definition")
     scene = IGLogReader.read_metadata_attr(in_log_path, "/metadata/scene_id")
-    physics_timestep = IGLogReader.read_metadata_attr(in_log_path, "/metadata/physics_timestep")
-    render_timestep = IGLogReader.read_metadata_attr(in_log_path, "/metadata/render_timestep")
     filter_objects = IGLogReader.read_metadata_attr(in_log_path, "/metadata/filter_objects")
 
     logged_git_info = IGLogReader.read_metadata_attr(in_log_path, "/metadata/git_info")
@@ -151,27 +253,13 @@ def replay_demo(
             print("Current git info:\n")
             pp.pprint(git_info[key])
 
-    # VR system settings
-    s = Simulator(
-        mode=mode,
-        physics_timestep=physics_timestep,
-        render_timestep=render_timestep,
-        rendering_settings=vr_rendering_settings,
-        vr_settings=vr_settings,
-        image_width=1280,
-        image_height=720,
-    )
+    reuse_activity = igbhvr_act_inst is not None
+    if reuse_activity:
+        igbhvr_act_inst.simulator.vr_settings.set_frame_save_path(frame_save_path)
+    else:
+        igbhvr_act_inst = load_demo_activity(in_log_path, mode=mode, frame_save_path=frame_save_path)
+    s = igbhvr_act_inst.simulator
 
-    igbhvr_act_inst = iGBEHAVIORActivityInstance(task, task_id)
-    igbhvr_act_inst.initialize_simulator(
-        simulator=s,
-        scene_id=scene,
-        scene_kwargs={
-            "urdf_file": "{}_task_{}_{}_0_fixed_furniture".format(scene, task, task_id),
-        },
-        load_clutter=True,
-        online_sampling=False,
-    )
     vr_agent = igbhvr_act_inst.simulator.robots[0]
     log_reader = IGLogReader(in_log_path, log_status=False)
 
@@ -198,7 +286,14 @@ def replay_demo(
     task_done = False
     while log_reader.get_data_left_to_read():
 
-        igbhvr_act_inst.simulator.step(print_stats=profile)
+        if kinematic:
+            move_agent_parts_to_targets(vr_agent)
+            log_reader.set_physics_data()
+            # The logged poses and joint states may include the agent's parts
+            vr_agent.invalidate_state_snapshot()
+            igbhvr_act_inst.simulator.kinematic_step()
+        else:
+            igbhvr_act_inst.simulator.step(print_stats=profile)
         task_done, _ = igbhvr_act_inst.check_success()
 
         # Set camera each frame
@@ -220,7 +315,9 @@ def replay_demo(
     for callback in end_callbacks:
         callback(igbhvr_act_inst, log_reader)
 
-    s.disconnect()
+    log_reader.end_log_session()
+    if not reuse_activity:
+        s.disconnect()
 
     is_deterministic = None
     if not disable_save:
@@ -257,6 +354,7 @@ def main():
         frame_save_path=args.frame_save_path,
         mode=args.mode,
         profile=args.profile,
+        kinematic=args.kinematic,
     )
 
 
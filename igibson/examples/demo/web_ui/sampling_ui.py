@@ -254,7 +254,7 @@ class ToyEnvInt(object):
         self.task.simulator.particle_systems = self.task.simulator.particle_systems[: self.num_particle_systems]
 
         for body_id in range(self.num_body_ids, p.getNumBodies()):
-            p.removeBody(body_id)
+            self.task.simulator.remove_body(body_id)
 
         p.restoreState(self.state_id)
 
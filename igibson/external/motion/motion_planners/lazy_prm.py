@@ -176,3 +176,159 @@ def lazy_prm_replan_loop(start_conf, end_conf, distance_fn, sample_fn, extend_fn
         if path is not None:
             return smooth_path(path, extend_fn, collision_fn, iterations=smooth)
     return None
+
+
+class LazyRoadmap(object):
+    """
+    Multi-query lazy PRM. The roadmap is built once without collision checking; vertices and edges are only
+    checked when a query path goes through them, and the results are kept for later queries.
+    Optionally records the workspace AABB swept by every checked vertex and edge, so that only the
+    collision results near moved obstacles need to be invalidated.
+    """
+
+    def __init__(self, samples, max_degree=10, weights=None, p_norm=2, max_distance=INF):
+        self.max_degree = max_degree
+        self.weights = np.ones(len(samples[0])) if weights is None else np.array(weights)
+        self.p_norm = p_norm
+        self.max_distance = max_distance
+
+        self.samples = [tuple(q) for q in samples]
+        self.embedded = self.weights * np.array(self.samples)
+        self.neighbors = {v: set() for v in range(len(self.samples))}
+        kd_tree = KDTree(self.embedded)
+        for v1 in range(len(self.samples)):
+            distances, neighbors = kd_tree.query(self.embedded[v1], k=max_degree + 1, p=p_norm,
+                                                 distance_upper_bound=max_distance)
+            for d, v2 in zip(distances, neighbors):
+                if (d < max_distance) and (v1 != v2):
+                    self.neighbors[v1].add(v2)
+                    self.neighbors[v2].add(v1)
+
+        self.colliding_vertices, self.colliding_edges = {}, {}
+        # Workspace AABBs (lower, upper) of the checked vertices and edges
+        self.vertex_aabbs, self.edge_aabbs = {}, {}
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add_vertex(self, conf):
+        """
+        Add a configuration to the roadmap and connect it to its nearest vertices
+        :return: index of the vertex
+        """
+        conf = tuple(conf)
+        embedded = self.weights * np.array(conf)
+        distances = np.linalg.norm(self.embedded - embedded, ord=self.p_norm, axis=1)
+        v1 = len(self.samples)
+        self.samples.append(conf)
+        self.embedded = np.vstack([self.embedded, embedded])
+        self.neighbors[v1] = set()
+        for v2 in np.argsort(distances)[:self.max_degree]:
+            if distances[v2] < self.max_distance:
+                self.neighbors[v1].add(int(v2))
+                self.neighbors[int(v2)].add(v1)
+        return v1
+
+    def remove_vertex(self, v1):
+        """
+        Remove the last vertex added with add_vertex, along with its edges and collision results
+        :param v1: index of the vertex
+        """
+        assert v1 == len(self.samples) - 1, "Only the last vertex of the roadmap can be removed"
+        for v2 in self.neighbors.pop(v1):
+            self.neighbors[v2].discard(v1)
+            edge = (min(v1, v2), max(v1, v2))
+            self.colliding_edges.pop(edge, None)
+            self.edge_aabbs.pop(edge, None)
+        self.colliding_vertices.pop(v1, None)
+        self.vertex_aabbs.pop(v1, None)
+        self.samples.pop()
+        self.embedded = self.embedded[:-1]
+
+    def invalidate(self, lowers, uppers):
+        """
+        Forget the collision results of the vertices and edges whose AABB overlaps any of the given regions
+        :param lowers: (N, 3) lower corners of the regions
+        :param uppers: (N, 3) upper corners of the regions
+        :return: number of collision results forgotten
+        """
+        lowers, uppers = np.reshape(lowers, (-1, 3)), np.reshape(uppers, (-1, 3))
+        num_invalidated = 0
+        for aabbs, results in [(self.vertex_aabbs, self.colliding_vertices), (self.edge_aabbs, self.colliding_edges)]:
+            if not aabbs or len(lowers) == 0:
+                continue
+            keys = list(aabbs)
+            aabb_array = np.array([aabbs[key] for key in keys])
+            overlapping = np.any(np.all(aabb_array[:, np.newaxis, 0] <= uppers[np.newaxis], axis=2) &
+                                 np.all(lowers[np.newaxis] <= aabb_array[:, np.newaxis, 1], axis=2), axis=1)
+            for i in np.flatnonzero(overlapping):
+                results.pop(keys[i], None)
+                del aabbs[keys[i]]
+                num_invalidated += 1
+        return num_invalidated
+
+    def clear_collisions(self):
+        self.colliding_vertices, self.colliding_edges = {}, {}
+        self.vertex_aabbs, self.edge_aabbs = {}, {}
+
+    def check_path(self, path, extend_fn, collision_fn, aabb_fn=None):
+        for v in path:
+            if v not in self.colliding_vertices:
+                self.colliding_vertices[v] = collision_fn(self.samples[v])
+                if aabb_fn is not None:
+                    self.vertex_aabbs[v] = aabb_fn([self.samples[v]])
+            if self.colliding_vertices[v]:
+                return False
+        for v1, v2 in zip(path, path[1:]):
+            edge = (min(v1, v2), max(v1, v2))
+            if edge not in self.colliding_edges:
+                segment = list(extend_fn(self.samples[edge[0]], self.samples[edge[1]]))
+                self.colliding_edges[edge] = any(map(collision_fn, segment))
+                if aabb_fn is not None:
+                    self.edge_aabbs[edge] = aabb_fn(segment)
+            if self.colliding_edges[edge]:
+                return False
+        return True
+
+    def query(self, start_conf, end_conf, distance_fn, extend_fn, collision_fn, aabb_fn=None,
+              max_cost=INF, max_time=INF):
+        """
+        Search the roadmap for a collision-free path, lazily checking and repairing it. The start and goal
+        configurations are only added to the roadmap for the duration of the query
+        :param aabb_fn: optional function mapping a list of configurations to the (lower, upper) workspace
+            AABB they sweep, recorded for invalidation
+        :return: list of configurations or None if no path was found
+        """
+        start_index, end_index = self.add_vertex(start_conf), self.add_vertex(end_conf)
+        try:
+            return self._search(start_index, end_index, distance_fn, extend_fn, collision_fn, aabb_fn,
+                                max_cost=max_cost, max_time=max_time)
+        finally:
+            self.remove_vertex(end_index)
+            self.remove_vertex(start_index)
+
+    def _search(self, start_index, end_index, distance_fn, extend_fn, collision_fn, aabb_fn, max_cost, max_time):
+        start_time = time.time()
+
+        def cost_fn(v1, v2): return distance_fn(self.samples[v1], self.samples[v2])
+
+        def neighbors_fn(v1):
+            for v2 in self.neighbors[v1]:
+                if not (self.colliding_vertices.get(v2, False) or
+                        self.colliding_edges.get((min(v1, v2), max(v1, v2)), False)):
+                    yield v2
+
+        visited = dijkstra(end_index, neighbors_fn, cost_fn)
+        def heuristic_fn(v): return visited[v].g if v in visited else INF
+        while elapsed_time(start_time) < max_time:
+            path = wastar_search(start_index, end_index, neighbors_fn=neighbors_fn,
+                                 cost_fn=cost_fn, heuristic_fn=heuristic_fn,
+                                 max_cost=max_cost, max_time=max_time - elapsed_time(start_time))
+            if path is None:
+                return None
+            if self.check_path(path, extend_fn, collision_fn, aabb_fn):
+                solution = [self.samples[start_index]]
+                for v1, v2 in zip(path, path[1:]):
+                    solution.extend(extend_fn(self.samples[v1], self.samples[v2]))
+                return solution
+        return None
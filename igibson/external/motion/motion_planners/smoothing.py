@@ -3,8 +3,11 @@ Developed by Caelen Garrett in pybullet-planning repository (https://github.com/
 and adapted by iGibson team.
 """
 from random import randint
+import time
 import numpy as np
 
+from .utils import INF, elapsed_time
+
 
 def smooth_path(path, extend, collision, iterations=50):
     smoothed_path = path
@@ -52,3 +55,59 @@ def optimize_path(path, extend, collision, iterations=50):
     return smoothed_path
 
 # TODO: sparsify path to just waypoints
+
+
+def shortcut_path(path, extend, collision, batch_collision=None, weights=None, iterations=50, num_proposals=32,
+                  max_time=INF):
+    """
+    Shortcut a path by proposing many shortcuts per iteration, checking all of them with one batched collision
+    call, and applying the non-overlapping collision-free shortcuts with the largest cost reduction
+    :param batch_collision: function mapping an (N, d) array of configurations to an (N,) boolean array of
+        collisions. Defaults to calling collision on every configuration
+    :param weights: per-dimension weights of the path cost (weighted Euclidean length)
+    :param num_proposals: number of shortcuts proposed per iteration
+    """
+    start_time = time.time()
+    if batch_collision is None:
+        def batch_collision(qs): return np.array([collision(q) for q in qs], dtype=bool)
+    weights = np.ones(len(path[0])) if weights is None else np.array(weights)
+
+    def cost_fn(configs): return np.linalg.norm(np.diff(configs, axis=0) * weights, axis=1)
+
+    smoothed_path = list(path)
+    for _ in range(iterations):
+        if len(smoothed_path) <= 2 or elapsed_time(start_time) >= max_time:
+            break
+        configs = np.array(smoothed_path)
+        cumulative_cost = np.concatenate([[0], np.cumsum(cost_fn(configs))])
+        indices = np.sort(np.random.randint(0, len(smoothed_path), size=(num_proposals, 2)), axis=1)
+        indices = np.unique(indices[indices[:, 1] - indices[:, 0] > 1], axis=0)
+
+        proposals = []
+        for i, j in indices:
+            shortcut = [tuple(q) for q in extend(smoothed_path[i], smoothed_path[j])]
+            # Extend functions may or may not include their end points
+            if shortcut and np.allclose(shortcut[0], smoothed_path[i]):
+                shortcut = shortcut[1:]
+            if shortcut and np.allclose(shortcut[-1], smoothed_path[j]):
+                shortcut = shortcut[:-1]
+            shortcut = [smoothed_path[i]] + shortcut + [smoothed_path[j]]
+            gain = cumulative_cost[j] - cumulative_cost[i] - np.sum(cost_fn(np.array(shortcut)))
+            if gain > 1e-9:
+                proposals.append((gain, i, j, shortcut))
+        if not proposals:
+            continue
+
+        collisions = batch_collision(np.concatenate([shortcut for _, _, _, shortcut in proposals]))
+        starts = np.cumsum([0] + [len(shortcut) for _, _, _, shortcut in proposals[:-1]])
+        colliding = np.logical_or.reduceat(collisions, starts)
+
+        chosen = []
+        for proposal, is_colliding in sorted(zip(proposals, colliding), key=lambda item: -item[0][0]):
+            _, i, j, _ = proposal
+            if not is_colliding and all(j <= i2 or j2 <= i for _, i2, j2, _ in chosen):
+                chosen.append(proposal)
+        # Apply from the end of the path so that the indices of the remaining shortcuts stay valid
+        for _, i, j, shortcut in sorted(chosen, key=lambda item: -item[1]):
+            smoothed_path = smoothed_path[:i] + shortcut + smoothed_path[j + 1:]
+    return smoothed_path
@@ -16,7 +16,7 @@ import random
 import sys
 import time
 import datetime
-from collections import defaultdict, deque, namedtuple
+from collections import OrderedDict, defaultdict, deque, namedtuple
 from itertools import product, combinations, count
 
 from .transformations import quaternion_from_matrix, unit_vector
@@ -25,7 +25,7 @@ from igibson.external.motion.motion_planners.rrt_connect import birrt, direct_pa
 from igibson.external.motion.motion_planners.rrt_star import rrt_star
 from igibson.external.motion.motion_planners.lazy_prm import lazy_prm_replan_loop
 from igibson.external.motion.motion_planners.rrt import rrt
-from igibson.external.motion.motion_planners.smoothing import optimize_path
+from igibson.external.motion.motion_planners.smoothing import shortcut_path
 from igibson.utils.constants import OccupancyGridState
 #from ..motion.motion_planners.rrt_connect import birrt, direct_path
 import cv2
@@ -711,6 +711,7 @@ def disconnect():
     # TODO: change CLIENT?
     if CLIENT in CLIENTS:
         del CLIENTS[CLIENT]
+    clear_body_metadata()
     with HideOutput():
         return p.disconnect(physicsClientId=CLIENT)
 
@@ -784,6 +785,7 @@ def update_state():
 
 
 def reset_simulation():
+    clear_body_metadata()
     p.resetSimulation(physicsClientId=CLIENT)
 
 
@@ -1193,7 +1195,7 @@ BodyInfo = namedtuple('BodyInfo', ['base_name', 'body_name'])
 
 
 def get_body_info(body):
-    return BodyInfo(*p.getBodyInfo(body, physicsClientId=CLIENT))
+    return get_body_metadata(body).body_info
 
 
 def get_base_name(body):
@@ -1229,6 +1231,7 @@ def body_from_name(name):
 def remove_body(body):
     if (CLIENT, body) in INFO_FROM_BODY:
         del INFO_FROM_BODY[CLIENT, body]
+    clear_body_metadata(body)
     return p.removeBody(body, physicsClientId=CLIENT)
 
 
@@ -1363,7 +1366,7 @@ JOINT_TYPES = {
 
 
 def get_num_joints(body):
-    return p.getNumJoints(body, physicsClientId=CLIENT)
+    return len(get_body_metadata(body).joint_infos)
 
 
 def get_joints(body):
@@ -1383,8 +1386,56 @@ JointInfo = namedtuple('JointInfo', ['jointIndex', 'jointName', 'jointType',
                                      'parentFramePos', 'parentFrameOrn', 'parentIndex'])
 
 
+# Names, joint types and limits and the kinematic tree of a body never change once it is loaded, but the helpers
+# below are called in hot loops (sampling, motion planning, robot parsing). The metadata of each body is read from
+# pybullet once and kept per (client, body). Pybullet reuses client and body ids after p.removeBody,
+# p.resetSimulation or p.disconnect, which do not clear the cache, so every entry is checked against the number of
+# joints and the body info of the body, two queries that are much cheaper than reading the joint infos.
+# clear_body_metadata drops the entries of removed bodies right away.
+BodyMetadata = namedtuple('BodyMetadata', ['body_info', 'joint_infos', 'link_names',
+                                           'link_from_name', 'joint_from_name'])
+
+METADATA_FROM_BODY = {}
+
+
+def get_body_metadata(body):
+    key = (CLIENT, body)
+    metadata = METADATA_FROM_BODY.get(key, None)
+    num_joints = p.getNumJoints(body, physicsClientId=CLIENT)
+    body_info = BodyInfo(*p.getBodyInfo(body, physicsClientId=CLIENT))
+    if metadata is not None and (len(metadata.joint_infos) != num_joints or metadata.body_info != body_info):
+        # Another body now has this id
+        metadata = None
+    if metadata is None:
+        joint_infos = tuple(JointInfo(*p.getJointInfo(body, joint, physicsClientId=CLIENT))
+                            for joint in range(num_joints))
+        link_names = tuple(info.linkName.decode('UTF-8') for info in joint_infos)
+        link_from_name = {}
+        joint_from_name = {}
+        # The first link or joint with a name wins, like a linear search would.
+        for joint, (info, link_name) in enumerate(zip(joint_infos, link_names)):
+            link_from_name.setdefault(link_name, joint)
+            joint_from_name.setdefault(info.jointName.decode('UTF-8'), joint)
+        metadata = BodyMetadata(body_info, joint_infos, link_names, link_from_name, joint_from_name)
+        METADATA_FROM_BODY[key] = metadata
+    return metadata
+
+
+def clear_body_metadata(body=None):
+    # Clears one body of the current client, or all of them
+    if body is not None:
+        METADATA_FROM_BODY.pop((CLIENT, body), None)
+        return
+    for key in [key for key in METADATA_FROM_BODY if key[0] == CLIENT]:
+        del METADATA_FROM_BODY[key]
+
+
 def get_joint_info(body, joint):
-    return JointInfo(*p.getJointInfo(body, joint, physicsClientId=CLIENT))
+    joint_infos = get_body_metadata(body).joint_infos
+    if not 0 <= joint < len(joint_infos):
+        # Let pybullet raise its usual error
+        return JointInfo(*p.getJointInfo(body, joint, physicsClientId=CLIENT))
+    return joint_infos[joint]
 
 
 def get_joint_name(body, joint):
@@ -1396,13 +1447,10 @@ def get_joint_names(body, joints):
 
 
 def joint_from_name(body, name):
-    for joint in get_joints(body):
-        joint_name = get_joint_name(body, joint)
-        if type(joint_name) == bytes:
-            joint_name = joint_name.decode()
-        if joint_name == name:
-            return joint
-    raise ValueError(body, name)
+    joint = get_body_metadata(body).joint_from_name.get(name, None)
+    if joint is None:
+        raise ValueError(body, name)
+    return joint
 
 
 def has_joint(body, name):
@@ -1628,7 +1676,10 @@ def get_all_links(body):
 def get_link_name(body, link):
     if link == BASE_LINK:
         return get_base_name(body)
-    return get_joint_info(body, link).linkName.decode('UTF-8')
+    link_names = get_body_metadata(body).link_names
+    if not 0 <= link < len(link_names):
+        return get_joint_info(body, link).linkName.decode('UTF-8')
+    return link_names[link]
 
 
 def get_link_parent(body, link):
@@ -1643,10 +1694,10 @@ parent_link_from_joint = get_link_parent
 def link_from_name(body, name):
     if name == get_base_name(body):
         return BASE_LINK
-    for link in get_joints(body):
-        if get_link_name(body, link) == name:
-            return link
-    raise ValueError("Could not find link %s for body %d" % (name, body))
+    link = get_body_metadata(body).link_from_name.get(name, None)
+    if link is None:
+        raise ValueError("Could not find link %s for body %d" % (name, body))
+    return link
 
 
 def has_link(body, name):
@@ -2926,8 +2977,15 @@ def get_self_link_pairs(body, joints, disabled_collisions=set(), only_moving=Tru
     return check_link_pairs
 
 
+def get_link_aabb_arrays(body_links, margin=0.):
+    if len(body_links) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+    aabbs = np.array([p.getAABB(body, linkIndex=link, physicsClientId=CLIENT) for body, link in body_links])
+    return aabbs[:, 0] - margin, aabbs[:, 1] + margin
+
+
 def get_collision_fn(body, joints, obstacles, attachments, self_collisions, disabled_collisions,
-                     custom_limits={}, allow_collision_links=[], **kwargs):
+                     custom_limits={}, allow_collision_links=[], cache_size=1024, **kwargs):
     # TODO: convert most of these to keyword arguments
     check_link_pairs = get_self_link_pairs(body, joints, disabled_collisions) \
         if self_collisions else []
@@ -2935,11 +2993,64 @@ def get_collision_fn(body, joints, obstacles, attachments, self_collisions, disa
         [item for item in get_moving_links(body, joints) if not item in allow_collision_links])
     # TODO: This is a fetch specific change
     attached_bodies = [attachment.child for attachment in attachments]
-    moving_bodies = [(body, moving_links)] + attached_bodies
-    #moving_bodies = [body] + [attachment.child for attachment in attachments]
-    # + list(combinations(moving_bodies, 2))
-    check_body_pairs = list(product(moving_bodies, obstacles))
     lower_limits, upper_limits = get_custom_limits(body, joints, custom_limits)
+    max_distance = kwargs.get('max_distance', MAX_DISTANCE)
+
+    # Broadphase: obstacles and the links that the planned joints do not move are static while planning,
+    # so their AABBs are computed once, when the collision function is built. Callers that move obstacles or the
+    # robot base between calls must call collision_fn.refresh(). Only the moving links are queried after forward
+    # kinematics, and the narrowphase only runs on pairs whose AABBs overlap
+    obstacle_links = []
+    for obstacle in obstacles:
+        obstacle_body, links = expand_links(obstacle)
+        obstacle_links.extend((obstacle_body, link) for link in links)
+    obstacle_lowers, obstacle_uppers = get_link_aabb_arrays(obstacle_links, margin=max_distance)
+    moving_body_links = [(body, link) for link in sorted(moving_links)]
+    for child in attached_bodies:
+        moving_body_links.extend((child, link) for link in get_all_links(child))
+
+    moving_self_links = set(get_moving_links(body, joints))
+    self_links = sorted({link for pair in check_link_pairs for link in pair})
+    self_index = {link: i for i, link in enumerate(self_links)}
+    self_moving_indices = [self_index[link] for link in self_links if link in moving_self_links]
+    self_lowers, self_uppers = get_link_aabb_arrays([(body, link) for link in self_links])
+    self_pair_indices = np.array([(self_index[link1], self_index[link2]) for link1, link2 in check_link_pairs],
+                                 dtype=int).reshape(-1, 2)
+
+    # Results for recently seen configurations, in least recently used order. They are only valid for the
+    # static AABBs computed when the collision function was built or last refreshed
+    cache = OrderedDict()
+
+    def refresh():
+        # Recompute the static AABBs and forget the results, after obstacles or the robot base moved
+        obstacle_lowers[:], obstacle_uppers[:] = get_link_aabb_arrays(obstacle_links, margin=max_distance)
+        self_lowers[:], self_uppers[:] = get_link_aabb_arrays([(body, link) for link in self_links])
+        cache.clear()
+
+    def check_collision():
+        if len(check_link_pairs) > 0:
+            self_lowers[self_moving_indices], self_uppers[self_moving_indices] = get_link_aabb_arrays(
+                [(body, self_links[i]) for i in self_moving_indices])
+            lowers1, uppers1 = self_lowers[self_pair_indices[:, 0]], self_uppers[self_pair_indices[:, 0]]
+            lowers2, uppers2 = self_lowers[self_pair_indices[:, 1]], self_uppers[self_pair_indices[:, 1]]
+            overlapping = np.all(lowers1 <= uppers2, axis=1) & np.all(lowers2 <= uppers1, axis=1)
+            for i in np.flatnonzero(overlapping):
+                link1, link2 = check_link_pairs[i]
+                # Self-collisions should not have the max_distance parameter
+                if pairwise_link_collision(body, link1, body, link2):
+                    return True
+        if len(obstacle_links) > 0 and len(moving_body_links) > 0:
+            moving_lowers, moving_uppers = get_link_aabb_arrays(moving_body_links)
+            overlapping = np.all(moving_lowers[:, np.newaxis] <= obstacle_uppers[np.newaxis], axis=2) & \
+                np.all(obstacle_lowers[np.newaxis] <= moving_uppers[:, np.newaxis], axis=2)
+            for i, j in zip(*np.nonzero(overlapping)):
+                body1, link1 = moving_body_links[i]
+                body2, link2 = obstacle_links[j]
+                if (body1 == body2) and (link1 == link2):
+                    continue
+                if pairwise_link_collision(body1, link1, body2, link2, **kwargs):
+                    return True
+        return False
 
     # TODO: maybe prune the link adjacent to the robot
     # TODO: test self collision with the holding
@@ -2949,21 +3060,20 @@ def get_collision_fn(body, joints, obstacles, attachments, self_collisions, disa
             # print(lower_limits, q, upper_limits)
             # print('Joint limits violated')
             # return True
+        # Callers rely on the robot being left at q, also when the result is memoized
         set_joint_positions(body, joints, q)
         for attachment in attachments:
             attachment.assign()
-        for link1, link2 in check_link_pairs:
-            # Self-collisions should not have the max_distance parameter
-            # , **kwargs):
-            if pairwise_link_collision(body, link1, body, link2):
-                #print(get_body_name(body), get_link_name(body, link1), get_link_name(body, link2))
-                return True
-        for body1, body2 in check_body_pairs:
-            if pairwise_collision(body1, body2, **kwargs):
-                # print('body collision', body1, body2)
-                #print(get_body_name(body1), get_body_name(body2))
-                return True
-        return False
+        key = tuple(q)
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        collision = check_collision()
+        cache[key] = collision
+        if len(cache) > cache_size:
+            cache.popitem(last=False)
+        return collision
+    collision_fn.refresh = refresh
     return collision_fn
 
 
@@ -3008,7 +3118,8 @@ def check_initial_end(start_conf, end_conf, collision_fn):
 
 def plan_joint_motion(body, joints, end_conf, obstacles=[], attachments=[],
                       self_collisions=True, disabled_collisions=set(),
-                      weights=None, resolutions=None, max_distance=MAX_DISTANCE, custom_limits={}, algorithm='birrt', allow_collision_links=[], **kwargs):
+                      weights=None, resolutions=None, max_distance=MAX_DISTANCE, custom_limits={}, algorithm='birrt', allow_collision_links=[],
+                      optimize_iter=0, **kwargs):
 
     assert len(joints) == len(end_conf)
     sample_fn = get_sample_fn(body, joints, custom_limits=custom_limits)
@@ -3022,18 +3133,22 @@ def plan_joint_motion(body, joints, end_conf, obstacles=[], attachments=[],
     if not check_initial_end(start_conf, end_conf, collision_fn):
         return None
     if algorithm == 'direct':
-        return direct_path(start_conf, end_conf, extend_fn, collision_fn)
+        path = direct_path(start_conf, end_conf, extend_fn, collision_fn)
     elif algorithm == 'birrt':
-        return birrt(start_conf, end_conf, distance_fn,
+        path = birrt(start_conf, end_conf, distance_fn,
                      sample_fn, extend_fn, collision_fn, **kwargs)
     elif algorithm == 'rrt_star':
-        return rrt_star(start_conf, end_conf, distance_fn, sample_fn, extend_fn, collision_fn, max_iterations=5000, **kwargs)
+        path = rrt_star(start_conf, end_conf, distance_fn, sample_fn, extend_fn, collision_fn, max_iterations=5000, **kwargs)
     elif algorithm == 'rrt':
-        return rrt(start_conf, end_conf, distance_fn, sample_fn, extend_fn, collision_fn, iterations=500, **kwargs)
+        path = rrt(start_conf, end_conf, distance_fn, sample_fn, extend_fn, collision_fn, iterations=500, **kwargs)
     elif algorithm == 'lazy_prm':
-        return lazy_prm_replan_loop(start_conf, end_conf, distance_fn, sample_fn, extend_fn, collision_fn, [500, 2000, 5000], **kwargs)
+        path = lazy_prm_replan_loop(start_conf, end_conf, distance_fn, sample_fn, extend_fn, collision_fn, [500, 2000, 5000], **kwargs)
     else:
-        return None
+        path = None
+
+    if optimize_iter > 0 and path is not None:
+        path = shortcut_path(path, extend_fn, collision_fn, iterations=optimize_iter)
+    return path
 
 
 def plan_lazy_prm(start_conf, end_conf, sample_fn, extend_fn, collision_fn, **kwargs):
@@ -3214,6 +3329,44 @@ def plan_base_motion(body, end_conf, base_limits, obstacles=[], direct=False,
                  sample_fn, extend_fn, collision_fn, **kwargs)
 
 
+def get_cspace_map_2d(map_2d, robot_footprint_radius_in_map):
+    """
+    Dilate the obstacles of an occupancy grid by a circular robot footprint
+
+    :param map_2d: occupancy grid, cells equal to OccupancyGridState.FREESPACE are free
+    :param robot_footprint_radius_in_map: robot footprint radius in cells
+    :return: boolean map, True where a footprint centered at the cell overlaps a non-free cell
+    """
+    map_2d = np.asarray(map_2d)
+    occupied = np.any((map_2d != OccupancyGridState.FREESPACE).reshape(map_2d.shape[:2] + (-1,)), axis=2)
+    kernel = np.zeros((robot_footprint_radius_in_map * 2 + 1,
+                       robot_footprint_radius_in_map * 2 + 1), dtype=np.uint8)
+    cv2.circle(kernel, (robot_footprint_radius_in_map, robot_footprint_radius_in_map), robot_footprint_radius_in_map,
+               1, -1)
+    return cv2.dilate(occupied.astype(np.uint8), kernel).astype(bool)
+
+
+def get_base_extend_configs(q1, q2, difference_fn, resolutions):
+    """
+    Vectorized interpolation from q1 to q2: turn towards q2, translate, then turn to the final orientation
+
+    :return: (N, 3) array of base configurations
+    """
+    target_theta = np.arctan2(q2[1] - q1[1], q2[0] - q1[0])
+    q1_turned = (q1[0], q1[1], target_theta)
+    q2_turned = (q2[0], q2[1], target_theta)
+
+    n1 = int(np.abs(circular_difference(target_theta, q1[2]) / resolutions[2])) + 1
+    n3 = int(np.abs(circular_difference(q2[2], target_theta) / resolutions[2])) + 1
+    n2 = int(np.max(np.abs(np.divide(difference_fn(q2, q1), resolutions)))) + 1
+
+    segments = []
+    for n, start, end in [(n1, q1, q1_turned), (n2, q1_turned, q2_turned), (n3, q2_turned, q2)]:
+        fractions = np.arange(n)[:, np.newaxis] / n
+        segments.append(fractions * np.array(difference_fn(end, start)) + np.array(start))
+    return np.concatenate(segments)
+
+
 def plan_base_motion_2d(body, end_conf, base_limits, map_2d, occupancy_range, grid_resolution, robot_footprint_radius_in_map,
                         obstacles=[], weights=1 * np.ones(3), resolutions=0.05 * np.ones(3),
                         max_distance=MAX_DISTANCE, min_goal_dist = 0.02, algorithm='birrt', optimize_iter=0, 
@@ -3226,72 +3379,41 @@ def plan_base_motion_2d(body, end_conf, base_limits, map_2d, occupancy_range, gr
     difference_fn = get_base_difference_fn()
     distance_fn = get_base_distance_fn(weights=weights)
 
-    def extend_fn(q1, q2):
-        target_theta = np.arctan2(q2[1] - q1[1], q2[0] - q1[0])
-
-        n1 = int(np.abs(circular_difference(
-            target_theta, q1[2]) / resolutions[2])) + 1
-        n3 = int(np.abs(circular_difference(
-            q2[2], target_theta) / resolutions[2])) + 1
-        steps2 = np.abs(np.divide(difference_fn(q2, q1), resolutions))
-        n2 = int(np.max(steps2)) + 1
-
-        for i in range(n1):
-            q = (i / (n1)) * \
-                np.array(difference_fn(
-                    (q1[0], q1[1], target_theta), q1)) + np.array(q1)
-            q = tuple(q)
-            yield q
-
-        for i in range(n2):
-            q = (i / (n2)) * np.array(
-                difference_fn((q2[0], q2[1], target_theta), (q1[0], q1[1], target_theta))) + np.array(
-                (q1[0], q1[1], target_theta))
-            q = tuple(q)
-            yield q
-
-        for i in range(n3):
-            q = (i / (n3)) * np.array(difference_fn(q2, (q2[0], q2[1], target_theta))) + np.array(
-                (q2[0], q2[1], target_theta))
-            q = tuple(q)
-            yield q
-
     start_conf = get_base_values(body)
 
     if np.abs(start_conf[0] - end_conf[0]) < min_goal_dist and np.abs(start_conf[1] - end_conf[1]) < min_goal_dist:
         # do not do plans that is smaller than 30mm
         return None
 
+    # Dilate the occupancy grid by the robot footprint once, so that checking a configuration is a single lookup
+    cspace_map = get_cspace_map_2d(map_2d, robot_footprint_radius_in_map)
+    theta = start_conf[2]
+    map_from_world = np.array([[np.sin(theta), -np.cos(theta)],
+                               [np.cos(theta), np.sin(theta)]]) / (occupancy_range / 2) * (grid_resolution / 2)
+
+    def collision_fn_batch(qs):
+        delta = np.asarray(qs)[:, :2] - np.array(start_conf)[:2]
+        pts = (delta.dot(map_from_world.T) + grid_resolution / 2).astype(np.int32)
+        in_map = np.all((pts >= robot_footprint_radius_in_map) &
+                        (pts <= grid_resolution - robot_footprint_radius_in_map - 1), axis=1)
+        collisions = np.ones(len(pts), dtype=bool)
+        collisions[in_map] = cspace_map[pts[in_map, 0], pts[in_map, 1]]
+        return collisions
+
+    # Collision flags of the configurations of the last extension, computed in one vectorized lookup
+    edge_collisions = {}
+
     def collision_fn(q):
-        # TODO: update this function
-        # set_base_values(body, q)
-        # return any(pairwise_collision(body, obs, max_distance=max_distance) for obs in obstacles)
-        delta = np.array(q)[:2] - np.array(start_conf)[:2]
-        theta = start_conf[2]
-        x_dir = np.array([np.sin(theta), -np.cos(theta)])
-        y_dir = np.array([np.cos(theta), np.sin(theta)])
-        end_in_start_frame = [x_dir.dot(delta), y_dir.dot(delta)]
-        pts = np.array(end_in_start_frame) / (occupancy_range / 2) * \
-            (grid_resolution / 2) + grid_resolution / 2
-        pts = pts.astype(np.int32)
-        # print(pts)
-
-        if pts[0] < robot_footprint_radius_in_map or pts[1] < robot_footprint_radius_in_map \
-            or pts[0] > grid_resolution - robot_footprint_radius_in_map - 1 or pts[
-                1] > grid_resolution - robot_footprint_radius_in_map - 1:
-            return True
+        q = tuple(q)
+        if q in edge_collisions:
+            return edge_collisions[q]
+        return bool(collision_fn_batch([q])[0])
 
-        # plt.figure()
-        # plt.imshow(map_2d[pts[0]-1:pts[0]+1, pts[1]-1:pts[1]+1])
-        # plt.colorbar()
-        mask = np.zeros((robot_footprint_radius_in_map * 2 + 1,
-                         robot_footprint_radius_in_map * 2 + 1))
-        cv2.circle(mask, (robot_footprint_radius_in_map, robot_footprint_radius_in_map), robot_footprint_radius_in_map,
-                   1, -1)
-        mask = mask.astype(np.bool)
-        return not np.all(map_2d[pts[0] - robot_footprint_radius_in_map:pts[0] + robot_footprint_radius_in_map + 1,
-                             pts[1] - robot_footprint_radius_in_map:pts[1] + robot_footprint_radius_in_map + 1][mask]
-                      == OccupancyGridState.FREESPACE)
+    def extend_fn(q1, q2):
+        qs = [tuple(q) for q in get_base_extend_configs(q1, q2, difference_fn, resolutions)]
+        edge_collisions.clear()
+        edge_collisions.update(zip(qs, collision_fn_batch(qs).tolist()))
+        return qs
 
     if collision_fn(start_conf):
         # print("Warning: initial configuration is in collision")
@@ -3315,7 +3437,9 @@ def plan_base_motion_2d(body, end_conf, base_limits, map_2d, occupancy_range, gr
         path = None
 
     if optimize_iter > 0 and path is not None:
-        path = optimize_path(path, extend_fn, collision_fn, iterations=optimize_iter)
+        # Path cost is the distance traveled in xy
+        path = shortcut_path(path, extend_fn, collision_fn, batch_collision=collision_fn_batch, weights=[1, 1, 0],
+                             iterations=optimize_iter)
 
     return path
 
@@ -1,191 +1,165 @@
-import copy
-
 import numpy as np
 import pybullet as p
 
-from igibson.metrics.metric_base import MetricBase
+from igibson.metrics.metric_base import MetricBase, TimestepBuffer
 
 
 class BehaviorRobotMetric(MetricBase):
+    parts = ["left_hand", "right_hand", "body"]
+    hands = ["left_hand", "right_hand"]
+
     def __init__(self):
         self.initialized = False
 
-        self.state_cache = {}
-        self.next_state_cache = {}
+        # Positions of the previous and the current frame, swapped instead of copied every step
+        self.state_cache = np.zeros((len(self.parts), 3))
+        self.next_state_cache = np.zeros((len(self.parts), 3))
 
-        self.agent_pos = {part: [] for part in ["left_hand", "right_hand", "body"]}
-        self.agent_grasping = {part: [] for part in ["left_hand", "right_hand"]}
+        self.agent_pos = TimestepBuffer((len(self.parts), 3))
+        self.agent_grasping = TimestepBuffer((len(self.hands),), dtype=bool)
 
-        self.agent_local_pos = {part: [] for part in ["left_hand", "right_hand"]}
+        self.agent_local_pos = TimestepBuffer((len(self.hands), 3))
 
-        self.agent_reset = {part: [] for part in ["left_hand", "right_hand", "body"]}
+        self.agent_reset = TimestepBuffer((len(self.parts),), dtype=bool)
 
-        self.delta_agent_work = {part: [] for part in ["left_hand", "right_hand", "body"]}
-        self.delta_agent_distance = {part: [] for part in ["left_hand", "right_hand", "body"]}
-        self.delta_agent_grasp_distance = {part: [] for part in ["left_hand", "right_hand"]}
+        self.delta_agent_work = TimestepBuffer((len(self.parts),))
+        self.delta_agent_distance = TimestepBuffer((len(self.parts),))
+        self.delta_agent_grasp_distance = TimestepBuffer((len(self.hands),))
 
         self.clip = 0.2
 
     def step_callback(self, igbhvr_act_inst, _):
         robot = igbhvr_act_inst.simulator.robots[0]
-        agent_work = {part: 0 for part in ["left_hand", "right_hand", "body"]}
-        agent_distance = {part: 0 for part in ["left_hand", "right_hand", "body"]}
 
-        for part in ["left_hand", "right_hand", "body"]:
-            self.next_state_cache[part] = {
-                "position": np.array(p.getBasePositionAndOrientation(robot.parts[part].body_id)[0]),
-            }
+        snapshot = robot.get_state_snapshot()
+        for i, part in enumerate(self.parts):
+            self.next_state_cache[i] = snapshot.part_positions[part]
 
         if not self.initialized:
-            self.state_cache = copy.deepcopy(self.next_state_cache)
+            self.state_cache[:] = self.next_state_cache
             self.initialized = True
 
-        if robot.action[19] > 0 and robot.action[27] > 0:
-            self.agent_reset["left_hand"].append(True)
-            self.agent_reset["right_hand"].append(True)
-            self.agent_reset["body"].append(True)
-        if robot.action[19] > 0:
-            self.agent_reset["left_hand"].append(True)
-            self.agent_reset["right_hand"].append(False)
-            self.agent_reset["body"].append(True)
-        elif robot.action[27] > 0:
-            self.agent_reset["left_hand"].append(False)
-            self.agent_reset["right_hand"].append(True)
-            self.agent_reset["body"].append(True)
-        else:
-            self.agent_reset["left_hand"].append(False)
-            self.agent_reset["right_hand"].append(False)
-            self.agent_reset["body"].append(False)
-
-        for part in self.state_cache:
-            delta_pos = np.linalg.norm(self.next_state_cache[part]["position"] - self.state_cache[part]["position"])
-            self.agent_pos[part].append(list(self.state_cache[part]["position"]))
-            # Exclude agent teleports
-            delta_pos = np.clip(delta_pos, -self.clip, self.clip)
-            if robot.parts[part].movement_cid is None:
-                force = 0
-                work = 0
-            else:
-                force = p.getConstraintState(robot.parts[part].movement_cid)
-                work = np.abs((delta_pos * np.linalg.norm(force)))
-
-            distance = np.abs(delta_pos)
-            if part in ["left_hand", "right_hand"]:
-                self.agent_local_pos[part].append(list(robot.parts[part].local_pos))
-            if part in ["left_hand", "right_hand"] and (
-                len(p.getContactPoints(robot.parts[part].body_id)) > 0 or robot.parts[part].object_in_hand is not None
-            ):
-                self.delta_agent_grasp_distance[part].append(distance)
-                self.agent_grasping[part].append(True)
-            elif part in ["left_hand", "right_hand"]:
-                self.delta_agent_grasp_distance[part].append(0)
-                self.agent_grasping[part].append(False)
-
-            agent_work[part] = work
-            agent_distance[part] = distance
-
-            self.delta_agent_work[part].append(work)
-            self.delta_agent_distance[part].append(distance)
-
-        self.state_cache = copy.deepcopy(self.next_state_cache)
+        left_reset = robot.action[19] > 0
+        right_reset = robot.action[27] > 0
+        self.agent_reset.append([left_reset, right_reset, left_reset or right_reset])
+
+        self.agent_pos.append(self.state_cache)
+        # Exclude agent teleports
+        distance = np.clip(np.linalg.norm(self.next_state_cache - self.state_cache, axis=1), 0, self.clip)
+
+        force = np.zeros(len(self.parts))
+        for i, part in enumerate(self.parts):
+            if robot.parts[part].movement_cid is not None:
+                force[i] = np.linalg.norm(p.getConstraintState(robot.parts[part].movement_cid))
+        self.delta_agent_work.append(distance * force)
+        self.delta_agent_distance.append(distance)
+
+        self.agent_local_pos.append([robot.parts[hand].local_pos for hand in self.hands])
+        contact_cache = igbhvr_act_inst.simulator.contact_cache
+        grasping = [
+            contact_cache.in_contact(robot.parts[hand].body_id) or robot.parts[hand].object_in_hand is not None
+            for hand in self.hands
+        ]
+        self.agent_grasping.append(grasping)
+        self.delta_agent_grasp_distance.append(np.where(grasping, distance[: len(self.hands)], 0))
+
+        self.state_cache, self.next_state_cache = self.next_state_cache, self.state_cache
 
     def gather_results(self):
         return {
             "agent_distance": {
-                "timestep": self.delta_agent_distance,
+                "timestep": per_part_timesteps(self.delta_agent_distance, self.parts),
             },
             "grasp_distance": {
-                "timestep": self.delta_agent_grasp_distance,
+                "timestep": per_part_timesteps(self.delta_agent_grasp_distance, self.hands),
             },
             "work": {
-                "timestep": self.delta_agent_work,
+                "timestep": per_part_timesteps(self.delta_agent_work, self.parts),
             },
             "pos": {
-                "timestep": self.agent_pos,
+                "timestep": per_part_timesteps(self.agent_pos, self.parts),
             },
             "local_pos": {
-                "timestep": self.agent_local_pos,
+                "timestep": per_part_timesteps(self.agent_local_pos, self.hands),
             },
             "grasping": {
-                "timestep": self.agent_grasping,
+                "timestep": per_part_timesteps(self.agent_grasping, self.hands),
             },
             "reset": {
-                "timestep": self.agent_reset,
+                "timestep": per_part_timesteps(self.agent_reset, self.parts),
             },
         }
 
 
 class FetchRobotMetric(MetricBase):
+    parts = ["gripper", "body"]
+    grippers = ["gripper"]
+
     def __init__(self):
         self.initialized = False
 
-        self.state_cache = {}
-        self.next_state_cache = {}
+        self.state_cache = np.zeros((len(self.parts), 3))
+        self.next_state_cache = np.zeros((len(self.parts), 3))
 
-        self.agent_pos = {part: [] for part in ["gripper", "body"]}
-        self.agent_grasping = {part: [] for part in ["gripper"]}
+        self.agent_pos = TimestepBuffer((len(self.parts), 3))
+        self.agent_grasping = TimestepBuffer((len(self.grippers),), dtype=bool)
 
-        self.agent_local_pos = {part: [] for part in ["gripper"]}
+        self.agent_local_pos = TimestepBuffer((len(self.grippers), 3))
 
-        self.delta_agent_distance = {part: [] for part in ["gripper", "body"]}
-        self.delta_agent_grasp_distance = {part: [] for part in ["gripper"]}
+        self.delta_agent_distance = TimestepBuffer((len(self.parts),))
+        self.delta_agent_grasp_distance = TimestepBuffer((len(self.grippers),))
 
         self.clip = 0.2
 
     def step_callback(self, igbhvr_act_inst, _):
         robot = igbhvr_act_inst.simulator.robots[0]
-        agent_distance = {part: 0 for part in self.agent_pos}
 
-        self.next_state_cache = {
-            "gripper": {"position": robot.get_end_effector_position()},
-            "body": {"position": robot.get_position()},
-        }
+        self.next_state_cache[0] = robot.get_end_effector_position()
+        self.next_state_cache[1] = robot.get_position()
 
         if not self.initialized:
-            self.state_cache = copy.deepcopy(self.next_state_cache)
+            self.state_cache[:] = self.next_state_cache
             self.initialized = True
 
-        self.agent_pos["body"].append(list(self.state_cache["body"]["position"]))
-        delta_pos = np.linalg.norm(
-            np.array(self.next_state_cache["body"]["position"]) - self.state_cache["body"]["position"]
-        )
-        distance = np.abs(delta_pos)
-        self.delta_agent_distance["body"].append(distance)
-
-        self.agent_pos["gripper"].append(list(self.state_cache["gripper"]["position"]))
-        delta_pos = np.linalg.norm(
-            self.next_state_cache["gripper"]["position"] - self.state_cache["gripper"]["position"]
-        )
-        gripper_distance = np.abs(delta_pos)
-        self.delta_agent_distance["gripper"].append(gripper_distance)
+        self.agent_pos.append(self.state_cache)
+        distance = np.linalg.norm(self.next_state_cache - self.state_cache, axis=1)
+        self.delta_agent_distance.append(distance)
 
-        self.agent_local_pos["gripper"].append(list(robot.get_relative_eef_position()))
+        self.agent_local_pos.append([robot.get_relative_eef_position()])
 
-        contacts = p.getContactPoints(bodyA=robot.robot_ids[0], linkIndexA=robot.eef_link_id)
-        if len(contacts) > 0:
-            self.delta_agent_grasp_distance["gripper"].append(gripper_distance)
-            self.agent_grasping["gripper"].append(True)
-        else:
-            self.delta_agent_grasp_distance["gripper"].append(0)
-            self.agent_grasping["gripper"].append(False)
+        grasping = igbhvr_act_inst.simulator.contact_cache.in_contact(robot.robot_ids[0], link_id=robot.eef_link_id)
+        self.delta_agent_grasp_distance.append(distance[0] if grasping else 0)
+        self.agent_grasping.append(grasping)
 
-        self.state_cache = copy.deepcopy(self.next_state_cache)
+        self.state_cache, self.next_state_cache = self.next_state_cache, self.state_cache
 
     def gather_results(self):
         return {
             "agent_distance": {
-                "timestep": self.delta_agent_distance,
+                "timestep": per_part_timesteps(self.delta_agent_distance, self.parts),
             },
             "grasp_distance": {
-                "timestep": self.delta_agent_grasp_distance,
+                "timestep": per_part_timesteps(self.delta_agent_grasp_distance, self.grippers),
             },
             "pos": {
-                "timestep": self.agent_pos,
+                "timestep": per_part_timesteps(self.agent_pos, self.parts),
             },
             "local_pos": {
-                "timestep": self.agent_local_pos,
+                "timestep": per_part_timesteps(self.agent_local_pos, self.grippers),
             },
             "grasping": {
-                "timestep": self.agent_grasping,
+                "timestep": per_part_timesteps(self.agent_grasping, self.grippers),
             },
         }
+
+
+def per_part_timesteps(buffer, parts):
+    """
+    Split a per-timestep buffer with one row entry per part into per-part lists
+
+    :param buffer: TimestepBuffer whose rows are indexed by part
+    :param parts: part names, in row order
+    :return: dictionary mapping part name to its list of per-timestep values
+    """
+    values = buffer.view()
+    return {part: values[:, i].tolist() for i, part in enumerate(parts)}
@@ -1,14 +1,81 @@
-import copy
-
 import numpy as np
 
-from igibson.metrics.metric_base import MetricBase
+from igibson.metrics.metric_base import MetricBase, TimestepBuffer
 from igibson.object_states import Inside, NextTo, OnFloor, OnTop, Pose, Touching, Under
 from igibson.object_states.object_state_base import AbsoluteObjectState, BooleanState
 from igibson.object_states.on_floor import RoomFloor
 from igibson.objects.multi_object_wrappers import ObjectMultiplexer
 
 SIMULATOR_SETTLE_TIME = 150
+# Objects whose pose components and joint positions moved less than this between two caches are considered static
+POSE_CHANGE_TOLERANCE = 1e-4
+
+
+def get_tracked_objects(task):
+    """
+    Get the scene objects tracked by the disarrangement metrics, i.e. all non-agent objects
+
+    :param task: iGBEHAVIORActivityInstance
+    :return: list of object names and list of objects, in the same order
+    """
+    names = [obj_id for obj_id, obj in task.scene.objects_by_name.items() if obj.category != "agent"]
+    return names, [task.scene.objects_by_name[name] for name in names]
+
+
+def get_object_part_poses(objects, part_poses=None, active=None):
+    """
+    Query the poses of the currently active parts of every object into preallocated arrays.
+    Regular objects and inactive multiplexers report their base pose for both parts, split multiplexers
+    report the pose of each of their two halves.
+
+    :param objects: list of objects
+    :param part_poses: optional (N, 2, 7) array to fill with [x, y, z, qx, qy, qz, qw] poses
+    :param active: optional (N,) array to fill with the active multiplexer index of each object
+    :return: part_poses and active arrays
+    """
+    if part_poses is None:
+        part_poses = np.zeros((len(objects), 2, 7))
+    if active is None:
+        active = np.zeros(len(objects), dtype=int)
+    for i, obj in enumerate(objects):
+        if type(obj) == ObjectMultiplexer:
+            assert (
+                len(obj._multiplexed_objects[1].objects) == 2
+            ), "Kinematic caching only supported for multiplexed objects of len 2"
+            active[i] = obj.current_index
+            if obj.current_index == 1:
+                for j, part in enumerate(obj._multiplexed_objects[1].objects):
+                    pos, orn = part.states[Pose].get_value()
+                    part_poses[i, j, :3] = pos
+                    part_poses[i, j, 3:] = orn
+                continue
+            obj = obj._multiplexed_objects[0]
+        else:
+            active[i] = 0
+        pos, orn = obj.states[Pose].get_value()
+        part_poses[i, :, :3] = pos
+        part_poses[i, :, 3:] = orn
+    return part_poses, active
+
+
+def get_object_joint_positions(objects):
+    """
+    Query the positions of the movable joints of the currently active parts of every object.
+    Objects without joint metadata, e.g. objects that are not loaded from URDF, have no joint positions.
+
+    :param objects: list of objects
+    :return: list of joint position arrays, in the same order as objects
+    """
+    joint_positions = []
+    for obj in objects:
+        if type(obj) == ObjectMultiplexer:
+            obj = obj.current_selection()
+        obj_joint_positions = [np.zeros(0)]
+        for joint_metadata in getattr(obj, "joint_metadata", []):
+            movable_joint_ids = joint_metadata.joint_ids[joint_metadata.get_movable_joint_mask()]
+            obj_joint_positions.append(joint_metadata.get_joint_positions(movable_joint_ids))
+        joint_positions.append(np.concatenate(obj_joint_positions))
+    return joint_positions
 
 
 class KinematicDisarrangement(MetricBase):
@@ -16,102 +83,52 @@ class KinematicDisarrangement(MetricBase):
         self.initialized = False
 
         self.integrated_disarrangement = 0
-        self.delta_disarrangement = []
+        self.delta_disarrangement = TimestepBuffer()
 
-        self.delta_obj_disp_dict = {}
-        self.int_obj_disp_dict = {}
-
-    def update_state_cache(self, task):
-        state_cache = {}
-        for obj_id, obj in task.scene.objects_by_name.items():
-            if obj.category == "agent":
-                continue
-            if type(obj) == ObjectMultiplexer:
-                assert (
-                    len(obj._multiplexed_objects[1].objects) == 2
-                ), "Kinematic caching only supported for multiplexed objects of len 2"
-                part_pose = [
-                    obj._multiplexed_objects[1].objects[0].states[Pose].get_value(),
-                    obj._multiplexed_objects[1].objects[1].states[Pose].get_value(),
-                ]
-                state_cache[obj_id] = {
-                    "pose": {
-                        "base": obj._multiplexed_objects[0].states[Pose].get_value(),
-                        "children": part_pose,
-                    },
-                    "active": obj.current_index,
-                }
-            else:
-                state_cache[obj_id] = {
-                    "pose": {
-                        "base": obj.states[Pose].get_value(),
-                    },
-                    "active": 0,
-                }
-        return state_cache
+        self.obj_names = []
+        self.objects = []
+        self.delta_obj_disp = None
+        self.int_obj_disp = None
 
     @staticmethod
-    def calculate_object_disarrangement(obj, prev_state_cache, cur_state_cache):
+    def calculate_disarrangement(prev_poses, prev_active, cur_poses, cur_active):
         """
-        This function implements logic to check the current index in order to aggregate kinematic state as
-        an object is split/joined. This logic should be shifted into the multiplexer class, as it requires
-        a significant amount of (error prone) handling.
+        Vectorized displacement of every object between two pose caches.
+        Objects that stay whole accumulate displacement on their base, objects that are (or were) split
+        accumulate the displacement of each half relative to the corresponding previous part.
+
+        :return: (N, 3) array of [base, first child, second child] displacements
         """
-        obj_disarrangement = {"base": 0, "children": [0, 0]}
-        if prev_state_cache[obj]["active"] == 0 and cur_state_cache[obj]["active"] == 0:
-            obj_disarrangement["base"] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["base"][0] - prev_state_cache[obj]["pose"]["base"][0]
-            )
-        elif prev_state_cache[obj]["active"] == 0 and cur_state_cache[obj]["active"] == 1:
-            obj_disarrangement["children"][0] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["children"][0][0] - prev_state_cache[obj]["pose"]["base"][0]
-            )
-            obj_disarrangement["children"][1] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["children"][1][0] - prev_state_cache[obj]["pose"]["base"][0]
-            )
-        elif prev_state_cache[obj]["active"] == 1 and cur_state_cache[obj]["active"] == 0:
-            obj_disarrangement["children"][0] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["base"][0] - prev_state_cache[obj]["pose"]["children"][0][0]
-            )
-            obj_disarrangement["children"][1] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["base"][0] - prev_state_cache[obj]["pose"]["children"][1][0]
-            )
-        elif prev_state_cache[obj]["active"] == 1 and cur_state_cache[obj]["active"] == 1:
-            obj_disarrangement["children"][0] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["children"][0][0] - prev_state_cache[obj]["pose"]["children"][0][0]
-            )
-            obj_disarrangement["children"][1] = np.linalg.norm(
-                cur_state_cache[obj]["pose"]["children"][1][0] - prev_state_cache[obj]["pose"]["children"][1][0]
-            )
-        else:
-            raise Exception
-        return obj_disarrangement
+        part_displacement = np.linalg.norm(cur_poses[:, :, :3] - prev_poses[:, :, :3], axis=-1)
+        whole = (prev_active == 0) & (cur_active == 0)
+        disarrangement = np.zeros((len(part_displacement), 3))
+        disarrangement[:, 0] = np.where(whole, part_displacement[:, 0], 0)
+        disarrangement[:, 1:] = np.where(whole[:, None], 0, part_displacement)
+        return disarrangement
 
     def step_callback(self, igbhvr_act_inst, _):
-        total_disarrangement = 0
-        self.cur_state_cache = self.update_state_cache(igbhvr_act_inst)
-
         if not self.initialized:
-            self.prev_state_cache = copy.deepcopy(self.cur_state_cache)
-            self.initial_state_cache = copy.deepcopy(self.cur_state_cache)
-            self.delta_obj_disp_dict = {obj: {"base": [], "children": []} for obj in self.cur_state_cache}
-            self.int_obj_disp_dict = {obj: {"base": 0, "children": [0, 0]} for obj in self.cur_state_cache}
+            self.obj_names, self.objects = get_tracked_objects(igbhvr_act_inst)
+            self.cur_poses, self.cur_active = get_object_part_poses(self.objects)
+            self.prev_poses, self.prev_active = self.cur_poses.copy(), self.cur_active.copy()
+            self.initial_poses, self.initial_active = self.cur_poses.copy(), self.cur_active.copy()
+            self.delta_obj_disp = TimestepBuffer((len(self.objects), 3))
+            self.int_obj_disp = np.zeros((len(self.objects), 3))
             self.initialized = True
+        else:
+            # Reuse the previous frame's arrays as the destination of the new query
+            self.prev_poses, self.cur_poses = self.cur_poses, self.prev_poses
+            self.prev_active, self.cur_active = self.cur_active, self.prev_active
+            get_object_part_poses(self.objects, self.cur_poses, self.cur_active)
 
-        for obj in self.prev_state_cache:
-            obj_disarrangement = self.calculate_object_disarrangement(obj, self.prev_state_cache, self.cur_state_cache)
-            total_disarrangement += obj_disarrangement["base"]
-            total_disarrangement += np.sum(obj_disarrangement["children"])
-
-            self.delta_obj_disp_dict[obj]["base"].append(obj_disarrangement["base"])
-            self.delta_obj_disp_dict[obj]["children"].append(obj_disarrangement["children"])
+        obj_disarrangement = self.calculate_disarrangement(
+            self.prev_poses, self.prev_active, self.cur_poses, self.cur_active
+        )
+        total_disarrangement = np.sum(obj_disarrangement)
 
-            self.int_obj_disp_dict[obj]["base"] += obj_disarrangement["base"]
-            self.int_obj_disp_dict[obj]["children"] = np.array(self.int_obj_disp_dict[obj]["children"]) + np.array(
-                obj_disarrangement["children"]
-            )
+        self.delta_obj_disp.append(obj_disarrangement)
+        self.int_obj_disp += obj_disarrangement
 
-        self.prev_state_cache = copy.deepcopy(self.cur_state_cache)
         self.integrated_disarrangement += total_disarrangement
         self.delta_disarrangement.append(total_disarrangement)
 
@@ -119,18 +136,15 @@ class KinematicDisarrangement(MetricBase):
 
     @property
     def relative_disarrangement(self):
-        relative_disarrangement = 0
-        for obj in self.initial_state_cache:
-            disarrangement = self.calculate_object_disarrangement(obj, self.initial_state_cache, self.cur_state_cache)
-            relative_disarrangement += disarrangement["base"]
-            relative_disarrangement += np.sum(disarrangement["children"])
-        return relative_disarrangement
+        return np.sum(
+            self.calculate_disarrangement(self.initial_poses, self.initial_active, self.cur_poses, self.cur_active)
+        )
 
     def gather_results(self):
         return {
             "kinematic_disarrangement": {
                 "relative": self.relative_disarrangement,
-                "timestep": self.delta_disarrangement,
+                "timestep": self.delta_disarrangement.tolist(),
                 "integrated": self.integrated_disarrangement,
             }
         }
@@ -143,8 +157,20 @@ class LogicalDisarrangement(MetricBase):
         self.state_cache = {}
         self.next_state_cache = {}
 
+        self.obj_names = []
+        self.objects = []
+
     @staticmethod
-    def cache_single_object(obj_id, obj, room_floors, task):
+    def cache_single_object(obj_id, obj, room_floors, task, reference_cache=None, static_obj_ids=()):
+        """
+        Evaluate the boolean states of a single object.
+
+        :param reference_cache: optional previous cache of this object, reused for relational states whose
+            object and target have not moved since it was computed
+        :param static_obj_ids: set of object names that have not moved since reference_cache was computed
+        """
+        if obj_id not in static_obj_ids:
+            reference_cache = None
         obj_cache = {}
         for state_class, state in obj.states.items():
             if not isinstance(state, BooleanState):
@@ -154,6 +180,9 @@ class LogicalDisarrangement(MetricBase):
             # TODO (mjlbach): room floors are not currently proper objects, this means special logic
             # is needed to handle onFloor until this is fixed
             elif isinstance(state, OnFloor):
+                if reference_cache is not None:
+                    obj_cache[state_class] = reference_cache[state_class]
+                    continue
                 relational_state_cache = {}
                 for floor_id, floor in room_floors.items():
                     relational_state_cache[floor_id] = state.get_value(floor)
@@ -168,12 +197,23 @@ class LogicalDisarrangement(MetricBase):
                     # For example, inside apple cabinet is supported, inside cabinet apple is not
                     if type(target_obj) == ObjectMultiplexer:
                         pass
+                    elif reference_cache is not None and target_obj_id in static_obj_ids:
+                        relational_state_cache[target_obj_id] = reference_cache[state_class][target_obj_id]
                     else:
                         relational_state_cache[target_obj_id] = state.get_value(target_obj)
                 obj_cache[state_class] = relational_state_cache
         return obj_cache
 
-    def create_object_logical_state_cache(self, task):
+    def create_object_logical_state_cache(self, task, reference_state_cache=None, static_obj_ids=()):
+        """
+        Evaluate the boolean states of every object in the scene.
+
+        :param reference_state_cache: optional previously computed state cache. Relational states between
+            objects that are both in static_obj_ids are copied from it instead of being evaluated again
+        :param static_obj_ids: set of object names that have not moved since reference_state_cache was computed
+        """
+        if reference_state_cache is None:
+            static_obj_ids = ()
         room_floors = {
             "room_floor_"
             + room_inst: RoomFloor(
@@ -190,19 +230,37 @@ class LogicalDisarrangement(MetricBase):
         for obj_id, obj in task.scene.objects_by_name.items():
             if obj.category == "agent":
                 continue
+            reference = reference_state_cache[obj_id] if obj_id in static_obj_ids else None
             state_cache[obj_id] = {}
             if type(obj) == ObjectMultiplexer:
                 if obj.current_index == 0:
-                    cache_base = self.cache_single_object(obj_id, obj._multiplexed_objects[0], room_floors, task)
+                    cache_base = self.cache_single_object(
+                        obj_id,
+                        obj._multiplexed_objects[0],
+                        room_floors,
+                        task,
+                        reference and reference["base_states"],
+                        static_obj_ids,
+                    )
                     cache_part_1 = None
                     cache_part_2 = None
                 else:
                     cache_base = None
                     cache_part_1 = self.cache_single_object(
-                        obj_id, obj._multiplexed_objects[1].objects[0], room_floors, task
+                        obj_id,
+                        obj._multiplexed_objects[1].objects[0],
+                        room_floors,
+                        task,
+                        reference and reference["part_states"][0],
+                        static_obj_ids,
                     )
                     cache_part_2 = self.cache_single_object(
-                        obj_id, obj._multiplexed_objects[1].objects[1], room_floors, task
+                        obj_id,
+                        obj._multiplexed_objects[1].objects[1],
+                        room_floors,
+                        task,
+                        reference and reference["part_states"][1],
+                        static_obj_ids,
                     )
                 state_cache[obj_id] = {
                     "base_states": cache_base,
@@ -211,13 +269,33 @@ class LogicalDisarrangement(MetricBase):
                     "type": "multiplexer",
                 }
             else:
-                cache_base = self.cache_single_object(obj_id, obj, room_floors, task)
+                cache_base = self.cache_single_object(
+                    obj_id, obj, room_floors, task, reference and reference["base_states"], static_obj_ids
+                )
                 state_cache[obj_id] = {
                     "base_states": cache_base,
                     "type": "standard",
                 }
         return state_cache
 
+    @staticmethod
+    def get_static_objects(
+        obj_names, prev_poses, prev_active, cur_poses, cur_active, prev_joint_positions=None, cur_joint_positions=None
+    ):
+        """
+        :param prev_joint_positions: optional joint positions of the objects when prev_poses was cached, see
+            get_object_joint_positions
+        :param cur_joint_positions: optional joint positions of the objects when cur_poses was cached
+        :return: set of names of the objects whose active parts did not move or articulate between the two caches
+        """
+        pose_change = np.max(np.abs(cur_poses - prev_poses), axis=(1, 2))
+        static = (pose_change < POSE_CHANGE_TOLERANCE) & (prev_active == cur_active)
+        if prev_joint_positions is not None and cur_joint_positions is not None:
+            for i, (prev, cur) in enumerate(zip(prev_joint_positions, cur_joint_positions)):
+                if len(prev) != len(cur) or np.any(np.abs(cur - prev) >= POSE_CHANGE_TOLERANCE):
+                    static[i] = False
+        return {name for name, is_static in zip(obj_names, static) if is_static}
+
     def diff_object_states(self, obj_1_states, obj_2_states):
         total_states = 0
         non_kinematic_edits = 0
@@ -331,6 +409,9 @@ class LogicalDisarrangement(MetricBase):
     def step_callback(self, igbhvr_act_inst, _):
         if not self.initialized and igbhvr_act_inst.simulator.frame_count == SIMULATOR_SETTLE_TIME:
             self.initial_state_cache = self.create_object_logical_state_cache(igbhvr_act_inst)
+            self.obj_names, self.objects = get_tracked_objects(igbhvr_act_inst)
+            self.initial_poses, self.initial_active = get_object_part_poses(self.objects)
+            self.initial_joint_positions = get_object_joint_positions(self.objects)
             self.initialized = True
         else:
             return
@@ -341,12 +422,27 @@ class LogicalDisarrangement(MetricBase):
         Setting collision groups on the agent (which happens when users first activate the agent)
         Wipes active collision groups. To get the logical disarrangement, we must wake up all objects in the scene
         This can only be done at the end of the scene so as to not affect determinism.
+
+        Only relational states involving objects that moved or articulated since the initial cache are evaluated
+        again.
         """
         for obj in igbhvr_act_inst.scene.objects_by_name.values():
             obj.force_wakeup()
         igbhvr_act_inst.simulator.step()
 
-        self.cur_state_cache = self.create_object_logical_state_cache(igbhvr_act_inst)
+        cur_poses, cur_active = get_object_part_poses(self.objects)
+        static_obj_ids = self.get_static_objects(
+            self.obj_names,
+            self.initial_poses,
+            self.initial_active,
+            cur_poses,
+            cur_active,
+            self.initial_joint_positions,
+            get_object_joint_positions(self.objects),
+        )
+        self.cur_state_cache = self.create_object_logical_state_cache(
+            igbhvr_act_inst, self.initial_state_cache, static_obj_ids
+        )
 
         self.relative_logical_disarrangement = self.compute_logical_disarrangement(
             self.initial_state_cache, self.cur_state_cache
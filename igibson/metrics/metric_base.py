@@ -1,5 +1,6 @@
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
 from future.utils import with_metaclass
 
 
@@ -17,3 +18,49 @@ class MetricBase(with_metaclass(ABCMeta, object)):
     def gather_results(self):
         """Produce a dictionary of values for this metric, to be added onto demo information."""
         pass
+
+
+class TimestepBuffer(object):
+    """
+    Preallocated NumPy buffer that stores one fixed-shape row per timestep.
+    Capacity grows geometrically, so appending a row is amortized O(1) and never allocates Python objects.
+    The buffer is not bounded like a ring buffer, because gather_results reports every timestep of the episode.
+    """
+
+    def __init__(self, row_shape=(), dtype=np.float64, capacity=1024):
+        """
+        :param row_shape: shape of the value stored every timestep
+        :param dtype: dtype of the stored values
+        :param capacity: number of timesteps preallocated up front
+        """
+        self.row_shape = tuple(row_shape)
+        self.data = np.zeros((max(capacity, 1),) + self.row_shape, dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, value):
+        """
+        Store a new row, doubling the capacity when the buffer is full
+
+        :param value: value broadcastable to row_shape
+        """
+        if self.size == len(self.data):
+            grown = np.zeros((2 * len(self.data),) + self.row_shape, dtype=self.data.dtype)
+            grown[: self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self):
+        """
+        :return: array view of the rows stored so far
+        """
+        return self.data[: self.size]
+
+    def tolist(self):
+        """
+        :return: rows stored so far as (JSON serializable) Python lists
+        """
+        return self.view().tolist()
@@ -1,18 +1,18 @@
 import numpy as np
 
-from igibson.external.pybullet_tools.utils import aabb_union, get_aabb, get_all_links
 from igibson.object_states.object_state_base import CachingEnabledObjectState
 
 
 class AABB(CachingEnabledObjectState):
+    """
+    The AABB of the object, from the simulator AABB table.
+    """
+
     def _compute_value(self):
-        body_id = self.obj.get_body_id()
-        all_links = get_all_links(body_id)
-        aabbs = [get_aabb(body_id, link=link) for link in all_links]
-        aabb_low, aabb_hi = aabb_union(aabbs)
+        aabb_low, aabb_hi = self.simulator.aabb_table.get_aabb(self.obj.get_body_id())
 
         if not hasattr(self.obj, "category") or self.obj.category != "floors" or self.obj.room_floor is None:
-            return np.array(aabb_low), np.array(aabb_hi)
+            return aabb_low, aabb_hi
 
         # TODO: remove after split floors
         # room_floor will be set to the correct RoomFloor beforehand
@@ -30,6 +30,12 @@ class AABB(CachingEnabledObjectState):
 
         return np.array(room_aabb_low), np.array(room_aabb_hi)
 
+    def clear_cached_value(self):
+        super(AABB, self).clear_cached_value()
+        # The object may have been moved without stepping physics, e.g. while sampling.
+        if self.simulator is not None and self.obj.get_body_id() is not None:
+            self.simulator.aabb_table.invalidate(self.obj.get_body_id())
+
     def _set_value(self, new_value):
         raise NotImplementedError("AABB state currently does not support setting.")
 
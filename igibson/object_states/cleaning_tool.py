@@ -1,4 +1,7 @@
-from igibson.external.pybullet_tools.utils import aabb_contains_point, get_aabb
+import itertools
+
+import numpy as np
+
 from igibson.object_states.aabb import AABB
 from igibson.object_states.contact_bodies import ContactBodies
 from igibson.object_states.dirty import Dusty, Stained
@@ -14,6 +17,8 @@ _LINK_NAME = "cleaning_tool_area"
 class CleaningTool(AbsoluteObjectState, LinkBasedStateMixin):
     def __init__(self, obj):
         super(CleaningTool, self).__init__(obj)
+        # Number of dirt particles cleaned in the last step.
+        self.num_cleaned_particles = 0
 
     @staticmethod
     def get_state_link_name():
@@ -23,6 +28,10 @@ class CleaningTool(AbsoluteObjectState, LinkBasedStateMixin):
         self.initialize_link_mixin()
 
     def _update(self):
+        self.num_cleaned_particles = 0
+        touched_body_ids = None
+        aabb = None
+
         # Check if this tool interacts with any dirt particles.
         for particle_system in self.simulator.particle_systems:
             # We don't check for inheritance, just the leaf types.
@@ -42,27 +51,31 @@ class CleaningTool(AbsoluteObjectState, LinkBasedStateMixin):
 
             # Check if we're touching the parent of the particle system through our
             # cleaning link.
-            contact_bodies = self.obj.states[ContactBodies].get_value()
-            touching_body = [
-                cb for cb in contact_bodies if cb.bodyUniqueIdB == particle_system.parent_obj.get_body_id()
-            ]
-            touching_link = any(self.link_id is None or cb.linkIndexA == self.link_id for cb in touching_body)
-            if not touching_link:
+            if touched_body_ids is None:
+                if self.link_id is None:
+                    touched_body_ids = self.obj.states[ContactBodies].get_contact_body_ids()
+                else:
+                    contacts = self.obj.states[ContactBodies].get_value()
+                    touched_body_ids = set(contacts.bodyUniqueIdB[contacts.linkIndexA == self.link_id].tolist())
+            if particle_system.parent_obj.get_body_id() not in touched_body_ids:
                 continue
 
             # Time to check for colliding particles in our AABB.
-            if self.link_id is not None:
-                # If we have a cleaning link, use it.
-                aabb = get_aabb(self.body_id, link=self.link_id)
-            else:
-                # Otherwise, use the full-object AABB.
-                aabb = self.obj.states[AABB].get_value()
-
-            # Find particles in the AABB.
-            for particle in particle_system.get_active_particles():
-                pos = particle.get_position()
-                if aabb_contains_point(pos, aabb):
-                    particle_system.stash_particle(particle)
+            if aabb is None:
+                if self.link_id is not None:
+                    # If we have a cleaning link, use it.
+                    aabb = self.simulator.aabb_table.get_link_aabb(self.body_id, self.link_id)
+                else:
+                    # Otherwise, use the full-object AABB.
+                    aabb = self.obj.states[AABB].get_value()
+
+            # Find particles in the AABB and stash them all at once.
+            positions = particle_system.get_active_particle_positions()
+            in_aabb = np.all((aabb[0] <= positions) & (positions <= aabb[1]), axis=1)
+            cleaned_particles = list(itertools.compress(particle_system.get_active_particles(), in_aabb))
+            if cleaned_particles:
+                particle_system.stash_particles(cleaned_particles)
+                self.num_cleaned_particles += len(cleaned_particles)
 
     def _set_value(self, new_value):
         raise ValueError("Cannot set valueless state CleaningTool.")
@@ -1,13 +1,20 @@
-import pybullet as p
-
-from igibson.external.pybullet_tools.utils import ContactResult
 from igibson.object_states.object_state_base import CachingEnabledObjectState
 
 
 class ContactBodies(CachingEnabledObjectState):
+    """
+    The contact points of the object in the current step, as a record array with the fields of ContactResult. They are
+    read from the simulator contact cache, which makes a single contact query per step.
+    """
+
     def _compute_value(self):
-        body_id = self.obj.get_body_id()
-        return [ContactResult(*item[:10]) for item in p.getContactPoints(bodyA=body_id)]
+        return self.simulator.contact_cache.get_contacts(self.obj.get_body_id())
+
+    def get_contact_body_ids(self):
+        """
+        :return: set of the ids of the bodies in contact with the object
+        """
+        return self.simulator.contact_cache.get_contact_body_ids(self.obj.get_body_id())
 
     def _set_value(self, new_value):
         raise NotImplementedError("ContactBodies state currently does not support setting.")
@@ -35,15 +35,13 @@ class _Dirty(AbsoluteObjectState, BooleanState):
 
     def _set_value(self, new_value):
         if not new_value:
-            for particle in self.dirt.get_active_particles():
-                self.dirt.stash_particle(particle)
+            self.dirt.stash_particles(self.dirt.get_active_particles())
         else:
             self.dirt.randomize()
 
             # If after randomization we have too few particles, stash them and return False.
             if self.dirt.get_num_particles_activated_at_any_time() < MIN_PARTICLES_FOR_SAMPLING_SUCCESS:
-                for particle in self.dirt.get_active_particles():
-                    self.dirt.stash_particle(particle)
+                self.dirt.stash_particles(self.dirt.get_active_particles())
 
                 return False
 
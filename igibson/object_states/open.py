@@ -1,5 +1,6 @@
 import random
 
+import numpy as np
 import pybullet as p
 
 from igibson.external.pybullet_tools import utils
@@ -16,13 +17,19 @@ _JOINT_THRESHOLD_BY_TYPE = {
 _METADATA_FIELD = "openable_joint_ids"
 
 
-def _compute_joint_threshold(joint_info):
+def _compute_joint_thresholds(joint_types, lower_limits, upper_limits):
     # Convert fractional threshold to actual joint position.
-    f = _JOINT_THRESHOLD_BY_TYPE[joint_info.jointType]
-    return (1 - f) * joint_info.jointLowerLimit + f * joint_info.jointUpperLimit
+    f = np.array([_JOINT_THRESHOLD_BY_TYPE[joint_type] for joint_type in joint_types])
+    return (1 - f) * lower_limits + f * upper_limits
 
 
 def _get_relevant_joints(obj):
+    """
+    Read the openable joints of an object from its metadata annotation and its static joint metadata.
+
+    :param obj: object
+    :return: arrays of the ids, lower limits, upper limits and openness thresholds of the openable joints, or None
+    """
     if not hasattr(obj, "metadata"):
         return None
 
@@ -37,64 +44,78 @@ def _get_relevant_joints(obj):
     if not joint_names:
         print("No openable joint was listed in metadata for object %s" % obj.name)
         return None
-    joint_names = set(obj.get_prefixed_joint_name(joint_name).encode(encoding="utf-8") for joint_name in joint_names)
+    joint_names = set(obj.get_prefixed_joint_name(joint_name) for joint_name in joint_names)
 
-    # Get joint infos and compute openness thresholds.
-    body_id = obj.get_body_id()
-    all_joint_ids = utils.get_joints(body_id)
-    all_joint_infos = [utils.get_joint_info(body_id, joint_id) for joint_id in all_joint_ids]
-    relevant_joint_infos = [joint_info for joint_info in all_joint_infos if joint_info.jointName in joint_names]
+    # Get the joint ids from the static metadata of the body.
+    body_joint_metadata = obj.get_joint_metadata()
+    relevant_joint_ids = np.array(
+        [joint_id for joint_id, name in enumerate(body_joint_metadata.joint_names) if name in joint_names], dtype=int
+    )
 
     # Assert that all of the joints' names match our expectations.
     assert len(joint_names) == len(
-        relevant_joint_infos
+        relevant_joint_ids
     ), "Unexpected joints found during Open state joint checking. Expected %r, found %r." % (
         joint_names,
-        relevant_joint_infos,
+        [body_joint_metadata.joint_names[joint_id] for joint_id in relevant_joint_ids],
     )
-    assert all(joint_info.jointType in _JOINT_THRESHOLD_BY_TYPE.keys() for joint_info in relevant_joint_infos)
+    joint_types = body_joint_metadata.joint_types[relevant_joint_ids]
+    assert all(joint_type in _JOINT_THRESHOLD_BY_TYPE.keys() for joint_type in joint_types)
 
-    return relevant_joint_infos
+    lower_limits = body_joint_metadata.joint_lower_limits[relevant_joint_ids]
+    upper_limits = body_joint_metadata.joint_upper_limits[relevant_joint_ids]
+    thresholds = _compute_joint_thresholds(joint_types, lower_limits, upper_limits)
+    return relevant_joint_ids, lower_limits, upper_limits, thresholds
 
 
 class Open(CachingEnabledObjectState, BooleanState):
+    def __init__(self, obj):
+        super(Open, self).__init__(obj)
+        # The openable joints are static, so they are only looked up once.
+        self._relevant_joints = None
+        self._relevant_joints_loaded = False
+
+    def _get_relevant_joints(self):
+        if not self._relevant_joints_loaded:
+            self._relevant_joints = _get_relevant_joints(self.obj)
+            self._relevant_joints_loaded = True
+        return self._relevant_joints
+
     def _compute_value(self):
-        relevant_joint_infos = _get_relevant_joints(self.obj)
-        if not relevant_joint_infos:
+        relevant_joints = self._get_relevant_joints()
+        if relevant_joints is None or len(relevant_joints[0]) == 0:
             return False
 
-        # Compute a boolean openness state for each joint by comparing positions to thresholds.
-        joint_ids = [joint_info.jointIndex for joint_info in relevant_joint_infos]
-        joint_thresholds = (_compute_joint_threshold(joint_info) for joint_info in relevant_joint_infos)
-        joint_positions = utils.get_joint_positions(self.obj.get_body_id(), joint_ids)
-        joint_openness = (position > threshold for position, threshold in zip(joint_positions, joint_thresholds))
+        # Compare all the joint positions to their thresholds at once.
+        joint_ids, _, _, thresholds = relevant_joints
+        joint_positions = self.obj.get_joint_metadata().get_joint_positions(joint_ids)
 
         # Return open if any joint is open, false otherwise.
-        return any(joint_openness)
+        return bool(np.any(joint_positions > thresholds))
 
     def _set_value(self, new_value):
-        relevant_joint_infos = _get_relevant_joints(self.obj)
-        if not relevant_joint_infos:
+        relevant_joints = self._get_relevant_joints()
+        if relevant_joints is None or len(relevant_joints[0]) == 0:
             return False
+        joint_ids, lower_limits, upper_limits, thresholds = relevant_joints
 
         # All joints are relevant if we are closing, but if we are opening let's sample a subset.
+        joint_indices = list(range(len(joint_ids)))
         if new_value:
-            num_to_open = random.randint(1, len(relevant_joint_infos))
-            relevant_joint_infos = random.sample(relevant_joint_infos, num_to_open)
+            num_to_open = random.randint(1, len(joint_indices))
+            joint_indices = random.sample(joint_indices, num_to_open)
 
         # Go through the relevant joints & set random positions.
-        for joint_info in relevant_joint_infos:
-            joint_threshold = _compute_joint_threshold(joint_info)
-
+        for i in joint_indices:
             if new_value:
                 # Sample an open position.
-                joint_pos = random.uniform(joint_threshold, joint_info.jointUpperLimit)
+                joint_pos = random.uniform(thresholds[i], upper_limits[i])
             else:
                 # Sample a closed position.
-                joint_pos = random.uniform(joint_info.jointLowerLimit, joint_threshold)
+                joint_pos = random.uniform(lower_limits[i], thresholds[i])
 
             # Save sampled position.
-            utils.set_joint_position(self.obj.get_body_id(), joint_info.jointIndex, joint_pos)
+            utils.set_joint_position(self.obj.get_body_id(), joint_ids[i], joint_pos)
 
         return True
 
@@ -1,3 +1,5 @@
+import weakref
+
 import numpy as np
 
 from igibson.object_states.object_state_base import BooleanState, CachingEnabledObjectState
@@ -7,7 +9,8 @@ from igibson.utils.constants import MAX_INSTANCE_COUNT
 
 _IN_REACH_DISTANCE_THRESHOLD = 2.0
 
-_IN_FOV_PIXEL_FRACTION_THRESHOLD = 0.05
+# By default, an object is in the FOV as soon as one of its pixels is visible
+_IN_FOV_PIXEL_FRACTION_THRESHOLD = 0.0
 
 
 def _get_behavior_robot(simulator):
@@ -23,6 +26,78 @@ def _get_behavior_robot(simulator):
     return valid_robots[0]
 
 
+class RobotFOVVisibility(object):
+    """
+    Tracks which renderer instances are visible from the robot camera. The instance segmentation is rendered once per
+    simulator frame and camera pose, and a histogram of its instance ids answers all InFOVOfRobot queries in between.
+    """
+
+    def __init__(self, simulator):
+        """
+        :param simulator: Simulator whose robot camera is rendered
+        """
+        self.simulator = simulator
+        self._key = None
+        self._pixel_counts = None
+        self._num_pixels = 0
+
+    def invalidate(self):
+        """
+        Force the segmentation to be rendered again at the next query.
+        """
+        self._key = None
+
+    def _get_camera_key(self):
+        from igibson.render.mesh_renderer.instances import Robot
+
+        camera_poses = [
+            instance.robot.eyes.get_position_orientation()
+            for instance in self.simulator.renderer.instances
+            if isinstance(instance, Robot)
+        ]
+        robot = _get_behavior_robot(self.simulator)
+        if robot is not None:
+            camera_poses.append(robot.parts["eye"].get_position_orientation())
+        return self.simulator.frame_count, tuple(tuple(np.concatenate(pose)) for pose in camera_poses)
+
+    def get_pixel_counts(self):
+        """
+        :return: Number of pixels of each instance id in the robot camera image
+        """
+        key = self._get_camera_key()
+        if key != self._key:
+            seg = self.simulator.renderer.render_robot_cameras(modes="ins_seg")[0][:, :, 0]
+            seg = np.round(seg * MAX_INSTANCE_COUNT).astype(int)
+            self._pixel_counts = np.bincount(seg.ravel(), minlength=MAX_INSTANCE_COUNT + 1)
+            self._num_pixels = seg.size
+            self._key = key
+
+        return self._pixel_counts
+
+    def is_visible(self, instance_ids, pixel_fraction_threshold):
+        """
+        :param instance_ids: Renderer instance ids of an object
+        :param pixel_fraction_threshold: Minimum fraction of the image the instances need to cover, 0 to only require
+            one pixel
+        :return: Whether the instances cover enough of the robot camera image
+        """
+        pixel_counts = self.get_pixel_counts()
+        num_pixels = pixel_counts[[i for i in instance_ids if i < len(pixel_counts)]].sum()
+        return num_pixels > 0 and num_pixels >= pixel_fraction_threshold * self._num_pixels
+
+
+_FOV_VISIBILITY_BY_SIMULATOR = weakref.WeakKeyDictionary()
+
+
+def get_robot_fov_visibility(simulator):
+    """
+    Get the RobotFOVVisibility shared by all the InFOVOfRobot states of a simulator.
+    """
+    if simulator not in _FOV_VISIBILITY_BY_SIMULATOR:
+        _FOV_VISIBILITY_BY_SIMULATOR[simulator] = RobotFOVVisibility(simulator)
+    return _FOV_VISIBILITY_BY_SIMULATOR[simulator]
+
+
 class InReachOfRobot(CachingEnabledObjectState, BooleanState):
     @staticmethod
     def get_dependencies():
@@ -99,13 +174,20 @@ class InHandOfRobot(CachingEnabledObjectState, BooleanState):
 
 
 class InFOVOfRobot(CachingEnabledObjectState, BooleanState):
+    def __init__(self, obj, pixel_fraction_threshold=_IN_FOV_PIXEL_FRACTION_THRESHOLD):
+        """
+        :param obj: Object the state belongs to
+        :param pixel_fraction_threshold: Minimum fraction of the robot camera image the object needs to cover to be in
+            the FOV, 0 to only require one pixel
+        """
+        super(InFOVOfRobot, self).__init__(obj)
+        self.pixel_fraction_threshold = pixel_fraction_threshold
+
     def _compute_value(self):
-        seg = self.simulator.renderer.render_robot_cameras(modes="ins_seg")[0][:, :, 0]
-        seg = np.round(seg * MAX_INSTANCE_COUNT)
         main_body_instances = [
             inst.id for inst in self.obj.renderer_instances if inst.pybullet_uuid == self.obj.get_body_id()
         ]
-        return np.any(np.isin(seg, main_body_instances))
+        return get_robot_fov_visibility(self.simulator).is_visible(main_body_instances, self.pixel_fraction_threshold)
 
     def _set_value(self, new_value):
         raise NotImplementedError("InFOVOfRobot state currently does not support setting.")
@@ -1,23 +1,106 @@
+import weakref
+
 import numpy as np
 
 from igibson.object_states.object_state_base import AbsoluteObjectState, BooleanState, CachingEnabledObjectState
 
 
+def _uses_in_rooms(obj):
+    # For fixed objects, we can use the in_rooms attribute.
+    return getattr(obj, "main_body_is_fixed", False) and getattr(obj, "in_rooms", None)
+
+
+class RoomAssignment(object):
+    """
+    Assigns the non-fixed objects with an InsideRoomTypes state to the room types of the segmentation map, in one
+    batched pass.
+
+    The positions of all the objects are gathered into one array and only the objects that moved since the last pass
+    are looked up in the room segmentation map, with a single gather. The pass fills the InsideRoomTypes caches of
+    all the objects, so the other queries are cache hits until a cache is cleared, e.g. by a simulator step.
+    """
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self._valid = False
+        self._objects = []
+        self._positions = np.zeros((0, 2))
+        self._room_types = []
+
+    def invalidate(self):
+        """
+        Run the pass again at the next query. Called when an InsideRoomTypes cache is cleared.
+        """
+        self._valid = False
+
+    def update(self):
+        """
+        Run the room assignment pass, if it was invalidated since it last ran.
+        """
+        if self._valid:
+            return
+        self._valid = True
+
+        objects = [
+            obj for obj in self.simulator.scene.get_objects_with_state(InsideRoomTypes) if not _uses_in_rooms(obj)
+        ]
+        positions = np.array([obj.get_position()[:2] for obj in objects]).reshape(-1, 2)
+        if objects == self._objects:
+            moved = np.any(positions != self._positions, axis=1)
+            room_types = self._room_types
+        else:
+            moved = np.ones(len(objects), dtype=bool)
+            room_types = [None] * len(objects)
+
+        moved_idx = np.flatnonzero(moved)
+        if len(moved_idx):
+            moved_room_types = self.simulator.scene.get_room_types_by_points(positions[moved_idx])
+            for i, room_type in zip(moved_idx.tolist(), moved_room_types):
+                room_types[i] = room_type
+
+        self._objects = objects
+        self._positions = positions
+        self._room_types = room_types
+        for obj, room_type in zip(objects, room_types):
+            obj.states[InsideRoomTypes].value = [room_type]
+
+
+_ROOM_ASSIGNMENT_BY_SIMULATOR = weakref.WeakKeyDictionary()
+
+
+def get_room_assignment(simulator):
+    """
+    Get the RoomAssignment shared by all the InsideRoomTypes states of a simulator.
+    """
+    if simulator not in _ROOM_ASSIGNMENT_BY_SIMULATOR:
+        _ROOM_ASSIGNMENT_BY_SIMULATOR[simulator] = RoomAssignment(simulator)
+    return _ROOM_ASSIGNMENT_BY_SIMULATOR[simulator]
+
+
 class InsideRoomTypes(CachingEnabledObjectState):
     """The value of this state is the list of rooms that the object currently is in."""
 
     def _compute_value(self):
-        if hasattr(self.obj, "main_body_is_fixed") and self.obj.main_body_is_fixed:
-            # For fixed objects, we can use the in_rooms attribute.
-            if hasattr(self.obj, "in_rooms") and self.obj.in_rooms:
-                return self.obj.in_rooms
+        if _uses_in_rooms(self.obj):
+            return self.obj.in_rooms
 
         # Otherwise we need to calculate using room segmentation function. Check that it exists.
-        if not hasattr(self.simulator.scene, "get_room_type_by_point"):
+        if not hasattr(self.simulator.scene, "get_room_types_by_points"):
             return ["undefined"]
 
-        pose = self.obj.get_position()
-        return [self.simulator.scene.get_room_type_by_point(np.array(pose[:2]))]
+        # The room assignment pass fills the cache of this state along with the others.
+        room_assignment = get_room_assignment(self.simulator)
+        room_assignment.update()
+        if self.value is None:
+            # The object is not part of the scene, so the pass does not know about it.
+            pose = self.obj.get_position()
+            return self.simulator.scene.get_room_types_by_points(np.array(pose[:2]))
+        return self.value
+
+    def clear_cached_value(self):
+        super(InsideRoomTypes, self).clear_cached_value()
+        if self.simulator is not None:
+            get_room_assignment(self.simulator).invalidate()
 
     def _set_value(self, new_value):
         raise NotImplementedError("Room state currently does not support setting.")
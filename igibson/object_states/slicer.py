@@ -21,9 +21,7 @@ class Slicer(AbsoluteObjectState, LinkBasedStateMixin):
         if slicer_position is None:
             return
         contact_points = self.obj.states[ContactBodies].get_value()
-        for item in contact_points:
-            if item.linkIndexA != self.link_id:
-                continue
+        for item in contact_points[contact_points.linkIndexA == self.link_id]:
             contact_obj = self.simulator.scene.objects_by_id[item.bodyUniqueIdB]
             if Sliced in contact_obj.states:
                 if (
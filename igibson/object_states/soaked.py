@@ -19,12 +19,20 @@ class Soaked(AbsoluteObjectState, BooleanState, TextureChangeStateMixin):
 
     def _update(self):
         water_source_objs = self.simulator.scene.get_objects_with_state(WaterSource)
+        contacted_water_body_ids = None
         for water_source_obj in water_source_objs:
-            contacted_water_body_ids = set(
-                item.bodyUniqueIdB for item in list(self.obj.states[ContactBodies].get_value())
-            )
-            for particle in water_source_obj.states[WaterSource].water_stream.get_active_particles():
-                if particle.body_id in contacted_water_body_ids:
+            water_stream = water_source_obj.states[WaterSource].water_stream
+            if water_stream is None:
+                continue
+
+            if water_stream.kinematic:
+                # Kinematic drops report the bodies their ray queries hit.
+                if self.obj.get_body_id() in water_stream.hit_body_ids:
+                    self.value = True
+            else:
+                if contacted_water_body_ids is None:
+                    contacted_water_body_ids = self.obj.states[ContactBodies].get_contact_body_ids()
+                if water_stream.get_active_particles_with_body_ids(contacted_water_body_ids):
                     self.value = True
         self.update_texture()
 
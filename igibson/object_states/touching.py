@@ -14,7 +14,4 @@ class Touching(KinematicsMixin, RelativeObjectState, BooleanState):
         assert ContactBodies in objA_states
         assert ContactBodies in objB_states
 
-        for item in objA_states[ContactBodies].get_value():
-            if item.bodyUniqueIdB == other.get_body_id():
-                return True
-        return False
+        return other.get_body_id() in objA_states[ContactBodies].get_contact_body_ids()
@@ -20,8 +20,14 @@ _NUM_DROPS = 10
 
 
 class WaterSource(AbsoluteObjectState, LinkBasedStateMixin):
-    def __init__(self, obj):
+    def __init__(self, obj, kinematic=False):
+        """
+        :param obj: The object this state is attached to
+        :param kinematic: Whether to use body-less water drops that soak objects through ray queries instead of
+            physical drops that soak objects through contacts
+        """
         super(WaterSource, self).__init__(obj)
+        self.kinematic = kinematic
 
         # Reduced to a single water stream for now since annotations don't support more.
         self.water_stream = None
@@ -41,29 +47,33 @@ class WaterSource(AbsoluteObjectState, LinkBasedStateMixin):
             return
 
         water_source_position = list(np.array(water_source_position) + _OFFSET_FROM_LINK)
-        self.water_stream = WaterStream(water_source_position, num=_NUM_DROPS, initial_dump=self.initial_dump)
+        self.water_stream = WaterStream(
+            water_source_position, num=_NUM_DROPS, initial_dump=self.initial_dump, kinematic=self.kinematic
+        )
         self.simulator.import_particle_system(self.water_stream)
         del self.initial_dump
 
     def _update(self):
-        water_source_position = self.get_link_position()
-        if water_source_position is None:
+        if self.water_stream is None:
             return
 
-        water_source_position = list(np.array(water_source_position) + _OFFSET_FROM_LINK)
-        self.water_stream.water_source_pos = water_source_position
-
         if ToggledOn in self.obj.states:
             # sync water source state with toggleable
             self.water_stream.set_running(self.obj.states[ToggledOn].get_value())
         else:
             self.water_stream.set_running(True)  # turn on the water by default
 
-        # water reusing logic
-        contacted_water_body_ids = set(item.bodyUniqueIdB for item in list(self.obj.states[ContactBodies].get_value()))
-        for particle in self.water_stream.get_active_particles():
-            if particle.body_id in contacted_water_body_ids:
-                self.water_stream.stash_particle(particle)
+        # The source position is only needed to drop new water.
+        if self.water_stream.on:
+            water_source_position = self.get_link_position()
+            self.water_stream.water_source_pos = list(np.array(water_source_position) + _OFFSET_FROM_LINK)
+
+        # water reusing logic. Kinematic drops are recycled by the water stream itself.
+        if not self.water_stream.kinematic and self.water_stream.get_num_active():
+            contacted_water_body_ids = self.obj.states[ContactBodies].get_contact_body_ids()
+            self.water_stream.stash_particles(
+                self.water_stream.get_active_particles_with_body_ids(contacted_water_body_ids)
+            )
 
     def _set_value(self, new_value):
         raise ValueError("set_value not supported for WaterSource.")
@@ -14,8 +14,6 @@ import trimesh
 
 import igibson
 from igibson.external.pybullet_tools.utils import (
-    get_joint_info,
-    get_joints,
     link_from_name,
     matrix_from_quat,
     quat_from_matrix,
@@ -26,6 +24,7 @@ from igibson.object_states.texture_change_state_mixin import TextureChangeStateM
 from igibson.object_states.utils import clear_cached_states
 from igibson.objects.stateful_object import StatefulObject
 from igibson.render.mesh_renderer.materials import ProceduralMaterial, RandomizedMaterial
+from igibson.utils.joint_utils import BodyJointMetadata
 from igibson.utils.urdf_utils import add_fixed_link, get_base_link_name, round_up, save_urdfs_without_floating_joints
 from igibson.utils.utils import get_transform_from_xyz_rpy, quatXYZWFromRotMat, rotate_vector_3d
 
@@ -212,6 +211,8 @@ class URDFObject(StatefulObject):
         self.poses = []
         # pybullet body ids, int
         self.body_ids = []
+        # static joint and link metadata of each body, read once at load, BodyJointMetadata
+        self.joint_metadata = []
         # whether this object is fixed or not, boolean
         self.is_fixed = []
         self.main_body = -1
@@ -817,12 +818,8 @@ class URDFObject(StatefulObject):
             body_id = self.body_ids[i]
             sub_urdf_tree = ET.parse(self.urdf_paths[i])
 
-            for j in np.arange(-1, p.getNumJoints(body_id)):
-                # base_link
-                if j == -1:
-                    link_name = p.getBodyInfo(body_id)[0].decode("UTF-8")
-                else:
-                    link_name = p.getJointInfo(body_id, j)[12].decode("UTF-8")
+            for j in np.arange(-1, self.joint_metadata[i].num_joints):
+                link_name = self.joint_metadata[i].get_link_name(j)
                 link = sub_urdf_tree.find(".//link[@name='{}']".format(link_name))
                 link_materials = []
                 for visual_mesh in link.findall("visual/geometry/mesh"):
@@ -930,21 +927,17 @@ class URDFObject(StatefulObject):
             p.resetBasePositionAndOrientation(body_id, pos, orn)
             p.changeDynamics(body_id, -1, activationState=p.ACTIVATION_STATE_ENABLE_SLEEPING)
 
-            for j in get_joints(body_id):
-                info = get_joint_info(body_id, j)
-                jointType = info.jointType
-                if jointType in [p.JOINT_REVOLUTE, p.JOINT_PRISMATIC]:
-                    p.setJointMotorControl2(
-                        body_id, j, p.VELOCITY_CONTROL, targetVelocity=0.0, force=self.joint_friction
-                    )
+            joint_metadata = BodyJointMetadata(body_id)
+            for j in joint_metadata.joint_ids[joint_metadata.get_movable_joint_mask()]:
+                p.setJointMotorControl2(body_id, j, p.VELOCITY_CONTROL, targetVelocity=0.0, force=self.joint_friction)
 
-                    # Only need to restore revolute and prismatic joints
-                    if self.joint_positions:
-                        joint_name = str(info.jointName, encoding="utf-8")
-                        joint_position = self.joint_positions[idx][joint_name]
-                        set_joint_position(body_id, j, joint_position)
+                # Only need to restore revolute and prismatic joints
+                if self.joint_positions:
+                    joint_position = self.joint_positions[idx][joint_metadata.joint_names[j]]
+                    set_joint_position(body_id, j, joint_position)
 
             self.body_ids.append(body_id)
+            self.joint_metadata.append(joint_metadata)
 
         self.load_supporting_surfaces()
 
@@ -975,14 +968,10 @@ class URDFObject(StatefulObject):
             p.resetBasePositionAndOrientation(body_id, pos, orn)
 
             # reset joint position to 0.0
-            for j in range(p.getNumJoints(body_id)):
-                info = p.getJointInfo(body_id, j)
-                jointType = info[2]
-                if jointType in [p.JOINT_REVOLUTE, p.JOINT_PRISMATIC]:
-                    p.resetJointState(body_id, j, targetValue=0.0, targetVelocity=0.0)
-                    p.setJointMotorControl2(
-                        body_id, j, p.VELOCITY_CONTROL, targetVelocity=0.0, force=self.joint_friction
-                    )
+            joint_metadata = self.joint_metadata[idx]
+            for j in joint_metadata.joint_ids[joint_metadata.get_movable_joint_mask()]:
+                p.resetJointState(body_id, j, targetValue=0.0, targetVelocity=0.0)
+                p.setJointMotorControl2(body_id, j, p.VELOCITY_CONTROL, targetVelocity=0.0, force=self.joint_friction)
 
     def get_position(self):
         """
@@ -1090,6 +1079,12 @@ class URDFObject(StatefulObject):
     def get_body_id(self):
         return self.body_ids[self.main_body]
 
+    def get_joint_metadata(self):
+        """
+        :return: BodyJointMetadata of the main body, read once when the object was loaded
+        """
+        return self.joint_metadata[self.main_body]
+
     def add_meta_links(self, meta_links):
         """
         Adds the meta links (e.g. heating element position, water source position) from the metadata file
@@ -1,5 +1,4 @@
 import os
-from collections import deque
 
 import numpy as np
 import pybullet as p
@@ -9,7 +8,9 @@ from igibson.external.pybullet_tools import utils
 from igibson.external.pybullet_tools.utils import get_aabb_extent, get_link_name, link_from_name
 from igibson.objects.object_base import Object
 from igibson.utils import sampling_utils
+from igibson.utils import transform_utils as T
 from igibson.utils.constants import PyBulletSleepState, SemanticClass
+from igibson.utils.mesh_util import quat2rotmat, xyzw2wxyz
 
 _STASH_POSITION = [0, 0, -100]
 
@@ -105,6 +106,105 @@ class Particle(Object):
         p.changeDynamics(self.body_id, -1, activationState=activationState)
 
 
+class InstancedParticle(object):
+    """
+    A kinematic, visual-only particle, used for dust, stain and kinematic water. It has no pybullet body: its pose is
+    a row of the pose arrays of its particle system, and it is drawn by a renderer instance that shares its visual
+    object with all other particles of the same shape, size and color.
+    """
+
+    def __init__(
+        self,
+        system,
+        index,
+        size,
+        color=(1, 1, 1, 1),
+        base_shape="sphere",
+        mesh_filename=None,
+        mesh_bounding_box=None,
+        **kwargs
+    ):
+        """
+        Create an instanced particle.
+
+        :param system: ParticleSystem holding the pose of this particle.
+        :param index: Index of this particle in the particle system.
+        :param size: 3-dimensional bounding box size to fit particle in. For sphere, the smallest dimension is used.
+        :param color: RGBA particle color.
+        :param base_shape: One of "box", "sphere", "mesh". If mesh, mesh_filename also required.
+        :param mesh_filename: Filename of obj file to load mesh from, if base_shape is "mesh".
+        :param mesh_bounding_box: bounding box of the mesh when scale=1. Needed for scale computation.
+        :param kwargs: Remaining Particle arguments (e.g. mass), unused since the particle has no body.
+        """
+        self._system = system
+        self._index = index
+        self.size = size
+        self.visual_only = True
+        self.color = color
+        self.base_shape = base_shape
+        self.bounding_box = np.array(self.size)
+        self.body_id = None
+        self.loaded = False
+        self.renderer_instances = []
+        assert len(self.size) == 3
+
+        if self.base_shape == "mesh":
+            assert mesh_filename is not None and mesh_bounding_box is not None
+            self.mesh_filename = mesh_filename
+            self.mesh_scale = np.array(size) / np.array(mesh_bounding_box)
+        elif self.base_shape not in ["box", "sphere"]:
+            raise ValueError("Unsupported particle base shape.")
+
+    def load(self, simulator, **kwargs):
+        """
+        Load the particle into the renderer
+
+        :param simulator: Simulator to load the particle in
+        :param kwargs: Renderer settings (class_id, use_pbr, use_pbr_mapping, shadow_caster)
+        """
+        if not self.loaded:
+            self.renderer_instances.append(simulator.load_particle_instance(self, **kwargs))
+            self.loaded = True
+
+    def get_position(self):
+        return self._system._positions[self._index].copy()
+
+    def get_orientation(self):
+        return self._system._orientations[self._index].copy()
+
+    def get_position_orientation(self):
+        return self.get_position(), self.get_orientation()
+
+    def set_position(self, pos):
+        self.set_position_orientation(pos, self._system._orientations[self._index])
+
+    def set_orientation(self, orn):
+        self.set_position_orientation(self._system._positions[self._index], orn)
+
+    def set_position_orientation(self, pos, orn):
+        self._system._positions[self._index] = pos
+        self._system._orientations[self._index] = orn
+        self.update_renderer_pose()
+
+    def update_renderer_pose(self, rotation=None):
+        """
+        Move the renderer instances of the particle to its current pose
+
+        :param rotation: 4x4 rotation matrix of the current orientation, if already computed by the caller
+        """
+        if rotation is None:
+            rotation = quat2rotmat(xyzw2wxyz(self._system._orientations[self._index]))
+        for instance in self.renderer_instances:
+            instance.set_position(self._system._positions[self._index])
+            instance.set_rotation(rotation)
+
+    def force_sleep(self):
+        pass
+
+    def force_wakeup(self):
+        pass
+
+
 class ParticleSystem(object):
     def __init__(
         self,
@@ -125,9 +225,11 @@ class ParticleSystem(object):
         if color.ndim == 2:
             assert color.shape[0] == num
 
+        # Active and stashed particles are kept in insertion-ordered dicts used as ordered sets, so that particles
+        # can be stashed and unstashed in O(1).
         self._all_particles = []
-        self._active_particles = []
-        self._stashed_particles = deque()
+        self._active_particles = {}
+        self._stashed_particles = {}
         self._particles_activated_at_any_time = set()
 
         self._simulator = None
@@ -143,13 +245,24 @@ class ParticleSystem(object):
             this_size = size if size.ndim == 1 else size[i]
             this_color = color if color.ndim == 1 else color[i]
 
-            particle = Particle(this_size, _STASH_POSITION, color=this_color, **kwargs)
+            particle = self._create_particle(i, this_size, this_color, **kwargs)
             self._all_particles.append(particle)
-            self._stashed_particles.append(particle)
+            self._stashed_particles[particle] = None
+
+        # Poses of the particles. They are the source of truth for InstancedParticles, which have no pybullet body.
+        self._particle_indices = {particle: i for i, particle in enumerate(self._all_particles)}
+        self._positions = np.tile(np.array(_STASH_POSITION, dtype=float), (num, 1))
+        self._orientations = np.tile([0.0, 0.0, 0.0, 1.0], (num, 1))
+
+    def _create_particle(self, index, size, color, **kwargs):
+        # Particles without collisions do not need a pybullet body.
+        if kwargs.get("visual_only", False):
+            return InstancedParticle(self, index, size, color=color, **kwargs)
+        return Particle(size, _STASH_POSITION, color=color, **kwargs)
 
     def dump(self):
         return [
-            particle.get_position_orientation() if particle in self.get_active_particles() else None
+            particle.get_position_orientation() if particle in self._active_particles else None
             for particle in self.get_particles()
         ]
 
@@ -189,24 +302,34 @@ class ParticleSystem(object):
         return self._all_particles
 
     def stash_particle(self, particle):
-        assert particle in self._active_particles
-        self._active_particles.remove(particle)
-        self._stashed_particles.append(particle)
-
-        particle.set_position(_STASH_POSITION)
-        if particle.visual_only:
-            # Stain and Dust need to be woken up before stashing because if
-            # they are asleep, their poses will not be updated in the renderer
-            particle.force_wakeup()
-        else:
-            # Water (awake when stash_particle is called) needs to be
-            # put to sleep because they would collide in _STASH_POSITION
-            # It's okay to call force_sleep() because the sleep state will only
-            # be reflected after p.stepSimulation() is called. Thus, the
-            # renderer should still update its pose in the curren timestep
-            particle.force_sleep()
+        self.stash_particles([particle])
+
+    def stash_particles(self, particles):
+        """Stash several active particles at once."""
+        for particle in particles:
+            assert particle in self._active_particles
+            del self._active_particles[particle]
+            self._stashed_particles[particle] = None
+
+            particle.set_position(_STASH_POSITION)
+            if particle.visual_only:
+                # Stain and Dust need to be woken up before stashing because if
+                # they are asleep, their poses will not be updated in the renderer
+                particle.force_wakeup()
+            else:
+                # Water (awake when stash_particle is called) needs to be
+                # put to sleep because they would collide in _STASH_POSITION
+                # It's okay to call force_sleep() because the sleep state will only
+                # be reflected after p.stepSimulation() is called. Thus, the
+                # renderer should still update its pose in the curren timestep
+                particle.force_sleep()
 
     def _load_particle(self, particle):
+        if isinstance(particle, InstancedParticle):
+            particle.load(self._simulator, **self._import_params)
+            particle.set_position(_STASH_POSITION)
+            return None
+
         body_id = self._simulator.import_object(particle, **self._import_params)
         # Put loaded particles at the stash position initially.
         particle.set_position(_STASH_POSITION)
@@ -214,10 +337,9 @@ class ParticleSystem(object):
 
     def unstash_particle(self, position, orientation, particle=None):
         # If the user wants a particular particle, give it to them. Otherwise, unstash one.
-        if particle is not None:
-            self._stashed_particles.remove(particle)
-        else:
-            particle = self._stashed_particles.popleft()
+        if particle is None:
+            particle = next(iter(self._stashed_particles))
+        del self._stashed_particles[particle]
 
         # Lazy loading of the particle now if not already loaded
         if not particle.loaded:
@@ -226,18 +348,17 @@ class ParticleSystem(object):
         particle.set_position_orientation(position, orientation)
         particle.force_wakeup()
 
-        self._active_particles.append(particle)
+        self._active_particles[particle] = None
         self._particles_activated_at_any_time.add(particle)
 
         return particle
 
     def reset_stash(self):
         """Stash all particles and re-order the stash in the all_particles order for determinism."""
-        for particle in self.get_active_particles():
-            self.stash_particle(particle)
+        self.stash_particles(self.get_active_particles())
 
         self._stashed_particles.clear()
-        self._stashed_particles.extend(self._all_particles)
+        self._stashed_particles.update(dict.fromkeys(self._all_particles))
 
     def get_num_particles_activated_at_any_time(self):
         """Get the number of unique particles that were active at some point in history."""
@@ -248,13 +369,24 @@ class ParticleSystem(object):
 
 
 class AttachedParticleSystem(ParticleSystem):
+    """
+    A particle system whose particles are attached to the links of a parent object. Particle poses are kept as arrays
+    of link-relative offsets and world poses that are updated for all particles of a link at once. Visual-only
+    particles are kinematic InstancedParticles that only exist in the renderer.
+    """
+
     def __init__(self, parent_obj, initial_dump=None, **kwargs):
         super(AttachedParticleSystem, self).__init__(**kwargs)
 
         self.parent_obj = parent_obj
-        self._attachment_offsets = {}  # in the format of {particle: offset}
         self.initial_dump = initial_dump
 
+        num = self.get_num()
+        self._attached = np.zeros(num, dtype=bool)
+        self._link_ids = np.full(num, -1, dtype=int)
+        self._offset_positions = np.zeros((num, 3))
+        self._offset_orientations = np.tile([0.0, 0.0, 0.0, 1.0], (num, 1))
+
     def reset_to_dump(self, dump):
         # Assert that the dump is compatible
         assert len(dump) == self.get_num()
@@ -289,36 +421,58 @@ class AttachedParticleSystem(ParticleSystem):
             self.reset_to_dump(self.initial_dump)
             del self.initial_dump
 
+    def _get_attachment_pose(self, link_id):
+        if link_id == -1:
+            return self.parent_obj.get_position(), self.parent_obj.get_orientation()
+
+        link_state = utils.get_link_state(self.parent_obj.get_body_id(), link_id)
+        return link_state.linkWorldPosition, link_state.linkWorldOrientation
+
     def unstash_particle(self, position, orientation, link_id=-1, **kwargs):
         particle = super(AttachedParticleSystem, self).unstash_particle(position, orientation, **kwargs)
 
         # Compute the offset for this particle.
-        if link_id == -1:
-            attachment_source_pos = self.parent_obj.get_position()
-            attachment_source_orn = self.parent_obj.get_orientation()
-        else:
-            link_state = utils.get_link_state(self.parent_obj.get_body_id(), link_id)
-            attachment_source_pos = link_state.linkWorldPosition
-            attachment_source_orn = link_state.linkWorldOrientation
-
+        attachment_source_pos, attachment_source_orn = self._get_attachment_pose(link_id)
         base_pos, base_orn = p.invertTransform(attachment_source_pos, attachment_source_orn)
-        offsets = p.multiplyTransforms(base_pos, base_orn, position, orientation)
-        self._attachment_offsets[particle] = (link_id, offsets)
+        pos_offset, orn_offset = p.multiplyTransforms(base_pos, base_orn, position, orientation)
+
+        i = self._particle_indices[particle]
+        self._attached[i] = True
+        self._link_ids[i] = link_id
+        self._offset_positions[i] = pos_offset
+        self._offset_orientations[i] = orn_offset
+        self._positions[i] = position
+        self._orientations[i] = orientation
 
         return particle
 
-    def stash_particle(self, particle):
-        super(AttachedParticleSystem, self).stash_particle(particle)
-        del self._attachment_offsets[particle]
+    def stash_particles(self, particles):
+        super(AttachedParticleSystem, self).stash_particles(particles)
+
+        indices = [self._particle_indices[particle] for particle in particles]
+        self._attached[indices] = False
+        self._positions[indices] = _STASH_POSITION
+
+    def get_active_particle_positions(self):
+        """
+        Get the positions of the active particles, in the order of get_active_particles.
+
+        :return: (N, 3) array of particle positions
+        """
+        indices = [self._particle_indices[particle] for particle in self._active_particles]
+        return self._positions[indices]
 
     def update(self, simulator):
         super(AttachedParticleSystem, self).update(simulator)
 
-        # Move every particle to their known parent object offsets.
-        for particle in self.get_active_particles():
-            link_id, (pos_offset, orn_offset) = self._attachment_offsets[particle]
+        if not np.any(self._attached):
+            return
 
-            dynamics_info = p.getDynamicsInfo(self.parent_obj.get_body_id(), link_id)
+        # Move every particle to their known parent object offsets, one batch per parent link.
+        body_id = self.parent_obj.get_body_id()
+        updated_indices = []
+        for link_id in np.unique(self._link_ids[self._attached]):
+            dynamics_info = p.getDynamicsInfo(body_id, int(link_id))
 
             if len(dynamics_info) == 13:
                 activation_state = dynamics_info[12]
@@ -329,40 +483,44 @@ class AttachedParticleSystem(ParticleSystem):
                 # If parent object is in sleep, don't update particle poses
                 continue
 
-            if link_id == -1:
-                attachment_source_pos = self.parent_obj.get_position()
-                attachment_source_orn = self.parent_obj.get_orientation()
-            else:
-                link_state = utils.get_link_state(self.parent_obj.get_body_id(), link_id)
-                attachment_source_pos = link_state.linkWorldPosition
-                attachment_source_orn = link_state.linkWorldOrientation
-
-            position, orientation = p.multiplyTransforms(
-                attachment_source_pos, attachment_source_orn, pos_offset, orn_offset
+            attachment_source_pos, attachment_source_orn = self._get_attachment_pose(int(link_id))
+            indices = np.flatnonzero(self._attached & (self._link_ids == link_id))
+            self._positions[indices] = attachment_source_pos + T.quat_apply(
+                attachment_source_orn, self._offset_positions[indices]
             )
-            particle.set_position_orientation(position, orientation)
-            particle.force_wakeup()
+            self._orientations[indices] = T.quat_multiply_batch(
+                attachment_source_orn, self._offset_orientations[indices]
+            )
+            updated_indices.append(indices)
+
+        if not updated_indices:
+            return
+
+        indices = np.concatenate(updated_indices)
+        rotations = np.tile(np.eye(4), (len(indices), 1, 1))
+        rotations[:, :3, :3] = T.quat2mat_batch(self._orientations[indices])
+        for i, rotation in zip(indices, rotations):
+            particle = self._all_particles[i]
+            if isinstance(particle, InstancedParticle):
+                particle.update_renderer_pose(rotation)
+            else:
+                particle.set_position_orientation(self._positions[i], self._orientations[i])
+                particle.force_wakeup()
 
     def dump(self):
         data = []
-        for particle in self.get_particles():
-            if particle in self.get_stashed_particles():
+        for i in range(self.get_num()):
+            if not self._attached[i]:
                 data.append(None)
             else:
-                link_id, (pos_offset, orn_offset) = self._attachment_offsets[particle]
-
-                if link_id == -1:
-                    link_name = None
-                    attachment_source_pos = self.parent_obj.get_position()
-                    attachment_source_orn = self.parent_obj.get_orientation()
-                else:
-                    link_name = get_link_name(self.parent_obj.get_body_id(), link_id)
-                    link_state = utils.get_link_state(self.parent_obj.get_body_id(), link_id)
-                    attachment_source_pos = link_state.linkWorldPosition
-                    attachment_source_orn = link_state.linkWorldOrientation
-
+                link_id = int(self._link_ids[i])
+                link_name = None if link_id == -1 else get_link_name(self.parent_obj.get_body_id(), link_id)
+                attachment_source_pos, attachment_source_orn = self._get_attachment_pose(link_id)
                 position, orientation = p.multiplyTransforms(
-                    attachment_source_pos, attachment_source_orn, pos_offset, orn_offset
+                    attachment_source_pos,
+                    attachment_source_orn,
+                    self._offset_positions[i],
+                    self._offset_orientations[i],
                 )
                 data.append((link_name, position, orientation))
 
@@ -370,7 +528,14 @@ class AttachedParticleSystem(ParticleSystem):
 
 
 class WaterStream(ParticleSystem):
+    """
+    A stream of water drops dropped from a fixed pool of particles. Physical drops are pybullet bodies that are
+    recycled when they touch the water source. Kinematic drops have no body: they fall under gravity, are recycled
+    when a ray query along their motion hits something, and record the bodies they hit for the Soaked state.
+    """
+
     _DROP_PERIOD = 0.1  # new water every this many seconds.
+    _MAX_KINEMATIC_LIFETIME = 2.0  # kinematic drops that did not hit anything are recycled after this many seconds.
     _SIZE_OPTIONS = np.array(
         [
             [0.02] * 3,
@@ -380,7 +545,7 @@ class WaterStream(ParticleSystem):
     )
     _COLOR_OPTIONS = np.array([(0.61, 0.82, 0.86, 1), (0.5, 0.77, 0.87, 1)])
 
-    def __init__(self, water_source_pos, num, initial_dump=None, **kwargs):
+    def __init__(self, water_source_pos, num, initial_dump=None, kinematic=False, **kwargs):
         if initial_dump is not None:
             self.sizes = np.array(initial_dump["sizes"])
             self.colors = np.array(initial_dump["colors"])
@@ -395,7 +560,7 @@ class WaterStream(ParticleSystem):
             num=num,
             size=self.sizes,
             color=self.colors,
-            visual_only=False,
+            visual_only=kinematic,
             mass=0.00005,  # each drop is around 0.05 grams
             use_pbr=True,  # PBR needs to be on for the shiny water particles.
             **kwargs
@@ -405,6 +570,16 @@ class WaterStream(ParticleSystem):
         self.water_source_pos = water_source_pos
         self.on = False
         self.initial_dump = initial_dump
+        self.kinematic = kinematic
+
+        # Per-particle pybullet body ids, activity, age (in steps) and, for kinematic drops, velocity.
+        self._body_ids = np.full(num, -1, dtype=int)
+        self._active = np.zeros(num, dtype=bool)
+        self._ages = np.zeros(num, dtype=int)
+        self._velocities = np.zeros((num, 3))
+
+        # Bodies hit by kinematic drops during the last update.
+        self.hit_body_ids = set()
 
     def reset_to_dump(self, dump):
         # Assert that the dump is compatible with the particle system state.
@@ -432,20 +607,77 @@ class WaterStream(ParticleSystem):
     def _load_particle(self, particle):
         # First load the particle normally.
         body_id = super(WaterStream, self)._load_particle(particle)
+        if body_id is not None:
+            self._body_ids[self._particle_indices[particle]] = body_id
 
         # Set renderer instance settings on the particles.
-        instances = self._simulator.renderer.get_instances()
-        for instance in instances:
-            if instance.pybullet_uuid == body_id:
-                instance.roughness = 0
-                instance.metalness = 1
+        for instance in particle.renderer_instances:
+            instance.roughness = 0
+            instance.metalness = 1
 
         return body_id
 
+    def unstash_particle(self, position, orientation, particle=None):
+        particle = super(WaterStream, self).unstash_particle(position, orientation, particle=particle)
+
+        i = self._particle_indices[particle]
+        self._active[i] = True
+        self._ages[i] = 0
+        self._velocities[i] = 0
+        return particle
+
+    def stash_particles(self, particles):
+        super(WaterStream, self).stash_particles(particles)
+
+        indices = [self._particle_indices[particle] for particle in particles]
+        self._active[indices] = False
+
+    def get_active_particles_with_body_ids(self, body_ids):
+        """
+        Get the active physical drops whose pybullet body is in body_ids, e.g. the drops touching an object.
+
+        :param body_ids: collection of pybullet body ids
+        :return: list of particles, in the order of get_active_particles
+        """
+        matched = self._active & np.isin(self._body_ids, list(body_ids))
+        if not np.any(matched):
+            return []
+        return [particle for particle in self._active_particles if matched[self._particle_indices[particle]]]
+
+    def _step_kinematic_particles(self, simulator):
+        self.hit_body_ids = set()
+        indices = np.flatnonzero(self._active)
+        if len(indices) == 0:
+            return
+
+        # Move the drops under gravity and check what they went through with a single batched ray query.
+        dt = simulator.render_timestep
+        self._velocities[indices, 2] -= simulator.gravity * dt
+        old_positions = self._positions[indices]
+        new_positions = old_positions + self._velocities[indices] * dt
+        hit_body_ids = np.array([result[0] for result in p.rayTestBatch(old_positions, new_positions)])
+        self.hit_body_ids = set(hit_body_ids[hit_body_ids != -1].tolist())
+
+        expired = (hit_body_ids != -1) | (self._ages[indices] * dt >= self._MAX_KINEMATIC_LIFETIME)
+        rotation = np.eye(4)
+        for i, position in zip(indices[~expired], new_positions[~expired]):
+            self._positions[i] = position
+            self._all_particles[i].update_renderer_pose(rotation)
+
+        if np.any(expired):
+            expired_indices = set(indices[expired].tolist())
+            self.stash_particles(
+                [particle for particle in self._active_particles if self._particle_indices[particle] in expired_indices]
+            )
+
     def set_running(self, on):
         self.on = on
 
     def update(self, simulator):
+        self._ages[self._active] += 1
+        if self.kinematic:
+            self._step_kinematic_particles(simulator)
+
         # If the stream is off, return.
         if not self.on:
             return
@@ -251,6 +251,8 @@ PYBIND11_MODULE(EGLRendererContext, m) {
     pymodule.def("load_object_meshrenderer", &EGLRendererContext::load_object_meshrenderer,
                  "load object into VAO and VBO");
     pymodule.def("loadTexture", &EGLRendererContext::loadTexture, "load texture function");
+    pymodule.def("decodeTexture", &EGLRendererContext::decodeTexture, "decode texture function");
+    pymodule.def("loadTextureFromArray", &EGLRendererContext::loadTextureFromArray, "load decoded texture function");
     pymodule.def("setup_pbr", &EGLRendererContext::setup_pbr, "setup pbr");
     pymodule.def("readbuffer_meshrenderer_shadow_depth", &EGLRendererContext::readbuffer_meshrenderer_shadow_depth,
                  "read pixel buffer");
@@ -276,6 +278,7 @@ PYBIND11_MODULE(EGLRendererContext, m) {
 
     // for optimized renderer
     pymodule.def("generateArrayTextures", &EGLRendererContext::generateArrayTextures, "TBA");
+    pymodule.def("generateArrayTexturesFromArrays", &EGLRendererContext::generateArrayTexturesFromArrays, "TBA");
     pymodule.def("renderSetup", &EGLRendererContext::renderSetup, "TBA");
     pymodule.def("updateTextureIdArrays", &EGLRendererContext::updateTextureIdArrays, "TBA");
 	pymodule.def("updateHiddenData", &EGLRendererContext::updateHiddenData, "TBA");
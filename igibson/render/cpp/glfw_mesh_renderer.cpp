@@ -135,6 +135,8 @@ PYBIND11_MODULE(GLFWRendererContext, m) {
     pymodule.def("load_object_meshrenderer", &GLFWRendererContext::load_object_meshrenderer,
                  "load object into VAO and VBO");
     pymodule.def("loadTexture", &GLFWRendererContext::loadTexture, "load texture function");
+    pymodule.def("decodeTexture", &GLFWRendererContext::decodeTexture, "decode texture function");
+    pymodule.def("loadTextureFromArray", &GLFWRendererContext::loadTextureFromArray, "load decoded texture function");
     pymodule.def("allocateTexture", &GLFWRendererContext::allocateTexture, "load texture function");
 
     // class Instance
@@ -156,6 +158,7 @@ PYBIND11_MODULE(GLFWRendererContext, m) {
 
     // for optimized renderer
     pymodule.def("generateArrayTextures", &GLFWRendererContext::generateArrayTextures, "TBA");
+    pymodule.def("generateArrayTexturesFromArrays", &GLFWRendererContext::generateArrayTexturesFromArrays, "TBA");
     pymodule.def("renderSetup", &GLFWRendererContext::renderSetup, "TBA");
     pymodule.def("updateTextureIdArrays", &GLFWRendererContext::updateTextureIdArrays, "TBA");
 	pymodule.def("updateHiddenData", &GLFWRendererContext::updateHiddenData, "TBA");
@@ -78,7 +78,7 @@ class Image {
 public:
     static std::shared_ptr<Image> fromFile(const std::string &filename, int channels) {
         std::printf("Loading image: %s\n", filename.c_str());
-        stbi_set_flip_vertically_on_load(false);
+        stbi_set_flip_vertically_on_load_thread(false);
         std::shared_ptr<Image> image{new Image};
 
         if (stbi_is_hdr(filename.c_str())) {
@@ -772,7 +772,7 @@ int MeshRendererContext::loadTexture(std::string filename, float texture_scale,
     int w;
     int h;
     int comp;
-    stbi_set_flip_vertically_on_load(true);
+    stbi_set_flip_vertically_on_load_thread(true);
 
     std::vector<unsigned char> buffer;
     if (ends_with(filename, std::string("encrypted.png"))) {
@@ -810,6 +810,62 @@ int MeshRendererContext::loadTexture(std::string filename, float texture_scale,
     return texture;
 }
 
+py::array_t<unsigned char> MeshRendererContext::decodeTexture(std::string filename, float texture_scale, std::string keyfilename) {
+    // Decode and downsample a texture like loadTexture, without uploading it. This does not use OpenGL and releases
+    // the GIL, so textures can be decoded in worker threads.
+    int w;
+    int h;
+    int comp;
+    unsigned char *image;
+    {
+        py::gil_scoped_release release;
+        stbi_set_flip_vertically_on_load_thread(true);
+        std::vector<unsigned char> buffer;
+        if (ends_with(filename, std::string("encrypted.png"))) {
+            buffer = readFileWithKey(filename.c_str(), keyfilename.c_str());
+        } else {
+            buffer = readFile(filename.c_str());
+        }
+        image = stbi_load_from_memory(buffer.data(), buffer.size(), &w, &h, &comp, STBI_rgb);
+    }
+    if (image == nullptr)
+        throw std::runtime_error("Failed to load texture: " + filename);
+
+    int new_w = (int)(w * texture_scale);
+    int new_h = (int)(h * texture_scale);
+    py::array_t<unsigned char> resized_image({new_h, new_w, 3});
+    unsigned char *resized_data = resized_image.mutable_data();
+    {
+        py::gil_scoped_release release;
+        if (new_w == w && new_h == h) {
+            memcpy(resized_data, image, w * h * 3);
+        } else {
+            stbir_resize_uint8(image, w, h, 0, resized_data, new_w, new_h, 0, 3);
+        }
+        stbi_image_free(image);
+    }
+    return resized_image;
+}
+
+int MeshRendererContext::loadTextureFromArray(py::array_t<unsigned char> image) {
+    // Upload a texture decoded by decodeTexture, which is a (h, w, 3) array
+    py::buffer_info info = image.request();
+    int h = info.shape[0];
+    int w = info.shape[1];
+
+    GLuint texture;
+    glGenTextures(1, &texture);
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1);
+    glBindTexture(GL_TEXTURE_2D, texture);
+    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR);
+    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR);
+    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT);
+    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT);
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, w, h, 0, GL_RGB, GL_UNSIGNED_BYTE, info.ptr);
+    glGenerateMipmap(GL_TEXTURE_2D);
+    return texture;
+}
+
 void MeshRendererContext::generate_light_maps(
     GLuint equirectToCubeProgram,
     GLuint spmapProgram,
@@ -1147,7 +1203,6 @@ py::list MeshRendererContext::generateArrayTextures(std::vector<std::string> fil
 		std::vector<unsigned char*> image_data;
 		std::vector<int> texHeights;
 		std::vector<int> texWidths;
-		std::vector<int> texChannels;
         std::vector<unsigned char> buffer;
 		printf("number of textures %d\n", num_textures);
 		for (int i = 0; i < num_textures; i++) {
@@ -1156,7 +1211,7 @@ py::list MeshRendererContext::generateArrayTextures(std::vector<std::string> fil
 			int w;
 			int h;
 			int comp;
-			stbi_set_flip_vertically_on_load(true);
+			stbi_set_flip_vertically_on_load_thread(true);
 			if (ends_with(filename, std::string("encrypted.png"))) {
                 buffer = readFileWithKey(filename.c_str(), keyfilename.c_str());
             } else {
@@ -1167,14 +1222,35 @@ py::list MeshRendererContext::generateArrayTextures(std::vector<std::string> fil
 			if (image == nullptr)
 				throw(std::string("Failed to load texture"));
 			std::cout << "Size is w: " << w << " by h: " << h << std::endl;
-			comp = 3;
 			image_data.push_back(image);
 			texHeights.push_back(h);
 			texWidths.push_back(w);
-			texChannels.push_back(comp);
 		}
 
+		py::list texInfo = createArrayTextures(image_data, texWidths, texHeights, filenames, texCutoff,
+		    shouldShrinkSmallTextures, smallTexBucketSize);
+		for (int i = 0; i < image_data.size(); i++) {
+			stbi_image_free(image_data[i]);
+		}
+		return texInfo;
+	}
+
+py::list MeshRendererContext::generateArrayTexturesFromArrays(std::vector<py::array_t<unsigned char>> images, std::vector<std::string> filenames, int texCutoff, bool shouldShrinkSmallTextures, int smallTexBucketSize) {
+		// The images are decoded by decodeTexture, they are (h, w, 3) arrays
+		std::vector<unsigned char*> image_data;
+		std::vector<int> texHeights;
+		std::vector<int> texWidths;
+		for (int i = 0; i < images.size(); i++) {
+			py::buffer_info info = images[i].request();
+			image_data.push_back((unsigned char*)info.ptr);
+			texHeights.push_back(info.shape[0]);
+			texWidths.push_back(info.shape[1]);
+		}
+		return createArrayTextures(image_data, texWidths, texHeights, filenames, texCutoff, shouldShrinkSmallTextures,
+		    smallTexBucketSize);
+	}
 
+py::list MeshRendererContext::createArrayTextures(std::vector<unsigned char*> image_data, std::vector<int> texWidths, std::vector<int> texHeights, std::vector<std::string> filenames, int texCutoff, bool shouldShrinkSmallTextures, int smallTexBucketSize) {
 		GLuint texId1, texId2;
 		glGenTextures(1, &texId1);
 		glGenTextures(1, &texId2);
@@ -1304,7 +1380,7 @@ py::list MeshRendererContext::generateArrayTextures(std::vector<std::string> fil
 
 				int orig_w = texWidths[idx];
 				int orig_h = texHeights[idx];
-				int n_channels = texChannels[idx];
+				int n_channels = 3;
 				unsigned char* input_data = image_data[idx];
 				unsigned char* tex_bytes = input_data;
 				bool shouldResize = (orig_w != out_w || orig_h != out_h);
@@ -1329,7 +1405,6 @@ py::list MeshRendererContext::generateArrayTextures(std::vector<std::string> fil
 					tex_bytes
 				);
 
-				stbi_image_free(input_data);
 				if (shouldResize) {
 					free(tex_bytes);
 				}
@@ -150,6 +150,10 @@ public:
 
     int loadTexture(std::string filename, float texture_scale, std::string keyfilename);
 
+    py::array_t<unsigned char> decodeTexture(std::string filename, float texture_scale, std::string keyfilename);
+
+    int loadTextureFromArray(py::array_t<unsigned char> image);
+
     void setup_pbr(std::string shader_path,
     std::string env_texture_filename,
     std::string env_texture_filename2,
@@ -194,6 +198,14 @@ public:
 	py::list generateArrayTextures(std::vector<std::string> filenames, int texCutoff, bool shouldShrinkSmallTextures,
 	int smallTexBucketSize, std::string keyfilename);
 
+	// Same as generateArrayTextures, for textures decoded by decodeTexture
+	py::list generateArrayTexturesFromArrays(std::vector<py::array_t<unsigned char>> images,
+	std::vector<std::string> filenames, int texCutoff, bool shouldShrinkSmallTextures, int smallTexBucketSize);
+
+	py::list createArrayTextures(std::vector<unsigned char*> image_data, std::vector<int> texWidths,
+	std::vector<int> texHeights, std::vector<std::string> filenames, int texCutoff, bool shouldShrinkSmallTextures,
+	int smallTexBucketSize);
+
 	py::list renderSetup(int shaderProgram, py::array_t<float> V, py::array_t<float> P, py::array_t<float> lightpos, py::array_t<float> lightcolor,
 		py::array_t<float> mergedVertexData, py::array_t<int> index_ptr_offsets, py::array_t<int> index_counts,
 		py::array_t<int> indices, py::array_t<float> mergedFragData, py::array_t<float> mergedFragRMData,
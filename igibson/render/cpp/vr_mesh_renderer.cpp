@@ -823,6 +823,8 @@ PYBIND11_MODULE(VRRendererContext, m) {
 	pymodule.def("load_object_meshrenderer", &VRRendererContext::load_object_meshrenderer,
 		"load object into VAO and VBO");
 	pymodule.def("loadTexture", &VRRendererContext::loadTexture, "load texture function");
+pymodule.def("decodeTexture", &VRRendererContext::decodeTexture, "decode texture function");
+pymodule.def("loadTextureFromArray", &VRRendererContext::loadTextureFromArray, "load decoded texture function");
 	pymodule.def("allocateTexture", &VRRendererContext::allocateTexture, "load texture function");
 	pymodule.def("updateTextureIdArrays", &VRRendererContext::updateTextureIdArrays);
 
@@ -845,6 +847,7 @@ PYBIND11_MODULE(VRRendererContext, m) {
 
 	// for optimized renderer
 	pymodule.def("generateArrayTextures", &VRRendererContext::generateArrayTextures, "TBA");
+pymodule.def("generateArrayTexturesFromArrays", &VRRendererContext::generateArrayTexturesFromArrays, "TBA");
 	pymodule.def("renderSetup", &VRRendererContext::renderSetup, "TBA");
 	pymodule.def("updateHiddenData", &VRRendererContext::updateHiddenData, "TBA");
 	pymodule.def("updateUVData", &VRRendererContext::updateUVData, "TBA");
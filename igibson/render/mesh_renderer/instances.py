@@ -327,14 +327,15 @@ class Instance(object):
             vertices = p.getMeshData(self.pybullet_uuid)[1]
             vertices_flattened = [item for sublist in vertices for item in sublist]
             vertex_position = np.array(vertices_flattened).reshape((len(vertices_flattened) // 3, 3))
-            shape = self.renderer.shapes[object_idx]
-            n_indices = len(shape.mesh.indices)
-            np_indices = shape.mesh.numpy_indices().reshape((n_indices, 3))
-            shape_vertex_index = np_indices[:, 0]
+            shape_vertex_index = self.renderer.shape_vertex_indices[object_idx]
             shape_vertex = vertex_position[shape_vertex_index]
 
             # update new vertex position in buffer data
             new_data = self.renderer.vertex_data[object_idx]
+            if not new_data.flags.writeable:
+                # the vertex data from the mesh cache is shared, so the soft body gets its own copy
+                new_data = np.array(new_data)
+                self.renderer.vertex_data[object_idx] = new_data
             new_data[:, 0 : shape_vertex.shape[1]] = shape_vertex
             new_data = new_data.astype(np.float32)
 
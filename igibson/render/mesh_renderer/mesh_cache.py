@@ -0,0 +1,249 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from igibson.utils.mesh_util import quat2rotmat, xyzw2wxyz
+
+# Material of an OBJ file, as much of it as the renderer uses
+MeshMaterial = namedtuple(
+    "MeshMaterial", ["diffuse", "diffuse_texname", "metallic_texname", "roughness_texname", "bump_texname"]
+)
+
+# Shape of an OBJ file, ready to be uploaded. material_id is None if the shape has no material. vertex_data is the
+# interleaved (num_vertices, 14) buffer of positions, normals, texcoords, tangents and bitangents, and
+# vertex_indices are the indices of its vertices in the OBJ file, used to update soft bodies.
+MeshShape = namedtuple("MeshShape", ["name", "material_id", "vertex_data", "vertex_indices"])
+
+MeshData = namedtuple("MeshData", ["materials", "shapes"])
+
+# Hashes of the files read by the caches, by path, modification time and size
+_FILE_HASHES = {}
+
+
+def get_file_hash(path):
+    """
+    Hash the content of a file, only reading it again if it changed.
+
+    :param path: path of the file
+    :return: sha1 hex digest of the file content
+    """
+    stat = os.stat(path)
+    file_key = (os.path.realpath(path), stat.st_mtime, stat.st_size)
+    if file_key not in _FILE_HASHES:
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha1.update(chunk)
+        _FILE_HASHES[file_key] = sha1.hexdigest()
+    return _FILE_HASHES[file_key]
+
+
+def compute_vertex_data(
+    vertex_position, vertex_normal, vertex_texcoord, indices, scale, transform_orn=None, transform_pos=None
+):
+    """
+    Compute the interleaved vertex buffer of a shape.
+
+    :param vertex_position: (N, 3) vertex positions of the OBJ file
+    :param vertex_normal: (N, 3) vertex normals of the OBJ file, possibly empty
+    :param vertex_texcoord: (N, 2) texture coordinates of the OBJ file, possibly empty
+    :param indices: (M, 3) vertex, normal and texcoord indices of the shape, three per triangle
+    :param scale: scale of the shape
+    :param transform_orn: rotation quaternion, convention xyzw
+    :param transform_pos: translation for loading, it is a list of length 3
+    :return: (M, 14) float32 vertex buffer
+    """
+    shape_vertex = vertex_position[indices[:, 0]]
+
+    if len(vertex_normal) == 0:
+        # dummy normal if normal is not available
+        shape_normal = np.zeros((shape_vertex.shape[0], 3))
+    else:
+        shape_normal = vertex_normal[indices[:, 1]]
+
+    # Scale the shape before transforming
+    # Need to flip normals in axes where we have negative scaling
+    for i in range(3):
+        shape_vertex[:, i] *= scale[i]
+        if scale[i] < 0:
+            shape_normal[:, i] *= -1
+
+    if len(vertex_texcoord) == 0:
+        # dummy texcoord if texcoord is not available
+        shape_texcoord = np.zeros((shape_vertex.shape[0], 2))
+    else:
+        shape_texcoord = vertex_texcoord[indices[:, 2]]
+
+    if transform_orn is not None:
+        # Rotate the shape after they are scaled
+        orn = quat2rotmat(xyzw2wxyz(transform_orn))
+        shape_vertex = shape_vertex.dot(orn[:3, :3].T)
+        # Also rotate the surface normal, note that tangent space does not need to be rotated since they
+        # are derived from shape_vertex
+        shape_normal = shape_normal.dot(orn[:3, :3].T)
+    if transform_pos is not None:
+        # Translate the shape after they are scaled
+        shape_vertex += np.array(transform_pos)
+
+    v0 = shape_vertex[0::3, :]
+    v1 = shape_vertex[1::3, :]
+    v2 = shape_vertex[2::3, :]
+    uv0 = shape_texcoord[0::3, :]
+    uv1 = shape_texcoord[1::3, :]
+    uv2 = shape_texcoord[2::3, :]
+
+    delta_pos1 = v1 - v0
+    delta_pos2 = v2 - v0
+    delta_uv1 = uv1 - uv0
+    delta_uv2 = uv2 - uv0
+    r = 1.0 / (delta_uv1[:, 0] * delta_uv2[:, 1] - delta_uv1[:, 1] * delta_uv2[:, 0])
+    tangent = (delta_pos1 * delta_uv2[:, 1][:, None] - delta_pos2 * delta_uv1[:, 1][:, None]) * r[:, None]
+    bitangent = (delta_pos2 * delta_uv1[:, 0][:, None] - delta_pos1 * delta_uv2[:, 0][:, None]) * r[:, None]
+    bitangent = bitangent.repeat(3, axis=0)
+    tangent = tangent.repeat(3, axis=0)
+    vertices = np.concatenate([shape_vertex, shape_normal, shape_texcoord, tangent, bitangent], axis=-1)
+    return vertices.astype(np.float32)
+
+
+class MeshCache(object):
+    """
+    Cache of the vertex buffers of OBJ files, after scaling, transformation and tangent computation.
+
+    Identical loads (same file content, scale and transform) share one MeshData, whose arrays are read-only. If a
+    cache directory is given, the vertex buffers are also stored on disk and memory-mapped by later processes, so
+    the OBJ file is not parsed again. Encrypted OBJ files are only cached in memory, to not store their decrypted
+    geometry on disk.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._meshes = {}
+
+    def get_key(self, obj_path, scale, transform_orn=None, transform_pos=None):
+        """
+        :return: key of a load of an OBJ file, from its content and the loading parameters
+        """
+        # The materials are read from the mtl files next to the obj file, so they are part of the key too.
+        mtl_paths = sorted(glob.glob(os.path.join(os.path.dirname(obj_path), "*.mtl")))
+        sha1 = hashlib.sha1()
+        for path in [obj_path] + mtl_paths:
+            sha1.update(get_file_hash(path).encode("utf-8"))
+        for param in [scale, transform_orn, transform_pos]:
+            sha1.update(b"none" if param is None else np.asarray(param, dtype=np.float64).tobytes())
+        return sha1.hexdigest()
+
+    def _get_paths(self, key):
+        prefix = os.path.join(self.cache_dir, key)
+        return prefix + ".json", prefix + "_vertex_data.npy", prefix + "_vertex_indices.npy"
+
+    def _read(self, key):
+        json_path, vertex_data_path, vertex_indices_path = self._get_paths(key)
+        # The json file is written last, so the other files are complete if it exists.
+        if not os.path.isfile(json_path):
+            return None
+        with open(json_path, "r") as f:
+            info = json.load(f)
+        vertex_data = np.load(vertex_data_path, mmap_mode="r")
+        vertex_indices = np.load(vertex_indices_path, mmap_mode="r")
+
+        shapes = []
+        start = 0
+        for shape_info in info["shapes"]:
+            end = start + shape_info["num_vertices"]
+            shapes.append(
+                MeshShape(
+                    shape_info["name"], shape_info["material_id"], vertex_data[start:end], vertex_indices[start:end]
+                )
+            )
+            start = end
+        materials = [MeshMaterial(**material) for material in info["materials"]]
+        return MeshData(materials, shapes)
+
+    def _write(self, key, mesh_data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        json_path, vertex_data_path, vertex_indices_path = self._get_paths(key)
+        vertex_data = [shape.vertex_data for shape in mesh_data.shapes]
+        vertex_indices = [shape.vertex_indices for shape in mesh_data.shapes]
+        info = {
+            "materials": [material._asdict() for material in mesh_data.materials],
+            "shapes": [
+                {"name": shape.name, "material_id": shape.material_id, "num_vertices": len(shape.vertex_data)}
+                for shape in mesh_data.shapes
+            ],
+        }
+
+        # Write to temporary files first, so that concurrent processes never read partial files.
+        tmp_suffix = ".%d.tmp" % os.getpid()
+        with open(vertex_data_path + tmp_suffix, "wb") as f:
+            np.save(f, np.concatenate(vertex_data) if vertex_data else np.zeros((0, 14), dtype=np.float32))
+        with open(vertex_indices_path + tmp_suffix, "wb") as f:
+            np.save(f, np.concatenate(vertex_indices) if vertex_indices else np.zeros(0, dtype=np.int64))
+        with open(json_path + tmp_suffix, "w") as f:
+            json.dump(info, f)
+        os.replace(vertex_data_path + tmp_suffix, vertex_data_path)
+        os.replace(vertex_indices_path + tmp_suffix, vertex_indices_path)
+        os.replace(json_path + tmp_suffix, json_path)
+
+    def load(self, obj_path, read_mesh, scale, transform_orn=None, transform_pos=None):
+        """
+        Get the MeshData of a load of an OBJ file, from the cache if possible.
+
+        :param obj_path: path of obj file
+        :param read_mesh: function that parses the OBJ file and returns its MeshData, if it is not cached
+        :param scale: scale
+        :param transform_orn: rotation quaternion, convention xyzw
+        :param transform_pos: translation for loading, it is a list of length 3
+        :return: MeshData with read-only arrays
+        """
+        key = self.get_key(obj_path, scale, transform_orn, transform_pos)
+        if key in self._meshes:
+            return self._meshes[key]
+
+        use_disk = self.cache_dir is not None and not obj_path.endswith("encrypted.obj")
+        mesh_data = self._read(key) if use_disk else None
+        if mesh_data is None:
+            mesh_data = read_mesh()
+            for shape in mesh_data.shapes:
+                shape.vertex_data.flags.writeable = False
+                shape.vertex_indices.flags.writeable = False
+            if use_disk:
+                try:
+                    self._write(key, mesh_data)
+                except OSError as e:
+                    logging.warning("Failed to write the mesh cache of {}: {}".format(obj_path, e))
+
+        self._meshes[key] = mesh_data
+        return mesh_data
+
+    def clear(self):
+        """
+        Forget the meshes kept in memory. The on-disk cache is kept.
+        """
+        self._meshes = {}
+
+
+def merge_vertex_data(vertex_data, faces):
+    """
+    Merge the vertex data of all the shapes into one buffer, e.g. for the optimized renderer. Shapes whose vertex
+    data is the same array, e.g. identical meshes loaded with different materials, share it in the buffer.
+
+    :param vertex_data: list of vertex data, one per shape
+    :param faces: list of faces, one per shape
+    :return: merged vertex data, and list of faces offset into it
+    """
+    offsets = {}
+    unique_vertex_data = []
+    offset_faces = []
+    curr_index_offset = 0
+    for shape_vertex_data, shape_faces in zip(vertex_data, faces):
+        if id(shape_vertex_data) not in offsets:
+            offsets[id(shape_vertex_data)] = curr_index_offset
+            unique_vertex_data.append(shape_vertex_data)
+            curr_index_offset += len(shape_vertex_data)
+        offset_faces.append(shape_faces + offsets[id(shape_vertex_data)])
+    return np.concatenate(unique_vertex_data, axis=0), offset_faces
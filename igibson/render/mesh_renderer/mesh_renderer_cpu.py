@@ -3,6 +3,7 @@ import os
 import platform
 import shutil
 import sys
+import time
 
 import numpy as np
 import py360convert
@@ -14,8 +15,17 @@ from igibson.render.mesh_renderer import tinyobjloader
 from igibson.render.mesh_renderer.get_available_devices import get_available_devices
 from igibson.render.mesh_renderer.instances import Instance, InstanceGroup, Robot
 from igibson.render.mesh_renderer.materials import Material, ProceduralMaterial, RandomizedMaterial
+from igibson.render.mesh_renderer.mesh_cache import (
+    MeshCache,
+    MeshData,
+    MeshMaterial,
+    MeshShape,
+    compute_vertex_data,
+    merge_vertex_data,
+)
 from igibson.render.mesh_renderer.mesh_renderer_settings import MeshRendererSettings
 from igibson.render.mesh_renderer.text import Text, TextManager
+from igibson.render.mesh_renderer.texture_cache import TextureCache, get_array_texture_bytes
 from igibson.render.mesh_renderer.visual_object import VisualObject
 from igibson.robots.behavior_robot import BehaviorRobot
 from igibson.utils.constants import AVAILABLE_MODALITIES, MAX_CLASS_COUNT, MAX_INSTANCE_COUNT, ShadowPass
@@ -61,8 +71,14 @@ class MeshRenderer(object):
         self.textures = []
         self.objects = []
         self.visual_objects = []
+        # Mapping from the parameters of a load to the id of its VisualObject, see load_visual_object
+        self.visual_object_ids = {}
+        # Vertex data that reused VisualObjects would have duplicated, for get_memory_usage
+        self.reused_vertex_bytes = 0
         self.vertex_data = []
-        self.shapes = []
+        self.shape_vertex_indices = []
+        # Vertex data of the loaded meshes, shared by identical loads and kept across clean()
+        self.mesh_cache = MeshCache(rendering_settings.mesh_cache_dir)
         self.width = width
         self.height = height
         self.faces = []
@@ -70,6 +86,15 @@ class MeshRenderer(object):
         self.fisheye = rendering_settings.use_fisheye
         self.optimized = rendering_settings.optimized
         self.texture_files = {}
+        # Decodes the texture files in a thread pool, see load_texture_file
+        self.texture_cache = TextureCache(
+            lambda tex_filename, texture_scale: self.r.decodeTexture(tex_filename, texture_scale, igibson.key_path),
+            cache_dir=rendering_settings.texture_cache_dir,
+            num_workers=rendering_settings.texture_load_workers,
+        )
+        # GPU memory used by the textures, and time spent loading them, for get_texture_usage
+        self.texture_bytes = 0
+        self.texture_load_time = 0.0
         self.enable_shadow = rendering_settings.enable_shadow
         self.platform = platform.system()
         self.optimization_process_executed = False
@@ -270,8 +295,8 @@ class MeshRenderer(object):
         self.P = np.ascontiguousarray(P, np.float32)
         self.material_idx_to_material_instance_mapping = {}
         self.shape_material_idx = []
-        # shape_material_idx is a list with the same length as self.shapes and self.VAOs, indicating the material_idx
-        # that each shape is mapped to.
+        # shape_material_idx is a list with the same length as self.shape_vertex_indices and self.VAOs, indicating the
+        # material_idx that each shape is mapped to.
         # Number of unique shapes comprising the optimized renderer buffer
         self.or_buffer_shape_num = 0
         # Store trans and rot data for OR as a single variable that we update every frame - avoids copying variable each frame
@@ -368,17 +393,42 @@ class MeshRenderer(object):
         if self.optimized:
             # assume optimized renderer will have texture id starting from 0
             texture_id = len(self.texture_files)
+            # the textures are uploaded by optimize_vertex_and_texture, decode them in the meantime
+            self.texture_cache.prefetch([tex_filename])
         else:
-            texture_id = self.r.loadTexture(tex_filename, self.rendering_settings.texture_scale, igibson.key_path)
+            start = time.time()
+            image = self.texture_cache.get(tex_filename, self.rendering_settings.texture_scale)
+            texture_id = self.r.loadTextureFromArray(image)
             self.textures.append(texture_id)
+            # mipmaps take a third of the size of the texture
+            self.texture_bytes += image.nbytes * 4 // 3
+            self.texture_load_time += time.time() - start
 
         self.texture_files[tex_filename] = texture_id
         return texture_id
 
+    def prefetch_texture_files(self, tex_filenames):
+        """
+        Start decoding texture files that are about to be loaded with load_texture_file
+
+        :param tex_filenames: texture file filenames
+        """
+        tex_filenames = [tex_filename for tex_filename in tex_filenames if tex_filename not in self.texture_files]
+        # the optimized renderer does not downsample textures
+        texture_scale = 1.0 if self.optimized else self.rendering_settings.texture_scale
+        self.texture_cache.prefetch(tex_filenames, texture_scale)
+
     def load_procedural_material(self, material):
         material.lookup_or_create_transformed_texture()
         has_encrypted_texture = os.path.exists(os.path.join(material.material_folder, "DIFFUSE.encrypted.png"))
         suffix = ".encrypted.png" if has_encrypted_texture else ".png"
+        self.prefetch_texture_files(
+            [
+                os.path.join(material.material_folder, "{}{}".format(name, suffix))
+                for name in ["DIFFUSE", "METALLIC", "ROUGHNESS", "NORMAL"]
+            ]
+            + [material.texture_filenames[state] for state in material.states]
+        )
         material.texture_id = self.load_texture_file(os.path.join(material.material_folder, "DIFFUSE{}".format(suffix)))
         material.metallic_texture_id = self.load_texture_file(
             os.path.join(material.material_folder, "METALLIC{}".format(suffix))
@@ -405,6 +455,14 @@ class MeshRenderer(object):
         if material.material_ids is not None:
             return
         material.material_ids = {}
+        self.prefetch_texture_files(
+            [
+                material_instance[key]
+                for material_instances in material.material_files.values()
+                for material_instance in material_instances
+                for key in material_instance
+            ]
+        )
         for material_class in material.material_files:
             if material_class not in material.material_ids:
                 material.material_ids[material_class] = []
@@ -415,38 +473,18 @@ class MeshRenderer(object):
                 material.material_ids[material_class].append(material_id_instance)
         material.randomize()
 
-    def load_object(
-        self,
-        obj_path,
-        scale=np.array([1, 1, 1]),
-        transform_orn=None,
-        transform_pos=None,
-        input_kd=None,
-        texture_scale=1.0,
-        load_texture=True,
-        overwrite_material=None,
-    ):
+    @staticmethod
+    def read_obj(obj_path, scale, transform_orn=None, transform_pos=None):
         """
-        Load a wavefront obj file into the renderer and create a VisualObject to manage it.
+        Parse a wavefront obj file with tinyobjloader and compute the vertex data of its shapes.
 
         :param obj_path: path of obj file
-        :param scale: scale, default 1
+        :param scale: scale
         :param transform_orn: rotation quaternion, convention xyzw
         :param transform_pos: translation for loading, it is a list of length 3
-        :param input_kd: if loading material fails, use this default material. input_kd should be a list of length 3
-        :param texture_scale: texture scale for the object, downsample to save memory.
-        :param load_texture: load texture or not
-        :param overwrite_material: whether to overwrite the default Material (usually with a RandomizedMaterial for material randomization)
-        :return: VAO_ids
+        :return: MeshData of the obj file
         """
-        if self.optimization_process_executed and self.optimized:
-            logging.error(
-                "Using optimized renderer and optimization process is already excuted, cannot add new " "objects"
-            )
-            return
-
         reader = tinyobjloader.ObjReader()
-        logging.info("Loading {}".format(obj_path))
         if obj_path.endswith("encrypted.obj"):
             if not os.path.exists(igibson.key_path):
                 raise FileNotFoundError(
@@ -455,8 +493,6 @@ class MeshRenderer(object):
             ret = reader.ParseFromFileWithKey(obj_path, igibson.key_path)
         else:
             ret = reader.ParseFromFile(obj_path)
-        vertex_data_indices = []
-        face_indices = []
         if not ret:
             logging.error("Warning: {}".format(reader.Warning()))
             logging.error("Error: {}".format(reader.Error()))
@@ -482,6 +518,75 @@ class MeshRenderer(object):
         shapes = reader.GetShapes()
         logging.debug("Num shapes: {}".format(len(shapes)))
 
+        vertex_position = np.array(attrib.vertices).reshape((len(attrib.vertices) // 3, 3))
+        vertex_normal = np.array(attrib.normals).reshape((len(attrib.normals) // 3, 3))
+        vertex_texcoord = np.array(attrib.texcoords).reshape((len(attrib.texcoords) // 2, 2))
+
+        mesh_shapes = []
+        for shape in shapes:
+            logging.debug("num_indices = {}".format(len(shape.mesh.indices)))
+            n_indices = len(shape.mesh.indices)
+            np_indices = shape.mesh.numpy_indices().reshape((n_indices, 3))
+            vertex_data = compute_vertex_data(
+                vertex_position, vertex_normal, vertex_texcoord, np_indices, scale, transform_orn, transform_pos
+            )
+            material_id = shape.mesh.material_ids[0] if len(shape.mesh.material_ids) > 0 else None
+            mesh_shapes.append(MeshShape(shape.name, material_id, vertex_data, np_indices[:, 0].copy()))
+
+        mesh_materials = [
+            MeshMaterial(
+                list(item.diffuse),
+                item.diffuse_texname,
+                item.metallic_texname,
+                item.roughness_texname,
+                item.bump_texname,
+            )
+            for item in materials
+        ]
+        return MeshData(mesh_materials, mesh_shapes)
+
+    def load_object(
+        self,
+        obj_path,
+        scale=np.array([1, 1, 1]),
+        transform_orn=None,
+        transform_pos=None,
+        input_kd=None,
+        texture_scale=1.0,
+        load_texture=True,
+        overwrite_material=None,
+    ):
+        """
+        Load a wavefront obj file into the renderer and create a VisualObject to manage it.
+
+        :param obj_path: path of obj file
+        :param scale: scale, default 1
+        :param transform_orn: rotation quaternion, convention xyzw
+        :param transform_pos: translation for loading, it is a list of length 3
+        :param input_kd: if loading material fails, use this default material. input_kd should be a list of length 3
+        :param texture_scale: texture scale for the object, downsample to save memory.
+        :param load_texture: load texture or not
+        :param overwrite_material: whether to overwrite the default Material (usually with a RandomizedMaterial for material randomization)
+        :return: VAO_ids
+        """
+        if self.optimization_process_executed and self.optimized:
+            logging.error(
+                "Using optimized renderer and optimization process is already excuted, cannot add new " "objects"
+            )
+            return
+
+        logging.info("Loading {}".format(obj_path))
+        mesh_data = self.mesh_cache.load(
+            obj_path,
+            lambda: self.read_obj(obj_path, scale, transform_orn, transform_pos),
+            scale,
+            transform_orn,
+            transform_pos,
+        )
+        materials = mesh_data.materials
+        vertex_data_indices = []
+        face_indices = []
+
         if overwrite_material is not None and len(materials) > 1:
             logging.warning("passed in one material ends up overwriting multiple materials")
 
@@ -490,6 +595,22 @@ class MeshRenderer(object):
         num_added_materials = len(materials)
 
         if num_added_materials > 0:
+            if overwrite_material is None and load_texture:
+                # Decode the textures of all the materials in parallel
+                obj_dir = os.path.dirname(obj_path)
+                self.prefetch_texture_files(
+                    [
+                        os.path.join(obj_dir, tex_name)
+                        for item in materials
+                        if item.diffuse_texname != ""
+                        for tex_name in [
+                            item.diffuse_texname,
+                            item.metallic_texname,
+                            item.roughness_texname,
+                            item.bump_texname,
+                        ]
+                    ]
+                )
             # Deparse the materials in the obj file by loading textures into the renderer's memory and creating a
             # Material element for them
             for i, item in enumerate(materials):
@@ -541,79 +662,20 @@ class MeshRenderer(object):
 
         VAO_ids = []
 
-        vertex_position = np.array(attrib.vertices).reshape((len(attrib.vertices) // 3, 3))
-        vertex_normal = np.array(attrib.normals).reshape((len(attrib.normals) // 3, 3))
-        vertex_texcoord = np.array(attrib.texcoords).reshape((len(attrib.texcoords) // 2, 2))
-
-        for shape in shapes:
+        for shape in mesh_data.shapes:
             logging.debug("Shape name: {}".format(shape.name))
-            if len(shape.mesh.material_ids) == 0:
+            if shape.material_id is None:
                 if overwrite_material is not None:
                     material_id = 0
                 else:
                     material_id = -1  # if no material and no overwrite material is supplied
             else:
-                material_id = shape.mesh.material_ids[0]
+                material_id = shape.material_id
 
             logging.debug("material_id = {}".format(material_id))
-            logging.debug("num_indices = {}".format(len(shape.mesh.indices)))
-            n_indices = len(shape.mesh.indices)
-            np_indices = shape.mesh.numpy_indices().reshape((n_indices, 3))
-
-            shape_vertex_index = np_indices[:, 0]
-            shape_normal_index = np_indices[:, 1]
-            shape_texcoord_index = np_indices[:, 2]
-            shape_vertex = vertex_position[shape_vertex_index]
-
-            if len(vertex_normal) == 0:
-                # dummy normal if normal is not available
-                shape_normal = np.zeros((shape_vertex.shape[0], 3))
-            else:
-                shape_normal = vertex_normal[shape_normal_index]
-
-            # Scale the shape before transforming
-            # Need to flip normals in axes where we have negative scaling
-            for i in range(3):
-                shape_vertex[:, i] *= scale[i]
-                if scale[i] < 0:
-                    shape_normal[:, i] *= -1
-
-            if len(vertex_texcoord) == 0:
-                # dummy texcoord if texcoord is not available
-                shape_texcoord = np.zeros((shape_vertex.shape[0], 2))
-            else:
-                shape_texcoord = vertex_texcoord[shape_texcoord_index]
-
-            if transform_orn is not None:
-                # Rotate the shape after they are scaled
-                orn = quat2rotmat(xyzw2wxyz(transform_orn))
-                shape_vertex = shape_vertex.dot(orn[:3, :3].T)
-                # Also rotate the surface normal, note that tangent space does not need to be rotated since they
-                # are derived from shape_vertex
-                shape_normal = shape_normal.dot(orn[:3, :3].T)
-            if transform_pos is not None:
-                # Translate the shape after they are scaled
-                shape_vertex += np.array(transform_pos)
-
-            v0 = shape_vertex[0::3, :]
-            v1 = shape_vertex[1::3, :]
-            v2 = shape_vertex[2::3, :]
-            uv0 = shape_texcoord[0::3, :]
-            uv1 = shape_texcoord[1::3, :]
-            uv2 = shape_texcoord[2::3, :]
-
-            delta_pos1 = v1 - v0
-            delta_pos2 = v2 - v0
-            delta_uv1 = uv1 - uv0
-            delta_uv2 = uv2 - uv0
-            r = 1.0 / (delta_uv1[:, 0] * delta_uv2[:, 1] - delta_uv1[:, 1] * delta_uv2[:, 0])
-            tangent = (delta_pos1 * delta_uv2[:, 1][:, None] - delta_pos2 * delta_uv1[:, 1][:, None]) * r[:, None]
-            bitangent = (delta_pos2 * delta_uv1[:, 0][:, None] - delta_pos1 * delta_uv2[:, 0][:, None]) * r[:, None]
-            bitangent = bitangent.repeat(3, axis=0)
-            tangent = tangent.repeat(3, axis=0)
-            vertices = np.concatenate([shape_vertex, shape_normal, shape_texcoord, tangent, bitangent], axis=-1)
-            faces = np.array(range(len(vertices))).reshape((len(vertices) // 3, 3))
-            vertexData = vertices.astype(np.float32)
+            # The vertex data is shared by all the loads of the same mesh, and read-only.
+            vertexData = shape.vertex_data
+            faces = np.arange(len(vertexData)).reshape((len(vertexData) // 3, 3))
             [VAO, VBO] = self.r.load_object_meshrenderer(self.shaderProgram, vertexData)
             self.VAOs.append(VAO)
             self.VBOs.append(VBO)
@@ -622,7 +684,7 @@ class MeshRenderer(object):
             self.objects.append(obj_path)
             vertex_data_indices.append(len(self.vertex_data))
             self.vertex_data.append(vertexData)
-            self.shapes.append(shape)
+            self.shape_vertex_indices.append(shape.vertex_indices)
             # if material loading fails, use the default material
             if material_id == -1:
                 self.shape_material_idx.append(num_added_materials + num_existing_mats)
@@ -643,6 +705,70 @@ class MeshRenderer(object):
         self.visual_objects.append(new_obj)
         return VAO_ids
 
+    def load_visual_object(
+        self,
+        obj_path,
+        scale=np.array([1, 1, 1]),
+        transform_orn=None,
+        transform_pos=None,
+        input_kd=None,
+        texture_scale=1.0,
+        load_texture=True,
+        overwrite_material=None,
+        shared=True,
+    ):
+        """
+        Load a wavefront obj file into the renderer, unless it was already loaded with the same parameters and
+        material, and return the id of its VisualObject. Instances of the same visual object share its vertex
+        buffers and materials.
+
+        :param obj_path: path of obj file
+        :param scale: scale, default 1
+        :param transform_orn: rotation quaternion, convention xyzw
+        :param transform_pos: translation for loading, it is a list of length 3
+        :param input_kd: if loading material fails, use this default material. input_kd should be a list of length 3
+        :param texture_scale: texture scale for the object, downsample to save memory.
+        :param load_texture: load texture or not
+        :param overwrite_material: whether to overwrite the default Material (usually with a RandomizedMaterial for material randomization)
+        :param shared: whether the visual object can be shared, e.g. not for soft bodies, which update its vertex data
+        :return: visual object id
+        """
+
+        def to_key(value):
+            return None if value is None else tuple(np.asarray(value, dtype=float).flatten().tolist())
+
+        # Materials are compared by identity, objects with their own overwrite material do not share visual objects
+        key = (
+            obj_path,
+            to_key(scale),
+            to_key(transform_orn),
+            to_key(transform_pos),
+            to_key(input_kd),
+            texture_scale,
+            load_texture,
+            overwrite_material,
+        )
+        if shared and key in self.visual_object_ids:
+            visual_object = self.visual_objects[self.visual_object_ids[key]]
+            self.reused_vertex_bytes += sum(self.vertex_data[i].nbytes for i in visual_object.vertex_data_indices)
+            return self.visual_object_ids[key]
+
+        VAO_ids = self.load_object(
+            obj_path,
+            scale=scale,
+            transform_orn=transform_orn,
+            transform_pos=transform_pos,
+            input_kd=input_kd,
+            texture_scale=texture_scale,
+            load_texture=load_texture,
+            overwrite_material=overwrite_material,
+        )
+        if VAO_ids is None:
+            return None
+        if shared:
+            self.visual_object_ids[key] = len(self.visual_objects) - 1
+        return len(self.visual_objects) - 1
+
     def add_instance(
         self,
         object_id,
@@ -1122,6 +1248,37 @@ class MeshRenderer(object):
         """
         return self.visual_objects
 
+    def get_memory_usage(self):
+        """
+        Return the memory used by the vertex data of the loaded meshes. Vertex data shared by several shapes, e.g.
+        identical meshes with different materials, is only counted once.
+
+        :return: dict with the number of visual objects, instances and shapes, the bytes of vertex and face data, and
+            the bytes of vertex data that reusing visual objects saved
+        """
+        unique_vertex_data = {id(vertex_data): vertex_data for vertex_data in self.vertex_data}
+        return {
+            "visual_objects": len(self.visual_objects),
+            "instances": len(self.instances),
+            "shapes": len(self.vertex_data),
+            "vertex_bytes": sum(vertex_data.nbytes for vertex_data in unique_vertex_data.values()),
+            "face_bytes": sum(faces.nbytes for faces in self.faces),
+            "reused_vertex_bytes": self.reused_vertex_bytes,
+        }
+
+    def get_texture_usage(self):
+        """
+        Return the number of textures loaded in the renderer, the GPU memory they use and the time spent loading them.
+
+        :return: dict with the number of textures, the bytes of texture data, including mipmaps, and the load time in
+            seconds
+        """
+        return {
+            "textures": len(self.texture_files),
+            "texture_bytes": self.texture_bytes,
+            "texture_load_time": self.texture_load_time,
+        }
+
     def get_instances(self):
         """
         Return instances
@@ -1178,6 +1335,7 @@ class MeshRenderer(object):
         """
         logging.debug("Releasing. {}".format(self.glstring))
         self.clean()
+        self.texture_cache.shutdown()
         self.r.release()
 
     def clean(self):
@@ -1236,12 +1394,16 @@ class MeshRenderer(object):
         self.VAOs = []
         self.VBOs = []
         self.textures = []
+        self.texture_cache.clear()
+        self.texture_bytes = 0
         self.objects = []  # GC should free things here
         self.faces = []  # GC should free things here
         self.visual_objects = []
+        self.visual_object_ids = {}
+        self.reused_vertex_bytes = 0
         self.instances = []
         self.vertex_data = []
-        self.shapes = []
+        self.shape_vertex_indices = []
         save_path = os.path.join(igibson.ig_dataset_path, "tmp")
         if os.path.isdir(save_path):
             shutil.rmtree(save_path)
@@ -1388,22 +1550,25 @@ class MeshRenderer(object):
         texture_files = sorted(self.texture_files.items(), key=lambda x: x[1])
         texture_files = [item[0] for item in texture_files]
 
-        self.tex_id_1, self.tex_id_2, self.tex_id_layer_mapping = self.r.generateArrayTextures(
-            texture_files, cutoff, shouldShrinkSmallTextures, smallTexSize, igibson.key_path
+        start = time.time()
+        self.texture_cache.prefetch(texture_files)
+        images = [self.texture_cache.get(tex_file) for tex_file in texture_files]
+        self.tex_id_1, self.tex_id_2, self.tex_id_layer_mapping = self.r.generateArrayTexturesFromArrays(
+            images, texture_files, cutoff, shouldShrinkSmallTextures, smallTexSize
         )
+        self.texture_bytes = get_array_texture_bytes(
+            [image.shape for image in images], self.tex_id_layer_mapping, shouldShrinkSmallTextures, smallTexSize
+        )
+        del images
+        self.texture_load_time += time.time() - start
         print(self.tex_id_layer_mapping)
         print(len(self.texture_files), self.texture_files)
         self.textures.append(self.tex_id_1)
         self.textures.append(self.tex_id_2)
 
-        offset_faces = []
-
-        curr_index_offset = 0
-        for i in range(len(self.vertex_data)):
-            face_idxs = self.faces[i]
-            offset_face_idxs = face_idxs + curr_index_offset
-            offset_faces.append(offset_face_idxs)
-            curr_index_offset += len(self.vertex_data[i])
+        # Shapes that share their vertex data, e.g. identical meshes with different materials, share it in the merged
+        # buffer too
+        merged_vertex_data, offset_faces = merge_vertex_data(self.vertex_data, self.faces)
 
         # List of all primitives to render - these are the shapes that each have a vao_id
         # Some of these may share visual data, but have unique transforms
@@ -1568,7 +1733,6 @@ class MeshRenderer(object):
         self.merged_hidden_data = np.ascontiguousarray(np.concatenate(hidden_data, axis=0), np.float32)
         self.merged_uv_data = np.ascontiguousarray(np.concatenate(uv_data, axis=0), np.float32)
 
-        merged_vertex_data = np.concatenate(self.vertex_data, axis=0)
         print("Merged vertex data shape:")
         print(merged_vertex_data.shape)
         print("Enable pbr: {}".format(self.rendering_settings.enable_pbr))
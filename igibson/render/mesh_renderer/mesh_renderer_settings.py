@@ -25,6 +25,9 @@ class MeshRendererSettings(object):
         show_glfw_window=False,
         blend_highlight=False,
         is_robosuite=False,
+        mesh_cache_dir=None,
+        texture_cache_dir=None,
+        texture_load_workers=4,
     ):
         """
         :param use_fisheye: whether to use fisheye camera
@@ -45,6 +48,9 @@ class MeshRendererSettings(object):
         :param show_glfw_window: whether to show glfw window (default false)
         :param blend_highlight: blend highlight of objects into RGB image
         :param is_robosuite: whether the environment is of robosuite.
+        :param mesh_cache_dir: directory to cache the vertex data of the loaded meshes in, None to only cache in memory
+        :param texture_cache_dir: directory to cache the decoded and downsampled textures in, None to not cache them
+        :param texture_load_workers: number of threads decoding textures, 0 to decode them one at a time when loaded
         """
         self.use_fisheye = use_fisheye
         self.msaa = msaa
@@ -63,6 +69,9 @@ class MeshRendererSettings(object):
         self.show_glfw_window = show_glfw_window
         self.blend_highlight = blend_highlight
         self.is_robosuite = is_robosuite
+        self.mesh_cache_dir = mesh_cache_dir
+        self.texture_cache_dir = texture_cache_dir
+        self.texture_load_workers = texture_load_workers
 
         if glfw_gl_version is not None:
             self.glfw_gl_version = glfw_gl_version
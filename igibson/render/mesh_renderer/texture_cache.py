@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from igibson.render.mesh_renderer.mesh_cache import get_file_hash
+
+
+class TextureCache(object):
+    """
+    Decodes and downsamples texture files in a thread pool, ahead of their upload to the GPU.
+
+    Textures are requested with prefetch as soon as they are known, e.g. for all the materials of an obj file at
+    once, and collected with get when they are uploaded. If a cache directory is given, the downsampled textures are
+    also stored on disk, keyed by the content of the texture file and the texture scale, and memory-mapped by later
+    processes. Encrypted textures are only decoded, to not store them decrypted on disk.
+    """
+
+    def __init__(self, decode, cache_dir=None, num_workers=4):
+        """
+        :param decode: function that decodes a texture file with a texture scale into a (h, w, 3) uint8 array
+        :param cache_dir: directory to cache the downsampled textures in, None to not cache them
+        :param num_workers: number of threads decoding textures, 0 to decode them when they are collected
+        """
+        self.decode = decode
+        self.cache_dir = cache_dir
+        self.executor = ThreadPoolExecutor(max_workers=num_workers) if num_workers > 0 else None
+        self._futures = {}
+
+    def get_key(self, tex_filename, texture_scale):
+        """
+        :return: key of a texture file and a texture scale, from the content of the file
+        """
+        sha1 = hashlib.sha1(get_file_hash(tex_filename).encode("utf-8"))
+        sha1.update(struct.pack("<d", texture_scale))
+        return sha1.hexdigest()
+
+    def _load(self, tex_filename, texture_scale):
+        if self.cache_dir is None or tex_filename.endswith("encrypted.png"):
+            return self.decode(tex_filename, texture_scale)
+
+        path = os.path.join(self.cache_dir, self.get_key(tex_filename, texture_scale) + ".npy")
+        if os.path.isfile(path):
+            return np.load(path, mmap_mode="r")
+
+        image = self.decode(tex_filename, texture_scale)
+        # Write to a temporary file first, so that concurrent processes never read partial files.
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.save(f, image)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning("Failed to write the texture cache of {}: {}".format(tex_filename, e))
+        return image
+
+    def prefetch(self, tex_filenames, texture_scale=1.0):
+        """
+        Start decoding texture files in the thread pool.
+
+        :param tex_filenames: texture file filenames, None and missing files are ignored
+        :param texture_scale: texture scale, downsample to save memory
+        """
+        if self.executor is None:
+            return
+        for tex_filename in tex_filenames:
+            key = (tex_filename, texture_scale)
+            if tex_filename is None or key in self._futures or not os.path.isfile(tex_filename):
+                continue
+            self._futures[key] = self.executor.submit(self._load, tex_filename, texture_scale)
+
+    def get(self, tex_filename, texture_scale=1.0):
+        """
+        Collect a decoded texture, decoding it now if it was not prefetched.
+
+        :param tex_filename: texture file filename
+        :param texture_scale: texture scale, downsample to save memory
+        :return: (h, w, 3) uint8 array, whose first row is the bottom of the image
+        """
+        future = self._futures.pop((tex_filename, texture_scale), None)
+        if future is None:
+            return self._load(tex_filename, texture_scale)
+        return future.result()
+
+    def clear(self):
+        """
+        Drop the textures that were prefetched but not collected.
+        """
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+
+    def shutdown(self):
+        """
+        Stop the thread pool.
+        """
+        self.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def get_array_texture_bytes(image_shapes, tex_layer_mapping, shrink_small_textures, small_texture_size):
+    """
+    Compute the GPU memory used by the two array textures of the optimized renderer, including mipmaps.
+
+    :param image_shapes: (h, w, 3) shapes of the textures
+    :param tex_layer_mapping: array texture and layer of each texture, from generateArrayTexturesFromArrays
+    :param shrink_small_textures: whether the textures of the second array texture are shrunk
+    :param small_texture_size: size of the textures of the second array texture if they are shrunk
+    :return: number of bytes
+    """
+    # width, height and number of layers of each array texture
+    dims = [[0, 0, 0], [0, 0, 0]]
+    for (h, w, _), (tex_num, _) in zip(image_shapes, tex_layer_mapping):
+        dims[tex_num] = [max(dims[tex_num][0], w), max(dims[tex_num][1], h), dims[tex_num][2] + 1]
+    if shrink_small_textures:
+        dims[1][:2] = [small_texture_size, small_texture_size]
+    # mipmaps take a third of the size of the texture
+    return sum(w * h * layers * 3 * 4 // 3 for w, h, layers in dims)
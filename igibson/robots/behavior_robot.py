@@ -30,6 +30,7 @@ from igibson.object_states.factory import prepare_object_states
 from igibson.objects.articulated_object import ArticulatedObject
 from igibson.objects.visual_marker import VisualMarker
 from igibson.utils.mesh_util import quat2rotmat, xyzw2wxyz
+from igibson.utils.transform_utils import quat2euler, quat_apply
 
 # Helps eliminate effect of numerical error on distance threshold calculations, especially when part is at the threshold
 THRESHOLD_EPSILON = 0.001
@@ -174,12 +175,16 @@ class BehaviorRobot(object):
 
         self.parts["eye"] = BREye(self)
 
+        # Poses of the parts and hand links, shared by everything that reads them during a frame
+        self.state_snapshot = None
+
     def set_colliders(self, enabled=False):
         self.parts["left_hand"].set_colliders(enabled)
         self.parts["right_hand"].set_colliders(enabled)
         self.parts["body"].set_colliders(enabled)
 
     def set_position_orientation(self, pos, orn):
+        self.invalidate_state_snapshot()
         self.parts["body"].set_position_orientation_unwrapped(pos, orn)
         self.parts["body"].new_pos, self.parts["body"].new_orn = pos, orn
 
@@ -231,6 +236,21 @@ class BehaviorRobot(object):
     def get_end_effector_position(self):
         return self.parts["right_hand"].get_position()
 
+    def get_state_snapshot(self):
+        """
+        Returns the snapshot of the part and hand link poses for the current frame, building it if the simulator
+        has stepped or a part has been moved since it was last built.
+        """
+        if self.state_snapshot is None or self.state_snapshot.frame != self.simulator.frame_count:
+            self.state_snapshot = BRStateSnapshot(self)
+        return self.state_snapshot
+
+    def invalidate_state_snapshot(self):
+        """
+        Discards the state snapshot. Must be called whenever a part is moved outside of the simulation step.
+        """
+        self.state_snapshot = None
+
     def dump_action(self):
         """
         Returns action used on the current frame.
@@ -251,6 +271,40 @@ class BehaviorRobot(object):
             if self.parts[part_name].movement_cid is None:
                 self.parts[part_name].activate_constraints()
 
+    def deactivate(self):
+        """
+        Return BehaviorRobot to the inactive state it is in after being imported, so that the same robot can
+        be reused, e.g. to replay several demos in one simulator. This releases any assisted grasp, removes
+        the body movement constraint, which is recreated on the first frame, and retargets the hand movement
+        constraints to the current hand poses. The poses and local transforms of the parts are not changed, so this
+        should be called after they have been restored (e.g. by reset_scene).
+        """
+        self.activated = False
+        self.first_frame = True
+        self.action = np.zeros((28,))
+        self.constraints_active["body"] = False
+        self.invalidate_state_snapshot()
+
+        body = self.parts["body"]
+        if body.movement_cid is not None:
+            p.removeConstraint(body.movement_cid)
+            body.movement_cid = None
+        body.activated = False
+        body.new_pos, body.new_orn = None, None
+
+        for hand_name in ["left_hand", "right_hand"]:
+            hand = self.parts[hand_name]
+            if isinstance(hand, BRHand):
+                hand.force_release_obj()
+            hand.activated = False
+            hand.trigger_fraction = 0
+            hand.new_pos, hand.new_orn = None, None
+            if hand.movement_cid is not None:
+                hand.move(*hand.get_position_orientation())
+            if self.use_ghost_hands and hand.prev_ghost_hand_hidden_state:
+                self.simulator.set_hidden_state(hand.ghost_hand, hide=False)
+                hand.prev_ghost_hand_hidden_state = False
+
     def apply_action(self, action):
         """
         Updates BehaviorRobot - transforms of all objects managed by this class.
@@ -291,6 +345,9 @@ class BehaviorRobot(object):
         for vr_obj_name in ["left_hand", "right_hand", "eye"]:
             self.parts[vr_obj_name].update(frame_action)
 
+        # Hand joints may have been frozen and the next physics step moves the parts
+        self.invalidate_state_snapshot()
+
     def render_camera_image(self, modes=("rgb")):
         # render frames from current eye position
         eye_pos, eye_orn = self.parts["eye"].get_position_orientation()
@@ -320,13 +377,16 @@ class BehaviorRobot(object):
         return 6 * 3 + 2
 
     def get_proprioception(self):
+        local_euler = quat2euler(
+            [self.parts[part_name].local_orn for part_name in ["left_hand", "right_hand", "eye"]]
+        ).tolist()
         state = OrderedDict()
         state["left_hand_position_local"] = self.parts["left_hand"].local_pos
-        state["left_hand_orientation_local"] = p.getEulerFromQuaternion(self.parts["left_hand"].local_orn)
+        state["left_hand_orientation_local"] = local_euler[0]
         state["right_hand_position_local"] = self.parts["right_hand"].local_pos
-        state["right_hand_orientation_local"] = p.getEulerFromQuaternion(self.parts["right_hand"].local_orn)
+        state["right_hand_orientation_local"] = local_euler[1]
         state["eye_position_local"] = self.parts["eye"].local_pos
-        state["eye_orientation_local"] = p.getEulerFromQuaternion(self.parts["eye"].local_orn)
+        state["eye_orientation_local"] = local_euler[2]
         state["left_hand_trigger_fraction"] = self.parts["left_hand"].trigger_fraction
         state["right_hand_trigger_fraction"] = self.parts["right_hand"].trigger_fraction
 
@@ -354,28 +414,69 @@ class BehaviorRobot(object):
         )
 
     def can_toggle(self, toggle_position, toggle_distance_threshold):
-        for part_name, part in self.parts.items():
-            if part_name in ["left_hand", "right_hand"]:
-                if (
-                    np.linalg.norm(np.array(part.get_position()) - np.array(toggle_position))
-                    < toggle_distance_threshold
-                ):
-                    return True
-                for finger in FINGER_TIP_LINK_INDICES:
-                    finger_link_state = p.getLinkState(part.body_id, finger)
-                    link_pos = finger_link_state[0]
-                    if np.linalg.norm(np.array(link_pos) - np.array(toggle_position)) < toggle_distance_threshold:
-                        return True
+        snapshot = self.get_state_snapshot()
+        for part_name in ["left_hand", "right_hand"]:
+            if part_name not in self.parts:
+                continue
+            hand_positions = np.concatenate(
+                [snapshot.part_positions[part_name][None], snapshot.link_positions[part_name][FINGER_TIP_LINK_INDICES]]
+            )
+            distances = np.linalg.norm(hand_positions - np.asarray(toggle_position), axis=1)
+            if np.any(distances < toggle_distance_threshold):
+                return True
         return False
 
     def dump_state(self):
         return {part_name: part.dump_part_state() for part_name, part in self.parts.items()}
 
     def load_state(self, dump):
+        self.invalidate_state_snapshot()
         for part_name, part_state in dump.items():
             self.parts[part_name].load_part_state(part_state)
 
 
+class BRStateSnapshot(object):
+    """
+    Poses of all BehaviorRobot parts and hand links at one frame. Each part is queried once, hand links with a
+    single getLinkStates call, and the hand keypoints used by assisted grasping are transformed all at once.
+    """
+
+    def __init__(self, robot):
+        """
+        :param robot: BehaviorRobot to take the snapshot of
+        """
+        self.frame = robot.simulator.frame_count
+        self.part_positions = {}
+        self.part_orientations = {}
+        self.link_positions = {}
+        self.link_orientations = {}
+        self.hand_keypoints = {}
+
+        for part_name, part in robot.parts.items():
+            pos, orn = p.getBasePositionAndOrientation(part.body_id)
+            self.part_positions[part_name] = np.array(pos)
+            self.part_orientations[part_name] = np.array(orn)
+            if not isinstance(part, BRHandBase):
+                continue
+
+            link_states = p.getLinkStates(part.body_id, part.link_indices)
+            self.link_positions[part_name] = np.array([link_state[0] for link_state in link_states])
+            self.link_orientations[part_name] = np.array([link_state[1] for link_state in link_states])
+            if isinstance(part, BRHand):
+                keypoint_links = part.keypoint_link_indices
+                self.hand_keypoints[part_name] = self.link_positions[part_name][keypoint_links] + quat_apply(
+                    self.link_orientations[part_name][keypoint_links], part.keypoint_offsets
+                )
+
+    def get_link_pose(self, part_name, link_index):
+        """
+        :param part_name: name of a hand part
+        :param link_index: link of the hand
+        :return: position and orientation of the link
+        """
+        return self.link_positions[part_name][link_index], self.link_orientations[part_name][link_index]
+
+
 class BRBody(ArticulatedObject):
     """
     A simple ellipsoid representing the robot's body.
@@ -417,6 +518,7 @@ class BRBody(ArticulatedObject):
         return body_id
 
     def set_position_orientation_unwrapped(self, pos, orn):
+        self.parent.invalidate_state_snapshot()
         super(BRBody, self).set_position_orientation(pos, orn)
 
     def set_position_orientation(self, pos, orn):
@@ -502,6 +604,7 @@ class BRBody(ArticulatedObject):
             if not self.activated:
                 self.set_colliders(enabled=True)
                 self.activated = True
+            self.parent.invalidate_state_snapshot()
             self.set_position(self.new_pos)
             self.set_orientation(self.new_orn)
 
@@ -540,6 +643,8 @@ class BRHandBase(ArticulatedObject):
         self.fpath = fpath
         self.model_path = fpath
         self.hand = hand
+        # Key of the hand in BehaviorRobot.parts
+        self.part_name = "{}_hand".format(hand)
         self.other_hand = None
         self.new_pos = None
         self.new_orn = None
@@ -579,6 +684,7 @@ class BRHandBase(ArticulatedObject):
         """
         body_id = p.loadURDF(self.fpath, globalScaling=self.scale, flags=p.URDF_USE_MATERIAL_COLORS_FROM_MTL)
         self.mass = p.getDynamicsInfo(body_id, -1)[0]
+        self.link_indices = list(range(p.getNumJoints(body_id)))
         self.create_link_name_to_vm_map(body_id)
         return body_id
 
@@ -590,6 +696,8 @@ class BRHandBase(ArticulatedObject):
         self.other_hand = other_hand
 
     def activate_constraints(self):
+        # The subclasses reset the hand joints before calling this
+        self.parent.invalidate_state_snapshot()
         # Start ghost hand where the VR hand starts
         if self.parent.use_ghost_hands:
             self.ghost_hand.set_position(self.get_position())
@@ -599,6 +707,7 @@ class BRHandBase(ArticulatedObject):
     def set_position_orientation(self, pos, orn):
         # set position and orientation of BRobot body part and update
         # local transforms, note this function gets around state bound
+        self.parent.invalidate_state_snapshot()
         super(BRHandBase, self).set_position_orientation(pos, orn)
         body = self.parent.parts["body"]
         if body.new_pos is None:
@@ -741,7 +850,8 @@ class BRHandBase(ArticulatedObject):
 
         # If distance between hand and controller is greater than threshold,
         # ghost hand appears
-        dist_to_real_controller = np.linalg.norm(np.array(self.new_pos) - np.array(self.get_position()))
+        hand_pos = self.parent.get_state_snapshot().part_positions[self.part_name]
+        dist_to_real_controller = np.linalg.norm(np.array(self.new_pos) - hand_pos)
         should_hide = dist_to_real_controller <= self.ghost_hand_appear_threshold
 
         # Only toggle hidden state if we are transition from hidden to unhidden, or the other way around
@@ -795,6 +905,15 @@ class BRHand(BRHandBase):
         self.candidate_data = None
         self.movement_cid = None
 
+        # Points in link frames that are used for the assisted grasping raycasts: palm base, palm center, two
+        # thumb points and the tips of the other fingers. The y axis is mirrored for the left hand
+        mirror = np.array([1, 1 if self.hand == "right" else -1, 1])
+        self.keypoint_link_indices = [PALM_LINK_INDEX] * 2 + [THUMB_LINK_INDEX] * 2 + NON_THUMB_FINGERS
+        self.keypoint_offsets = np.array(
+            [PALM_BASE_POS, PALM_CENTER_POS * mirror, THUMB_2_POS * mirror, THUMB_1_POS * mirror]
+            + [FINGER_TIP_POS * mirror] * len(NON_THUMB_FINGERS)
+        )
+
     def activate_constraints(self):
         p.changeDynamics(self.body_id, -1, mass=1, lateralFriction=HAND_FRICTION)
         for joint_index in range(p.getNumJoints(self.body_id)):
@@ -853,6 +972,7 @@ class BRHand(BRHandBase):
         """
         Freezes hand joints - used in assisted grasping.
         """
+        self.parent.invalidate_state_snapshot()
         for joint_index, j_val in self.freeze_vals.items():
             p.resetJointState(self.body_id, joint_index, targetValue=j_val, targetVelocity=0.0)
 
@@ -860,40 +980,10 @@ class BRHand(BRHandBase):
         """
         Calculates the body id and link that have the most fingertip-palm ray intersections.
         """
-        # Store unique ray start/end points for visualization
-        raypoints = []
-        palm_link_state = p.getLinkState(self.body_id, 0)
-        palm_pos = palm_link_state[0]
-        palm_orn = palm_link_state[1]
-        palm_base_pos, _ = p.multiplyTransforms(palm_pos, palm_orn, PALM_BASE_POS, [0, 0, 0, 1])
-        palm_center_pos = np.copy(PALM_CENTER_POS)
-        palm_center_pos[1] *= 1 if self.hand == "right" else -1
-        palm_center_pos, _ = p.multiplyTransforms(palm_pos, palm_orn, palm_center_pos, [0, 0, 0, 1])
-        thumb_link_state = p.getLinkState(self.body_id, THUMB_LINK_INDEX)
-        thumb_pos = thumb_link_state[0]
-        thumb_orn = thumb_link_state[1]
-        thumb_1_pos = np.copy(THUMB_1_POS)
-        thumb_1_pos[1] *= 1 if self.hand == "right" else -1
-        thumb_2_pos = np.copy(THUMB_2_POS)
-        thumb_2_pos[1] *= 1 if self.hand == "right" else -1
-        thumb_1, _ = p.multiplyTransforms(thumb_pos, thumb_orn, thumb_2_pos, [0, 0, 0, 1])
-        thumb_2, _ = p.multiplyTransforms(thumb_pos, thumb_orn, thumb_1_pos, [0, 0, 0, 1])
-        # Repeat for each of 4 fingers
-        raypoints.extend([palm_base_pos, palm_center_pos, thumb_1, thumb_2])
-        raycast_startpoints = [palm_base_pos, palm_center_pos, thumb_1, thumb_2] * 4
-
-        raycast_endpoints = []
-        for lk in NON_THUMB_FINGERS:
-            finger_link_state = p.getLinkState(self.body_id, lk)
-            link_pos = finger_link_state[0]
-            link_orn = finger_link_state[1]
-
-            finger_tip_pos = np.copy(FINGER_TIP_POS)
-            finger_tip_pos[1] *= 1 if self.hand == "right" else -1
-
-            finger_tip_pos, _ = p.multiplyTransforms(link_pos, link_orn, finger_tip_pos, [0, 0, 0, 1])
-            raypoints.append(finger_tip_pos)
-            raycast_endpoints.extend([finger_tip_pos] * 4)
+        keypoints = self.parent.get_state_snapshot().hand_keypoints[self.part_name]
+        # Rays go from the palm base, palm center and two thumb points to each of the 4 finger tips
+        raycast_startpoints = np.tile(keypoints[:4], (len(NON_THUMB_FINGERS), 1)).tolist()
+        raycast_endpoints = np.repeat(keypoints[4:], 4, axis=0).tolist()
 
         # Raycast from each start point to each end point - 8 in total between 4 finger start points and 2 palm end points
         ray_results = p.rayTestBatch(raycast_startpoints, raycast_endpoints)
@@ -941,10 +1031,7 @@ class BRHand(BRHandBase):
             return None
 
         # Step 2 - find the closest object to the palm center among these "inside" objects
-        palm_state = p.getLinkState(self.body_id, 0)
-        palm_center_pos = np.copy(PALM_CENTER_POS)
-        palm_center_pos[1] *= 1 if self.hand == "right" else -1
-        palm_center_pos, _ = p.multiplyTransforms(palm_state[0], palm_state[1], palm_center_pos, [0, 0, 0, 1])
+        palm_center_pos = self.parent.get_state_snapshot().hand_keypoints[self.part_name][1]
 
         self.candidate_data = []
         for bid, link in ray_data:
@@ -1167,9 +1254,7 @@ class BRHand(BRHandBase):
 
         # Get inverse world transform of body frame
         inv_body_pos, inv_body_orn = p.invertTransform(body_pos, body_orn)
-        link_state = p.getLinkState(self.body_id, PALM_LINK_INDEX)
-        link_pos = link_state[0]
-        link_orn = link_state[1]
+        link_pos, link_orn = self.parent.get_state_snapshot().get_link_pose(self.part_name, PALM_LINK_INDEX)
         # B * T = P -> T = (B-1)P, where B is body transform, T is target transform and P is palm transform
         child_frame_pos, child_frame_orn = p.multiplyTransforms(inv_body_pos, inv_body_orn, link_pos, link_orn)
 
@@ -1341,6 +1426,7 @@ class BREye(ArticulatedObject):
     def set_position_orientation(self, pos, orn):
         # set position and orientation of BRobot body part and update
         # local transforms, note this function gets around state bound
+        self.parent.invalidate_state_snapshot()
         super(BREye, self).set_position_orientation(pos, orn)
         body = self.parent.parts["body"]
         if body.new_pos is None:
@@ -312,7 +312,7 @@ class FetchGripper(LocomotorRobot):
     def get_proprioception(self):
         relative_eef_pos = self.get_relative_eef_position()
         relative_eef_orn = p.getEulerFromQuaternion(self.get_relative_eef_orientation())
-        joint_states = np.array([j.get_state() for j in self.ordered_joints]).astype(np.float32).flatten()
+        joint_states = self.get_joint_states().astype(np.float32).flatten()
         ag_data = self.calculate_ag_object()
         has_grasped = np.array([ag_data is not None]).astype(np.float32)
         self.ag_data = ag_data
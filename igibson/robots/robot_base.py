@@ -69,6 +69,7 @@ class BaseRobot(object):
             )
 
         self.parts, self.jdict, self.ordered_joints, self.robot_body, self.robot_mass = self.parse_robot(self.robot_ids)
+        self.setup_joint_arrays()
 
         assert (
             "eyes" in self.parts
@@ -140,6 +141,115 @@ class BaseRobot(object):
 
         return parts, joints, ordered_joints, self.robot_body, robot_mass
 
+    def setup_joint_arrays(self):
+        """
+        Gather the ids and limits of ordered_joints into arrays and preallocate the joint state buffers
+        used by the batched joint state accessors
+        """
+        joints = self.ordered_joints
+        self.ordered_joint_ids = np.array([j.joint_index for j in joints], dtype=int)
+        self.joint_lower_limits = np.array([j.lower_limit for j in joints])
+        self.joint_upper_limits = np.array([j.upper_limit for j in joints])
+        self.joint_has_limits = np.array([j.joint_has_limit for j in joints], dtype=bool)
+        self.joint_max_velocities = np.array([j.max_velocity for j in joints])
+        self.joint_max_torques = np.array([j.max_torque for j in joints])
+
+        # positions of joints without limits are not normalized
+        self.joint_position_mean = np.where(
+            self.joint_has_limits, (self.joint_lower_limits + self.joint_upper_limits) / 2.0, 0.0
+        )
+        self.joint_position_magnitude = np.where(
+            self.joint_has_limits, (self.joint_upper_limits - self.joint_lower_limits) / 2.0, 1.0
+        )
+        self.joint_states = np.zeros((len(joints), 3))
+        self.joint_relative_states = np.zeros((len(joints), 3))
+
+    def get_joint_states(self):
+        """
+        Get the states of all ordered joints with a single pybullet call
+
+        :return: (num_joints, 3) array of joint position, velocity and torque. The array is reused across calls
+        """
+        if len(self.ordered_joint_ids) > 0:
+            states = p.getJointStates(self.robot_ids[0], self.ordered_joint_ids.tolist())
+            self.joint_states[:] = [(x, vx, trq) for x, vx, _, trq in states]
+        return self.joint_states
+
+    def get_joint_relative_states(self, joint_states=None):
+        """
+        Get the normalized states of all ordered joints, see Joint.get_relative_state
+
+        :param joint_states: joint states returned by get_joint_states, queried again if not given
+        :return: (num_joints, 3) array of normalized joint position, velocity and torque. The array is reused
+            across calls
+        """
+        if joint_states is None:
+            joint_states = self.get_joint_states()
+        relative_states = self.joint_relative_states
+        np.subtract(joint_states[:, 0], self.joint_position_mean, out=relative_states[:, 0])
+        relative_states[:, 0] /= self.joint_position_magnitude
+        np.divide(joint_states[:, 1], self.joint_max_velocities, out=relative_states[:, 1])
+        np.divide(joint_states[:, 2], self.joint_max_torques, out=relative_states[:, 2])
+        return relative_states
+
+    def set_motor_positions(self, positions, indices=None):
+        """
+        Set position targets of ordered joints with a single pybullet call
+
+        :param positions: joint position targets, clipped to the joint limits
+        :param indices: indices into ordered_joints to command, all of them by default
+        """
+        if indices is None:
+            indices = slice(None)
+        positions = np.asarray(positions, dtype=float)
+        positions = np.where(
+            self.joint_has_limits[indices],
+            np.clip(positions, self.joint_lower_limits[indices], self.joint_upper_limits[indices]),
+            positions,
+        )
+        p.setJointMotorControlArray(
+            self.robot_ids[0],
+            self.ordered_joint_ids[indices].tolist(),
+            p.POSITION_CONTROL,
+            targetPositions=positions.tolist(),
+        )
+
+    def set_motor_velocities(self, velocities, indices=None):
+        """
+        Set velocity targets of ordered joints with a single pybullet call
+
+        :param velocities: joint velocity targets, clipped to the joint velocity limits
+        :param indices: indices into ordered_joints to command, all of them by default
+        """
+        if indices is None:
+            indices = slice(None)
+        max_velocities = self.joint_max_velocities[indices]
+        velocities = np.clip(np.asarray(velocities, dtype=float), -max_velocities, max_velocities)
+        p.setJointMotorControlArray(
+            self.robot_ids[0],
+            self.ordered_joint_ids[indices].tolist(),
+            p.VELOCITY_CONTROL,
+            targetVelocities=velocities.tolist(),
+        )
+
+    def set_motor_torques(self, torques, indices=None):
+        """
+        Set torques of ordered joints with a single pybullet call
+
+        :param torques: joint torques, clipped to the joint torque limits
+        :param indices: indices into ordered_joints to command, all of them by default
+        """
+        if indices is None:
+            indices = slice(None)
+        max_torques = self.joint_max_torques[indices]
+        torques = np.clip(np.asarray(torques, dtype=float), -max_torques, max_torques)
+        p.setJointMotorControlArray(
+            self.robot_ids[0],
+            self.ordered_joint_ids[indices].tolist(),
+            p.TORQUE_CONTROL,
+            forces=torques.tolist(),
+        )
+
     def robot_specific_reset(self):
         """
         Reset function for each specific robot. Overwritten by subclasses
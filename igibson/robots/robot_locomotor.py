@@ -173,8 +173,7 @@ class LocomotorRobot(BaseRobot):
         """
         Keep the robot still. Apply zero velocity to all joints.
         """
-        for n, j in enumerate(self.ordered_joints):
-            j.set_motor_velocity(0.0)
+        self.set_motor_velocities(np.zeros(len(self.ordered_joints)))
 
     def apply_robot_action(self, action):
         """
@@ -184,15 +183,15 @@ class LocomotorRobot(BaseRobot):
 
         :param action: robot action
         """
+        num_joints = len(self.ordered_joints)
         if self.control == "torque":
-            for n, j in enumerate(self.ordered_joints):
-                j.set_motor_torque(self.torque_coef * j.max_torque * float(np.clip(action[n], -1, +1)))
+            self.set_motor_torques(self.torque_coef * self.joint_max_torques * np.clip(action[:num_joints], -1, +1))
         elif self.control == "velocity":
-            for n, j in enumerate(self.ordered_joints):
-                j.set_motor_velocity(self.velocity_coef * j.max_velocity * float(np.clip(action[n], -1, +1)))
+            self.set_motor_velocities(
+                self.velocity_coef * self.joint_max_velocities * np.clip(action[:num_joints], -1, +1)
+            )
         elif self.control == "position":
-            for n, j in enumerate(self.ordered_joints):
-                j.set_motor_position(action[n])
+            self.set_motor_positions(action[:num_joints])
         elif self.control == "differential_drive":
             # assume self.ordered_joints = [left_wheel, right_wheel]
             assert (
@@ -205,10 +204,11 @@ class LocomotorRobot(BaseRobot):
                 )
             left_wheel_ang_vel = (lin_vel - ang_vel * self.wheel_axle_half) / self.wheel_radius
             right_wheel_ang_vel = (lin_vel + ang_vel * self.wheel_axle_half) / self.wheel_radius
-            self.ordered_joints[0].set_motor_velocity(left_wheel_ang_vel)
-            self.ordered_joints[1].set_motor_velocity(right_wheel_ang_vel)
+            self.set_motor_velocities([left_wheel_ang_vel, right_wheel_ang_vel])
         elif type(self.control) is list or type(self.control) is tuple:
             # if control is a tuple, set different control type for each joint
+            action = np.asarray(action, dtype=float)
+            wheel_velocities = None
             if "differential_drive" in self.control:
                 # Assume the first two joints are wheels using differntiable drive control, and the rest use joint control
                 # assume self.ordered_joints = [left_wheel, right_wheel, joint_1, joint_2, ...]
@@ -225,16 +225,28 @@ class LocomotorRobot(BaseRobot):
                     )
                 left_wheel_ang_vel = (lin_vel - ang_vel * self.wheel_axle_half) / self.wheel_radius
                 right_wheel_ang_vel = (lin_vel + ang_vel * self.wheel_axle_half) / self.wheel_radius
-                self.ordered_joints[0].set_motor_velocity(left_wheel_ang_vel)
-                self.ordered_joints[1].set_motor_velocity(right_wheel_ang_vel)
-
-            for n, j in enumerate(self.ordered_joints):
-                if self.control[n] == "torque":
-                    j.set_motor_torque(self.torque_coef * j.max_torque * float(np.clip(action[n], -1, +1)))
-                elif self.control[n] == "velocity":
-                    j.set_motor_velocity(self.velocity_coef * j.max_velocity * float(np.clip(action[n], -1, +1)))
-                elif self.control[n] == "position":
-                    j.set_motor_position(action[n])
+                wheel_velocities = [left_wheel_ang_vel, right_wheel_ang_vel]
+
+            # group joints by control type so that each type is commanded with a single pybullet call
+            control = np.array(self.control[:num_joints])
+            torque_idx = np.flatnonzero(control == "torque")
+            velocity_idx = np.flatnonzero(control == "velocity")
+            position_idx = np.flatnonzero(control == "position")
+            if len(torque_idx) > 0:
+                self.set_motor_torques(
+                    self.torque_coef * self.joint_max_torques[torque_idx] * np.clip(action[torque_idx], -1, +1),
+                    torque_idx,
+                )
+            velocities = (
+                self.velocity_coef * self.joint_max_velocities[velocity_idx] * np.clip(action[velocity_idx], -1, +1)
+            )
+            if wheel_velocities is not None:
+                velocity_idx = np.concatenate([[0, 1], velocity_idx]).astype(int)
+                velocities = np.concatenate([wheel_velocities, velocities])
+            if len(velocity_idx) > 0:
+                self.set_motor_velocities(velocities, velocity_idx)
+            if len(position_idx) > 0:
+                self.set_motor_positions(action[position_idx], position_idx)
         else:
             raise Exception("unknown control type: {}".format(self.control))
 
@@ -275,9 +287,9 @@ class LocomotorRobot(BaseRobot):
 
         :return: proprioceptive states
         """
-        j = np.array([j.get_state() for j in self.ordered_joints]).astype(np.float32).flatten()
-
-        jn = np.array([j.get_joint_relative_state() for j in self.ordered_joints]).astype(np.float32).flatten()
+        joint_states = self.get_joint_states()
+        j = joint_states.astype(np.float32).flatten()
+        jn = self.get_joint_relative_states(joint_states).astype(np.float32).flatten()
 
         # Get raw joint values and normalized versions
         self.joint_position = j[0::3]
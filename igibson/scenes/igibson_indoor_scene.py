@@ -27,6 +27,7 @@ from igibson.utils.assets_utils import (
     get_ig_model_path,
     get_ig_scene_path,
 )
+from igibson.utils.joint_utils import BodyJointMetadata
 from igibson.utils.utils import rotate_vector_3d
 
 SCENE_SOURCE = ["IG", "CUBICASA", "THREEDFRONT"]
@@ -554,6 +555,18 @@ class InteractiveIndoorScene(StaticIndoorScene):
 
         return len(pts) > 0
 
+    def get_joint_metadata(self, body_id):
+        """
+        Get the static joint metadata of a scene body, which was read when its object was loaded
+
+        :param body_id: body id of a scene object
+        :return: BodyJointMetadata of the body
+        """
+        obj = self.objects_by_id.get(body_id)
+        if obj is not None and hasattr(obj, "joint_metadata") and body_id in obj.body_ids:
+            return obj.joint_metadata[obj.body_ids.index(body_id)]
+        return BodyJointMetadata(body_id)
+
     def check_scene_quality(self, body_ids, fixed_body_ids):
         """
         Helper function to check for scene quality.
@@ -604,9 +617,11 @@ class InteractiveIndoorScene(StaticIndoorScene):
         joint_collision_so_far = 0
         for body_id in fixed_body_ids:
             joint_quality = True
-            for joint_id in range(p.getNumJoints(body_id)):
-                j_low, j_high = p.getJointInfo(body_id, joint_id)[8:10]
-                j_type = p.getJointInfo(body_id, joint_id)[2]
+            joint_metadata = self.get_joint_metadata(body_id)
+            for joint_id in joint_metadata.joint_ids.tolist():
+                j_low = joint_metadata.joint_lower_limits[joint_id]
+                j_high = joint_metadata.joint_upper_limits[joint_id]
+                j_type = joint_metadata.joint_types[joint_id]
                 if j_type not in [p.JOINT_REVOLUTE, p.JOINT_PRISMATIC]:
                     continue
                 # this is the continuous joint (e.g. wheels for office chairs)
@@ -716,13 +731,15 @@ class InteractiveIndoorScene(StaticIndoorScene):
         :param mode: opening mode (zero, max, or random)
         """
         body_joint_pairs = []
-        for joint_id in range(p.getNumJoints(body_id)):
+        joint_metadata = self.get_joint_metadata(body_id)
+        for joint_id in joint_metadata.joint_ids.tolist():
             # cache current physics state
             state_id = p.saveState()
 
-            j_low, j_high = p.getJointInfo(body_id, joint_id)[8:10]
-            j_type = p.getJointInfo(body_id, joint_id)[2]
-            parent_idx = p.getJointInfo(body_id, joint_id)[-1]
+            j_low = joint_metadata.joint_lower_limits[joint_id]
+            j_high = joint_metadata.joint_upper_limits[joint_id]
+            j_type = joint_metadata.joint_types[joint_id]
+            parent_idx = joint_metadata.parent_indices[joint_id]
             if j_type not in [p.JOINT_REVOLUTE, p.JOINT_PRISMATIC]:
                 p.removeState(state_id)
                 continue
@@ -970,7 +987,7 @@ class InteractiveIndoorScene(StaticIndoorScene):
         :param xy: 2D location in world reference frame (metric)
         :return: 2D location in seg map reference frame (image)
         """
-        return np.flip((xy / self.seg_map_resolution + self.seg_map_size / 2.0)).astype(np.int)
+        return np.flip((xy / self.seg_map_resolution + self.seg_map_size / 2.0), axis=-1).astype(int)
 
     def get_room_type_by_point(self, xy):
         """
@@ -1005,6 +1022,40 @@ class InteractiveIndoorScene(StaticIndoorScene):
         else:
             return self.room_ins_id_to_ins_name[ins_id]
 
+    def _get_room_ids_by_points(self, room_map, xy):
+        """
+        Look up many points in a room segmentation map with one gather
+
+        :param room_map: room_sem_map or room_ins_map
+        :param xy: (N, 2) locations in world reference frame (metric)
+        :return: (N,) room ids, 0 for the points on a room boundary or outside of the map
+        """
+        map_xy = self.world_to_seg_map(np.asarray(xy, dtype=float).reshape(-1, 2))
+        on_map = np.all((map_xy >= 0) & (map_xy < room_map.shape[:2]), axis=1)
+        room_ids = np.zeros(len(map_xy), dtype=room_map.dtype)
+        room_ids[on_map] = room_map[map_xy[on_map, 0], map_xy[on_map, 1]]
+        return room_ids
+
+    def get_room_types_by_points(self, xy):
+        """
+        Return the room types of many points, like get_room_type_by_point
+
+        :param xy: (N, 2) locations in world reference frame (metric)
+        :return: room types of these points, None for the points not on the room segmentation map
+        """
+        room_ids = self._get_room_ids_by_points(self.room_sem_map, xy)
+        return [self.room_sem_id_to_sem_name[sem_id] if sem_id != 0 else None for sem_id in room_ids.tolist()]
+
+    def get_room_instances_by_points(self, xy):
+        """
+        Return the room instances of many points, like get_room_instance_by_point
+
+        :param xy: (N, 2) locations in world reference frame (metric)
+        :return: room instances of these points, None for the points not on the room segmentation map
+        """
+        room_ids = self._get_room_ids_by_points(self.room_ins_map, xy)
+        return [self.room_ins_id_to_ins_name[ins_id] if ins_id != 0 else None for ins_id in room_ids.tolist()]
+
     def get_body_ids(self):
         """
         Return the body ids of all scene objects
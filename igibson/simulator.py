@@ -9,6 +9,7 @@ import numpy as np
 import pybullet as p
 
 import igibson
+from igibson.external.pybullet_tools.utils import clear_body_metadata
 from igibson.object_states.factory import get_states_by_dependency_order
 from igibson.objects.articulated_object import ArticulatedObject, URDFObject
 from igibson.objects.multi_object_wrappers import ObjectGrouper, ObjectMultiplexer
@@ -26,8 +27,10 @@ from igibson.robots.behavior_robot import BehaviorRobot
 from igibson.robots.robot_base import BaseRobot
 from igibson.scenes.igibson_indoor_scene import InteractiveIndoorScene
 from igibson.scenes.scene_base import Scene
+from igibson.utils.aabb_utils import AABBTable
 from igibson.utils.assets_utils import get_ig_avg_category_specs
 from igibson.utils.constants import PyBulletSleepState, SemanticClass
+from igibson.utils.contact_utils import ContactCache
 from igibson.utils.mesh_util import quat2rotmat, xyz2mat, xyzw2wxyz
 from igibson.utils.semantics_utils import get_class_name_to_class_id
 from igibson.utils.utils import quatXYZWFromRotMat
@@ -251,7 +254,12 @@ class Simulator:
         p.setTimeStep(self.physics_timestep)
         p.setGravity(0, 0, -self.gravity)
         p.setPhysicsEngineParameter(enableFileCaching=0)
-        self.visual_objects = {}
+        # Body ids of a previous connection may be reused, so forget their cached metadata
+        clear_body_metadata()
+        # Contact points of the current step, shared by contact-based object states, envs and metrics
+        self.contact_cache = ContactCache()
+        # AABBs of the bodies, shared by AABB-based object states and sampling
+        self.aabb_table = AABBTable()
         self.robots = []
         self.scene = None
         if (self.use_ig_renderer or self.use_vr_renderer or self.use_simple_viewer) and not self.render_to_tensor:
@@ -495,14 +503,13 @@ class Simulator:
         :param color: RGB color of sphere (from 0 to 1 on each axis)
         """
         sphere_file = os.path.join(igibson.assets_path, "models/mjcf_primitives/sphere8.obj")
-        self.renderer.load_object(
+        visual_object = self.renderer.load_visual_object(
             sphere_file,
             transform_orn=[0, 0, 0, 1],
             transform_pos=[0, 0, 0],
             input_kd=[1, 0, 0],
             scale=[radius, radius, radius],
         )
-        visual_object = len(self.renderer.get_visual_objects()) - 1
         self.renderer.add_instance(
             visual_object,
             pybullet_uuid=0,  # this can be ignored
@@ -516,6 +523,50 @@ class Simulator:
         # Return instance so we can control it
         return self.renderer.instances[-1]
 
+    def load_particle_instance(
+        self, particle, class_id=SemanticClass.USER_ADDED_OBJS, use_pbr=False, use_pbr_mapping=False, shadow_caster=True
+    ):
+        """
+        Load a kinematic, visual-only particle into the renderer. The particle has no pybullet body and its particle
+        system moves the returned instance directly. Particles of the same shape, size and color share a visual object.
+
+        :param particle: InstancedParticle to load
+        :param class_id: Class id for rendering semantic segmentation
+        :param use_pbr: Whether to use pbr
+        :param use_pbr_mapping: Whether to use pbr mapping
+        :param shadow_caster: Whether to cast shadow
+        :return: renderer instance of the particle
+        """
+        if particle.base_shape == "sphere":
+            filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/sphere8.obj")
+            scale = [particle.bounding_box[0]] * 3
+        elif particle.base_shape == "box":
+            filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/cube.obj")
+            scale = particle.bounding_box
+        else:
+            filename = particle.mesh_filename
+            scale = particle.mesh_scale
+
+        visual_object = self.renderer.load_visual_object(
+            filename,
+            transform_orn=[0, 0, 0, 1],
+            transform_pos=[0, 0, 0],
+            input_kd=particle.color[:3],
+            scale=np.array(scale),
+        )
+
+        self.renderer.add_instance(
+            visual_object,
+            pybullet_uuid=None,
+            class_id=class_id,
+            dynamic=False,
+            softbody=False,
+            use_pbr=use_pbr,
+            use_pbr_mapping=use_pbr_mapping,
+            shadow_caster=shadow_caster,
+        )
+        return self.renderer.instances[-1]
+
     @load_without_pybullet_vis
     def load_object_in_renderer(
         self,
@@ -561,64 +612,56 @@ class Simulator:
             visual_object = None
             if type == p.GEOM_MESH:
                 filename = filename.decode("utf-8")
-                if (filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn)) not in self.visual_objects.keys():
-                    self.renderer.load_object(
-                        filename,
-                        transform_orn=rel_orn,
-                        transform_pos=rel_pos,
-                        input_kd=color[:3],
-                        scale=np.array(dimensions),
-                        texture_scale=texture_scale,
-                        load_texture=load_texture,
-                    )
-                    self.visual_objects[(filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn))] = (
-                        len(self.renderer.visual_objects) - 1
-                    )
-                visual_object = self.visual_objects[(filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn))]
+                visual_object = self.renderer.load_visual_object(
+                    filename,
+                    transform_orn=rel_orn,
+                    transform_pos=rel_pos,
+                    input_kd=color[:3],
+                    scale=np.array(dimensions),
+                    texture_scale=texture_scale,
+                    load_texture=load_texture,
+                    shared=not softbody,
+                )
             elif type == p.GEOM_SPHERE:
                 filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/sphere8.obj")
-                self.renderer.load_object(
+                visual_object = self.renderer.load_visual_object(
                     filename,
                     transform_orn=rel_orn,
                     transform_pos=rel_pos,
                     input_kd=color[:3],
                     scale=[dimensions[0] / 0.5, dimensions[0] / 0.5, dimensions[0] / 0.5],
                 )
-                visual_object = len(self.renderer.get_visual_objects()) - 1
             elif type == p.GEOM_CAPSULE or type == p.GEOM_CYLINDER:
                 filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/cube.obj")
-                self.renderer.load_object(
+                visual_object = self.renderer.load_visual_object(
                     filename,
                     transform_orn=rel_orn,
                     transform_pos=rel_pos,
                     input_kd=color[:3],
                     scale=[dimensions[1] / 0.5, dimensions[1] / 0.5, dimensions[0]],
                 )
-                visual_object = len(self.renderer.get_visual_objects()) - 1
             elif type == p.GEOM_BOX:
                 filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/cube.obj")
-                self.renderer.load_object(
+                visual_object = self.renderer.load_visual_object(
                     filename,
                     transform_orn=rel_orn,
                     transform_pos=rel_pos,
                     input_kd=color[:3],
                     scale=np.array(dimensions),
                 )
-                visual_object = len(self.renderer.visual_objects) - 1
             elif type == p.GEOM_PLANE:
                 # By default, we add an additional floor surface to "smooth out" that of the original mesh.
                 # Normally you don't need to render this additionally added floor surface.
                 # However, if you do want to render it for some reason, you can set render_floor_plane to be True.
                 if render_floor_plane:
                     filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/cube.obj")
-                    self.renderer.load_object(
+                    visual_object = self.renderer.load_visual_object(
                         filename,
                         transform_orn=rel_orn,
                         transform_pos=rel_pos,
                         input_kd=color[:3],
                         scale=[100, 100, 0.01],
                     )
-                    visual_object = len(self.renderer.visual_objects) - 1
             if visual_object is not None:
                 self.renderer.add_instance(
                     visual_object,
@@ -694,15 +737,9 @@ class Simulator:
                 if visual_mesh_to_material is not None and filename in visual_mesh_to_material:
                     overwrite_material = visual_mesh_to_material[filename]
 
-                if (
-                    filename,
-                    tuple(dimensions),
-                    tuple(rel_pos),
-                    tuple(rel_orn),
-                ) not in self.visual_objects.keys() or overwrite_material is not None:
-                    # if the object has an overwrite material, always create a
-                    # new visual object even if the same visual shape exsits
-                    self.renderer.load_object(
+                # if the object has an overwrite material, only the links that share it share visual objects
+                visual_objects.append(
+                    self.renderer.load_visual_object(
                         filename,
                         transform_orn=rel_orn,
                         transform_pos=rel_pos,
@@ -710,11 +747,6 @@ class Simulator:
                         scale=np.array(dimensions),
                         overwrite_material=overwrite_material,
                     )
-                    self.visual_objects[(filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn))] = (
-                        len(self.renderer.visual_objects) - 1
-                    )
-                visual_objects.append(
-                    self.visual_objects[(filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn))]
                 )
                 link_ids.append(link_id)
 
@@ -807,7 +839,7 @@ class Simulator:
                 objects_to_add.append(obj)
 
             for body_id in body_ids:
-                p.removeBody(body_id)
+                self.remove_body(body_id)
 
             p.restoreState(state_id)
 
@@ -817,6 +849,17 @@ class Simulator:
             self.import_object(obj)
 
     @load_without_pybullet_vis
+    def remove_body(self, body_id):
+        """
+        Remove a body from pybullet. Pybullet reuses the ids of removed bodies, so the metadata and AABBs cached for
+        the body are forgotten too.
+
+        :param body_id: pybullet body id
+        """
+        clear_body_metadata(body_id)
+        self.aabb_table.remove(body_id)
+        p.removeBody(body_id)
+
     def import_robot(self, robot, class_id=SemanticClass.ROBOTS):
         """
         Import a robot into the simulator
@@ -842,53 +885,51 @@ class Simulator:
 
             if type == p.GEOM_MESH:
                 filename = filename.decode("utf-8")
-                if (filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn)) not in self.visual_objects.keys():
-                    self.renderer.load_object(
+                visual_objects.append(
+                    self.renderer.load_visual_object(
                         filename,
                         transform_orn=rel_orn,
                         transform_pos=rel_pos,
                         input_kd=color[:3],
                         scale=np.array(dimensions),
                     )
-                    self.visual_objects[(filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn))] = (
-                        len(self.renderer.visual_objects) - 1
-                    )
-                visual_objects.append(
-                    self.visual_objects[(filename, tuple(dimensions), tuple(rel_pos), tuple(rel_orn))]
                 )
                 link_ids.append(link_id)
             elif type == p.GEOM_SPHERE:
                 filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/sphere8.obj")
-                self.renderer.load_object(
-                    filename,
-                    transform_orn=rel_orn,
-                    transform_pos=rel_pos,
-                    input_kd=color[:3],
-                    scale=[dimensions[0] / 0.5, dimensions[0] / 0.5, dimensions[0] / 0.5],
+                visual_objects.append(
+                    self.renderer.load_visual_object(
+                        filename,
+                        transform_orn=rel_orn,
+                        transform_pos=rel_pos,
+                        input_kd=color[:3],
+                        scale=[dimensions[0] / 0.5, dimensions[0] / 0.5, dimensions[0] / 0.5],
+                    )
                 )
-                visual_objects.append(len(self.renderer.get_visual_objects()) - 1)
                 link_ids.append(link_id)
             elif type == p.GEOM_CAPSULE or type == p.GEOM_CYLINDER:
                 filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/cube.obj")
-                self.renderer.load_object(
-                    filename,
-                    transform_orn=rel_orn,
-                    transform_pos=rel_pos,
-                    input_kd=color[:3],
-                    scale=[dimensions[1] / 0.5, dimensions[1] / 0.5, dimensions[0]],
+                visual_objects.append(
+                    self.renderer.load_visual_object(
+                        filename,
+                        transform_orn=rel_orn,
+                        transform_pos=rel_pos,
+                        input_kd=color[:3],
+                        scale=[dimensions[1] / 0.5, dimensions[1] / 0.5, dimensions[0]],
+                    )
                 )
-                visual_objects.append(len(self.renderer.get_visual_objects()) - 1)
                 link_ids.append(link_id)
             elif type == p.GEOM_BOX:
                 filename = os.path.join(igibson.assets_path, "models/mjcf_primitives/cube.obj")
-                self.renderer.load_object(
-                    filename,
-                    transform_orn=rel_orn,
-                    transform_pos=rel_pos,
-                    input_kd=color[:3],
-                    scale=np.array(dimensions),
+                visual_objects.append(
+                    self.renderer.load_visual_object(
+                        filename,
+                        transform_orn=rel_orn,
+                        transform_pos=rel_pos,
+                        input_kd=color[:3],
+                        scale=np.array(dimensions),
+                    )
                 )
-                visual_objects.append(len(self.renderer.get_visual_objects()) - 1)
                 link_ids.append(link_id)
 
             if link_id == -1:
@@ -1036,6 +1077,10 @@ class Simulator:
         """
         Complete any non-physics steps such as state updates.
         """
+        # Physics was just stepped, so the contact points and AABBs changed.
+        self.contact_cache.invalidate()
+        self.aabb_table.invalidate()
+
         # Step all of the particle systems.
         for particle_system in self.particle_systems:
             particle_system.update(self)
@@ -1147,6 +1192,18 @@ class Simulator:
         self.sync()
         self.frame_count += 1
 
+    def kinematic_step(self):
+        """
+        Step the simulation without simulating physics. Body poses and joint states are expected to have been set
+        directly (e.g. from a log during kinematic replay). Collision detection is still run so that contact-based
+        object states stay valid, and object states and renderer positions are updated as in step()
+        """
+        p.performCollisionDetection()
+        self._non_physics_step()
+        # Teleported bodies are not necessarily woken up, so all instances are synced
+        self.sync(force_sync=True)
+        self.frame_count += 1
+
     def sync(self, force_sync=False):
         """
         Update positions in renderer without stepping the simulation. Usually used in the reset() function
@@ -1803,7 +1860,7 @@ class Simulator:
             for j, link_id in enumerate(instance.link_ids):
                 if link_id == -1:
                     dynamics_info = p.getDynamicsInfo(instance.pybullet_uuid, -1)
-                    if len(dynamics_info) == 13 and not self.first_sync:
+                    if len(dynamics_info) == 13 and not self.first_sync and not force_sync:
                         activation_state = dynamics_info[12]
                     else:
                         activation_state = PyBulletSleepState.AWAKE
@@ -1816,7 +1873,7 @@ class Simulator:
                 else:
                     dynamics_info = p.getDynamicsInfo(instance.pybullet_uuid, link_id)
 
-                    if len(dynamics_info) == 13 and not self.first_sync:
+                    if len(dynamics_info) == 13 and not self.first_sync and not force_sync:
                         activation_state = dynamics_info[12]
                     else:
                         activation_state = PyBulletSleepState.AWAKE
@@ -1845,6 +1902,7 @@ class Simulator:
             # print("******************PyBullet Logging Information:")
             p.resetSimulation(physicsClientId=self.cid)
             p.disconnect(self.cid)
+            clear_body_metadata()
             # print("PyBullet Logging Information******************")
         self.renderer.release()
 
@@ -1855,3 +1913,4 @@ class Simulator:
         if self.isconnected():
             p.resetSimulation(physicsClientId=self.cid)
             p.disconnect(self.cid)
+            clear_body_metadata()
@@ -0,0 +1,49 @@
+import os
+import time
+
+import numpy as np
+
+import igibson
+from igibson.envs.igibson_env import iGibsonEnv
+from igibson.utils.motion_planning_wrapper import MotionPlanningWrapper
+
+
+def benchmark(algorithm="birrt", n_queries=100):
+    config_filename = os.path.join(igibson.root_path, "test", "test_house_occupancy_grid.yaml")
+    nav_env = iGibsonEnv(config_file=config_filename, mode="headless")
+    motion_planner = MotionPlanningWrapper(nav_env, base_mp_algo=algorithm)
+    nav_env.reset()
+    nav_env.robots[0].set_position_orientation([0, 0, 0], [0, 0, 0, 1])
+    nav_env.simulator.step()
+
+    np.random.seed(0)
+    planning_times = []
+    successes = 0
+    for _ in range(n_queries):
+        goal = [np.random.uniform(-2, 2), np.random.uniform(-2, 2), np.random.uniform(-np.pi, np.pi)]
+        start = time.time()
+        plan = motion_planner.plan_base_motion(goal)
+        planning_times.append(time.time() - start)
+        successes += plan is not None
+
+    print(
+        "Base motion planning with {}: {} queries, {} plans found, mean {:.4f} s, median {:.4f} s, max {:.4f} s".format(
+            algorithm,
+            n_queries,
+            successes,
+            np.mean(planning_times),
+            np.median(planning_times),
+            np.max(planning_times),
+        )
+    )
+    motion_planner.close()
+    nav_env.clean()
+
+
+def main():
+    for algorithm in ["birrt", "rrt", "lazy_prm"]:
+        benchmark(algorithm)
+
+
+if __name__ == "__main__":
+    main()
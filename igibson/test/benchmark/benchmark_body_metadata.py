@@ -0,0 +1,54 @@
+import cProfile
+import os
+import pstats
+
+import igibson
+from igibson.envs.behavior_env import BehaviorEnv
+from igibson.external.pybullet_tools.utils import clear_body_metadata
+
+# Pybullet queries whose results are kept in the body metadata cache
+METADATA_CALLS = ["getJointInfo", "getBodyInfo", "getNumJoints"]
+
+
+def profile_reset(env):
+    """
+    Profile one environment reset and count the pybullet metadata queries it made
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    env.reset()
+    profiler.disable()
+
+    stats = pstats.Stats(profiler).stats
+    counts = {name: 0 for name in METADATA_CALLS}
+    total_time = 0.0
+    for (_, _, function_name), (_, num_calls, _, cumulative_time, _) in stats.items():
+        total_time = max(total_time, cumulative_time)
+        for name in METADATA_CALLS:
+            if name in function_name:
+                counts[name] += num_calls
+    return counts, total_time
+
+
+def main():
+    env = BehaviorEnv(
+        config_file=os.path.join(igibson.example_config_path, "behavior_onboard_sensing.yaml"),
+        mode="headless",
+        action_timestep=1 / 30.0,
+        physics_timestep=1 / 300.0,
+    )
+
+    # A cold cache queries pybullet like before. A warm cache checks its entries with getNumJoints and getBodyInfo,
+    # and only reads the joint infos of bodies it has not seen.
+    clear_body_metadata()
+    cold_counts, cold_time = profile_reset(env)
+    warm_counts, warm_time = profile_reset(env)
+    env.close()
+
+    for name in METADATA_CALLS:
+        print("{}: {} calls with a cold cache, {} with a warm cache".format(name, cold_counts[name], warm_counts[name]))
+    print("reset: {:.2f} s with a cold cache, {:.2f} s with a warm cache".format(cold_time, warm_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import glob
+import os
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from igibson.render.mesh_renderer.mesh_cache import MeshCache
+from igibson.render.mesh_renderer.mesh_renderer_cpu import MeshRenderer
+from igibson.utils.assets_utils import get_ig_model_path, get_ig_scene_path
+
+
+def get_scene_obj_paths(scene_id):
+    """
+    Get the visual meshes that loading a scene parses, with one entry per object, so repeated models repeat
+    """
+    scene_dir = get_ig_scene_path(scene_id)
+    scene_tree = ET.parse(os.path.join(scene_dir, "urdf", "{}_best.urdf".format(scene_id)))
+    obj_paths = []
+    for link in scene_tree.findall("link"):
+        category = link.attrib.get("category")
+        if category is None or category in ["agent", "multiplexer", "grouper"]:
+            continue
+        if category in ["walls", "floors", "ceilings"]:
+            model_path = scene_dir
+        else:
+            model_path = get_ig_model_path(category, link.attrib["model"])
+        obj_paths += sorted(glob.glob(os.path.join(model_path, "shape", "visual", "*.obj")))
+    return obj_paths
+
+
+def ingest(obj_paths, mesh_cache=None):
+    """
+    Parse the meshes and compute their vertex data like MeshRenderer.load_object, without uploading them
+    """
+    scale = np.array([1, 1, 1])
+    start = time.time()
+    num_vertices = 0
+    for obj_path in obj_paths:
+        if mesh_cache is None:
+            mesh_data = MeshRenderer.read_obj(obj_path, scale)
+        else:
+            mesh_data = mesh_cache.load(obj_path, lambda: MeshRenderer.read_obj(obj_path, scale), scale)
+        num_vertices += sum(len(shape.vertex_data) for shape in mesh_data.shapes)
+    return time.time() - start, num_vertices
+
+
+def main():
+    obj_paths = get_scene_obj_paths("Rs_int")
+    print("{} meshes, {} unique".format(len(obj_paths), len(set(obj_paths))))
+
+    elapsed, num_vertices = ingest(obj_paths)
+    print("no cache: {:.2f} s, {} vertices".format(elapsed, num_vertices))
+    print("in-memory cache: {:.2f} s".format(ingest(obj_paths, MeshCache())[0]))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print("on-disk cache, cold: {:.2f} s".format(ingest(obj_paths, MeshCache(cache_dir))[0]))
+        # A new MeshCache is like a new process, it memory-maps the vertex data written by the cold run.
+        print("on-disk cache, warm: {:.2f} s".format(ingest(obj_paths, MeshCache(cache_dir))[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import time
+
+import numpy as np
+
+import igibson
+from igibson.robots.ant_robot import Ant
+from igibson.robots.fetch_robot import Fetch
+from igibson.robots.husky_robot import Husky
+from igibson.robots.jr2_kinova_robot import JR2_Kinova
+from igibson.robots.jr2_robot import JR2
+from igibson.robots.turtlebot_robot import Turtlebot
+from igibson.scenes.stadium_scene import StadiumScene
+from igibson.simulator import Simulator
+from igibson.utils.utils import parse_config
+
+
+def per_joint_step(robot, action):
+    """
+    Reference step that reads and commands every joint with its own pybullet call
+    """
+    for n, j in enumerate(robot.ordered_joints):
+        j.set_motor_velocity(j.max_velocity * float(np.clip(action[n], -1, +1)))
+    np.array([j.get_state() for j in robot.ordered_joints]).astype(np.float32).flatten()
+    np.array([j.get_joint_relative_state() for j in robot.ordered_joints]).astype(np.float32).flatten()
+
+
+def batched_step(robot, action):
+    """
+    Step that reads and commands all joints with one pybullet call each
+    """
+    robot.set_motor_velocities(robot.joint_max_velocities * np.clip(action, -1, +1))
+    joint_states = robot.get_joint_states()
+    joint_states.astype(np.float32).flatten()
+    robot.get_joint_relative_states(joint_states).astype(np.float32).flatten()
+
+
+def benchmark(robot_class, n_steps=2000):
+    config = parse_config(os.path.join(igibson.root_path, "test", "test.yaml"))
+    s = Simulator(mode="headless")
+    scene = StadiumScene()
+    s.import_scene(scene)
+    robot = robot_class(config)
+    s.import_robot(robot)
+    num_joints = len(robot.ordered_joints)
+
+    np.random.seed(0)
+    actions = np.random.uniform(-1, 1, (n_steps, num_joints))
+    overheads = {}
+    for name, step_fn in [("per joint", per_joint_step), ("batched", batched_step)]:
+        start = time.time()
+        for action in actions:
+            step_fn(robot, action)
+        overheads[name] = (time.time() - start) / n_steps
+
+    start = time.time()
+    for _ in range(n_steps // 10):
+        robot.calc_state()
+    calc_state_time = (time.time() - start) / (n_steps // 10)
+    s.disconnect()
+
+    print(
+        "{}: {} joints, per joint I/O {:.1f} us/step, batched I/O {:.1f} us/step ({:.1f}x), calc_state {:.1f} us".format(
+            robot_class.__name__,
+            num_joints,
+            overheads["per joint"] * 1e6,
+            overheads["batched"] * 1e6,
+            overheads["per joint"] / overheads["batched"],
+            calc_state_time * 1e6,
+        )
+    )
+
+
+def main():
+    for robot_class in [Turtlebot, Husky, Ant, JR2, JR2_Kinova, Fetch]:
+        benchmark(robot_class)
+
+
+if __name__ == "__main__":
+    main()
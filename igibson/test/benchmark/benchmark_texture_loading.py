@@ -0,0 +1,55 @@
+import resource
+import tempfile
+import time
+
+from igibson.render.mesh_renderer.mesh_renderer_settings import MeshRendererSettings
+from igibson.scenes.igibson_indoor_scene import InteractiveIndoorScene
+from igibson.simulator import Simulator
+
+
+def benchmark_scene(scene_name, texture_load_workers, texture_cache_dir=None, optimized=False):
+    """
+    Load a scene and print how long loading its textures took and how much memory they use
+    """
+    scene = InteractiveIndoorScene(scene_name, texture_randomization=False, object_randomization=False)
+    settings = MeshRendererSettings(
+        msaa=False,
+        enable_shadow=False,
+        optimized=optimized,
+        texture_cache_dir=texture_cache_dir,
+        texture_load_workers=texture_load_workers,
+    )
+    s = Simulator(mode="headless", image_width=512, image_height=512, rendering_settings=settings)
+    start = time.time()
+    s.import_ig_scene(scene)
+    elapsed = time.time() - start
+
+    usage = s.renderer.get_texture_usage()
+    s.disconnect()
+
+    print(
+        "{}, {} workers, cache {}: loaded in {:.2f} s, {:.2f} s in textures".format(
+            scene_name, texture_load_workers, texture_cache_dir, elapsed, usage["texture_load_time"]
+        )
+    )
+    print(
+        "{} textures: {:.1f} MB, max resident memory: {:.1f} MB".format(
+            usage["textures"],
+            usage["texture_bytes"] / 1e6,
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+        )
+    )
+
+
+def main():
+    for scene_name in ["Rs_int", "Beechwood_0_int"]:
+        benchmark_scene(scene_name, texture_load_workers=0)
+        benchmark_scene(scene_name, texture_load_workers=4)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            benchmark_scene(scene_name, texture_load_workers=4, texture_cache_dir=cache_dir)
+            # The warm run memory-maps the textures downsampled by the cold run
+            benchmark_scene(scene_name, texture_load_workers=4, texture_cache_dir=cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import time
+
+from igibson.render.mesh_renderer.mesh_renderer_settings import MeshRendererSettings
+from igibson.scenes.igibson_indoor_scene import InteractiveIndoorScene
+from igibson.simulator import Simulator
+
+
+def benchmark_scene(scene_name, optimized=False):
+    """
+    Load a scene and print how much vertex data its visual objects use, and how much sharing them saved
+    """
+    scene = InteractiveIndoorScene(scene_name, texture_randomization=False, object_randomization=False)
+    settings = MeshRendererSettings(msaa=False, enable_shadow=False, optimized=optimized)
+    s = Simulator(mode="headless", image_width=512, image_height=512, rendering_settings=settings)
+    start = time.time()
+    s.import_ig_scene(scene)
+    elapsed = time.time() - start
+
+    usage = s.renderer.get_memory_usage()
+    s.disconnect()
+
+    print(
+        "{}: loaded in {:.2f} s, {} instances of {} visual objects with {} shapes".format(
+            scene_name, elapsed, usage["instances"], usage["visual_objects"], usage["shapes"]
+        )
+    )
+    print(
+        "vertex data: {:.1f} MB, faces: {:.1f} MB, saved by sharing visual objects: {:.1f} MB".format(
+            usage["vertex_bytes"] / 1e6, usage["face_bytes"] / 1e6, usage["reused_vertex_bytes"] / 1e6
+        )
+    )
+
+
+def main():
+    for scene_name in ["Rs_int", "Beechwood_0_int", "Wainscott_0_int"]:
+        benchmark_scene(scene_name)
+
+
+if __name__ == "__main__":
+    main()
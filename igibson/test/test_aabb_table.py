@@ -0,0 +1,55 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson.external.pybullet_tools.utils import aabb_union, clear_body_metadata, get_aabb, get_all_links
+from igibson.utils.aabb_utils import AABBTable
+
+
+def get_expected_aabb(body_id):
+    return np.array(aabb_union([get_aabb(body_id, link=link) for link in get_all_links(body_id)]))
+
+
+def test_aabb_table_tracks_moved_bodies():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        cube = p.loadURDF("cube_small.urdf", [0, 0, 1])
+        robot = p.loadURDF("r2d2.urdf", [2, 0, 1], useFixedBase=True)
+
+        table = AABBTable()
+        for body_id in [cube, robot]:
+            assert np.allclose(table.get_aabb(body_id), get_expected_aabb(body_id))
+        assert np.allclose(table.get_link_aabb(robot, 1), p.getAABB(robot, 1))
+        body_ids, aabbs = table.get_all_aabbs()
+        assert body_ids == [cube, robot] and aabbs.shape == (2, 2, 3)
+
+        # Moves are only picked up after the table is invalidated, e.g. at the next step.
+        old_aabb = table.get_aabb(cube)
+        p.resetBasePositionAndOrientation(cube, [1, 1, 1], [0, 0, 0, 1])
+        assert not np.allclose(table.get_aabb(cube), get_expected_aabb(cube))
+        table.invalidate(cube)
+        assert np.allclose(table.get_aabb(cube), get_expected_aabb(cube))
+        # AABBs handed out earlier are not changed by the refresh.
+        assert not np.allclose(old_aabb, table.get_aabb(cube))
+        assert not table.get_link_aabbs(cube).flags.writeable
+
+        # Joint motion also changes the AABBs.
+        for joint in range(p.getNumJoints(robot)):
+            p.resetJointState(robot, joint, 0.5)
+        table.invalidate()
+        assert np.allclose(table.get_aabb(robot), get_expected_aabb(robot))
+        assert np.allclose(table.get_link_aabbs(robot)[0], p.getAABB(robot, -1))
+
+        # Removed bodies are forgotten, and their ids can be reused by new bodies.
+        table.remove(cube)
+        p.removeBody(cube)
+        body_ids, aabbs = table.get_all_aabbs()
+        assert body_ids == [robot] and np.allclose(aabbs[0], get_expected_aabb(robot))
+        clear_body_metadata(cube)
+        new_body = p.loadURDF("cube_small.urdf", [3, 3, 1])
+        assert np.allclose(table.get_aabb(new_body), get_expected_aabb(new_body))
+        assert np.allclose(table.get_aabb(robot), get_expected_aabb(robot))
+    finally:
+        clear_body_metadata()
+        p.disconnect()
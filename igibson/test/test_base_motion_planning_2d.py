@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+import pybullet as p
+
+from igibson.external.motion.motion_planners.smoothing import shortcut_path
+from igibson.external.pybullet_tools.utils import (
+    clear_body_metadata,
+    get_cspace_map_2d,
+    plan_base_motion_2d,
+    set_base_values,
+)
+from igibson.utils.constants import OccupancyGridState
+
+
+def footprint_collision(map_2d, pt, radius):
+    mask = np.zeros((radius * 2 + 1, radius * 2 + 1))
+    cv2.circle(mask, (radius, radius), radius, 1, -1)
+    window = map_2d[pt[0] - radius : pt[0] + radius + 1, pt[1] - radius : pt[1] + radius + 1]
+    return not np.all(window[mask.astype(bool)] == OccupancyGridState.FREESPACE)
+
+
+def test_cspace_map_matches_footprint_check():
+    rng = np.random.RandomState(0)
+    grid_resolution = 64
+    radius = 3
+    map_2d = np.full((grid_resolution, grid_resolution, 1), OccupancyGridState.FREESPACE)
+    map_2d[rng.rand(grid_resolution, grid_resolution) < 0.02] = OccupancyGridState.OBSTACLES
+    cspace_map = get_cspace_map_2d(map_2d, radius)
+    for i in range(radius, grid_resolution - radius):
+        for j in range(radius, grid_resolution - radius):
+            assert cspace_map[i, j] == footprint_collision(map_2d, (i, j), radius)
+
+
+def test_plan_base_motion_2d_avoids_wall():
+    grid_resolution = 128
+    occupancy_range = 5.0
+    radius = 4
+    map_2d = np.full((grid_resolution, grid_resolution, 1), OccupancyGridState.FREESPACE)
+    # Wall across the map with a gap on one side
+    map_2d[40:48, 40:88] = OccupancyGridState.OBSTACLES
+
+    p.connect(p.DIRECT)
+    try:
+        body = p.createMultiBody(baseCollisionShapeIndex=p.createCollisionShape(p.GEOM_SPHERE, radius=0.1))
+        set_base_values(body, (0, 0, 0))
+        np.random.seed(0)
+        path = plan_base_motion_2d(
+            body,
+            [0, 1.5, 0],
+            ((-2, -2), (2, 2)),
+            map_2d=map_2d,
+            occupancy_range=occupancy_range,
+            grid_resolution=grid_resolution,
+            robot_footprint_radius_in_map=radius,
+        )
+        assert path is not None
+        assert np.allclose(path[-1][:2], [0, 1.5])
+        cspace_map = get_cspace_map_2d(map_2d, radius)
+        for q in path:
+            pt = (np.array([-q[1], q[0]]) / (occupancy_range / 2) * (grid_resolution / 2) + grid_resolution / 2).astype(
+                np.int32
+            )
+            assert not cspace_map[pt[0], pt[1]]
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+def test_shortcut_path_shortens_detour():
+    grid_resolution = 128
+    radius = 4
+    map_2d = np.full((grid_resolution, grid_resolution, 1), OccupancyGridState.FREESPACE)
+    map_2d[40:48, 40:88] = OccupancyGridState.OBSTACLES
+    cspace_map = get_cspace_map_2d(map_2d, radius)
+
+    def batch_collision(qs):
+        pts = (np.asarray(qs)[:, :2] * 10 + 64).astype(np.int32)
+        return cspace_map[pts[:, 0], pts[:, 1]]
+
+    def extend(q1, q2):
+        n = int(np.linalg.norm(np.subtract(q2, q1)) / 0.05) + 1
+        return [tuple(q) for q in np.linspace(q1, q2, n + 1)[1:]]
+
+    # Zig-zag path from one side of the wall to the other
+    waypoints = [(-4, 0), (-4, -5), (2, -5), (2, 5), (1, 0)]
+    path = [waypoints[0]]
+    for q1, q2 in zip(waypoints, waypoints[1:]):
+        path.extend(extend(q1, q2))
+    assert not np.any(batch_collision(path))
+
+    def path_length(path):
+        return np.sum(np.linalg.norm(np.diff(np.array(path), axis=0), axis=1))
+
+    np.random.seed(0)
+    shortcut = shortcut_path(path, extend, None, batch_collision=batch_collision, iterations=20)
+    assert shortcut[0] == path[0] and shortcut[-1] == path[-1]
+    assert not np.any(batch_collision(shortcut))
+    assert path_length(shortcut) < 0.7 * path_length(path)
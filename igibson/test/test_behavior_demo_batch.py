@@ -0,0 +1,123 @@
+import json
+import os
+
+import pytest
+
+from igibson.examples.behavior.behavior_demo_batch_journal import (
+    _write_journal_record,
+    get_manifest_shard,
+    get_pending_demos,
+    read_batch_journal,
+    summarize_batch_journal,
+)
+
+
+def write_journal(out_dir, name, records, truncated_line=None):
+    with open(os.path.join(str(out_dir), "journal_{}.jsonl".format(name)), "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        if truncated_line is not None:
+            f.write(truncated_line)
+
+
+def finished_record(demo, status, time, load_duration, replay_duration, total_frame_num):
+    return {
+        "demo": demo,
+        "status": status,
+        "time": time,
+        "load_duration": load_duration,
+        "replay_duration": replay_duration,
+        "total_frame_num": total_frame_num,
+        "worker": "host_1",
+    }
+
+
+def test_get_manifest_shard():
+    demos = ["demo_{}.hdf5".format(i) for i in range(10)]
+    shards = [get_manifest_shard(demos, num_shards=3, shard_index=i) for i in range(3)]
+    # The shards partition the manifest and are balanced
+    assert sorted(sum(shards, [])) == sorted(demos)
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+    assert get_manifest_shard(demos) == demos
+    with pytest.raises(ValueError):
+        get_manifest_shard(demos, num_shards=3, shard_index=3)
+
+
+def test_read_batch_journal(tmp_path):
+    # Two workers wrote journals, the second one was killed mid-write
+    write_journal(
+        tmp_path,
+        "host_1",
+        [
+            {"demo": "a.hdf5", "status": "started", "time": 1.0},
+            finished_record("a.hdf5", "failed", 2.0, 1.0, 0.0, 0),
+            {"demo": "a.hdf5", "status": "started", "time": 5.0},
+            finished_record("a.hdf5", "done", 6.0, 1.0, 2.0, 100),
+        ],
+    )
+    write_journal(
+        tmp_path,
+        "host_2",
+        [{"demo": "b.hdf5", "status": "started", "time": 3.0}, finished_record("b.hdf5", "done", 4.0, 2.0, 4.0, 300)],
+        truncated_line='{"demo": "c.hdf5", "sta',
+    )
+    # Other files in the output directory are not journals
+    with open(os.path.join(str(tmp_path), "a.json"), "w") as f:
+        f.write("{}")
+
+    journal = read_batch_journal(str(tmp_path))
+    assert sorted(journal) == ["a.hdf5", "b.hdf5"]
+    assert journal["a.hdf5"]["status"] == "done"
+    assert journal["b.hdf5"]["total_frame_num"] == 300
+
+    # Records written by this process are read back as well
+    _write_journal_record(str(tmp_path), {"demo": "c.hdf5", "status": "started"})
+    assert read_batch_journal(str(tmp_path))["c.hdf5"]["status"] == "started"
+
+
+def test_resume_from_journal(tmp_path):
+    write_journal(
+        tmp_path,
+        "host_1",
+        [
+            finished_record("a.hdf5", "done", 1.0, 1.0, 2.0, 100),
+            finished_record("b.hdf5", "failed", 2.0, 1.0, 0.0, 0),
+            {"demo": "c.hdf5", "status": "started", "time": 3.0},
+        ],
+    )
+    journal = read_batch_journal(str(tmp_path))
+    demos = ["a.hdf5", "b.hdf5", "c.hdf5", "d.hdf5"]
+    # Demos that were interrupted or never started are replayed, failed ones only on request
+    assert get_pending_demos(demos, journal) == ["c.hdf5", "d.hdf5"]
+    assert get_pending_demos(demos, journal, retry_failed=True) == ["b.hdf5", "c.hdf5", "d.hdf5"]
+    assert get_pending_demos(demos, {}) == demos
+
+
+def test_summarize_batch_journal(tmp_path):
+    write_journal(
+        tmp_path,
+        "host_1",
+        [
+            finished_record("a.hdf5", "done", 1.0, 1.0, 2.0, 100),
+            finished_record("b.hdf5", "done", 2.0, 3.0, 6.0, 300),
+            finished_record("c.hdf5", "failed", 3.0, 2.0, 0.0, 0),
+            {"demo": "d.hdf5", "status": "started", "time": 4.0},
+        ],
+    )
+    summary = summarize_batch_journal(str(tmp_path))
+    assert summary["num_demos"] == 3
+    assert summary["num_failed"] == 1
+    assert summary["num_unfinished"] == 1
+    assert summary["total_replay_duration"] == 8.0
+    assert summary["total_load_duration"] == 6.0
+    assert summary["mean_replay_duration"] == pytest.approx(8.0 / 3)
+    assert summary["replay_fps"] == 50.0
+
+    # The summary of a shard only counts its demos
+    summary = summarize_batch_journal(str(tmp_path), demos=["b.hdf5", "d.hdf5"])
+    assert list(summary["demos"]) == ["b.hdf5", "d.hdf5"]
+    assert summary["num_demos"] == 1
+    assert summary["num_unfinished"] == 1
+    assert summary["replay_fps"] == 50.0
+
+    assert summarize_batch_journal(str(tmp_path), demos=[])["replay_fps"] == 0
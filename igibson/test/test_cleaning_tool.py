@@ -0,0 +1,104 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson import object_states
+from igibson.external.pybullet_tools.utils import clear_body_metadata
+from igibson.object_states.cleaning_tool import CleaningTool
+from igibson.objects.particles import Dust
+
+
+class FakeRendererInstance(object):
+    def set_position(self, pos):
+        pass
+
+    def set_rotation(self, rotation):
+        pass
+
+
+class FakeSimulator(object):
+    def __init__(self):
+        self.particle_systems = []
+
+    def load_particle_instance(self, particle, **kwargs):
+        return FakeRendererInstance()
+
+
+class ValueHolder(object):
+    """Holds a fixed value in place of a real object state, which needs a loaded object."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get_value(self):
+        return self.value
+
+    def get_contact_body_ids(self):
+        return self.value
+
+
+class FakeObject(object):
+    def __init__(self, body_id, states=None):
+        self.body_id = body_id
+        self.states = states if states is not None else {}
+
+    def get_body_id(self):
+        return self.body_id
+
+    def get_position(self):
+        return np.zeros(3)
+
+    def get_orientation(self):
+        return np.array([0.0, 0.0, 0.0, 1.0])
+
+
+def test_cleaning_tool_stashes_particles_in_aabb():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        # The cube has no cleaning_tool_area link, so the tool cleans with its full AABB
+        tool_body = p.loadURDF("cube_small.urdf")
+        table_body = p.loadURDF("cube_small.urdf", basePosition=[0, 0, -1])
+
+        simulator = FakeSimulator()
+        table = FakeObject(table_body)
+        dust = Dust(table)
+        dust.initialize(simulator)
+        simulator.particle_systems.append(dust)
+        # One dust particle every 10cm along x, the tool covers x in [0.25, 0.55]
+        particles = [dust.unstash_particle([0.1 * i, 0, 0], [0, 0, 0, 1]) for i in range(dust.get_num())]
+        aabb = ValueHolder(np.array([[0.25, -0.1, -0.1], [0.55, 0.1, 0.1]]))
+        contact_bodies = ValueHolder({table_body})
+        tool = FakeObject(tool_body, {object_states.AABB: aabb, object_states.ContactBodies: contact_bodies})
+        state = CleaningTool(tool)
+        state.initialize(simulator)
+        assert state.link_id is None
+
+        state.update()
+        assert state.num_cleaned_particles == 3
+        assert dust.get_active_particles() == particles[:3] + particles[6:]
+        assert dust.get_num_stashed() == 3
+        assert np.allclose(
+            dust.get_active_particle_positions()[:, 0], [0.0, 0.1, 0.2] + [0.1 * i for i in range(6, 20)]
+        )
+        assert np.allclose(particles[4].get_position(), [0, 0, -100])
+
+        # The particles are cleaned once, and the count is reset at every step
+        state.update()
+        assert state.num_cleaned_particles == 0
+        assert dust.get_num_active() == 17
+
+        # A tool that does not touch the dirty object does not clean it
+        aabb.value = np.array([[-1.0, -1.0, -1.0], [3.0, 1.0, 1.0]])
+        contact_bodies.value = set()
+        state.update()
+        assert state.num_cleaned_particles == 0
+        assert dust.get_num_active() == 17
+
+        contact_bodies.value = {table_body}
+        state.update()
+        assert state.num_cleaned_particles == 17
+        assert dust.get_num_active() == 0
+    finally:
+        clear_body_metadata()
+        p.disconnect()
@@ -0,0 +1,83 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson.external.pybullet_tools.utils import (
+    clear_body_metadata,
+    get_collision_fn,
+    get_joint_positions,
+    get_moving_links,
+    get_self_link_pairs,
+    pairwise_collision,
+    pairwise_link_collision,
+    set_joint_positions,
+)
+
+
+def reference_collision_fn(body, joints, obstacles):
+    check_link_pairs = get_self_link_pairs(body, joints)
+    moving_links = frozenset(get_moving_links(body, joints))
+
+    def collision_fn(q):
+        set_joint_positions(body, joints, q)
+        if any(pairwise_link_collision(body, link1, body, link2) for link1, link2 in check_link_pairs):
+            return True
+        return any(pairwise_collision((body, moving_links), obstacle) for obstacle in obstacles)
+
+    return collision_fn
+
+
+def test_collision_fn_matches_exhaustive_check(monkeypatch):
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        body = p.loadURDF("kuka_iiwa/model.urdf", useFixedBase=True)
+        obstacles = [
+            p.loadURDF("cube_small.urdf", basePosition=position, globalScaling=4)
+            for position in [[0.5, 0, 0.5], [-0.4, 0.3, 0.8], [0, -0.5, 0.3], [3, 3, 0]]
+        ]
+        joints = list(range(p.getNumJoints(body)))
+
+        collision_fn = get_collision_fn(body, joints, obstacles, [], True, set())
+        reference_fn = reference_collision_fn(body, joints, obstacles)
+
+        rng = np.random.RandomState(0)
+        configurations = rng.uniform(-2, 2, size=(100, len(joints)))
+        results = [collision_fn(q) for q in configurations]
+        assert 0 < sum(results) < len(results)
+        assert results == [reference_fn(q) for q in configurations]
+        # Memoized results are returned for previously seen configurations, and the robot is still moved to them.
+        # They do not query any AABB
+        get_aabb = p.getAABB
+        num_aabb_queries = [0]
+
+        def counting_get_aabb(*args, **kwargs):
+            num_aabb_queries[0] += 1
+            return get_aabb(*args, **kwargs)
+
+        monkeypatch.setattr(p, "getAABB", counting_get_aabb)
+        for q, result in zip(configurations, results):
+            assert collision_fn(q) == result
+            assert np.allclose(get_joint_positions(body, joints), q)
+        assert num_aabb_queries[0] == 0
+        monkeypatch.undo()
+
+        # Memoized results are dropped when the collision function is refreshed after obstacles moved
+        for obstacle in obstacles:
+            p.resetBasePositionAndOrientation(obstacle, [3, 3, 0], [0, 0, 0, 1])
+        collision_fn.refresh()
+        moved_results = [collision_fn(q) for q in configurations]
+        assert sum(moved_results) < sum(results)
+        assert moved_results == [reference_fn(q) for q in configurations]
+        p.resetBasePositionAndOrientation(obstacles[0], [0.5, 0, 0.5], [0, 0, 0, 1])
+        collision_fn.refresh()
+        reference_fn = reference_collision_fn(body, joints, obstacles)
+        assert [collision_fn(q) for q in configurations] == [reference_fn(q) for q in configurations]
+
+        # and when the robot base moves
+        p.resetBasePositionAndOrientation(body, [2.5, 3, 0], [0, 0, 0, 1])
+        collision_fn.refresh()
+        assert [collision_fn(q) for q in configurations] == [reference_fn(q) for q in configurations]
+    finally:
+        clear_body_metadata()
+        p.disconnect()
@@ -0,0 +1,66 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson.external.pybullet_tools.utils import clear_body_metadata
+from igibson.utils.contact_utils import ContactCache
+
+
+def test_contact_cache_matches_per_body_queries():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        p.setGravity(0, 0, -9.8)
+        plane = p.loadURDF("plane.urdf")
+        cube_a = p.loadURDF("cube_small.urdf", [0, 0, 0.03])
+        cube_b = p.loadURDF("cube_small.urdf", [0, 0, 0.09])
+        robot = p.loadURDF("r2d2.urdf", [1, 0, 0.5])
+        for _ in range(50):
+            p.stepSimulation()
+
+        cache = ContactCache()
+        for body_id in [plane, cube_a, cube_b, robot]:
+            expected = sorted(p.getContactPoints(bodyA=body_id), key=lambda c: (c[2], c[3], c[4], c[5]))
+            contacts = sorted(cache.get_contacts(body_id), key=lambda c: (c[2], c[3], c[4], tuple(c[5])))
+            assert len(contacts) == len(expected) > 0
+            for contact, expected_contact in zip(contacts, expected):
+                assert contact.bodyUniqueIdA == body_id
+                assert (contact.bodyUniqueIdB, contact.linkIndexA, contact.linkIndexB) == expected_contact[2:5]
+                assert np.allclose(contact.positionOnA, expected_contact[5])
+                assert np.allclose(contact.contactNormalOnB, expected_contact[7])
+                assert np.isclose(contact.normalForce, expected_contact[9])
+
+        assert cache.get_contact_body_ids(cube_a) == {plane, cube_b}
+        assert cache.in_contact(cube_b, cube_a)
+        assert not cache.in_contact(cube_b, plane)
+        assert not cache.in_contact(robot, link_id=0)
+        assert len(cache.get_contacts(robot + 1)) == 0
+
+        # The cache keeps its contacts until it is invalidated
+        p.resetBasePositionAndOrientation(cube_b, [0, 1, 1], [0, 0, 0, 1])
+        p.stepSimulation()
+        assert cache.in_contact(cube_b, cube_a)
+        cache.invalidate()
+        assert not cache.in_contact(cube_b, cube_a)
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+def test_contact_cache_reports_self_collisions_once():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        flags = p.URDF_USE_SELF_COLLISION | p.URDF_USE_SELF_COLLISION_INCLUDE_PARENT
+        robot = p.loadURDF("r2d2.urdf", [0, 0, 1], flags=flags, useFixedBase=True)
+        p.stepSimulation()
+
+        cache = ContactCache()
+        expected = p.getContactPoints(bodyA=robot)
+        assert len(expected) > 0 and all(contact[2] == robot for contact in expected)
+        assert len(cache.get_contacts(robot)) == len(expected)
+        assert len(cache.get_all_contacts()) == len(p.getContactPoints())
+        assert cache.get_contact_body_ids(robot) == {robot}
+    finally:
+        clear_body_metadata()
+        p.disconnect()
@@ -0,0 +1,96 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from igibson.utils.utils import dump_config
+
+pytest.importorskip("pyarrow")
+
+from igibson.utils.ig_log_export import (
+    compute_agent_distances,
+    compute_body_distances,
+    compute_goal_progress,
+    get_demo_name,
+    ingest_logs,
+    load_table,
+)
+
+
+def create_task_log(log_path, num_frames, agent_step):
+    with h5py.File(log_path, "w") as hf:
+        frame_data = np.zeros((num_frames, 4))
+        frame_data[:, 0] = np.arange(num_frames)
+        hf.create_dataset("frame_data", data=frame_data)
+
+        # Body 2 is the agent, moving agent_step along x every frame. Body 5 does not move
+        agent_position = np.zeros((num_frames, 3))
+        agent_position[:, 0] = np.arange(num_frames) * agent_step
+        for bid, position in [(2, agent_position), (5, np.ones((num_frames, 3)))]:
+            hf.create_dataset("physics_data/{}/position".format(bid), data=position)
+            hf.create_dataset("physics_data/{}/orientation".format(bid), data=np.tile([0, 0, 0, 1.0], (num_frames, 1)))
+            hf.create_dataset("physics_data/{}/joint_state".format(bid), data=np.zeros((num_frames, bid % 3)))
+
+        # Two goals, the second one is satisfied halfway through the demo
+        satisfied = np.zeros((num_frames, 2))
+        satisfied[:, 0] = 1
+        satisfied[num_frames // 2 :, 1] = 1
+        hf.create_dataset("goal_status/satisfied", data=satisfied)
+        hf.create_dataset("goal_status/unsatisfied", data=1 - satisfied)
+        hf.create_dataset("agent_actions/vr_robot", data=np.zeros((num_frames, 28)))
+
+        hf.attrs["/metadata/atus_activity"] = "cleaning"
+        hf.attrs["/metadata/activity_definition"] = 0
+        hf.attrs["/metadata/scene_id"] = "Rs_int"
+        hf.attrs["/metadata/obj_body_id_to_name"] = dump_config({2: "agent.n.01_1", 5: "bowl.n.01_1"})
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "ipc"])
+def test_ingest_and_query(tmp_path, file_format):
+    log_dir = tmp_path / "logs"
+    out_root = str(tmp_path / "export")
+    os.makedirs(str(log_dir))
+    log_paths = [str(log_dir / "demo_a.hdf5"), str(log_dir / "demo_b.hdf5")]
+    create_task_log(log_paths[0], 10, 0.1)
+    create_task_log(log_paths[1], 20, 0.5)
+
+    demo_a, demo_b = [get_demo_name(log_path) for log_path in log_paths]
+    assert demo_a.startswith("demo_a_")
+    assert ingest_logs(log_paths, out_root, file_format=file_format, log_status=False) == [demo_a, demo_b]
+    # Unchanged logs are not ingested again
+    assert ingest_logs(log_paths, out_root, file_format=file_format, log_status=False) == []
+
+    physics = load_table(out_root, "physics", demos=[demo_b], file_format=file_format)
+    assert physics.num_rows == 40
+    assert set(physics.column("body_id").to_pylist()) == {2, 5}
+
+    distances = compute_body_distances(out_root, file_format=file_format)
+    assert distances[(demo_a, 2)] == pytest.approx(0.9)
+    assert distances[(demo_a, 5)] == pytest.approx(0)
+    # Displacements are clipped to 0.2 per frame
+    assert distances[(demo_b, 2)] == pytest.approx(19 * 0.2)
+
+    agent_distances = compute_agent_distances(out_root, file_format=file_format)
+    assert agent_distances == pytest.approx({demo_a: 0.9, demo_b: 3.8})
+
+    progress = compute_goal_progress(out_root, file_format=file_format)
+    assert progress[demo_a] == {"num_goals_satisfied": 2, "num_goals": 2, "completion_frame": 5}
+    assert progress[demo_b]["completion_frame"] == 10
+
+
+def test_ingest_logs_with_same_file_name(tmp_path):
+    # Logs of different sessions often share a file name, they are exported as different demos
+    log_paths = []
+    for session, agent_step in [("session_1", 0.1), ("session_2", 0.05)]:
+        os.makedirs(str(tmp_path / session))
+        log_paths.append(str(tmp_path / session / "demo.hdf5"))
+        create_task_log(log_paths[-1], 10, agent_step)
+    out_root = str(tmp_path / "export")
+
+    demos = ingest_logs(log_paths, out_root, log_status=False)
+    assert len(set(demos)) == 2
+    assert ingest_logs(log_paths, out_root, log_status=False) == []
+    sources = {row["demo"]: row["source_path"] for row in load_table(out_root, "demos").to_pylist()}
+    assert sources == {demo: os.path.abspath(log_path) for demo, log_path in zip(demos, log_paths)}
+    assert compute_agent_distances(out_root) == pytest.approx({demos[0]: 0.9, demos[1]: 0.45})
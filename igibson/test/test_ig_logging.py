@@ -0,0 +1,77 @@
+import h5py
+import numpy as np
+import pybullet as p
+
+from igibson.external.pybullet_tools.utils import clear_body_metadata
+from igibson.utils.ig_logging import IGLogReader
+
+
+def create_log(log_path, num_frames):
+    with h5py.File(log_path, "w") as hf:
+        frame_data = np.zeros((num_frames, 4))
+        frame_data[:, 0] = np.arange(num_frames)
+        hf.create_dataset("frame_data", data=frame_data, maxshape=(None, 4), chunks=(16, 4))
+        hf.create_dataset(
+            "physics_data/3/position", data=np.arange(num_frames * 3, dtype=np.float64).reshape(num_frames, 3)
+        )
+        hf.create_dataset("action/vr_hand/constraint", data=np.arange(num_frames, dtype=np.float64).reshape(-1, 1))
+
+
+def test_reader_sequential_and_seek(tmp_path):
+    log_path = str(tmp_path / "log.hdf5")
+    num_frames = 50
+    create_log(log_path, num_frames)
+
+    p.connect(p.DIRECT)
+    try:
+        for prefetch in [True, False]:
+            reader = IGLogReader(log_path, log_status=False, prefetch=prefetch)
+            assert reader.cache.block_size == 16
+
+            frames = []
+            while reader.get_data_left_to_read():
+                assert reader.read_value("frame_data")[0] == reader.frame_counter
+                assert reader.read_action("vr_hand/constraint")[0] == reader.frame_counter
+                frames.append(reader.frame_counter)
+            assert frames == list(range(num_frames))
+
+            reader.seek(37)
+            assert np.array_equal(reader.read_value("physics_data/3/position"), [111, 112, 113])
+            assert np.array_equal(
+                reader.read_value_range("physics_data/3/position", 10, 40)[:, 0], np.arange(10, 40) * 3
+            )
+            assert np.array_equal(reader.read_action_range("vr_hand/constraint", 45, 100)[:, 0], np.arange(45, 50))
+            reader.end_log_session()
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+def test_reader_set_physics_data(tmp_path):
+    log_path = str(tmp_path / "log.hdf5")
+    num_frames = 20
+
+    p.connect(p.DIRECT)
+    try:
+        collision_id = p.createCollisionShape(p.GEOM_BOX, halfExtents=[0.1, 0.1, 0.1])
+        bid = p.createMultiBody(baseMass=1, baseCollisionShapeIndex=collision_id)
+
+        create_log(log_path, num_frames)
+        positions = np.stack([np.arange(num_frames), np.zeros(num_frames), np.ones(num_frames)], axis=1)
+        orientations = np.tile([0, 0, 0, 1.0], (num_frames, 1))
+        with h5py.File(log_path, "a") as hf:
+            hf.create_dataset("physics_data/{}/position".format(bid), data=positions)
+            hf.create_dataset("physics_data/{}/orientation".format(bid), data=orientations)
+            hf.create_dataset("physics_data/{}/joint_state".format(bid), data=np.zeros((num_frames, 0)))
+
+        reader = IGLogReader(log_path, log_status=False)
+        assert reader.physics_data_bids == [bid]
+        reader.seek(7)
+        reader.set_physics_data()
+        pos, orn = p.getBasePositionAndOrientation(bid)
+        assert np.allclose(pos, [7, 0, 1])
+        assert np.allclose(orn, [0, 0, 0, 1])
+        reader.end_log_session()
+    finally:
+        clear_body_metadata()
+        p.disconnect()
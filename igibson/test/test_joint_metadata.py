@@ -0,0 +1,103 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+import pytest
+
+from igibson.external.pybullet_tools.utils import (
+    clear_body_metadata,
+    get_joint_info,
+    get_num_joints,
+    joint_from_name,
+    link_from_name,
+    remove_body,
+)
+from igibson.utils.joint_utils import BodyJointMetadata
+
+
+def test_joint_metadata_matches_pybullet():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        robot = p.loadURDF("r2d2.urdf", [0, 0, 1], useFixedBase=True)
+        metadata = BodyJointMetadata(robot)
+
+        assert metadata.num_joints == p.getNumJoints(robot)
+        for joint_id in range(metadata.num_joints):
+            info = p.getJointInfo(robot, joint_id)
+            assert metadata.joint_names[joint_id] == info[1].decode("utf-8")
+            assert metadata.joint_types[joint_id] == info[2]
+            assert metadata.joint_lower_limits[joint_id] == info[8]
+            assert metadata.joint_upper_limits[joint_id] == info[9]
+            assert metadata.parent_indices[joint_id] == info[16]
+            assert metadata.get_link_name(joint_id) == info[12].decode("utf-8")
+        assert metadata.get_link_name(-1) == p.getBodyInfo(robot)[0].decode("utf-8")
+
+        movable = metadata.joint_ids[metadata.get_movable_joint_mask()]
+        assert len(movable) > 0
+        assert np.array_equal(metadata.get_joint_ids([metadata.joint_names[j] for j in movable]), movable)
+
+        for joint_id in movable:
+            p.resetJointState(robot, int(joint_id), 0.1 * joint_id)
+        assert np.allclose(metadata.get_joint_positions(movable), 0.1 * movable)
+        assert len(metadata.get_joint_positions([])) == 0
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+def test_body_metadata_cache_is_cleared_on_removal():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        robot = p.loadURDF("r2d2.urdf", [0, 0, 1])
+        assert get_num_joints(robot) == p.getNumJoints(robot)
+        for joint in range(p.getNumJoints(robot)):
+            info = p.getJointInfo(robot, joint)
+            assert tuple(get_joint_info(robot, joint)) == info
+            assert link_from_name(robot, info[12].decode("utf-8")) == joint
+            assert joint_from_name(robot, info[1].decode("utf-8")) == joint
+        assert link_from_name(robot, p.getBodyInfo(robot)[0].decode("utf-8")) == -1
+        with pytest.raises(ValueError):
+            link_from_name(robot, "no_such_link")
+
+        # Pybullet reuses the id of a removed body, so its metadata must not outlive it.
+        remove_body(robot)
+        cube = p.loadURDF("cube_small.urdf")
+        assert cube == robot
+        assert get_num_joints(cube) == p.getNumJoints(cube) == 0
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+def test_body_metadata_cache_detects_reused_ids():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        robot = p.loadURDF("r2d2.urdf", [0, 0, 1])
+        assert get_num_joints(robot) == p.getNumJoints(robot) > 0
+
+        # Raw pybullet calls reuse the ids without clearing the cache.
+        p.removeBody(robot)
+        cube = p.loadURDF("cube_small.urdf")
+        assert cube == robot
+        assert get_num_joints(cube) == 0
+        p.resetSimulation()
+        robot = p.loadURDF("r2d2.urdf", [0, 0, 1])
+        assert robot == cube
+        link_name = p.getJointInfo(robot, 1)[12].decode("utf-8")
+        assert link_from_name(robot, link_name) == 1
+    finally:
+        p.disconnect()
+
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        cube = p.loadURDF("cube_small.urdf")
+        assert cube == robot
+        assert get_num_joints(cube) == 0
+        with pytest.raises(ValueError):
+            link_from_name(cube, link_name)
+    finally:
+        clear_body_metadata()
+        p.disconnect()
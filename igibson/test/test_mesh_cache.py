@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+
+from igibson.render.mesh_renderer.mesh_cache import (
+    MeshCache,
+    MeshData,
+    MeshMaterial,
+    MeshShape,
+    compute_vertex_data,
+    merge_vertex_data,
+)
+
+# A textured quad made of two triangles, with (vertex, normal, texcoord) indices per corner
+VERTEX_POSITION = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 1.0, 0.0], [0.0, 1.0, 0.0]])
+VERTEX_NORMAL = np.array([[0.0, 0.0, 1.0]])
+VERTEX_TEXCOORD = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+INDICES = np.array([[0, 0, 0], [1, 0, 1], [2, 0, 2], [0, 0, 0], [2, 0, 2], [3, 0, 3]])
+
+
+def make_reader(calls, scale, transform_orn=None, transform_pos=None):
+    def read_mesh():
+        calls.append(1)
+        vertex_data = compute_vertex_data(
+            VERTEX_POSITION, VERTEX_NORMAL, VERTEX_TEXCOORD, INDICES, scale, transform_orn, transform_pos
+        )
+        return MeshData(
+            [MeshMaterial([0.5, 0.5, 0.5], "diffuse.png", "", "", "")],
+            [
+                MeshShape("quad", 0, vertex_data, INDICES[:, 0].copy()),
+                MeshShape("empty", None, vertex_data[:0], INDICES[:0, 0].copy()),
+            ],
+        )
+
+    return read_mesh
+
+
+def test_compute_vertex_data():
+    vertex_data = compute_vertex_data(
+        VERTEX_POSITION, VERTEX_NORMAL, VERTEX_TEXCOORD, INDICES, [2, 1, -1], [0, 0, 0, 1], [0, 0, 1]
+    )
+    assert vertex_data.shape == (6, 14) and vertex_data.dtype == np.float32
+    assert np.allclose(vertex_data[:, 0:3], VERTEX_POSITION[INDICES[:, 0]] * [2, 1, -1] + [0, 0, 1])
+    # Normals are flipped along the axes with a negative scale
+    assert np.allclose(vertex_data[:, 3:6], [0, 0, -1])
+    assert np.allclose(vertex_data[:, 6:8], VERTEX_TEXCOORD[INDICES[:, 2]])
+    assert np.allclose(vertex_data[:, 8:11], [2, 0, 0])
+    assert np.allclose(vertex_data[:, 11:14], [0, 1, 0])
+
+
+@pytest.mark.parametrize("obj_name", ["quad.obj", "encrypted.obj"])
+def test_mesh_cache(tmp_path, obj_name):
+    obj_path = str(tmp_path / obj_name)
+    with open(obj_path, "w") as f:
+        f.write("# quad\n")
+    cache_dir = str(tmp_path / "cache")
+    scale = np.array([1.0, 2.0, 3.0])
+
+    calls = []
+    cache = MeshCache(cache_dir)
+    mesh_data = cache.load(obj_path, make_reader(calls, scale), scale)
+    assert len(calls) == 1
+    assert not mesh_data.shapes[0].vertex_data.flags.writeable
+
+    # Identical loads share the same vertex data
+    assert cache.load(obj_path, make_reader(calls, scale), scale.tolist()) is mesh_data
+    assert len(calls) == 1
+    # Different loading parameters do not
+    cache.load(obj_path, make_reader(calls, scale, transform_pos=[0, 0, 1]), scale, transform_pos=[0, 0, 1])
+    assert len(calls) == 2
+
+    # Another process reads the vertex data from disk, unless the mesh is encrypted
+    calls = []
+    mesh_data_from_disk = MeshCache(cache_dir).load(obj_path, make_reader(calls, scale), scale)
+    if obj_name == "encrypted.obj":
+        assert len(calls) == 1
+        assert not os.path.isdir(cache_dir)
+        return
+    assert len(calls) == 0
+    assert mesh_data_from_disk.materials == mesh_data.materials
+    assert isinstance(mesh_data_from_disk.shapes[0].vertex_data, np.memmap)
+    for shape, shape_from_disk in zip(mesh_data.shapes, mesh_data_from_disk.shapes):
+        assert (shape_from_disk.name, shape_from_disk.material_id) == (shape.name, shape.material_id)
+        assert np.array_equal(shape_from_disk.vertex_data, shape.vertex_data)
+        assert np.array_equal(shape_from_disk.vertex_indices, shape.vertex_indices)
+
+    # Editing the mesh invalidates its cache entry
+    with open(obj_path, "a") as f:
+        f.write("# edited\n")
+    MeshCache(cache_dir).load(obj_path, make_reader(calls, scale), scale)
+    assert len(calls) == 1
+
+
+def test_merge_vertex_data():
+    calls = []
+    shared = make_reader(calls, [1, 1, 1])().shapes[0].vertex_data
+    other = make_reader(calls, [2, 2, 2])().shapes[0].vertex_data
+    faces = np.arange(6).reshape((2, 3))
+
+    merged, offset_faces = merge_vertex_data([shared, other, shared], [faces, faces, faces])
+    assert np.array_equal(merged, np.concatenate([shared, other]))
+    assert [f.min() for f in offset_faces] == [0, 6, 0]
+    for vertex_data, shape_faces in zip([shared, other, shared], offset_faces):
+        assert np.array_equal(merged[shape_faces], vertex_data[faces])
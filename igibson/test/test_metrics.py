@@ -0,0 +1,190 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson.external.pybullet_tools.utils import clear_body_metadata
+from igibson.metrics.agent import BehaviorRobotMetric
+from igibson.metrics.disarrangement import KinematicDisarrangement, LogicalDisarrangement, get_object_joint_positions
+from igibson.metrics.metric_base import TimestepBuffer
+from igibson.object_states import Inside
+from igibson.object_states.object_state_base import BooleanState, RelativeObjectState
+from igibson.utils.joint_utils import BodyJointMetadata
+
+
+def test_timestep_buffer_growth():
+    buffer = TimestepBuffer((2,), capacity=4)
+    for i in range(10):
+        buffer.append([i, -i])
+    assert len(buffer) == 10
+    assert len(buffer.data) == 16
+    assert buffer.view()[:, 0].tolist() == list(range(10))
+    assert buffer.tolist()[3] == [3, -3]
+
+
+def test_behavior_robot_metric_records_one_reset_row_per_step():
+    class FakePart(object):
+        movement_cid = None
+        local_pos = np.zeros(3)
+        body_id = 0
+        object_in_hand = None
+
+    class FakeSnapshot(object):
+        part_positions = {part: np.zeros(3) for part in BehaviorRobotMetric.parts}
+
+    class FakeRobot(object):
+        parts = {part: FakePart() for part in BehaviorRobotMetric.parts}
+        action = np.zeros(28)
+
+        def get_state_snapshot(self):
+            return FakeSnapshot()
+
+    class FakeContactCache(object):
+        def in_contact(self, body_id):
+            return False
+
+    class FakeSimulator(object):
+        robots = [FakeRobot()]
+        contact_cache = FakeContactCache()
+
+    class FakeActivity(object):
+        simulator = FakeSimulator()
+
+    metric = BehaviorRobotMetric()
+    robot = FakeSimulator.robots[0]
+    # No reset, left hand, right hand, then both hands reset in the same step
+    for left_reset, right_reset in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        robot.action[19] = left_reset
+        robot.action[27] = right_reset
+        metric.step_callback(FakeActivity, None)
+
+    reset = metric.gather_results()["reset"]["timestep"]
+    assert reset == {
+        "left_hand": [False, True, False, True],
+        "right_hand": [False, False, True, True],
+        "body": [False, True, True, True],
+    }
+    assert len(metric.agent_pos) == len(metric.agent_reset) == 4
+
+
+def test_kinematic_disarrangement_split_objects():
+    # Object 0 stays whole and moves 1m, object 1 gets split into two halves
+    prev_poses = np.zeros((2, 2, 7))
+    cur_poses = np.zeros((2, 2, 7))
+    cur_poses[0, :, 0] = 1
+    cur_poses[1, 0, 1] = 2
+    cur_poses[1, 1, 2] = 3
+    disarrangement = KinematicDisarrangement.calculate_disarrangement(
+        prev_poses, np.array([0, 0]), cur_poses, np.array([0, 1])
+    )
+    assert np.allclose(disarrangement, [[1, 0, 0], [0, 2, 3]])
+
+    # Object 2 was already split and did not move
+    cur_poses = np.concatenate([cur_poses, np.zeros((1, 2, 7))])
+    static = LogicalDisarrangement.get_static_objects(
+        ["a", "b", "c"], np.zeros((3, 2, 7)), np.array([0, 0, 1]), cur_poses, np.array([0, 1, 1])
+    )
+    assert static == {"c"}
+
+
+def test_static_objects_include_joint_positions():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+
+        class FakeObject(object):
+            pass
+
+        cabinet = FakeObject()
+        cabinet.joint_metadata = [BodyJointMetadata(p.loadURDF("kuka_iiwa/model.urdf"))]
+        apple = FakeObject()
+        objects = [cabinet, apple]
+        poses = np.zeros((2, 2, 7))
+        active = np.zeros(2, dtype=int)
+
+        prev_joint_positions = get_object_joint_positions(objects)
+        assert [len(joint_positions) for joint_positions in prev_joint_positions] == [7, 0]
+        static = LogicalDisarrangement.get_static_objects(
+            ["cabinet", "apple"],
+            poses,
+            active,
+            poses,
+            active,
+            prev_joint_positions,
+            get_object_joint_positions(objects),
+        )
+        assert static == {"cabinet", "apple"}
+
+        # Opening the cabinet does not move its base, but it is not static anymore
+        p.resetJointState(cabinet.joint_metadata[0].body_id, 2, 0.5)
+        static = LogicalDisarrangement.get_static_objects(
+            ["cabinet", "apple"],
+            poses,
+            active,
+            poses,
+            active,
+            prev_joint_positions,
+            get_object_joint_positions(objects),
+        )
+        assert static == {"apple"}
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+class CountingInside(RelativeObjectState, BooleanState):
+    """Inside state whose values are given by the test, counting how many of them are evaluated."""
+
+    def __init__(self, obj, values, num_evaluations):
+        super(CountingInside, self).__init__(obj)
+        self.values = values
+        self.num_evaluations = num_evaluations
+
+    def _get_value(self, other):
+        self.num_evaluations[0] += 1
+        return self.values.get((self.obj.name, other.name), False)
+
+    def _set_value(self, other, new_value):
+        raise NotImplementedError()
+
+    def _dump(self):
+        return None
+
+    def load(self, data):
+        pass
+
+
+def test_logical_state_cache_reuses_static_objects():
+    values = {("apple", "bowl"): True}
+    num_evaluations = [0]
+
+    class FakeObject(object):
+        def __init__(self, name):
+            self.name = name
+            self.category = name
+            self.states = {Inside: CountingInside(self, values, num_evaluations)}
+            self.states[Inside].initialize(None)
+
+    class Scene(object):
+        objects_by_name = {name: FakeObject(name) for name in ["apple", "bowl", "table"]}
+        room_ins_name_to_ins_id = {}
+
+    class Task(object):
+        scene = Scene()
+
+    metric = LogicalDisarrangement()
+    initial_cache = metric.create_object_logical_state_cache(Task)
+    assert num_evaluations[0] == 6
+    assert initial_cache["apple"]["base_states"][Inside] == {"bowl": True, "table": False}
+
+    # Only the states involving the table, which moved, are evaluated again
+    values[("apple", "bowl")] = False
+    values[("bowl", "table")] = True
+    cache = metric.create_object_logical_state_cache(Task, initial_cache, {"apple", "bowl"})
+    assert num_evaluations[0] == 6 + 4
+    assert cache["apple"]["base_states"][Inside] == {"bowl": True, "table": False}
+    assert cache["bowl"]["base_states"][Inside] == {"apple": False, "table": True}
+
+    # Without static objects, every state is evaluated again
+    cache = metric.create_object_logical_state_cache(Task, initial_cache, set())
+    assert num_evaluations[0] == 6 + 4 + 6
+    assert cache["apple"]["base_states"][Inside] == {"bowl": False, "table": False}
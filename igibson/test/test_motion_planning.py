@@ -50,4 +50,5 @@ def test_base_planning():
     motion_planner.dry_run_base_plan(plan)
 
     assert len(plan) > 0
+    motion_planner.close()
     nav_env.clean()
@@ -0,0 +1,78 @@
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson.external.pybullet_tools.utils import clear_body_metadata, get_sample_fn
+from igibson.utils.motion_planning_ik import IKService
+
+
+class KukaRobot(object):
+    def __init__(self):
+        self.physics_model_dir = pybullet_data.getDataPath()
+        self.model_file = "kuka_iiwa/model.urdf"
+        self.scale = 1
+        self.robot_ids = (p.loadURDF(self.model_file, useFixedBase=True),)
+
+    def end_effector_part_index(self):
+        return 6
+
+
+def test_ik_service_uses_clone_and_warm_starts():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        robot = KukaRobot()
+        robot_id = robot.robot_ids[0]
+        joints = list(range(7))
+        p.resetBasePositionAndOrientation(robot_id, [1, 0, 0], [0, 0, 0, 1])
+        ik_service = IKService(robot, joints, slice(0, 7), threshold=0.01)
+        ik_parameters = ([3] * 7, [-3] * 7, [0] * 7, [6] * 7, [0.1] * 7)
+        sample_fn = get_sample_fn(robot_id, joints)
+        initial_positions = [state[0] for state in p.getJointStates(robot_id, joints)]
+
+        np.random.seed(0)
+        target = [1.4, 0.2, 0.6]
+        solution = ik_service.solve(target, ik_parameters, sample_fn)
+        assert solution is not None
+        # The live robot is untouched
+        assert [state[0] for state in p.getJointStates(robot_id, joints)] == initial_positions
+        for joint, position in zip(joints, solution):
+            p.resetJointState(robot_id, joint, position)
+        assert np.linalg.norm(np.array(p.getLinkState(robot_id, 6, computeForwardKinematics=True)[4]) - target) < 0.01
+
+        # A nearby target is solved from the cached solution in the first round
+        assert ik_service.solve([1.42, 0.2, 0.6], ik_parameters, sample_fn) is not None
+        assert ik_service.get_statistics()["last_query_attempts"] <= ik_service.round_size
+
+        # Solutions rejected by the validity check are skipped
+        assert ik_service.solve(target, ik_parameters, sample_fn, is_valid_fn=lambda q: False) is None
+        statistics = ik_service.get_statistics()
+        assert statistics["num_queries"] == 3
+        assert np.isclose(statistics["success_rate"], 2 / 3.0)
+        ik_service.disconnect()
+    finally:
+        clear_body_metadata()
+        p.disconnect()
+
+
+def test_ik_service_releases_clone_client():
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        robot = KukaRobot()
+        with IKService(robot, list(range(7)), slice(0, 7)) as ik_service:
+            client = ik_service.client
+            assert p.isConnected(physicsClientId=client)
+        assert not p.isConnected(physicsClientId=client)
+        assert ik_service.client is None
+        # Disconnecting again is a no-op
+        ik_service.disconnect()
+
+        # A service that is never disconnected releases its client when it is garbage collected
+        ik_service = IKService(robot, list(range(7)), slice(0, 7))
+        client = ik_service.client
+        del ik_service
+        assert not p.isConnected(physicsClientId=client)
+    finally:
+        clear_body_metadata()
+        p.disconnect()
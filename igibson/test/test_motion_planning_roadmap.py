@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pybullet as p
+import pybullet_data
+
+from igibson.external.pybullet_tools.utils import (
+    clear_body_metadata,
+    get_collision_fn,
+    get_distance_fn,
+    get_extend_fn,
+    get_link_aabb_arrays,
+    get_sample_fn,
+    set_joint_positions,
+)
+from igibson.utils.motion_planning_roadmap import RoadmapService
+
+
+def test_roadmap_persistence_and_invalidation(tmp_path):
+    p.connect(p.DIRECT)
+    try:
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        body = p.loadURDF("kuka_iiwa/model.urdf", useFixedBase=True)
+        obstacle = p.loadURDF("cube_small.urdf", basePosition=[0.5, 0, 0.5], globalScaling=4)
+        joints = list(range(p.getNumJoints(body)))
+        links = [(body, link) for link in joints]
+
+        def aabb_fn(confs):
+            lowers, uppers = [], []
+            for q in confs:
+                set_joint_positions(body, joints, q)
+                link_lowers, link_uppers = get_link_aabb_arrays(links)
+                lowers.append(link_lowers.min(axis=0))
+                uppers.append(link_uppers.max(axis=0))
+            return np.array([np.min(lowers, axis=0), np.max(uppers, axis=0)])
+
+        def plan(service, start_conf, end_conf):
+            collision_fn = get_collision_fn(body, joints, [obstacle], [], True, set())
+            path = service.plan(
+                ("test_scene", "kuka", "arm"),
+                start_conf,
+                end_conf,
+                get_sample_fn(body, joints),
+                get_distance_fn(body, joints),
+                get_extend_fn(body, joints),
+                collision_fn,
+                aabb_fn=aabb_fn,
+                obstacle_ids=[obstacle],
+            )
+            assert path is not None
+            assert not any(collision_fn(q) for q in path)
+            return path
+
+        np.random.seed(0)
+        # The obstacle blocks the direct path, so the paths go through the roadmap
+        start_conf = (-1.0, 1.2, 0, 0.5, 0, 0, 0)
+        end_conf = (1.0, 1.2, 0, 0.5, 0, 0, 0)
+        service = RoadmapService(roadmap_dir=str(tmp_path), num_samples=200)
+        plan(service, start_conf, end_conf)
+        plan(service, end_conf, start_conf)
+        roadmap = service.get_roadmap(("test_scene", "kuka", "arm"), None)
+        num_checked = len(roadmap.colliding_vertices) + len(roadmap.colliding_edges)
+        assert num_checked > 0
+        # The start and goal configurations of the queries are not kept in the roadmap
+        assert len(roadmap) == 200
+        assert all(v < 200 for edge in roadmap.colliding_edges for v in edge)
+        assert all(v < 200 for v in roadmap.colliding_vertices)
+        service.save_roadmaps()
+
+        # A new service loads the roadmap, including its collision results, from disk
+        service = RoadmapService(roadmap_dir=str(tmp_path))
+        loaded_roadmap = service.get_roadmap(("test_scene", "kuka", "arm"), None)
+        assert len(loaded_roadmap) == len(roadmap)
+        assert loaded_roadmap.colliding_edges == roadmap.colliding_edges
+
+        # Moving the obstacle only invalidates the results near its old and new positions
+        confs = [start_conf, end_conf, (0, -1.2, 0, -0.5, 0, 0, 0), (2.0, 0.6, 0, 0.5, 0, 0, 0)]
+        for conf1, conf2 in itertools.permutations(confs, 2):
+            plan(service, conf1, conf2)
+        num_checked = len(loaded_roadmap.vertex_aabbs) + len(loaded_roadmap.edge_aabbs)
+        p.resetBasePositionAndOrientation(obstacle, [0, 0.5, 0.3], [0, 0, 0, 1])
+        num_invalidated = service.update_obstacles(
+            ("test_scene", "kuka", "arm"), {obstacle: np.array(p.getAABB(obstacle))}
+        )
+        assert 0 < num_invalidated < num_checked
+    finally:
+        clear_body_metadata()
+        p.disconnect()
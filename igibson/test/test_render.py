@@ -114,6 +114,26 @@ def test_render_rendering_cleaning():
         GPUtil.showUtilization()
 
 
+def test_render_visual_object_sharing():
+    download_assets()
+    test_dir = os.path.join(igibson.assets_path, "test")
+    obj_path = os.path.join(test_dir, "mesh/bed1a77d92d64f5cbbaaae4feed64ec1_new.obj")
+
+    renderer = MeshRenderer(width=800, height=600)
+    bed = renderer.load_visual_object(obj_path, input_kd=[0.5, 0.5, 0.5])
+    assert renderer.load_visual_object(obj_path, input_kd=[0.5, 0.5, 0.5]) == bed
+    assert renderer.load_visual_object(obj_path, input_kd=[1, 0, 0]) != bed
+    assert renderer.load_visual_object(obj_path, input_kd=[0.5, 0.5, 0.5], shared=False) != bed
+    renderer.add_instance(bed)
+    renderer.add_instance(bed)
+
+    usage = renderer.get_memory_usage()
+    assert usage["visual_objects"] == 3 and usage["instances"] == 2
+    # The mesh cache shares the vertex data of the three visual objects
+    assert usage["vertex_bytes"] == usage["reused_vertex_bytes"] > 0
+    renderer.release()
+
+
 """
 def test_tensor_render_rendering():
     w = 800
@@ -0,0 +1,97 @@
+import numpy as np
+import pybullet as p
+
+from igibson.external.pybullet_tools.utils import clear_body_metadata
+from igibson.robots.robot_locomotor import LocomotorRobot
+
+ARM_URDF = """<?xml version="1.0"?>
+<robot name="arm">
+  <link name="base_link">
+    <inertial><mass value="1"/><inertia ixx="0.01" ixy="0" ixz="0" iyy="0.01" iyz="0" izz="0.01"/></inertial>
+    <collision><geometry><box size="0.2 0.2 0.2"/></geometry></collision>
+  </link>
+  <link name="link_1">
+    <inertial><mass value="0.5"/><inertia ixx="0.01" ixy="0" ixz="0" iyy="0.01" iyz="0" izz="0.01"/></inertial>
+  </link>
+  <link name="link_2">
+    <inertial><mass value="0.5"/><inertia ixx="0.01" ixy="0" ixz="0" iyy="0.01" iyz="0" izz="0.01"/></inertial>
+  </link>
+  <link name="link_3">
+    <inertial><mass value="0.2"/><inertia ixx="0.01" ixy="0" ixz="0" iyy="0.01" iyz="0" izz="0.01"/></inertial>
+  </link>
+  <link name="eyes"/>
+  <joint name="joint_1" type="revolute">
+    <parent link="base_link"/><child link="link_1"/><origin xyz="0 0 0.2"/><axis xyz="0 1 0"/>
+    <limit lower="-1.5" upper="1.5" effort="20" velocity="2"/>
+  </joint>
+  <joint name="joint_2" type="continuous">
+    <parent link="link_1"/><child link="link_2"/><origin xyz="0 0 0.3"/><axis xyz="1 0 0"/>
+  </joint>
+  <joint name="joint_3" type="prismatic">
+    <parent link="link_2"/><child link="link_3"/><origin xyz="0 0 0.3"/><axis xyz="0 0 1"/>
+    <limit lower="0" upper="0.2" effort="50" velocity="0.5"/>
+  </joint>
+  <joint name="eyes_joint" type="fixed">
+    <parent link="base_link"/><child link="eyes"/><origin xyz="0.1 0 0.1"/>
+  </joint>
+</robot>
+"""
+
+
+class ArmRobot(LocomotorRobot):
+    def __init__(self, model_file, control):
+        LocomotorRobot.__init__(self, model_file, action_dim=3, control=control, is_discrete=False)
+
+    def set_up_continuous_action_space(self):
+        self.action_high = np.ones(self.action_dim)
+        self.action_low = -self.action_high
+
+
+def load_robot(model_file, control, position):
+    robot = ArmRobot(model_file, control)
+    robot.load()
+    p.resetBasePositionAndOrientation(robot.get_body_id(), position, [0, 0, 0, 1])
+    p.createConstraint(robot.get_body_id(), -1, -1, -1, p.JOINT_FIXED, [0, 0, 0], [0, 0, 0], position)
+    return robot
+
+
+def test_batched_joint_states(tmp_path):
+    model_file = str(tmp_path / "arm.urdf")
+    with open(model_file, "w") as f:
+        f.write(ARM_URDF)
+
+    p.connect(p.DIRECT)
+    try:
+        for control in ["torque", "velocity", "position", ("velocity", "torque", "position")]:
+            p.resetSimulation()
+            p.setGravity(0, 0, -9.8)
+            batched = load_robot(model_file, control, [0, 0, 0])
+            reference = load_robot(model_file, control, [5, 0, 0])
+            assert list(batched.ordered_joint_ids) == [0, 1, 2]
+            assert list(batched.joint_has_limits) == [True, False, True]
+
+            np.random.seed(0)
+            for _ in range(20):
+                action = np.random.uniform(-1, 1, 3)
+                batched.apply_robot_action(action)
+                # Command the reference robot joint by joint
+                controls = [control] * 3 if isinstance(control, str) else control
+                for n, j in enumerate(reference.ordered_joints):
+                    if controls[n] == "torque":
+                        j.set_motor_torque(j.max_torque * float(np.clip(action[n], -1, +1)))
+                    elif controls[n] == "velocity":
+                        j.set_motor_velocity(j.max_velocity * float(np.clip(action[n], -1, +1)))
+                    else:
+                        j.set_motor_position(action[n])
+                p.stepSimulation()
+
+                joint_states = batched.get_joint_states()
+                assert np.allclose(joint_states, [j.get_state() for j in reference.ordered_joints])
+                assert np.allclose(
+                    batched.get_joint_relative_states(joint_states),
+                    [j.get_relative_state() for j in reference.ordered_joints],
+                )
+            assert np.allclose(batched.calc_state()[12:], reference.calc_state()[12:], atol=1e-5)
+    finally:
+        clear_body_metadata()
+        p.disconnect()
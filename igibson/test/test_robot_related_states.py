@@ -0,0 +1,81 @@
+import numpy as np
+
+from igibson.object_states.robot_related_states import InFOVOfRobot
+from igibson.utils.constants import MAX_INSTANCE_COUNT
+
+
+class FakeRenderer(object):
+    """Renders a fixed instance segmentation, in place of a robot camera, and counts the renders."""
+
+    def __init__(self, seg):
+        self.instances = []
+        self.seg = seg
+        self.num_renders = 0
+
+    def render_robot_cameras(self, modes):
+        assert modes == "ins_seg"
+        self.num_renders += 1
+        return [np.repeat(self.seg[:, :, np.newaxis] / float(MAX_INSTANCE_COUNT), 3, axis=2)]
+
+
+class FakeSimulator(object):
+    def __init__(self, seg):
+        self.renderer = FakeRenderer(seg)
+        self.robots = []
+        self.frame_count = 0
+
+
+class FakeInstance(object):
+    def __init__(self, instance_id, body_id):
+        self.id = instance_id
+        self.pybullet_uuid = body_id
+
+
+class FakeObject(object):
+    def __init__(self, instance_id, body_id):
+        self.renderer_instances = [FakeInstance(instance_id, body_id)]
+        self.body_id = body_id
+
+    def get_body_id(self):
+        return self.body_id
+
+
+def make_state(simulator, obj, **kwargs):
+    state = InFOVOfRobot(obj, **kwargs)
+    state.initialize(simulator)
+    return state
+
+
+def test_in_fov_of_robot_shares_segmentation():
+    # Instance 1 covers half of the image, instance 2 a single pixel and instance 3 nothing.
+    seg = np.zeros((10, 10), dtype=int)
+    seg[:5] = 1
+    seg[9, 9] = 2
+    simulator = FakeSimulator(seg)
+    states = [make_state(simulator, FakeObject(instance_id, instance_id)) for instance_id in [1, 2, 3]]
+
+    assert [state.get_value() for state in states] == [True, True, False]
+    assert simulator.renderer.num_renders == 1
+
+    # The segmentation is rendered again in the next frame only.
+    for state in states:
+        state.update()
+    simulator.frame_count += 1
+    assert [state.get_value() for state in states] == [True, True, False]
+    assert simulator.renderer.num_renders == 2
+
+
+def test_in_fov_of_robot_pixel_fraction_threshold():
+    seg = np.zeros((10, 10), dtype=int)
+    seg[:5] = 1
+    seg[9, 9] = 2
+    simulator = FakeSimulator(seg)
+
+    # By default one pixel is enough, a threshold requires a fraction of the image.
+    assert make_state(simulator, FakeObject(1, 1)).get_value()
+    assert make_state(simulator, FakeObject(2, 2)).get_value()
+    assert not make_state(simulator, FakeObject(3, 3)).get_value()
+    assert make_state(simulator, FakeObject(1, 1), pixel_fraction_threshold=0.05).get_value()
+    assert not make_state(simulator, FakeObject(2, 2), pixel_fraction_threshold=0.05).get_value()
+    assert not make_state(simulator, FakeObject(1, 1), pixel_fraction_threshold=0.6).get_value()
+    assert simulator.renderer.num_renders == 1
@@ -0,0 +1,107 @@
+import numpy as np
+
+from igibson.object_states.room_states import InsideRoomTypes
+from igibson.scenes.igibson_indoor_scene import InteractiveIndoorScene
+
+
+def make_scene():
+    # A 10x10 map at 0.5m per pixel, covering [-2.5, 2.5) meters. Kitchen (instance kitchen_0) on the rows y < 0,
+    # bathrooms (instances bathroom_0 and bathroom_1) on the rows y >= 0, split at x = 0, and a boundary row.
+    scene = InteractiveIndoorScene.__new__(InteractiveIndoorScene)
+    scene.seg_map_resolution = 0.5
+    scene.seg_map_size = 10
+    scene.room_sem_map = np.zeros((10, 10), dtype=np.uint8)
+    scene.room_sem_map[:5] = 1
+    scene.room_sem_map[6:] = 2
+    scene.room_ins_map = np.zeros((10, 10), dtype=np.uint8)
+    scene.room_ins_map[:5] = 1
+    scene.room_ins_map[6:, :5] = 2
+    scene.room_ins_map[6:, 5:] = 3
+    scene.room_sem_id_to_sem_name = {1: "kitchen", 2: "bathroom"}
+    scene.room_ins_id_to_ins_name = {1: "kitchen_0", 2: "bathroom_0", 3: "bathroom_1"}
+    scene.objects_by_state = {}
+    return scene
+
+
+def test_room_types_by_points_match_per_point_lookups():
+    scene = make_scene()
+    on_map = np.random.RandomState(0).uniform(-2.5, 2.49, size=(100, 2))
+    room_types = scene.get_room_types_by_points(on_map)
+    room_instances = scene.get_room_instances_by_points(on_map)
+    assert room_types == [scene.get_room_type_by_point(xy) for xy in on_map]
+    assert room_instances == [scene.get_room_instance_by_point(xy) for xy in on_map]
+    assert {"kitchen", "bathroom", None} == set(room_types)
+    assert {"kitchen_0", "bathroom_0", "bathroom_1", None} == set(room_instances)
+
+    # Points off the map have no room, on either side of it.
+    off_map = np.array([[-3.0, 0.0], [0.0, -3.0], [2.5, -1.0], [-1.0, 2.5], [10.0, 10.0]])
+    assert scene.get_room_types_by_points(off_map) == [None] * len(off_map)
+    assert scene.get_room_instances_by_points(off_map) == [None] * len(off_map)
+
+    # A single point is looked up like a batch of one.
+    assert scene.get_room_types_by_points(np.array([1.0, -1.0])) == ["kitchen"]
+
+
+class FakeObject(object):
+    def __init__(self, position):
+        self.position = np.array(position, dtype=float)
+        self.main_body_is_fixed = False
+        self.states = {InsideRoomTypes: InsideRoomTypes(self)}
+
+    def get_position(self):
+        return self.position
+
+
+class FakeSimulator(object):
+    def __init__(self, scene):
+        self.scene = scene
+
+
+def test_room_assignment_only_looks_up_moved_objects():
+    scene = make_scene()
+    lookups = []
+    get_room_types_by_points = scene.get_room_types_by_points
+
+    def counting_get_room_types_by_points(xy):
+        lookups.append(len(np.asarray(xy).reshape(-1, 2)))
+        return get_room_types_by_points(xy)
+
+    scene.get_room_types_by_points = counting_get_room_types_by_points
+    simulator = FakeSimulator(scene)
+    objects = [FakeObject([1.0, -1.0, 0.5]), FakeObject([-1.0, 1.0, 0.5]), FakeObject([1.0, 1.0, 0.5])]
+    scene.objects_by_state[InsideRoomTypes] = objects
+    for obj in objects:
+        obj.states[InsideRoomTypes].initialize(simulator)
+
+    def get_room_types():
+        return [obj.states[InsideRoomTypes].get_value() for obj in objects]
+
+    # The first query assigns all the objects in one lookup, the other queries hit the caches it filled.
+    assert get_room_types() == [["kitchen"], ["bathroom"], ["bathroom"]]
+    assert lookups == [3]
+
+    # After a step, only the object that moved is looked up again.
+    objects[1].position[:2] = [-1.0, -1.0]
+    for obj in objects:
+        obj.states[InsideRoomTypes].update()
+    assert get_room_types() == [["kitchen"], ["kitchen"], ["bathroom"]]
+    assert lookups == [3, 1]
+
+    # Nothing is looked up if nothing moved, and objects that leave the map have no room.
+    for obj in objects:
+        obj.states[InsideRoomTypes].update()
+    assert get_room_types() == [["kitchen"], ["kitchen"], ["bathroom"]]
+    assert lookups == [3, 1]
+    objects[2].position[:2] = [5.0, 5.0]
+    for obj in objects:
+        obj.states[InsideRoomTypes].update()
+    assert get_room_types() == [["kitchen"], ["kitchen"], [None]]
+    assert lookups == [3, 1, 1]
+
+    # A new object changes the object list, so all the objects are looked up again.
+    objects.append(FakeObject([-1.0, 2.0, 0.5]))
+    objects[3].states[InsideRoomTypes].initialize(simulator)
+    for obj in objects:
+        obj.states[InsideRoomTypes].update()
+    assert get_room_types() == [["kitchen"], ["kitchen"], [None], ["bathroom"]]
+    assert lookups == [3, 1, 1, 4]
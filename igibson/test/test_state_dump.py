@@ -0,0 +1,103 @@
+import io
+import json
+
+import numpy as np
+
+from igibson import object_states
+from igibson.objects.multi_object_wrappers import ObjectGrouper, ObjectMultiplexer
+from igibson.objects.stateful_object import StatefulObject
+from igibson.utils.state_dump_utils import (
+    binary_to_json_states,
+    load_internal_states_binary,
+    save_internal_states_binary,
+)
+
+
+class DumpHolder(object):
+    """Holds a dump in place of a real object state, which needs a loaded object."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def dump(self):
+        return self.value
+
+    def load(self, data):
+        self.value = data
+
+
+def make_object(dumps):
+    obj = StatefulObject.__new__(StatefulObject)
+    obj.states = {state_type: DumpHolder(dump) for state_type, dump in dumps.items()}
+    return obj
+
+
+def test_binary_dump_round_trip():
+    sink = make_object(
+        {
+            object_states.Temperature: 25.0,
+            object_states.ToggledOn: {"value": True, "hand_in_marker_steps": 3},
+            object_states.Dusty: {
+                "particles": [None, ("link_1", [1, 2, 3], [0, 0, 0, 1]), (None, [4, 5, 6], [0, 0, 1, 0])]
+            },
+            object_states.Stained: {
+                "particles": {
+                    "dirt_dump": [("link_1", [1, 2, 3], [0, 0, 0, 1]), None],
+                    "random_bbox_dims": [(0.02, 0.02, 0.004), (0.03, 0.03, 0.004)],
+                }
+            },
+            object_states.WaterSource: {
+                "sizes": [(0.02, 0.02, 0.02), (0.016, 0.016, 0.016)],
+                "colors": [(0.61, 0.82, 0.86, 1), (0.5, 0.77, 0.87, 1)],
+                "steps_since_last_drop_step": float("inf"),
+                "particle_poses": [None, ([1, 1, 1], [0, 0, 0, 1])],
+            },
+            object_states.AABB: None,
+        }
+    )
+    apple = make_object({object_states.Temperature: 30.0, object_states.Sliced: False})
+    halves = [make_object({object_states.Temperature: t, object_states.Sliced: True}) for t in [1.0, 2.0]]
+    grouper = ObjectGrouper.__new__(ObjectGrouper)
+    grouper.__dict__["objects"] = halves
+    multiplexer = ObjectMultiplexer.__new__(ObjectMultiplexer)
+    multiplexer.__dict__.update(_multiplexed_objects=[apple, grouper], current_index=1)
+
+    class Scene(object):
+        objects_by_name = {"sink": sink, "apple": multiplexer}
+
+    class Simulator(object):
+        scene = Scene()
+        robots = []
+
+    dump = save_internal_states_binary(Simulator)
+    assert dump["states/Temperature/value"].dtype == np.float64
+    assert dump["states/Dusty/particles.positions"].shape == (3, 3)
+    assert dump["states/WaterSource/colors.rows"].shape == (2, 4)
+    assert "states/AABB/json" not in dump
+
+    # The dump is a flat dict of arrays, so it can be stored with NumPy.
+    f = io.BytesIO()
+    np.savez(f, **dump)
+    f.seek(0)
+    dump = dict(np.load(f))
+
+    json_dump = json.loads(json.dumps(binary_to_json_states(dump)))
+    assert json_dump["objects"]["sink"]["ToggledOn"] == {"value": True, "hand_in_marker_steps": 3}
+    assert json_dump["objects"]["sink"]["Dusty"]["particles"][1] == ["link_1", [1, 2, 3], [0, 0, 0, 1]]
+    assert json_dump["objects"]["apple"]["current_index"] == 1
+    assert json_dump["objects"]["apple"]["sub_states"][1]["Temperature"] == [1.0, 2.0]
+
+    sink.states[object_states.Temperature].value = 100.0
+    sink.states[object_states.Dusty].value = None
+    halves[1].states[object_states.Temperature].value = -5.0
+    multiplexer.current_index = 0
+    load_internal_states_binary(Simulator, dump)
+    assert sink.states[object_states.Temperature].value == 25.0
+    assert sink.states[object_states.Dusty].value["particles"][2] == (None, [4, 5, 6], [0, 0, 1, 0])
+    assert sink.states[object_states.Stained].value["particles"]["random_bbox_dims"][1] == (0.03, 0.03, 0.004)
+    water_dump = sink.states[object_states.WaterSource].value
+    assert water_dump["particle_poses"] == [None, ([1, 1, 1], [0, 0, 0, 1])]
+    assert water_dump["steps_since_last_drop_step"] == float("inf")
+    assert water_dump["colors"][0] == (0.61, 0.82, 0.86, 1)
+    assert halves[1].states[object_states.Temperature].value == 2.0
+    assert multiplexer.current_index == 1
@@ -1,3 +1,4 @@
+import json
 import os
 
 import networkx as nx
@@ -13,6 +14,12 @@ from igibson.objects.ycb_object import YCBObject
 from igibson.scenes.empty_scene import EmptyScene
 from igibson.simulator import Simulator
 from igibson.utils.assets_utils import download_assets, get_ig_model_path
+from igibson.utils.checkpoint_utils import save_internal_states
+from igibson.utils.state_dump_utils import (
+    binary_to_json_states,
+    load_internal_states_binary,
+    save_internal_states_binary,
+)
 
 download_assets()
 
@@ -241,6 +248,40 @@ def test_dirty():
         for i in range(10):
             s.step()
 
+        assert sink.states[object_states.Dusty].set_value(True)
+        dust = sink.states[object_states.Dusty].dirt
+        # Dust particles are kinematic and only exist in the renderer.
+        assert all(particle.body_id is None and particle.renderer_instances for particle in dust.get_active_particles())
+
+        # Particle positions in the frame of the sink, whose links are all fixed to its base.
+        sink_pos, sink_orn = p.getBasePositionAndOrientation(sink.get_body_id())
+        inv_sink_pos, inv_sink_orn = p.invertTransform(sink_pos, sink_orn)
+        local_positions = [
+            p.multiplyTransforms(inv_sink_pos, inv_sink_orn, position, [0, 0, 0, 1])[0]
+            for position in dust.get_active_particle_positions()
+        ]
+
+        sink.set_position_orientation([2, 1, 0.8], quat_from_euler(Euler(yaw=np.pi / 2)))
+        for i in range(10):
+            s.step()
+
+        # The particles follow the sink, and so do their renderer instances.
+        sink_pos, sink_orn = p.getBasePositionAndOrientation(sink.get_body_id())
+        expected_positions = [
+            p.multiplyTransforms(sink_pos, sink_orn, position, [0, 0, 0, 1])[0] for position in local_positions
+        ]
+        positions = dust.get_active_particle_positions()
+        assert np.allclose(positions, expected_positions, atol=1e-4)
+        instance_positions = [
+            particle.renderer_instances[0].pose_trans[:3, 3] for particle in dust.get_active_particles()
+        ]
+        assert np.allclose(instance_positions, expected_positions, atol=1e-4)
+
+        # Resetting to a dump puts the particles back at the dumped poses.
+        dump = dust.dump()
+        dust.reset_to_dump(dump)
+        assert np.allclose(dust.get_active_particle_positions(), positions, atol=1e-4)
+
     finally:
         s.disconnect()
 
@@ -274,3 +315,99 @@ def test_water_source():
         assert sink.states[object_states.WaterSource].water_stream.get_active_particles()[0].body_id is not None
     finally:
         s.disconnect()
+
+
+def test_kinematic_water_source():
+    s = Simulator(mode="headless")
+
+    try:
+        scene = EmptyScene()
+        s.import_scene(scene)
+        model_path = os.path.join(get_ig_model_path("sink", "sink_1"), "sink_1.urdf")
+
+        sink = URDFObject(
+            filename=model_path,
+            category="sink",
+            name="sink_1",
+            scale=np.array([0.8, 0.8, 0.8]),
+            abilities={"waterSource": {"kinematic": True}, "toggleable": {}},
+        )
+
+        s.import_object(sink)
+        sink.states[object_states.ToggledOn].set_value(True)
+        sink.set_position([1, 1, 0.8])
+
+        water_stream = sink.states[object_states.WaterSource].water_stream
+        hit_body_ids = set()
+        for i in range(60):
+            s.step()
+            hit_body_ids |= water_stream.hit_body_ids
+
+        # The drops have no pybullet body and are recycled when they hit something.
+        assert all(particle.body_id is None for particle in water_stream.get_particles())
+        assert hit_body_ids
+        assert water_stream.get_num_stashed() > 0
+    finally:
+        s.disconnect()
+
+
+def assert_dumps_close(dump, expected):
+    if isinstance(expected, dict):
+        assert sorted(dump) == sorted(expected)
+        for key in expected:
+            assert_dumps_close(dump[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(dump) == len(expected)
+        for item, expected_item in zip(dump, expected):
+            assert_dumps_close(item, expected_item)
+    elif isinstance(expected, float):
+        assert np.isclose(dump, expected)
+    else:
+        assert dump == expected
+
+
+def test_binary_dump_particle_states():
+    s = Simulator(mode="headless")
+
+    try:
+        scene = EmptyScene()
+        s.import_scene(scene)
+        model_path = os.path.join(get_ig_model_path("sink", "sink_1"), "sink_1.urdf")
+
+        sink = URDFObject(
+            filename=model_path,
+            category="sink",
+            name="sink_1",
+            scale=np.array([0.8, 0.8, 0.8]),
+            abilities={"dustyable": {}, "stainable": {}, "waterSource": {}, "toggleable": {}},
+        )
+
+        s.import_object(sink)
+        sink.set_position([1, 1, 0.8])
+        scene.objects_by_name = {"sink_1": sink}
+
+        for i in range(10):
+            s.step()
+
+        assert sink.states[object_states.Dusty].set_value(True)
+        assert sink.states[object_states.Stained].set_value(True)
+        sink.states[object_states.ToggledOn].set_value(True)
+        for i in range(10):
+            s.step()
+
+        # The binary dump holds the same data as the JSON one.
+        expected = json.loads(json.dumps(save_internal_states(s)))
+        dump = save_internal_states_binary(s)
+        assert_dumps_close(json.loads(json.dumps(binary_to_json_states(dump))), expected)
+
+        sink.states[object_states.Dusty].set_value(False)
+        sink.states[object_states.Stained].set_value(False)
+        for i in range(10):
+            s.step()
+
+        load_internal_states_binary(s, dump)
+        assert sink.states[object_states.Dusty].get_value()
+        assert sink.states[object_states.Stained].get_value()
+        assert_dumps_close(json.loads(json.dumps(save_internal_states(s))), expected)
+    finally:
+        s.disconnect()
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+
+from igibson.render.mesh_renderer.texture_cache import TextureCache, get_array_texture_bytes
+
+
+def make_decoder(calls):
+    def decode(tex_filename, texture_scale):
+        calls.append((tex_filename, texture_scale))
+        with open(tex_filename, "rb") as f:
+            value = f.read()[0]
+        size = int(8 * texture_scale)
+        return np.full((size, size, 3), value, dtype=np.uint8)
+
+    return decode
+
+
+def write_texture(path, value):
+    with open(path, "wb") as f:
+        f.write(bytes([value]))
+    return str(path)
+
+
+def test_texture_cache_prefetch(tmp_path):
+    tex_a = write_texture(tmp_path / "a.png", 1)
+    tex_b = write_texture(tmp_path / "b.png", 2)
+    calls = []
+    cache = TextureCache(make_decoder(calls), num_workers=2)
+    cache.prefetch([tex_a, tex_b, None, str(tmp_path / "missing.png")], 0.5)
+    cache.prefetch([tex_a], 0.5)
+
+    image = cache.get(tex_a, 0.5)
+    assert image.shape == (4, 4, 3) and np.all(image == 1)
+    assert np.all(cache.get(tex_b, 0.5) == 2)
+    # Textures that were not prefetched with the same scale are decoded on the spot
+    assert cache.get(tex_a).shape == (8, 8, 3)
+    assert sorted(calls) == [(tex_a, 0.5), (tex_a, 1.0), (tex_b, 0.5)]
+    cache.shutdown()
+
+
+def test_texture_cache_disk(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    tex = write_texture(tmp_path / "a.png", 1)
+    calls = []
+    TextureCache(make_decoder(calls), cache_dir, num_workers=0).get(tex)
+
+    # A new cache, as in a new process, memory-maps the texture decoded by the first one
+    cache = TextureCache(make_decoder(calls), cache_dir, num_workers=0)
+    image = cache.get(tex)
+    assert isinstance(image, np.memmap) and np.all(image == 1)
+    assert len(calls) == 1
+
+    # Other texture scales and edited files are decoded again
+    cache.get(tex, 0.5)
+    write_texture(tmp_path / "a.png", 3)
+    os.utime(tex, (0, 0))
+    assert np.all(cache.get(tex) == 3)
+    assert len(calls) == 3
+
+
+def test_texture_cache_encrypted(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    tex = write_texture(tmp_path / "DIFFUSE.encrypted.png", 1)
+    calls = []
+    cache = TextureCache(make_decoder(calls), cache_dir, num_workers=0)
+    cache.get(tex)
+    cache.get(tex)
+    assert len(calls) == 2
+    assert not os.path.exists(cache_dir)
+
+
+def test_get_array_texture_bytes():
+    shapes = [(512, 1024, 3), (1024, 512, 3), (64, 64, 3)]
+    mapping = [[0, 0], [0, 1], [1, 0]]
+    assert get_array_texture_bytes(shapes, mapping, False, 32) == 1024 * 1024 * 2 * 4 + 64 * 64 * 4
+    assert get_array_texture_bytes(shapes, mapping, True, 32) == 1024 * 1024 * 2 * 4 + 32 * 32 * 4
@@ -0,0 +1,39 @@
+import numpy as np
+import pybullet as p
+
+import igibson.utils.transform_utils as T
+
+
+def test_batched_quaternion_ops_match_pybullet():
+    np.random.seed(0)
+    quaternions = np.random.randn(100, 4)
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    positions = np.random.randn(100, 3)
+    points = np.random.randn(100, 3)
+
+    transformed = positions + T.quat_apply(quaternions, points)
+    expected = [
+        p.multiplyTransforms(pos, orn, point, [0, 0, 0, 1])[0]
+        for pos, orn, point in zip(positions, quaternions, points)
+    ]
+    assert np.allclose(transformed, expected, atol=1e-5)
+
+    # A single orientation is broadcast against several points
+    expected = [p.multiplyTransforms([0, 0, 0], quaternions[0], point, [0, 0, 0, 1])[0] for point in points[:5]]
+    assert np.allclose(T.quat_apply(quaternions[0], points[:5]), expected, atol=1e-5)
+
+    assert np.allclose(T.quat2euler(quaternions), [p.getEulerFromQuaternion(q) for q in quaternions])
+
+
+def test_batched_quaternion_composition_matches_pybullet():
+    np.random.seed(0)
+    quaternions = np.random.randn(2, 100, 4)
+    quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+    composed = T.quat_multiply_batch(quaternions[0], quaternions[1])
+    expected = [p.multiplyTransforms([0, 0, 0], q1, [0, 0, 0], q0)[1] for q1, q0 in zip(quaternions[0], quaternions[1])]
+    # q and -q are the same rotation
+    assert np.allclose(np.abs(np.sum(composed * expected, axis=1)), 1, atol=1e-5)
+
+    expected = [np.reshape(p.getMatrixFromQuaternion(q), (3, 3)) for q in quaternions[0]]
+    assert np.allclose(T.quat2mat_batch(quaternions[0]), expected, atol=1e-5)
@@ -0,0 +1,139 @@
+import numpy as np
+import pybullet as p
+
+
+class AABBTable(object):
+    """
+    Table of the axis-aligned bounding boxes of the bodies in the simulator. Body AABBs are rows of a contiguous
+    (num_bodies, 2, 3) array, and the AABBs of the links of each body are kept next to it.
+
+    Bodies are added on their first query. After that, a body is checked at most once per step, and its AABBs are
+    only queried from pybullet again if its base pose or joint positions changed since they were computed. Bodies
+    that are asleep or did not move therefore cost two cheap pybullet calls instead of one call per link.
+
+    Pybullet reuses the ids of removed bodies, so bodies must be removed from the table when they are removed from
+    pybullet, see Simulator.remove_body.
+    """
+
+    def __init__(self):
+        self._body_rows = {}
+        self._row_bodies = []
+        self._aabbs = np.zeros((0, 2, 3))
+        self._checked = np.zeros(0, dtype=bool)
+        self._link_aabbs = []
+        self._signatures = []
+
+    def invalidate(self, body_id=None):
+        """
+        Check the AABBs again at the next query. Called by the simulator once per step.
+
+        :param body_id: only invalidate this body, if not None
+        """
+        if body_id is None:
+            self._checked[:] = False
+        elif body_id in self._body_rows:
+            self._checked[self._body_rows[body_id]] = False
+
+    def _add_body(self, body_id):
+        row = len(self._body_rows)
+        if row == len(self._aabbs):
+            capacity = max(16, 2 * row)
+            aabbs = np.zeros((capacity, 2, 3))
+            aabbs[:row] = self._aabbs
+            checked = np.zeros(capacity, dtype=bool)
+            checked[:row] = self._checked[:row]
+            self._aabbs, self._checked = aabbs, checked
+
+        self._body_rows[body_id] = row
+        self._row_bodies.append(body_id)
+        self._link_aabbs.append(None)
+        self._signatures.append(None)
+        return row
+
+    def remove(self, body_id):
+        """
+        Forget the AABBs of a body, e.g. because it was removed from pybullet and its id may be reused.
+
+        :param body_id: pybullet body id
+        """
+        row = self._body_rows.pop(body_id, None)
+        if row is None:
+            return
+
+        # Move the last row into the freed one to keep the rows contiguous.
+        last_row = len(self._row_bodies) - 1
+        if row != last_row:
+            last_body_id = self._row_bodies[last_row]
+            self._body_rows[last_body_id] = row
+            self._row_bodies[row] = last_body_id
+            self._aabbs[row] = self._aabbs[last_row]
+            self._checked[row] = self._checked[last_row]
+            self._link_aabbs[row] = self._link_aabbs[last_row]
+            self._signatures[row] = self._signatures[last_row]
+        self._row_bodies.pop()
+        self._link_aabbs.pop()
+        self._signatures.pop()
+        self._checked[last_row] = False
+
+    @staticmethod
+    def _get_signature(body_id):
+        pos, orn = p.getBasePositionAndOrientation(body_id)
+        num_joints = p.getNumJoints(body_id)
+        joint_positions = [state[0] for state in p.getJointStates(body_id, range(num_joints))] if num_joints else []
+        return np.concatenate([pos, orn, joint_positions])
+
+    def _update_row(self, body_id):
+        row = self._body_rows.get(body_id)
+        if row is None:
+            row = self._add_body(body_id)
+        if self._checked[row]:
+            return row
+
+        signature = self._get_signature(body_id)
+        if self._signatures[row] is None or not np.array_equal(signature, self._signatures[row]):
+            # The base link comes first, followed by the joint links.
+            link_aabbs = np.array([p.getAABB(body_id, linkIndex=link) for link in range(-1, p.getNumJoints(body_id))])
+            # The link AABBs are replaced, never updated in place, so they can be handed out read-only.
+            link_aabbs.flags.writeable = False
+            self._link_aabbs[row] = link_aabbs
+            self._aabbs[row, 0] = np.min(link_aabbs[:, 0], axis=0)
+            self._aabbs[row, 1] = np.max(link_aabbs[:, 1], axis=0)
+            self._signatures[row] = signature
+
+        self._checked[row] = True
+        return row
+
+    def get_aabb(self, body_id):
+        """
+        :param body_id: pybullet body id
+        :return: (2, 3) array with the lower and upper corners of the AABB of the body
+        """
+        row = self._update_row(body_id)
+        # Rows are updated in place and moved around, so callers get a copy.
+        return self._aabbs[row].copy()
+
+    def get_link_aabbs(self, body_id):
+        """
+        :param body_id: pybullet body id
+        :return: read-only (num_links, 2, 3) array of the link AABBs of the body, starting with the base link
+        """
+        row = self._update_row(body_id)
+        return self._link_aabbs[row]
+
+    def get_link_aabb(self, body_id, link_id):
+        """
+        :param body_id: pybullet body id
+        :param link_id: link index, -1 for the base link
+        :return: read-only (2, 3) array with the lower and upper corners of the AABB of the link
+        """
+        return self.get_link_aabbs(body_id)[link_id + 1]
+
+    def get_all_aabbs(self):
+        """
+        Bring every body of the table up to date.
+
+        :return: body ids and a (num_bodies, 2, 3) array of their AABBs
+        """
+        for body_id in self._row_bodies:
+            self._update_row(body_id)
+        return list(self._row_bodies), self._aabbs[: len(self._row_bodies)].copy()
@@ -0,0 +1,116 @@
+import numpy as np
+import pybullet as p
+
+# One row per contact point. The field names match ContactResult so that rows can be used in its place.
+CONTACT_DTYPE = np.dtype(
+    [
+        ("contactFlag", np.int32),
+        ("bodyUniqueIdA", np.int32),
+        ("bodyUniqueIdB", np.int32),
+        ("linkIndexA", np.int32),
+        ("linkIndexB", np.int32),
+        ("positionOnA", np.float64, 3),
+        ("positionOnB", np.float64, 3),
+        ("contactNormalOnB", np.float64, 3),
+        ("contactDistance", np.float64),
+        ("normalForce", np.float64),
+    ]
+)
+
+
+class ContactCache(object):
+    """
+    Caches all the pybullet contact points of a simulator step, fetched with a single p.getContactPoints() call.
+
+    Pybullet reports every contact once, for one order of the two bodies. The cache stores each contact between two
+    bodies in both orders and sorts the rows by bodyA, so the contacts of a body are a contiguous slice of a structured
+    array that is found in O(1). This matches p.getContactPoints(bodyA=body_id), which also reports the contacts of
+    the queried body as bodyA. Self-collisions are stored once, as pybullet reports them.
+    """
+
+    def __init__(self):
+        self._contacts = None
+        self._body_slices = None
+        self._contact_body_ids = {}
+
+    def invalidate(self):
+        """
+        Invalidate the cache. Called by the simulator after physics is stepped.
+        """
+        self._contacts = None
+        self._body_slices = None
+        self._contact_body_ids = {}
+
+    def _fetch(self):
+        points = p.getContactPoints()
+        num = len(points)
+        contacts = np.empty(2 * num, dtype=CONTACT_DTYPE)
+        if num:
+            columns = list(zip(*points))
+            forward, mirrored = contacts[:num], contacts[num:]
+            forward["contactFlag"] = mirrored["contactFlag"] = columns[0]
+            forward["bodyUniqueIdA"] = mirrored["bodyUniqueIdB"] = columns[1]
+            forward["bodyUniqueIdB"] = mirrored["bodyUniqueIdA"] = columns[2]
+            forward["linkIndexA"] = mirrored["linkIndexB"] = columns[3]
+            forward["linkIndexB"] = mirrored["linkIndexA"] = columns[4]
+            forward["positionOnA"] = mirrored["positionOnB"] = columns[5]
+            forward["positionOnB"] = mirrored["positionOnA"] = columns[6]
+            forward["contactNormalOnB"] = columns[7]
+            mirrored["contactNormalOnB"] = -forward["contactNormalOnB"]
+            forward["contactDistance"] = mirrored["contactDistance"] = columns[8]
+            forward["normalForce"] = mirrored["normalForce"] = columns[9]
+            # Self-collisions are already reported with the body as bodyA, so they are not mirrored.
+            is_mirrored = forward["bodyUniqueIdA"] != forward["bodyUniqueIdB"]
+            contacts = contacts[np.concatenate([np.ones(num, dtype=bool), is_mirrored])]
+
+        contacts = contacts[np.argsort(contacts["bodyUniqueIdA"], kind="stable")].view(np.recarray)
+        body_ids, starts, counts = np.unique(contacts.bodyUniqueIdA, return_index=True, return_counts=True)
+        self._body_slices = {
+            body_id: slice(start, start + count) for body_id, start, count in zip(body_ids.tolist(), starts, counts)
+        }
+        self._contacts = contacts
+
+    def get_all_contacts(self):
+        """
+        :return: recarray of CONTACT_DTYPE with every contact, once per order of the two bodies
+        """
+        if self._contacts is None:
+            self._fetch()
+        return self._contacts
+
+    def get_contacts(self, body_id, link_id=None):
+        """
+        Get the contacts of a body, like p.getContactPoints(bodyA=body_id, linkIndexA=link_id).
+
+        :param body_id: pybullet body id
+        :param link_id: only return the contacts of this link of the body, if not None
+        :return: recarray of CONTACT_DTYPE with the contacts of the body as bodyA
+        """
+        contacts = self.get_all_contacts()
+        contacts = contacts[self._body_slices.get(body_id, slice(0, 0))]
+        if link_id is not None:
+            contacts = contacts[contacts.linkIndexA == link_id]
+        return contacts
+
+    def get_contact_body_ids(self, body_id):
+        """
+        :param body_id: pybullet body id
+        :return: set of the ids of the bodies in contact with the body
+        """
+        if self._contacts is None:
+            self._fetch()
+        if body_id not in self._contact_body_ids:
+            self._contact_body_ids[body_id] = set(self.get_contacts(body_id).bodyUniqueIdB.tolist())
+        return self._contact_body_ids[body_id]
+
+    def in_contact(self, body_id, other_body_id=None, link_id=None):
+        """
+        :param body_id: pybullet body id
+        :param other_body_id: only consider contacts with this body, if not None
+        :param link_id: only consider contacts of this link of the body, if not None
+        :return: whether the body is in contact
+        """
+        contacts = self.get_contacts(body_id, link_id=link_id)
+        if other_body_id is not None:
+            contacts = contacts[contacts.bodyUniqueIdB == other_body_id]
+        return len(contacts) > 0
@@ -0,0 +1,400 @@
+"""
+Columnar export of iGibson HDF5 logs. Logs written by IGLogWriter are flattened into partitioned Parquet or
+Arrow IPC datasets keyed by demo, frame and body, so that metrics can be computed over many demos at once with
+vectorized scans instead of walking the nested physics_data/<bid>/... groups of every HDF5 file.
+
+Demos are named after their log's file name and a hash of its absolute path (see get_demo_name), so that logs with
+the same file name in different directories do not overwrite each other.
+
+Layout of an export root, where each table is hive-partitioned by demo:
+physics/demo=<demo>/part-0.<ext> - one row per frame and logged body: position, orientation and joint states
+frames/demo=<demo>/part-0.<ext> - one row per frame: frame timing, goal status and agent actions
+demos/demo=<demo>/part-0.<ext> - one row per demo: log metadata and the size and mtime of the source log
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import h5py
+import numpy as np
+
+from igibson.utils.utils import parse_str_config
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FILE_EXTENSIONS = {"parquet": "parquet", "ipc": "arrow"}
+
+
+def _check_pyarrow():
+    if pa is None:
+        raise ImportError(
+            'Columnar log export requires pyarrow, which is not installed. Try "pip install igibson[log_export]".'
+        )
+
+
+def get_demo_name(log_path):
+    """
+    Gets the name of the demo partition of a log, made of the log's file name without extension and a short hash
+    of its absolute path.
+
+    :param log_path: path of the HDF5 log
+    :return: name of the demo partition
+    """
+    log_name = os.path.splitext(os.path.basename(log_path))[0]
+    path_hash = hashlib.sha1(os.path.abspath(log_path).encode("utf-8")).hexdigest()[:8]
+    return "{}_{}".format(log_name, path_hash)
+
+
+def _read_attr(hf, attr_name, default=None):
+    attr_name = "/metadata/" + attr_name
+    return hf.attrs[attr_name] if attr_name in hf.attrs else default
+
+
+def _list_array(values_2d, value_type):
+    """Converts a (num_rows, row_len) array into an Arrow list array with one list per row."""
+    num_rows, row_len = values_2d.shape
+    offsets = np.arange(num_rows + 1, dtype=np.int32) * row_len
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values_2d.reshape(-1), type=value_type))
+
+
+def _physics_table(hf, num_frames):
+    if "physics_data" not in hf:
+        return None
+    tables = []
+    frames = np.arange(num_frames, dtype=np.int32)
+    for bid in sorted(hf["physics_data"], key=int):
+        body_data = hf["physics_data"][bid]
+        position = body_data["position"][()]
+        orientation = body_data["orientation"][()]
+        joint_state = body_data["joint_state"][()]
+        tables.append(
+            pa.table(
+                {
+                    "frame": frames,
+                    "body_id": np.full(num_frames, int(bid), dtype=np.int32),
+                    "pos_x": position[:, 0],
+                    "pos_y": position[:, 1],
+                    "pos_z": position[:, 2],
+                    "orn_x": orientation[:, 0],
+                    "orn_y": orientation[:, 1],
+                    "orn_z": orientation[:, 2],
+                    "orn_w": orientation[:, 3],
+                    "joint_state": _list_array(joint_state, pa.float64()),
+                }
+            )
+        )
+    return pa.concat_tables(tables) if tables else None
+
+
+def _frames_table(hf, num_frames):
+    frame_data = hf["frame_data"][()]
+    columns = {
+        "frame": np.arange(num_frames, dtype=np.int32),
+        "physics_timestep": frame_data[:, 1],
+        "render_timestep": frame_data[:, 2],
+        "frame_duration": frame_data[:, 3],
+    }
+    if "goal_status" in hf:
+        satisfied = hf["goal_status/satisfied"][()] > 0
+        unsatisfied = hf["goal_status/unsatisfied"][()] > 0
+        columns["goal_satisfied"] = _list_array(satisfied, pa.bool_())
+        columns["num_goals_satisfied"] = satisfied.sum(axis=1).astype(np.int32)
+        columns["num_goals_unsatisfied"] = unsatisfied.sum(axis=1).astype(np.int32)
+    if "agent_actions/vr_robot" in hf:
+        columns["agent_action"] = _list_array(hf["agent_actions/vr_robot"][()], pa.float64())
+    return pa.table(columns)
+
+
+def _demos_table(hf, log_path, num_frames):
+    obj_body_id_to_name = _read_attr(hf, "obj_body_id_to_name")
+    if obj_body_id_to_name is not None:
+        obj_body_id_to_name = json.dumps({str(k): v for k, v in parse_str_config(obj_body_id_to_name).items()})
+    stat = os.stat(log_path)
+    activity_definition = _read_attr(hf, "activity_definition")
+    return pa.table(
+        {
+            "source_path": [os.path.abspath(log_path)],
+            "source_size": pa.array([stat.st_size], type=pa.int64()),
+            "source_mtime": pa.array([stat.st_mtime], type=pa.float64()),
+            "num_frames": pa.array([num_frames], type=pa.int64()),
+            "task": pa.array([_read_attr(hf, "atus_activity")], type=pa.string()),
+            "task_id": pa.array([None if activity_definition is None else int(activity_definition)], type=pa.int64()),
+            "scene": pa.array([_read_attr(hf, "scene_id")], type=pa.string()),
+            "physics_timestep": pa.array([_read_attr(hf, "physics_timestep")], type=pa.float64()),
+            "render_timestep": pa.array([_read_attr(hf, "render_timestep")], type=pa.float64()),
+            "obj_body_id_to_name": pa.array([obj_body_id_to_name], type=pa.string()),
+        }
+    )
+
+
+def _write_partition(table, out_root, table_name, demo, file_format):
+    partition_dir = os.path.join(out_root, table_name, "demo={}".format(demo))
+    # Replace any previous export of this demo
+    if os.path.exists(partition_dir):
+        shutil.rmtree(partition_dir)
+    os.makedirs(partition_dir)
+    path = os.path.join(partition_dir, "part-0.{}".format(FILE_EXTENSIONS[file_format]))
+    if file_format == "parquet":
+        pq.write_table(table, path)
+    else:
+        feather.write_feather(table, path)
+
+
+def convert_log(log_path, out_root, demo=None, file_format="parquet"):
+    """
+    Converts a single HDF5 log into the physics, frames and demos tables of an export root.
+
+    :param log_path: path of the HDF5 log written by IGLogWriter
+    :param out_root: root directory of the columnar export
+    :param demo: name of the demo partition - defaults to get_demo_name(log_path)
+    :param file_format: parquet or ipc (Arrow IPC / Feather V2)
+    :return: name of the demo partition
+    """
+    _check_pyarrow()
+    if file_format not in FILE_EXTENSIONS:
+        raise ValueError("Unsupported file format: {}".format(file_format))
+    if demo is None:
+        demo = get_demo_name(log_path)
+
+    with h5py.File(log_path, "r") as hf:
+        num_frames = hf["frame_data"].shape[0]
+        tables = {
+            "physics": _physics_table(hf, num_frames),
+            "frames": _frames_table(hf, num_frames),
+            "demos": _demos_table(hf, log_path, num_frames),
+        }
+
+    for table_name, table in tables.items():
+        if table is not None:
+            _write_partition(table, out_root, table_name, demo, file_format)
+    return demo
+
+
+def load_table(out_root, table_name, columns=None, demos=None, file_format="parquet"):
+    """
+    Loads a table of an export root, optionally restricted to some columns and demos.
+
+    :param out_root: root directory of the columnar export
+    :param table_name: one of physics, frames and demos
+    :param columns: list of columns to load - all columns if None. The demo column is always included
+    :param demos: list of demos to load - all demos if None
+    :param file_format: parquet or ipc
+    :return: pyarrow Table, or None if the table does not exist yet
+    """
+    _check_pyarrow()
+    table_dir = os.path.join(out_root, table_name)
+    if not os.path.isdir(table_dir):
+        return None
+    dataset = ds.dataset(
+        table_dir,
+        format="parquet" if file_format == "parquet" else "ipc",
+        partitioning=ds.partitioning(pa.schema([("demo", pa.string())]), flavor="hive"),
+    )
+    if columns is not None and "demo" not in columns:
+        columns = ["demo"] + list(columns)
+    row_filter = None if demos is None else ds.field("demo").isin(list(demos))
+    return dataset.to_table(columns=columns, filter=row_filter)
+
+
+def ingest_logs(log_paths, out_root, file_format="parquet", log_status=True):
+    """
+    Incrementally converts HDF5 logs into an export root. Logs whose demo has already been exported from a source
+    file with the same size and modification time are skipped.
+
+    :param log_paths: paths of the HDF5 logs to ingest
+    :param out_root: root directory of the columnar export
+    :param file_format: parquet or ipc
+    :param log_status: whether to print the progress
+    :return: list of demos that were (re-)exported, named by get_demo_name
+    """
+    _check_pyarrow()
+    existing = {}
+    demos_table = load_table(out_root, "demos", columns=["source_size", "source_mtime"], file_format=file_format)
+    if demos_table is not None:
+        for row in demos_table.to_pylist():
+            existing[row["demo"]] = (row["source_size"], row["source_mtime"])
+
+    ingested = []
+    for idx, log_path in enumerate(log_paths):
+        demo = get_demo_name(log_path)
+        stat = os.stat(log_path)
+        if existing.get(demo) == (stat.st_size, stat.st_mtime):
+            continue
+        if log_status:
+            print("Ingesting log {} ({} out of {})".format(log_path, idx + 1, len(log_paths)))
+        convert_log(log_path, out_root, demo=demo, file_format=file_format)
+        ingested.append(demo)
+
+    if log_status:
+        print("Ingested {} new or updated logs out of {}".format(len(ingested), len(log_paths)))
+    return ingested
+
+
+def _group_ids(group_keys, sort_key):
+    """
+    Sorts rows by the group keys and then by sort_key.
+
+    :return: the sorting row order, and the id of the group of every sorted row
+    """
+    order = np.lexsort([sort_key] + list(group_keys[::-1]))
+    new_group = np.zeros(len(order), dtype=bool)
+    if len(order) > 0:
+        new_group[0] = True
+        for key in group_keys:
+            sorted_key = key[order]
+            new_group[1:] |= sorted_key[1:] != sorted_key[:-1]
+    return order, np.cumsum(new_group) - 1
+
+
+def _demo_codes(table):
+    """Dictionary-encodes the demo column, returning the demo names and an integer code per row."""
+    encoded = pc.dictionary_encode(table.column("demo")).combine_chunks()
+    return encoded.dictionary.to_pylist(), encoded.indices.to_numpy(zero_copy_only=False)
+
+
+def get_body_ids_by_name(out_root, body_name, demos=None, file_format="parquet"):
+    """
+    Looks up the body id that an object of the activity scope (eg. agent.n.01_1) had in each demo.
+
+    :return: dictionary mapping demo names to body ids, for demos in which the object was logged
+    """
+    demos_table = load_table(out_root, "demos", columns=["obj_body_id_to_name"], demos=demos, file_format=file_format)
+    body_ids = {}
+    for row in demos_table.to_pylist():
+        if row["obj_body_id_to_name"] is None:
+            continue
+        for bid, name in json.loads(row["obj_body_id_to_name"]).items():
+            if name == body_name:
+                body_ids[row["demo"]] = int(bid)
+    return body_ids
+
+
+def compute_body_distances(out_root, demos=None, body_ids=None, clip=0.2, file_format="parquet"):
+    """
+    Computes the distance travelled by logged bodies in every demo with a single vectorized scan of the physics
+    table. As in AgentMetric, per-frame displacements are clipped to exclude teleports.
+
+    :param out_root: root directory of the columnar export
+    :param demos: list of demos to include - all demos if None
+    :param body_ids: optional dictionary mapping demo names to the body id to include for that demo
+    :param clip: maximum displacement per frame
+    :param file_format: parquet or ipc
+    :return: dictionary mapping (demo, body_id) to the distance travelled
+    """
+    if body_ids is not None:
+        demos = [demo for demo in body_ids if demos is None or demo in demos]
+    table = load_table(
+        out_root,
+        "physics",
+        columns=["frame", "body_id", "pos_x", "pos_y", "pos_z"],
+        demos=demos,
+        file_format=file_format,
+    )
+    demo_names, demo_codes = _demo_codes(table)
+    body_id = table.column("body_id").to_numpy()
+    if body_ids is not None:
+        wanted = np.array([body_ids[demo] for demo in demo_names])
+        mask = body_id == wanted[demo_codes]
+        table, demo_codes, body_id = table.filter(pa.array(mask)), demo_codes[mask], body_id[mask]
+
+    frame = table.column("frame").to_numpy()
+    position = np.stack([table.column(axis).to_numpy() for axis in ["pos_x", "pos_y", "pos_z"]], axis=1)
+    order, group = _group_ids([demo_codes, body_id], frame)
+    position = position[order]
+
+    # Displacement between consecutive frames of the same (demo, body) group
+    delta = np.clip(np.linalg.norm(np.diff(position, axis=0), axis=1), 0, clip)
+    same_group = group[1:] == group[:-1]
+    num_groups = group[-1] + 1 if len(group) > 0 else 0
+    distances = np.bincount(group[1:][same_group], weights=delta[same_group], minlength=num_groups)
+
+    first_rows = order[np.r_[True, ~same_group]] if len(order) > 0 else order
+    return {
+        (demo_names[demo_codes[row]], int(body_id[row])): float(distance)
+        for row, distance in zip(first_rows, distances)
+    }
+
+
+def compute_agent_distances(out_root, demos=None, agent_name="agent.n.01_1", clip=0.2, file_format="parquet"):
+    """
+    Computes the distance travelled by the agent's body in every demo, as the body distance of AgentMetric.
+
+    :return: dictionary mapping demo names to the distance travelled by the agent
+    """
+    body_ids = get_body_ids_by_name(out_root, agent_name, demos=demos, file_format=file_format)
+    distances = compute_body_distances(out_root, demos=demos, body_ids=body_ids, clip=clip, file_format=file_format)
+    return {demo: distance for (demo, _), distance in distances.items()}
+
+
+def compute_goal_progress(out_root, demos=None, file_format="parquet"):
+    """
+    Computes the goal progress of every demo from the frames table.
+
+    :return: dictionary mapping demo names to the final number of satisfied goals, the total number of goals and
+        the first frame at which all goals were satisfied (-1 if never)
+    """
+    table = load_table(
+        out_root,
+        "frames",
+        columns=["frame", "num_goals_satisfied", "num_goals_unsatisfied"],
+        demos=demos,
+        file_format=file_format,
+    )
+    demo_names, demo_codes = _demo_codes(table)
+    frame = table.column("frame").to_numpy()
+    satisfied = table.column("num_goals_satisfied").to_numpy()
+    unsatisfied = table.column("num_goals_unsatisfied").to_numpy()
+
+    num_demos = len(demo_names)
+    last_frame = np.full(num_demos, -1)
+    np.maximum.at(last_frame, demo_codes, frame)
+    is_last = frame == last_frame[demo_codes]
+    final_satisfied = np.zeros(num_demos, dtype=np.int64)
+    final_satisfied[demo_codes[is_last]] = satisfied[is_last]
+    num_goals = np.zeros(num_demos, dtype=np.int64)
+    num_goals[demo_codes[is_last]] = satisfied[is_last] + unsatisfied[is_last]
+
+    done = (unsatisfied == 0) & (satisfied > 0)
+    first_done = np.full(num_demos, np.iinfo(np.int64).max)
+    np.minimum.at(first_done, demo_codes[done], frame[done])
+    first_done[first_done == np.iinfo(np.int64).max] = -1
+
+    return {
+        demo: {
+            "num_goals_satisfied": int(final_satisfied[code]),
+            "num_goals": int(num_goals[code]),
+            "completion_frame": int(first_done[code]),
+        }
+        for code, demo in enumerate(demo_names)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export iGibson HDF5 logs to partitioned columnar files")
+    parser.add_argument("out_root", type=str, help="Root directory of the columnar export")
+    parser.add_argument("logs", type=str, nargs="+", help="HDF5 logs or directories containing HDF5 logs")
+    parser.add_argument("--format", type=str, default="parquet", choices=["parquet", "ipc"], help="File format")
+    args = parser.parse_args()
+
+    log_paths = []
+    for path in args.logs:
+        if os.path.isdir(path):
+            log_paths.extend(sorted(glob.glob(os.path.join(path, "*.hdf5"))))
+        else:
+            log_paths.append(path)
+    ingest_logs(log_paths, args.out_root, file_format=args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ can be used to write regular logs, iGATUS task logs or VR logs to HDF5 for savin
 import copy
 import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import h5py
 import numpy as np
@@ -538,11 +539,130 @@ class IGLogWriter(object):
         self.hf.close()
 
 
+class IGLogBlockCache(object):
+    """Block cache that serves per-frame reads of an HDF5 log from memory.
+
+    Frames are read in chunk-aligned blocks of block_size rows for every registered dataset path at once, and
+    the block following the current one is read on a background thread so that sequential replay rarely waits
+    on file I/O. Paths are registered lazily the first time they are accessed.
+    """
+
+    def __init__(self, hf, total_frame_num, block_size=None, prefetch=True):
+        """
+        :param hf: open h5py File handle
+        :param total_frame_num: number of frames stored in the log
+        :param block_size: number of frames per block - defaults to the chunk size of the frame_data dataset
+        :param prefetch: whether to read the next block on a background thread
+        """
+        self.hf = hf
+        self.total_frame_num = total_frame_num
+        if block_size is None:
+            chunks = self.hf["frame_data"].chunks
+            block_size = chunks[0] if chunks else 200
+        self.block_size = max(int(block_size), 1)
+        self.paths = []
+        self.block_start = None
+        self.block = {}
+        # h5py serializes file access internally, so a single worker is enough to overlap reads with replay
+        self.executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        self.pending_start = None
+        self.pending = None
+
+    def __getitem__(self, path):
+        """Returns a frame-indexable view of the dataset at path, so the cache can stand in for the h5py file."""
+        return IGLogDatasetView(self, path)
+
+    def register_paths(self, paths):
+        """Registers dataset paths so that they are read as part of every block from now on."""
+        for path in paths:
+            if path in self.paths:
+                continue
+            if path not in self.hf:
+                raise RuntimeError("Unable to find path: {} in saved HDF5 file".format(path))
+            self.paths.append(path)
+            if self.block_start is not None:
+                self.block[path] = self.hf[path][self.block_start : self.block_stop(self.block_start)]
+
+    def block_stop(self, block_start):
+        return min(block_start + self.block_size, self.total_frame_num)
+
+    def read_block(self, block_start, paths):
+        block_stop = self.block_stop(block_start)
+        return {path: self.hf[path][block_start:block_stop] for path in paths}
+
+    def load_block(self, block_start):
+        """Makes the block starting at block_start current, using the prefetched block if it is available."""
+        block = None
+        if self.pending is not None:
+            # Always wait for the outstanding read so that the worker is idle before the file is used again
+            prefetched = self.pending.result()
+            if self.pending_start == block_start:
+                block = prefetched
+            self.pending = None
+            self.pending_start = None
+
+        if block is None:
+            block = self.read_block(block_start, self.paths)
+        else:
+            # Paths registered after the prefetch was scheduled are read synchronously
+            missing = [path for path in self.paths if path not in block]
+            block.update(self.read_block(block_start, missing))
+
+        self.block_start = block_start
+        self.block = block
+
+        next_start = block_start + self.block_size
+        if self.executor is not None and next_start < self.total_frame_num:
+            self.pending_start = next_start
+            self.pending = self.executor.submit(self.read_block, next_start, list(self.paths))
+
+    def get(self, path, frame):
+        """Returns the row of the dataset at path for a single frame."""
+        if frame < 0 or frame >= self.total_frame_num:
+            raise IndexError("Frame {} is out of range for log with {} frames".format(frame, self.total_frame_num))
+        if path not in self.paths:
+            self.register_paths([path])
+        block_start = (frame // self.block_size) * self.block_size
+        if block_start != self.block_start:
+            self.load_block(block_start)
+        return self.block[path][frame - block_start]
+
+    def get_range(self, path, start, stop):
+        """Returns rows [start, stop) of the dataset at path, served from memory if they lie in the current block."""
+        if path not in self.paths:
+            self.register_paths([path])
+        if self.block_start is not None and start >= self.block_start and stop <= self.block_stop(self.block_start):
+            return self.block[path][start - self.block_start : stop - self.block_start]
+        return self.hf[path][start:stop]
+
+    def close(self):
+        if self.executor is not None:
+            if self.pending is not None:
+                self.pending.result()
+                self.pending = None
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+class IGLogDatasetView(object):
+    """Frame-indexable view of a single dataset in an IGLogBlockCache."""
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+
+    def __getitem__(self, frame):
+        return self.cache.get(self.path, frame)
+
+
 class IGLogReader(object):
-    def __init__(self, log_filepath, log_status=True):
+    def __init__(self, log_filepath, log_status=True, block_size=None, prefetch=True):
         """
         :param log_filepath: path for logging files to be read from
         :param log_status: whether to print status updates to the command line
+        :param block_size: number of frames read into memory at once for every accessed dataset - defaults to the
+            HDF5 chunk size of the log
+        :param prefetch: whether to read the next block of frames on a background thread
         """
         self.log_filepath = log_filepath
         self.log_status = log_status
@@ -552,6 +672,12 @@ class IGLogReader(object):
         self.pb_ids = [p.getBodyUniqueId(i) for i in range(p.getNumBodies())]
         # Get total frame num (dataset row length) from an arbitary dataset
         self.total_frame_num = self.hf["frame_data"].shape[0]
+        # Body ids with logged physics data that also exist in the current simulation
+        self.physics_data_bids = []
+        if "physics_data" in self.hf:
+            self.physics_data_bids = sorted(int(bid) for bid in self.hf["physics_data"] if int(bid) in self.pb_ids)
+        # All per-frame reads go through the block cache
+        self.cache = IGLogBlockCache(self.hf, self.total_frame_num, block_size=block_size, prefetch=prefetch)
         # Placeholder VrData object, which will be filled every frame if we are performing action replay
         self.vr_data = VrData()
         if self.log_status:
@@ -593,14 +719,26 @@ class IGLogReader(object):
         """Sets camera based on saved camera matrices. Only valid if VR was used to save a demo.
         :param sim: Simulator object
         """
-        sim.renderer.V = self.hf["vr/vr_camera/right_eye_view"][self.frame_counter]
-        sim.renderer.P = self.hf["vr/vr_camera/right_eye_proj"][self.frame_counter]
-        right_cam_pos = self.hf["vr/vr_camera/right_camera_pos"][self.frame_counter]
+        sim.renderer.V = self.read_value("vr/vr_camera/right_eye_view")
+        sim.renderer.P = self.read_value("vr/vr_camera/right_eye_proj")
+        right_cam_pos = self.read_value("vr/vr_camera/right_camera_pos")
         sim.renderer.camera = right_cam_pos
         sim.renderer.set_light_position_direction(
             [right_cam_pos[0], right_cam_pos[1], 10], [right_cam_pos[0], right_cam_pos[1], 0]
         )
 
+    def set_physics_data(self):
+        """Sets the base pose and joint states of every logged body directly from the data of the current frame.
+        This is used for kinematic replay, where the simulation is not stepped.
+        """
+        for bid in self.physics_data_bids:
+            base = "physics_data/{}/".format(bid)
+            pos = self.read_value(base + "position")
+            orn = self.read_value(base + "orientation")
+            p.resetBasePositionAndOrientation(bid, pos, orn)
+            for joint_idx, joint_pos in enumerate(self.read_value(base + "joint_state")):
+                p.resetJointState(bid, joint_idx, joint_pos)
+
     def get_vr_data(self):
         """
         Returns VR for the current frame as a VrData object. This can be indexed
@@ -608,7 +746,7 @@ class IGLogReader(object):
         its actions for a single frame.
         """
         # Update VrData with new HF data
-        self.vr_data.refresh_action_replay_data(self.hf, self.frame_counter)
+        self.vr_data.refresh_action_replay_data(self.cache, self.frame_counter)
         return self.vr_data
 
     def get_agent_action(self, agent_name):
@@ -618,7 +756,7 @@ class IGLogReader(object):
         agent_action_path = "agent_actions/{}".format(agent_name)
         if agent_action_path not in self.hf:
             raise RuntimeError("Unable to find agent action path: {} in saved HDF5 file".format(agent_action_path))
-        return self.hf[agent_action_path][self.frame_counter]
+        return self.cache.get(agent_action_path, self.frame_counter)
 
     def read_value(self, value_path):
         """Reads any saved value at value_path for the current frame.
@@ -628,7 +766,17 @@ class IGLogReader(object):
             values list in the comment at the top of this file.
             Eg. vr/vr_button_data/right_controller
         """
-        return self.hf[value_path][self.frame_counter]
+        return self.cache.get(value_path, self.frame_counter)
+
+    def read_value_range(self, value_path, start, stop):
+        """Reads any saved value at value_path for the frames in [start, stop).
+
+        Args:
+            value_path: /-separated string representing the value to fetch
+            start: first frame to read
+            stop: frame after the last frame to read
+        """
+        return self.cache.get_range(value_path, start, min(stop, self.total_frame_num))
 
     def read_action(self, action_path):
         """Reads the action at action_path for the current frame.
@@ -638,7 +786,21 @@ class IGLogReader(object):
                 an action that was previously registered with the VRLogWriter during data saving
         """
         full_action_path = "action/" + action_path
-        return self.hf[full_action_path][self.frame_counter]
+        return self.cache.get(full_action_path, self.frame_counter)
+
+    def read_action_range(self, action_path, start, stop):
+        """Reads the action at action_path for the frames in [start, stop)."""
+        return self.read_value_range("action/" + action_path, start, stop)
+
+    def seek(self, frame):
+        """Moves the reader to the given frame, so that subsequent reads return data for that frame.
+
+        Args:
+            frame: frame to move to. The next call to get_data_left_to_read will advance to frame + 1
+        """
+        if frame < 0 or frame >= self.total_frame_num:
+            raise IndexError("Frame {} is out of range for log with {} frames".format(frame, self.total_frame_num))
+        self.frame_counter = frame
 
     def get_data_left_to_read(self):
         """Returns whether there is still data left to read."""
@@ -650,6 +812,7 @@ class IGLogReader(object):
 
     def end_log_session(self):
         """Call this once reading has finished to clean up resources used."""
+        self.cache.close()
         self.hf.close()
 
         if self.log_status:
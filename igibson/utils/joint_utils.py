@@ -0,0 +1,63 @@
+import numpy as np
+import pybullet as p
+
+from igibson.external.pybullet_tools.utils import get_base_name, get_body_metadata
+
+
+class BodyJointMetadata(object):
+    """
+    Static joint and link metadata of a pybullet body as arrays, built once when the body is loaded.
+
+    Joint names, types, limits and parent links cannot change after a body is loaded, so they are not queried from
+    pybullet again. The per-joint values are arrays indexed by joint id, and the link names start with the base link,
+    which has no joint.
+    """
+
+    def __init__(self, body_id):
+        self.body_id = body_id
+        self.joint_infos = list(get_body_metadata(body_id).joint_infos)
+        self.num_joints = len(self.joint_infos)
+
+        self.joint_ids = np.arange(self.num_joints)
+        self.joint_names = [info.jointName.decode("utf-8") for info in self.joint_infos]
+        self.joint_types = np.array([info.jointType for info in self.joint_infos], dtype=int)
+        self.joint_lower_limits = np.array([info.jointLowerLimit for info in self.joint_infos], dtype=float)
+        self.joint_upper_limits = np.array([info.jointUpperLimit for info in self.joint_infos], dtype=float)
+        self.parent_indices = np.array([info.parentIndex for info in self.joint_infos], dtype=int)
+
+        self.base_link_name = get_base_name(body_id)
+        self.link_names = [self.base_link_name] + [info.linkName.decode("utf-8") for info in self.joint_infos]
+
+        self._joint_ids_by_name = {name: joint_id for joint_id, name in enumerate(self.joint_names)}
+
+    def get_link_name(self, link_id):
+        """
+        :param link_id: link index, -1 for the base link
+        :return: name of the link
+        """
+        return self.link_names[link_id + 1]
+
+    def get_joint_ids(self, joint_names):
+        """
+        :param joint_names: joint names
+        :return: array of the ids of the joints, in the same order
+        """
+        return np.array([self._joint_ids_by_name[name] for name in joint_names], dtype=int)
+
+    def get_movable_joint_mask(self):
+        """
+        :return: boolean array of the revolute and prismatic joints
+        """
+        return (self.joint_types == p.JOINT_REVOLUTE) | (self.joint_types == p.JOINT_PRISMATIC)
+
+    def get_joint_positions(self, joint_ids=None):
+        """
+        Read the current positions of joints with a single pybullet call.
+
+        :param joint_ids: joint ids, all the joints if None
+        :return: array of the joint positions
+        """
+        joint_ids = self.joint_ids if joint_ids is None else joint_ids
+        if len(joint_ids) == 0:
+            return np.zeros(0)
+        return np.array([state[0] for state in p.getJointStates(self.body_id, np.asarray(joint_ids).tolist())])
@@ -0,0 +1,196 @@
+import os
+from collections import deque
+from time import time
+
+import numpy as np
+import pybullet as p
+
+
+class IKService(object):
+    """
+    Multi-start inverse kinematics solved on a kinematic clone of the robot loaded in a separate DIRECT
+    pybullet client, so the live simulation is never stepped or modified while searching.
+    pybullet has no batched IK, so every restart is still one calculateInverseKinematics call on the clone, solved
+    sequentially. Restarts are grouped in rounds only to order the (more expensive) validity checks: the reachable
+    solutions of a round are validated closest first, and the query stops at the first valid one.
+    Solutions are cached in the robot base frame and used to warm-start queries for nearby targets.
+    The clone client is released by disconnect(), when the service is used as a context manager, or when it is
+    garbage collected.
+    """
+
+    def __init__(
+        self,
+        robot,
+        arm_joint_ids,
+        ik_joint_slice,
+        threshold=0.05,
+        round_size=15,
+        max_attempts=75,
+        warm_start_radius=0.1,
+        cache_size=1000,
+    ):
+        """
+        :param robot: live robot, whose model file is loaded into the clone
+        :param arm_joint_ids: joint indices of the arm
+        :param ik_joint_slice: slice of the calculateInverseKinematics output that corresponds to arm_joint_ids
+        :param threshold: maximum end effector distance to the target for a solution to be reachable
+        :param round_size: number of restarts solved before their reachable solutions are validated
+        :param max_attempts: maximum number of restarts per query
+        :param warm_start_radius: cached solutions of targets closer than this distance are used as seeds
+        :param cache_size: maximum number of cached solutions
+        """
+        self.robot = robot
+        self.robot_id = robot.robot_ids[0]
+        self.arm_joint_ids = list(arm_joint_ids)
+        self.ik_joint_slice = ik_joint_slice
+        self.end_effector_link = robot.end_effector_part_index()
+        self.threshold = threshold
+        self.round_size = round_size
+        self.max_attempts = max_attempts
+        self.warm_start_radius = warm_start_radius
+
+        self.client = p.connect(p.DIRECT)
+        self.clone_id = p.loadURDF(
+            os.path.join(robot.physics_model_dir, robot.model_file),
+            globalScaling=robot.scale,
+            physicsClientId=self.client,
+        )
+        self.num_joints = p.getNumJoints(self.clone_id, physicsClientId=self.client)
+
+        # Targets (in the robot base frame) and the solutions found for them
+        self.cached_targets = deque(maxlen=cache_size)
+        self.cached_solutions = deque(maxlen=cache_size)
+
+        self.num_queries = 0
+        self.num_successes = 0
+        self.total_time = 0.0
+        self.last_query_time = 0.0
+        self.last_query_attempts = 0
+
+    def sync_clone(self):
+        """
+        Copy the base pose and all joint positions of the live robot to the clone
+        """
+        pos, orn = p.getBasePositionAndOrientation(self.robot_id)
+        p.resetBasePositionAndOrientation(self.clone_id, pos, orn, physicsClientId=self.client)
+        joint_states = p.getJointStates(self.robot_id, range(self.num_joints))
+        for joint, state in enumerate(joint_states):
+            p.resetJointState(self.clone_id, joint, state[0], physicsClientId=self.client)
+
+    def get_warm_start_seeds(self, target_in_base):
+        """
+        :param target_in_base: target position in the robot base frame
+        :return: cached solutions of the targets within warm_start_radius, closest first
+        """
+        if len(self.cached_targets) == 0:
+            return []
+        distances = np.linalg.norm(np.array(self.cached_targets) - target_in_base, axis=1)
+        nearby = np.flatnonzero(distances < self.warm_start_radius)
+        return [self.cached_solutions[i] for i in nearby[np.argsort(distances[nearby])]]
+
+    def solve_seed(self, seed, target, ik_parameters):
+        """
+        Solve IK on the clone from a seed configuration
+
+        :return: arm joint positions and the resulting end effector distance to the target
+        """
+        max_limits, min_limits, rest_position, joint_range, joint_damping = ik_parameters
+        for joint, position in zip(self.arm_joint_ids, seed):
+            p.resetJointState(self.clone_id, joint, position, physicsClientId=self.client)
+        solution = p.calculateInverseKinematics(
+            self.clone_id,
+            self.end_effector_link,
+            targetPosition=target,
+            lowerLimits=min_limits,
+            upperLimits=max_limits,
+            jointRanges=joint_range,
+            restPoses=rest_position,
+            jointDamping=joint_damping,
+            solver=p.IK_DLS,
+            maxNumIterations=100,
+            physicsClientId=self.client,
+        )[self.ik_joint_slice]
+        for joint, position in zip(self.arm_joint_ids, solution):
+            p.resetJointState(self.clone_id, joint, position, physicsClientId=self.client)
+        end_effector_position = p.getLinkState(
+            self.clone_id, self.end_effector_link, computeForwardKinematics=True, physicsClientId=self.client
+        )[4]
+        return solution, np.linalg.norm(np.array(end_effector_position) - target)
+
+    def solve(self, target, ik_parameters, sample_fn, is_valid_fn=None):
+        """
+        Find arm joint positions that bring the end effector to the target
+
+        :param target: [x, y, z] target position in the world frame
+        :param ik_parameters: IK parameters (max_limits, min_limits, rest_position, joint_range, joint_damping)
+        :param sample_fn: random arm configuration sampler used for restarts
+        :param is_valid_fn: optional function that returns whether reachable arm joint positions are acceptable,
+            e.g. collision-free
+        :return: arm joint positions, or None if no valid solution was found
+        """
+        start = time()
+        target = np.array(target)
+        self.sync_clone()
+        base_pos, base_orn = p.getBasePositionAndOrientation(self.robot_id)
+        inv_pos, inv_orn = p.invertTransform(base_pos, base_orn)
+        target_in_base = np.array(p.multiplyTransforms(inv_pos, inv_orn, target, [0, 0, 0, 1])[0])
+
+        seeds = self.get_warm_start_seeds(target_in_base)[: self.max_attempts]
+        seeds += [sample_fn() for _ in range(self.max_attempts - len(seeds))]
+
+        result = None
+        attempts = 0
+        for round_start in range(0, len(seeds), self.round_size):
+            solutions = [
+                self.solve_seed(seed, target, ik_parameters)
+                for seed in seeds[round_start : round_start + self.round_size]
+            ]
+            attempts += len(solutions)
+            reachable = sorted((item for item in solutions if item[1] <= self.threshold), key=lambda item: item[1])
+            for solution, _ in reachable:
+                if is_valid_fn is None or is_valid_fn(solution):
+                    result = solution
+                    break
+            if result is not None:
+                break
+
+        if result is not None:
+            self.num_successes += 1
+            self.cached_targets.append(target_in_base)
+            self.cached_solutions.append(tuple(result))
+        self.num_queries += 1
+        self.last_query_attempts = attempts
+        self.last_query_time = time() - start
+        self.total_time += self.last_query_time
+        return result
+
+    def get_statistics(self):
+        """
+        :return: dictionary with the number of queries, success rate and time per query
+        """
+        return {
+            "num_queries": self.num_queries,
+            "success_rate": self.num_successes / self.num_queries if self.num_queries > 0 else 0.0,
+            "mean_query_time": self.total_time / self.num_queries if self.num_queries > 0 else 0.0,
+            "last_query_time": self.last_query_time,
+            "last_query_attempts": self.last_query_attempts,
+        }
+
+    def disconnect(self):
+        """
+        Disconnect the clone pybullet client, if it is still connected
+        """
+        if self.client is not None and p.isConnected(physicsClientId=self.client):
+            p.disconnect(physicsClientId=self.client)
+        self.client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.disconnect()
+
+    def __del__(self):
+        # pybullet may already be torn down at interpreter exit
+        if p is not None and getattr(self, "client", None) is not None:
+            self.disconnect()
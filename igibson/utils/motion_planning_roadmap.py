@@ -0,0 +1,168 @@
+import logging
+import os
+import pickle
+
+import numpy as np
+import pybullet as p
+
+import igibson
+from igibson.external.motion.motion_planners.lazy_prm import LazyRoadmap
+
+
+def get_body_aabbs(body_ids):
+    """
+    Get the AABB of every body
+
+    :param body_ids: list of pybullet body ids
+    :return: dictionary mapping body id to a (2, 3) array with its lower and upper corners
+    """
+    aabbs = {}
+    for body_id in body_ids:
+        link_aabbs = np.array([p.getAABB(body_id, link) for link in range(-1, p.getNumJoints(body_id))])
+        aabbs[body_id] = np.array([np.min(link_aabbs[:, 0], axis=0), np.max(link_aabbs[:, 1], axis=0)])
+    return aabbs
+
+
+class RoadmapService(object):
+    """
+    Lazy PRM roadmaps that persist across queries and sessions, one per scene, robot and robot part (arm or base).
+    Roadmaps are built once and saved to disk on request, e.g. at shutdown. When obstacles move, only the collision
+    results of the roadmap vertices and edges whose swept volume overlaps the old or new obstacle AABB are
+    invalidated, so that later queries reduce to a graph search plus lazy repair of the invalidated parts.
+    """
+
+    def __init__(self, roadmap_dir=None, num_samples=1000, max_degree=10, pose_tolerance=1e-3):
+        """
+        :param roadmap_dir: directory where roadmaps are saved, defaults to igibson/data/roadmaps
+        :param num_samples: number of configurations sampled when building a new roadmap
+        :param max_degree: number of nearest neighbors every roadmap vertex is connected to
+        :param pose_tolerance: obstacle AABB displacement (in meters) above which an obstacle is considered moved
+        """
+        self.roadmap_dir = (
+            roadmap_dir if roadmap_dir is not None else os.path.join(igibson.root_path, "data", "roadmaps")
+        )
+        self.num_samples = num_samples
+        self.max_degree = max_degree
+        self.pose_tolerance = pose_tolerance
+        # key -> (roadmap, obstacle AABBs the collision results are valid for, robot base pose)
+        self.roadmaps = {}
+
+    def get_roadmap_path(self, key):
+        return os.path.join(self.roadmap_dir, "{}.pkl".format("_".join(str(part) for part in key)))
+
+    def get_roadmap(self, key, sample_fn, weights=None):
+        """
+        Load the roadmap for a key from memory or disk, or build it
+
+        :param key: tuple identifying the roadmap, e.g. (scene_id, robot_name, "arm")
+        :param sample_fn: configuration sampler used to build a new roadmap
+        :param weights: configuration space distance weights used to connect vertices
+        :return: LazyRoadmap
+        """
+        if key in self.roadmaps:
+            return self.roadmaps[key][0]
+        roadmap_path = self.get_roadmap_path(key)
+        if os.path.isfile(roadmap_path):
+            logging.info("Loading roadmap {}".format(roadmap_path))
+            with open(roadmap_path, "rb") as f:
+                self.roadmaps[key] = pickle.load(f)
+        else:
+            logging.info("Building roadmap {}".format(key))
+            samples = [sample_fn() for _ in range(self.num_samples)]
+            self.roadmaps[key] = (LazyRoadmap(samples, max_degree=self.max_degree, weights=weights), None, None)
+        return self.roadmaps[key][0]
+
+    def save_roadmap(self, key):
+        """
+        Save the roadmap for a key to disk
+
+        :param key: tuple identifying the roadmap
+        """
+        if not os.path.isdir(self.roadmap_dir):
+            os.makedirs(self.roadmap_dir)
+        with open(self.get_roadmap_path(key), "wb") as f:
+            pickle.dump(self.roadmaps[key], f)
+
+    def save_roadmaps(self):
+        """
+        Save all the roadmaps used so far to disk, with the collision results gathered by their queries
+        """
+        for key in self.roadmaps:
+            self.save_roadmap(key)
+
+    def update_obstacles(self, key, obstacle_aabbs, base_pose=None):
+        """
+        Invalidate the collision results of the roadmap that are affected by obstacles that moved, appeared or
+        disappeared since the last query. All results are invalidated if the robot base moved.
+
+        :param key: tuple identifying the roadmap
+        :param obstacle_aabbs: dictionary mapping obstacle body id to its current (2, 3) AABB
+        :param base_pose: optional robot base pose the roadmap collision results depend on
+        :return: number of invalidated vertex and edge collision results
+        """
+        roadmap, prev_obstacle_aabbs, prev_base_pose = self.roadmaps[key]
+        self.roadmaps[key] = (roadmap, obstacle_aabbs, base_pose)
+        if prev_obstacle_aabbs is None:
+            return 0
+
+        if (prev_base_pose is None) != (base_pose is None) or (
+            base_pose is not None and not np.allclose(prev_base_pose, base_pose, atol=self.pose_tolerance)
+        ):
+            num_invalidated = len(roadmap.colliding_vertices) + len(roadmap.colliding_edges)
+            roadmap.clear_collisions()
+            return num_invalidated
+
+        regions = []
+        for body_id in set(prev_obstacle_aabbs) | set(obstacle_aabbs):
+            prev_aabb, aabb = prev_obstacle_aabbs.get(body_id), obstacle_aabbs.get(body_id)
+            if prev_aabb is not None and aabb is not None and np.allclose(prev_aabb, aabb, atol=self.pose_tolerance):
+                continue
+            regions.extend(aabb for aabb in [prev_aabb, aabb] if aabb is not None)
+        if len(regions) == 0:
+            return 0
+        regions = np.array(regions)
+        return roadmap.invalidate(regions[:, 0], regions[:, 1])
+
+    def plan(
+        self,
+        key,
+        start_conf,
+        end_conf,
+        sample_fn,
+        distance_fn,
+        extend_fn,
+        collision_fn,
+        aabb_fn=None,
+        obstacle_ids=(),
+        base_pose=None,
+        weights=None,
+        save=False,
+        max_time=np.inf,
+    ):
+        """
+        Plan with the persistent roadmap for a key
+
+        :param key: tuple identifying the roadmap, e.g. (scene_id, robot_name, "arm")
+        :param start_conf: start configuration
+        :param end_conf: goal configuration
+        :param sample_fn: configuration sampler, only used when the roadmap is built
+        :param distance_fn: configuration space distance
+        :param extend_fn: configuration space interpolation
+        :param collision_fn: configuration collision checker
+        :param aabb_fn: function mapping a list of configurations to the workspace (lower, upper) AABB the robot
+            sweeps through them. Without it, collision results are never invalidated
+        :param obstacle_ids: pybullet body ids of the obstacles checked by collision_fn
+        :param base_pose: robot base pose that collision results depend on, e.g. for arm roadmaps
+        :param weights: configuration space distance weights used to connect vertices
+        :param save: whether to save the roadmap to disk after the query, see save_roadmaps to save them all at once
+        :param max_time: planning time budget in seconds
+        :return: list of configurations or None if no path was found
+        """
+        roadmap = self.get_roadmap(key, sample_fn, weights=weights)
+        if aabb_fn is not None:
+            num_invalidated = self.update_obstacles(key, get_body_aabbs(obstacle_ids), base_pose)
+            logging.info("Invalidated {} roadmap collision results".format(num_invalidated))
+        path = roadmap.query(start_conf, end_conf, distance_fn, extend_fn, collision_fn, aabb_fn, max_time=max_time)
+        if save:
+            self.save_roadmap(key)
+        return path
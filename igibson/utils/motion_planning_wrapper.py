@@ -5,16 +5,26 @@ import pybullet as p
 from transforms3d import euler
 
 from igibson.external.pybullet_tools.utils import (
+    CIRCULAR_LIMITS,
+    are_links_adjacent,
     control_joints,
+    get_all_links,
+    get_base_difference_fn,
+    get_base_distance_fn,
+    get_base_extend_configs,
     get_base_values,
+    get_collision_fn,
+    get_distance_fn,
+    get_extend_fn,
     get_joint_positions,
+    get_link_aabb_arrays,
     get_max_limits,
     get_min_limits,
     get_moving_links,
     get_sample_fn,
-    is_collision_free,
     joints_from_names,
     link_from_name,
+    pairwise_link_collision,
     plan_base_motion_2d,
     plan_joint_motion,
     set_base_values_with_z,
@@ -23,7 +33,9 @@ from igibson.external.pybullet_tools.utils import (
 from igibson.objects.visual_marker import VisualMarker
 from igibson.scenes.gibson_indoor_scene import StaticIndoorScene
 from igibson.scenes.igibson_indoor_scene import InteractiveIndoorScene
-from igibson.utils.utils import l2_distance, quatToXYZW, rotate_vector_2d
+from igibson.utils.motion_planning_ik import IKService
+from igibson.utils.motion_planning_roadmap import RoadmapService
+from igibson.utils.utils import quatToXYZW, rotate_vector_2d
 
 
 class MotionPlanningWrapper(object):
@@ -31,9 +43,22 @@ class MotionPlanningWrapper(object):
     Motion planner wrapper that supports both base and arm motion
     """
 
-    def __init__(self, env=None, base_mp_algo="birrt", arm_mp_algo="birrt", optimize_iter=0, fine_motion_plan=True):
+    def __init__(
+        self,
+        env=None,
+        base_mp_algo="birrt",
+        arm_mp_algo="birrt",
+        optimize_iter=0,
+        fine_motion_plan=True,
+        roadmap_dir=None,
+    ):
         """
         Get planning related parameters.
+
+        :param base_mp_algo: base motion planning algorithm, "roadmap" plans on a persistent lazy PRM roadmap
+            over the scene traversability map
+        :param arm_mp_algo: arm motion planning algorithm, "roadmap" plans on a persistent lazy PRM roadmap
+        :param roadmap_dir: directory where persistent roadmaps are saved
         """
         self.env = env
         assert "occupancy_grid" in self.env.output
@@ -52,6 +77,9 @@ class MotionPlanningWrapper(object):
         self.arm_mp_algo = arm_mp_algo
         self.base_mp_resolutions = np.array([0.05, 0.05, 0.05])
         self.optimize_iter = optimize_iter
+        self.roadmap_service = None
+        if "roadmap" in [base_mp_algo, arm_mp_algo]:
+            self.roadmap_service = RoadmapService(roadmap_dir)
         self.mode = self.env.mode
         self.initial_height = self.env.initial_pos_z_offset
         self.fine_motion_plan = fine_motion_plan
@@ -60,6 +88,7 @@ class MotionPlanningWrapper(object):
         if self.env.simulator.viewer is not None:
             self.env.simulator.viewer.setup_motion_planner(self)
 
+        self.ik_service = None
         if self.robot_type in ["Fetch", "Movo"]:
             self.setup_arm_mp()
 
@@ -80,6 +109,17 @@ class MotionPlanningWrapper(object):
             self.env.simulator.import_object(self.marker, use_pbr=False)
             self.env.simulator.import_object(self.marker_direction, use_pbr=False)
 
+    def close(self):
+        """
+        Save the persistent roadmaps, with the collision results gathered by the queries of this planner, and
+        disconnect the pybullet client of the IK service, if one was created
+        """
+        if self.roadmap_service is not None:
+            self.roadmap_service.save_roadmaps()
+        if self.ik_service is not None:
+            self.ik_service.disconnect()
+            self.ik_service = None
+
     def set_marker_position(self, pos):
         """
         Set subgoal marker position
@@ -166,6 +206,9 @@ class MotionPlanningWrapper(object):
             item for item in self.arm_joint_ids_all if item != self.robot.end_effector_part_index()
         ]
         self.arm_ik_threshold = 0.05
+        # The IK service loads a clone of the robot in its own pybullet client, so it is only created by the first
+        # arm IK query (see get_ik_service)
+        self.ik_joint_slice = slice(2, 10) if self.robot_type == "Fetch" else slice(0, 8)
 
         self.mp_obstacles = []
         if type(self.env.scene) == StaticIndoorScene:
@@ -184,6 +227,9 @@ class MotionPlanningWrapper(object):
         if self.marker is not None:
             self.set_marker_position_yaw([goal[0], goal[1], 0.05], goal[2])
 
+        if self.base_mp_algo == "roadmap":
+            return self.plan_base_motion_roadmap(goal)
+
         state = self.env.get_state()
         x, y, theta = goal
         grid = state["occupancy_grid"]
@@ -216,6 +262,46 @@ class MotionPlanningWrapper(object):
 
         return path
 
+    def plan_base_motion_roadmap(self, goal):
+        """
+        Plan base motion on the persistent roadmap of the scene floor, checking configurations against the
+        scene traversability map (already eroded by the robot footprint)
+
+        :param goal: base goal
+        :return: waypoints or None if no plan can be found
+        """
+        scene = self.env.scene
+        floor = getattr(self.env.task, "floor_num", 0)
+        trav_map = scene.floor_map[floor]
+        difference_fn = get_base_difference_fn()
+        distance_fn = get_base_distance_fn()
+
+        def sample_fn():
+            _, pos = scene.get_random_point(floor=floor)
+            return (pos[0], pos[1], np.random.uniform(*CIRCULAR_LIMITS))
+
+        def extend_fn(q1, q2):
+            return [tuple(q) for q in get_base_extend_configs(q1, q2, difference_fn, self.base_mp_resolutions)]
+
+        def collision_fn(q):
+            xy_map = scene.world_to_map(q[:2])
+            if np.any(xy_map < 0) or np.any(xy_map >= trav_map.shape[0]):
+                return True
+            return trav_map[xy_map[0], xy_map[1]] == 0
+
+        start_conf = get_base_values(self.robot_id)
+        if collision_fn(start_conf) or collision_fn(goal):
+            return None
+        return self.roadmap_service.plan(
+            (scene.scene_id, self.robot_type, "base", floor),
+            start_conf,
+            tuple(goal),
+            sample_fn,
+            distance_fn,
+            extend_fn,
+            collision_fn,
+        )
+
     def simulator_sync(self):
         """Sync the simulator to renderer"""
         self.env.simulator.sync()
@@ -269,6 +355,18 @@ class MotionPlanningWrapper(object):
 
         return (max_limits, min_limits, rest_position, joint_range, joint_damping)
 
+    def get_ik_service(self):
+        """
+        Get the IK service, creating it on the first call
+
+        :return: IK service for the arm of the robot
+        """
+        if self.ik_service is None:
+            self.ik_service = IKService(
+                self.robot, self.arm_joint_ids, self.ik_joint_slice, threshold=self.arm_ik_threshold
+            )
+        return self.ik_service
+
     def get_arm_joint_positions(self, arm_ik_goal):
         """
         Attempt to find arm_joint_positions that satisfies arm_subgoal
@@ -277,97 +375,41 @@ class MotionPlanningWrapper(object):
         :param arm_ik_goal: [x, y, z] in the world frame
         :return: arm joint positions
         """
-        ik_start = time()
-
-        max_limits, min_limits, rest_position, joint_range, joint_damping = self.get_ik_parameters()
-
-        n_attempt = 0
-        max_attempt = 75
+        ik_parameters = self.get_ik_parameters()
         sample_fn = get_sample_fn(self.robot_id, self.arm_joint_ids)
-        base_pose = get_base_values(self.robot_id)
-        state_id = p.saveState()
-        # p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, False)
-        # find collision-free IK solution for arm_subgoal
-        while n_attempt < max_attempt:
-            if self.robot_type == "Movo":
-                self.robot.tuck()
-
-            set_joint_positions(self.robot_id, self.arm_joint_ids, sample_fn())
-            arm_joint_positions = p.calculateInverseKinematics(
-                self.robot_id,
-                self.robot.end_effector_part_index(),
-                targetPosition=arm_ik_goal,
-                # targetOrientation=self.robots[0].get_orientation(),
-                lowerLimits=min_limits,
-                upperLimits=max_limits,
-                jointRanges=joint_range,
-                restPoses=rest_position,
-                jointDamping=joint_damping,
-                solver=p.IK_DLS,
-                maxNumIterations=100,
-            )
-
-            if self.robot_type == "Fetch":
-                arm_joint_positions = arm_joint_positions[2:10]
-            elif self.robot_type == "Movo":
-                arm_joint_positions = arm_joint_positions[:8]
-
-            set_joint_positions(self.robot_id, self.arm_joint_ids, arm_joint_positions)
-
-            dist = l2_distance(self.robot.get_end_effector_position(), arm_ik_goal)
-            # print('dist', dist)
-            if dist > self.arm_ik_threshold:
-                n_attempt += 1
-                continue
-
-            # need to simulator_step to get the latest collision
-            self.simulator_step()
-
-            # simulator_step will slightly move the robot base and the objects
-            set_base_values_with_z(self.robot_id, base_pose, z=self.initial_height)
-            # self.reset_object_states()
-            # TODO: have a princpled way for stashing and resetting object states
-
-            # arm should not have any collision
-            if self.robot_type == "Movo":
-                collision_free = is_collision_free(body_a=self.robot_id, link_a_list=self.arm_joint_ids_all)
-                # ignore linear link
-            else:
-                collision_free = is_collision_free(body_a=self.robot_id, link_a_list=self.arm_joint_ids)
+        # arm should not collide with the scene or itself. Collisions are checked with closest point queries,
+        # so the live simulation does not need to be stepped
+        collision_fn = get_collision_fn(
+            self.robot_id,
+            self.arm_joint_ids,
+            self.mp_obstacles,
+            [],
+            True,
+            self.get_arm_disabled_collisions(),
+            allow_collision_links=self.get_arm_allow_collision_links(),
+        )
 
-            if not collision_free:
-                n_attempt += 1
-                # print('arm has collision')
-                continue
+        # gripper should not have any self-collision
+        gripper_collision_fn = self.get_gripper_self_collision_fn()
 
-            # gripper should not have any self-collision
-            collision_free = is_collision_free(
-                body_a=self.robot_id, link_a_list=[self.robot.end_effector_part_index()], body_b=self.robot_id
-            )
-            if not collision_free:
-                n_attempt += 1
-                print("gripper has collision")
-                continue
-
-            # self.episode_metrics['arm_ik_time'] += time() - ik_start
-            # p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, True)
-            p.restoreState(state_id)
-            p.removeState(state_id)
-            return arm_joint_positions
-
-        # p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, True)
+        state_id = p.saveState()
+        if self.robot_type == "Movo":
+            self.robot.tuck()
+        arm_joint_positions = self.get_ik_service().solve(
+            arm_ik_goal,
+            ik_parameters,
+            sample_fn,
+            is_valid_fn=lambda q: not collision_fn(q) and not gripper_collision_fn(q),
+        )
         p.restoreState(state_id)
         p.removeState(state_id)
-        # self.episode_metrics['arm_ik_time'] += time() - ik_start
-        return None
+        return arm_joint_positions
 
-    def plan_arm_motion(self, arm_joint_positions):
+    def get_arm_disabled_collisions(self):
         """
-        Attempt to reach arm arm_joint_positions and return arm trajectory
-        If failed, reset the arm to its original pose and return None
+        Get the pairs of robot links whose collisions are ignored by arm motion planning
 
-        :param arm_joint_positions: final arm joint position to reach
-        :return: arm trajectory or None if no plan can be found
+        :return: set of link index pairs
         """
         disabled_collisions = {}
         if self.robot_type == "Fetch":
@@ -445,6 +487,54 @@ class MotionPlanningWrapper(object):
                     link_from_name(self.robot_id, "linear_actuator_fixed_link"),
                 ),
             }
+        return disabled_collisions
+
+    def get_gripper_self_collision_fn(self):
+        """
+        Get a function that checks whether the gripper collides with the rest of the robot, ignoring the links it
+        is attached to and the disabled collision pairs
+
+        :return: function mapping arm joint positions to whether the gripper is in self-collision
+        """
+        end_effector = self.robot.end_effector_part_index()
+        disabled_collisions = self.get_arm_disabled_collisions()
+        links = [
+            link
+            for link in get_all_links(self.robot_id)
+            if link != end_effector
+            and not are_links_adjacent(self.robot_id, end_effector, link)
+            and (end_effector, link) not in disabled_collisions
+            and (link, end_effector) not in disabled_collisions
+        ]
+
+        def gripper_collision_fn(arm_joint_positions):
+            set_joint_positions(self.robot_id, self.arm_joint_ids, arm_joint_positions)
+            return any(pairwise_link_collision(self.robot_id, end_effector, self.robot_id, link) for link in links)
+
+        return gripper_collision_fn
+
+    def get_arm_allow_collision_links(self):
+        """
+        Get the robot links that are allowed to collide with obstacles during arm motion planning
+
+        :return: list of link indices
+        """
+        allow_collision_links = []
+        if self.robot_type == "Fetch":
+            allow_collision_links = [19]
+        elif self.robot_type == "Movo":
+            allow_collision_links = [23, 24]
+        return allow_collision_links
+
+    def plan_arm_motion(self, arm_joint_positions):
+        """
+        Attempt to reach arm arm_joint_positions and return arm trajectory
+        If failed, reset the arm to its original pose and return None
+
+        :param arm_joint_positions: final arm joint position to reach
+        :return: arm trajectory or None if no plan can be found
+        """
+        disabled_collisions = self.get_arm_disabled_collisions()
 
         if self.fine_motion_plan:
             self_collisions = True
@@ -457,27 +547,83 @@ class MotionPlanningWrapper(object):
         p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, False)
         state_id = p.saveState()
 
-        allow_collision_links = []
-        if self.robot_type == "Fetch":
-            allow_collision_links = [19]
-        elif self.robot_type == "Movo":
-            allow_collision_links = [23, 24]
+        allow_collision_links = self.get_arm_allow_collision_links()
 
-        arm_path = plan_joint_motion(
-            self.robot_id,
-            self.arm_joint_ids,
-            arm_joint_positions,
-            disabled_collisions=disabled_collisions,
-            self_collisions=self_collisions,
-            obstacles=mp_obstacles,
-            algorithm=self.arm_mp_algo,
-            allow_collision_links=allow_collision_links,
-        )
+        if self.arm_mp_algo == "roadmap":
+            arm_path = self.plan_arm_motion_roadmap(
+                arm_joint_positions,
+                disabled_collisions=disabled_collisions,
+                self_collisions=self_collisions,
+                obstacles=mp_obstacles,
+                allow_collision_links=allow_collision_links,
+            )
+        else:
+            arm_path = plan_joint_motion(
+                self.robot_id,
+                self.arm_joint_ids,
+                arm_joint_positions,
+                disabled_collisions=disabled_collisions,
+                self_collisions=self_collisions,
+                obstacles=mp_obstacles,
+                algorithm=self.arm_mp_algo,
+                allow_collision_links=allow_collision_links,
+                optimize_iter=self.optimize_iter,
+            )
         p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, True)
         p.restoreState(state_id)
         p.removeState(state_id)
         return arm_path
 
+    def plan_arm_motion_roadmap(
+        self, arm_joint_positions, disabled_collisions, self_collisions, obstacles, allow_collision_links
+    ):
+        """
+        Plan arm motion on the persistent roadmap of the scene and robot. Only the collision results near
+        obstacles that moved since the last query are checked again
+
+        :param arm_joint_positions: final arm joint position to reach
+        :return: arm trajectory or None if no plan can be found
+        """
+        sample_fn = get_sample_fn(self.robot_id, self.arm_joint_ids)
+        distance_fn = get_distance_fn(self.robot_id, self.arm_joint_ids)
+        extend_fn = get_extend_fn(self.robot_id, self.arm_joint_ids)
+        collision_fn = get_collision_fn(
+            self.robot_id,
+            self.arm_joint_ids,
+            obstacles,
+            [],
+            self_collisions,
+            disabled_collisions,
+            allow_collision_links=allow_collision_links,
+        )
+        arm_links = [(self.robot_id, link) for link in self.arm_joint_ids_all]
+
+        def aabb_fn(confs):
+            lowers, uppers = [], []
+            for q in confs:
+                set_joint_positions(self.robot_id, self.arm_joint_ids, q)
+                link_lowers, link_uppers = get_link_aabb_arrays(arm_links)
+                lowers.append(np.min(link_lowers, axis=0))
+                uppers.append(np.max(link_uppers, axis=0))
+            return np.array([np.min(lowers, axis=0), np.max(uppers, axis=0)])
+
+        start_conf = get_joint_positions(self.robot_id, self.arm_joint_ids)
+        if collision_fn(start_conf) or collision_fn(arm_joint_positions):
+            return None
+        base_pose = np.concatenate(p.getBasePositionAndOrientation(self.robot_id))
+        return self.roadmap_service.plan(
+            (self.env.scene.scene_id, self.robot_type, "arm"),
+            start_conf,
+            tuple(arm_joint_positions),
+            sample_fn,
+            distance_fn,
+            extend_fn,
+            collision_fn,
+            aabb_fn=aabb_fn,
+            obstacle_ids=obstacles,
+            base_pose=base_pose,
+        )
+
     def dry_run_arm_plan(self, arm_path):
         """
         Dry run arm motion plan by setting the arm joint position without physics simulation
@@ -0,0 +1,357 @@
+"""
+This file contains a binary format for the internal (non-pybullet) states of all the objects of a scene.
+
+save_internal_states in checkpoint_utils builds nested dicts with one dump per state per object. Here, the dumps of
+each absolute state type are packed into typed NumPy arrays instead, following a schema per state type. A binary
+dump is a flat dict of arrays, so it can be stored with np.savez, and binary_to_json_states converts it back to the
+JSON format for tooling.
+"""
+
+import itertools
+import json
+
+import numpy as np
+
+from igibson.object_states import Dusty, MaxTemperature, Sliced, Soaked, Stained, Temperature, ToggledOn, WaterSource
+from igibson.object_states.factory import get_state_from_name, get_state_name
+from igibson.object_states.object_state_base import AbsoluteObjectState
+from igibson.objects.multi_object_wrappers import ObjectGrouper, ObjectMultiplexer
+from igibson.objects.stateful_object import StatefulObject
+
+# Kinds of the entities of a dump: the objects of the scene and the sub-objects of multiplexers and groupers.
+_STATEFUL, _MULTIPLEXER, _GROUPER, _STATELESS = range(4)
+
+
+def _to_json_compatible(value):
+    # NumPy values may be left in dumps that are otherwise JSON-compatible.
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError("%r is not JSON serializable" % (value,))
+
+
+def _encode_json(data):
+    return np.frombuffer(json.dumps(data, default=_to_json_compatible).encode("utf-8"), dtype=np.uint8)
+
+
+def _decode_json(array):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+class _ValueSchema(object):
+    """Packs states whose dump is a single value, e.g. a temperature or a flag."""
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+
+    def pack(self, dumps):
+        return {"value": np.array(dumps, dtype=self.dtype)}
+
+    def unpack(self, arrays):
+        return arrays["value"].tolist()
+
+
+class _ToggledOnSchema(object):
+    """Packs ToggledOn dumps, which are dicts with the value and the number of steps the hand was in the marker."""
+
+    def pack(self, dumps):
+        return {
+            "value": np.array([dump["value"] for dump in dumps], dtype=bool),
+            "hand_in_marker_steps": np.array([dump["hand_in_marker_steps"] for dump in dumps], dtype=np.int64),
+        }
+
+    def unpack(self, arrays):
+        return [
+            {"value": value, "hand_in_marker_steps": steps}
+            for value, steps in zip(arrays["value"].tolist(), arrays["hand_in_marker_steps"].tolist())
+        ]
+
+
+class _ParticleSchema(object):
+    """
+    Packs particle system dumps, which have a pose for each active particle and None for each stashed one. The
+    particles of all the objects are concatenated, and the names of the links the particles are attached to are
+    indices into a table of names.
+    """
+
+    def __init__(self, attached):
+        self.attached = attached
+
+    def pack(self, dumps):
+        particles = list(itertools.chain.from_iterable(dumps))
+        active = np.array([particle is not None for particle in particles], dtype=bool)
+        poses = [particle for particle in particles if particle is not None]
+
+        positions = np.zeros((len(particles), 3))
+        orientations = np.zeros((len(particles), 4))
+        links = np.full(len(particles), -1, dtype=np.int32)
+        link_names = []
+        if poses:
+            if self.attached:
+                particle_link_names, particle_positions, particle_orientations = zip(*poses)
+                link_names = sorted(set(name for name in particle_link_names if name is not None))
+                link_ids = {name: i for i, name in enumerate(link_names)}
+                links[active] = [-1 if name is None else link_ids[name] for name in particle_link_names]
+            else:
+                particle_positions, particle_orientations = zip(*poses)
+            positions[active] = particle_positions
+            orientations[active] = particle_orientations
+
+        return {
+            "num_particles": np.array([len(dump) for dump in dumps], dtype=np.int32),
+            "active": active,
+            "positions": positions,
+            "orientations": orientations,
+            "links": links,
+            "link_names": np.array(link_names, dtype=str),
+        }
+
+    def unpack(self, arrays):
+        link_names = arrays["link_names"].tolist()
+        particles = []
+        for active, position, orientation, link in zip(
+            arrays["active"].tolist(),
+            arrays["positions"].tolist(),
+            arrays["orientations"].tolist(),
+            arrays["links"].tolist(),
+        ):
+            if not active:
+                particles.append(None)
+            elif self.attached:
+                particles.append((None if link == -1 else link_names[link], position, orientation))
+            else:
+                particles.append((position, orientation))
+
+        offsets = np.cumsum(np.concatenate([[0], arrays["num_particles"]])).tolist()
+        return [particles[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+class _RowsSchema(object):
+    """Packs dumps that are lists of fixed-size rows, e.g. the sizes of the particles of a particle system."""
+
+    def __init__(self, row_size):
+        self.row_size = row_size
+
+    def pack(self, dumps):
+        rows = list(itertools.chain.from_iterable(dumps))
+        return {
+            "num_rows": np.array([len(dump) for dump in dumps], dtype=np.int32),
+            "rows": np.array(rows, dtype=np.float64).reshape(len(rows), self.row_size),
+        }
+
+    def unpack(self, arrays):
+        rows = [tuple(row) for row in arrays["rows"].tolist()]
+        offsets = np.cumsum(np.concatenate([[0], arrays["num_rows"]])).tolist()
+        return [rows[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+class _DictSchema(object):
+    """Packs dumps that are dicts with fixed keys, with a schema per key. The fields of a key are prefixed by it."""
+
+    def __init__(self, schemas):
+        self.schemas = schemas
+
+    def pack(self, dumps):
+        arrays = {}
+        for key, schema in self.schemas.items():
+            for field, array in schema.pack([dump[key] for dump in dumps]).items():
+                arrays["%s.%s" % (key, field)] = array
+        return arrays
+
+    def unpack(self, arrays):
+        values_by_key = {}
+        for key, schema in self.schemas.items():
+            prefix = key + "."
+            values_by_key[key] = schema.unpack(
+                {field[len(prefix) :]: array for field, array in arrays.items() if field.startswith(prefix)}
+            )
+        return [dict(zip(values_by_key, values)) for values in zip(*values_by_key.values())]
+
+
+class _JSONSchema(object):
+    """Fallback for the states without a schema. Most of them do not dump anything, so their dumps are only kept
+    if some of them are not None."""
+
+    def pack(self, dumps):
+        if all(dump is None for dump in dumps):
+            return {}
+        return {"json": _encode_json(dumps)}
+
+    def unpack(self, arrays):
+        if "json" not in arrays:
+            return None
+        return _decode_json(arrays["json"])
+
+
+_SCHEMAS = {
+    Temperature: _ValueSchema(np.float64),
+    MaxTemperature: _ValueSchema(np.float64),
+    Soaked: _ValueSchema(bool),
+    Sliced: _ValueSchema(bool),
+    ToggledOn: _ToggledOnSchema(),
+    Dusty: _DictSchema({"particles": _ParticleSchema(attached=True)}),
+    Stained: _DictSchema(
+        {"particles": _DictSchema({"dirt_dump": _ParticleSchema(attached=True), "random_bbox_dims": _RowsSchema(3)})}
+    ),
+    WaterSource: _DictSchema(
+        {
+            "sizes": _RowsSchema(3),
+            "colors": _RowsSchema(4),
+            "steps_since_last_drop_step": _ValueSchema(np.float64),
+            "particle_poses": _ParticleSchema(attached=False),
+        }
+    ),
+}
+_JSON_SCHEMA = _JSONSchema()
+
+
+def _get_entities(simulator):
+    """
+    Flatten the objects of the scene, including the sub-objects of multiplexers and groupers, in a fixed order.
+
+    :return: names, kinds and parent indices of the entities, and the objects themselves
+    """
+    names, kinds, parents, objects = [], [], [], []
+
+    def add(name, obj, parent):
+        index = len(names)
+        names.append(name)
+        parents.append(parent)
+        objects.append(obj)
+        # Multiplexers and groupers are stateful objects too, so they are checked first.
+        if isinstance(obj, ObjectMultiplexer):
+            kinds.append(_MULTIPLEXER)
+            sub_objects = obj._multiplexed_objects
+        elif isinstance(obj, ObjectGrouper):
+            kinds.append(_GROUPER)
+            sub_objects = obj.objects
+        else:
+            kinds.append(_STATEFUL if isinstance(obj, StatefulObject) else _STATELESS)
+            sub_objects = []
+        for i, sub_obj in enumerate(sub_objects):
+            add("%s/%d" % (name, i), sub_obj, index)
+
+    for name, obj in simulator.scene.objects_by_name.items():
+        add(name, obj, -1)
+    return names, kinds, parents, objects
+
+
+def save_internal_states_binary(simulator):
+    """
+    Dump the internal states of all the objects and robots of the simulator into arrays.
+
+    :param simulator: Simulator
+    :return: dict of arrays
+    """
+    names, kinds, parents, objects = _get_entities(simulator)
+    dump = {
+        "entities/names": np.array(names, dtype=str),
+        "entities/kinds": np.array(kinds, dtype=np.int8),
+        "entities/parents": np.array(parents, dtype=np.int32),
+        "entities/current_index": np.array(
+            [obj.current_index if kind == _MULTIPLEXER else -1 for obj, kind in zip(objects, kinds)], dtype=np.int32
+        ),
+    }
+
+    # Gather the dumps of each state type over all the objects that have it.
+    dumps_by_state = {}
+    for entity, (obj, kind) in enumerate(zip(objects, kinds)):
+        if kind != _STATEFUL:
+            continue
+        for state_type, state_instance in obj.states.items():
+            if issubclass(state_type, AbsoluteObjectState):
+                entities, dumps = dumps_by_state.setdefault(state_type, ([], []))
+                entities.append(entity)
+                dumps.append(state_instance.dump())
+
+    for state_type, (entities, dumps) in dumps_by_state.items():
+        prefix = "states/%s/" % get_state_name(state_type)
+        dump[prefix + "entities"] = np.array(entities, dtype=np.int32)
+        for field, array in _SCHEMAS.get(state_type, _JSON_SCHEMA).pack(dumps).items():
+            dump[prefix + field] = array
+
+    dump["robots/json"] = _encode_json([robot.dump_state() for robot in simulator.robots])
+    return dump
+
+
+def _unpack_states(dump):
+    """
+    :return: dict mapping each state type of the dump to the entities that have it and their dumps
+    """
+    fields_by_state = {}
+    for key, array in dump.items():
+        if key.startswith("states/"):
+            _, state_name, field = key.split("/")
+            fields_by_state.setdefault(state_name, {})[field] = array
+
+    states = {}
+    for state_name, arrays in fields_by_state.items():
+        state_type = get_state_from_name(state_name)
+        entities = arrays["entities"].tolist()
+        dumps = _SCHEMAS.get(state_type, _JSON_SCHEMA).unpack(arrays)
+        states[state_type] = (entities, dumps if dumps is not None else [None] * len(entities))
+    return states
+
+
+def load_internal_states_binary(simulator, dump):
+    """
+    Restore the internal states of all the objects and robots of the simulator from a binary dump.
+
+    :param simulator: Simulator
+    :param dump: dict of arrays from save_internal_states_binary
+    """
+    names, _, _, objects = _get_entities(simulator)
+    objects_by_name = dict(zip(names, objects))
+    dump_names = dump["entities/names"].tolist()
+
+    for name, kind, current_index in zip(
+        dump_names, dump["entities/kinds"].tolist(), dump["entities/current_index"].tolist()
+    ):
+        if kind == _MULTIPLEXER:
+            objects_by_name[name].current_index = current_index
+
+    # The sub-objects of groupers are loaded directly, like a grouper loads a dump of its own.
+    for state_type, (entities, dumps) in _unpack_states(dump).items():
+        for entity, state_dump in zip(entities, dumps):
+            objects_by_name[dump_names[entity]].states[state_type].load(state_dump)
+
+    for robot, robot_dump in zip(simulator.robots, _decode_json(dump["robots/json"])):
+        robot.load_state(robot_dump)
+
+
+def binary_to_json_states(dump):
+    """
+    Convert a binary dump to the format of save_internal_states, e.g. to store it as JSON.
+
+    :param dump: dict of arrays from save_internal_states_binary
+    :return: dict with the dumps of the objects and the robots
+    """
+    names = dump["entities/names"].tolist()
+    kinds = dump["entities/kinds"].tolist()
+    parents = dump["entities/parents"].tolist()
+    current_indices = dump["entities/current_index"].tolist()
+
+    state_dumps = [{} for _ in names]
+    for state_type, (entities, dumps) in _unpack_states(dump).items():
+        for entity, state_dump in zip(entities, dumps):
+            state_dumps[entity][get_state_name(state_type)] = state_dump
+
+    children = [[] for _ in names]
+    for entity, parent in enumerate(parents):
+        if parent != -1:
+            children[parent].append(entity)
+
+    def to_json(entity):
+        if kinds[entity] == _MULTIPLEXER:
+            return {
+                "current_index": current_indices[entity],
+                "sub_states": [to_json(child) for child in children[entity]],
+            }
+        if kinds[entity] == _GROUPER:
+            child_dumps = [to_json(child) for child in children[entity]]
+            return {state_name: [child_dump[state_name] for child_dump in child_dumps] for state_name in child_dumps[0]}
+        if kinds[entity] == _STATELESS:
+            return None
+        return state_dumps[entity]
+
+    object_dump = {name: to_json(entity) for entity, name in enumerate(names) if parents[entity] == -1}
+    return {"objects": object_dump, "robots": _decode_json(dump["robots/json"])}
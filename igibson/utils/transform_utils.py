@@ -549,6 +549,85 @@ def quat2mat(quaternion):
     )
 
 
+def quat_apply(quaternion, vector):
+    """
+    Rotates vectors by quaternions. Leading dimensions of both arguments are broadcast against each other,
+    so a batch of points can be transformed by a batch of link orientations at once.
+
+    Args:
+        quaternion (np.array): (..., 4) (x,y,z,w) quaternions
+        vector (np.array): (..., 3) vectors
+
+    Returns:
+        np.array: (..., 3) rotated vectors
+    """
+    quaternion = np.asarray(quaternion, dtype=np.float64)
+    vector = np.asarray(vector, dtype=np.float64)
+    xyz = quaternion[..., :3]
+    t = 2.0 * np.cross(xyz, vector)
+    return vector + quaternion[..., 3:] * t + np.cross(xyz, t)
+
+
+def quat_multiply_batch(quaternion1, quaternion0):
+    """
+    Batched version of quat_multiply (q1 * q0). Leading dimensions of both arguments are broadcast against each other.
+
+    Args:
+        quaternion1 (np.array): (..., 4) (x,y,z,w) quaternions
+        quaternion0 (np.array): (..., 4) (x,y,z,w) quaternions
+
+    Returns:
+        np.array: (..., 4) (x,y,z,w) multiplied quaternions
+    """
+    quaternion1 = np.asarray(quaternion1, dtype=np.float64)
+    quaternion0 = np.asarray(quaternion0, dtype=np.float64)
+    xyz1, w1 = quaternion1[..., :3], quaternion1[..., 3:]
+    xyz0, w0 = quaternion0[..., :3], quaternion0[..., 3:]
+    xyz = w1 * xyz0 + w0 * xyz1 + np.cross(xyz1, xyz0)
+    w = w1 * w0 - np.sum(xyz1 * xyz0, axis=-1, keepdims=True)
+    return np.concatenate([xyz, w], axis=-1)
+
+
+def quat2mat_batch(quaternion):
+    """
+    Batched version of quat2mat for unit quaternions.
+
+    Args:
+        quaternion (np.array): (..., 4) (x,y,z,w) quaternions
+
+    Returns:
+        np.array: (..., 3, 3) rotation matrices
+    """
+    quaternion = np.asarray(quaternion, dtype=np.float64)
+    x, y, z, w = quaternion[..., 0], quaternion[..., 1], quaternion[..., 2], quaternion[..., 3]
+    return np.stack(
+        [
+            np.stack([1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - z * w), 2.0 * (x * z + y * w)], axis=-1),
+            np.stack([2.0 * (x * y + z * w), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - x * w)], axis=-1),
+            np.stack([2.0 * (x * z - y * w), 2.0 * (y * z + x * w), 1.0 - 2.0 * (x * x + y * y)], axis=-1),
+        ],
+        axis=-2,
+    )
+
+
+def quat2euler(quaternion):
+    """
+    Converts quaternions to (r,p,y) euler angles, matching pybullet's getEulerFromQuaternion.
+
+    Args:
+        quaternion (np.array): (..., 4) (x,y,z,w) quaternions
+
+    Returns:
+        np.array: (..., 3) (r,p,y) angles
+    """
+    quaternion = np.asarray(quaternion, dtype=np.float64)
+    x, y, z, w = quaternion[..., 0], quaternion[..., 1], quaternion[..., 2], quaternion[..., 3]
+    roll = np.arctan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2.0 * (w * y - z * x), -1.0, 1.0))
+    yaw = np.arctan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    return np.stack([roll, pitch, yaw], axis=-1)
+
+
 def quat2axisangle(quat):
     """
     Converts quaternion to axis-angle format.
@@ -162,6 +162,9 @@ setup(
         "py360convert",
         "bddl",
     ],
+    extras_require={
+        "log_export": ["pyarrow>=6.0"],
+    },
     ext_modules=[CMakeExtension("MeshRendererContext", sourcedir="igibson/render")],
     cmdclass=dict(build_ext=CMakeBuild),
     tests_require=[],